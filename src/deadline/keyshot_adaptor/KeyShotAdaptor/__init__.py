@@ -1,9 +1,26 @@
 # Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
 
-from .__main__ import main
-from .adaptor import KeyShotAdaptor
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .__main__ import main
+    from .adaptor import KeyShotAdaptor
 
 __all__ = [
     "KeyShotAdaptor",
     "main",
 ]
+
+
+def __getattr__(name: str) -> Any:
+    # Imported on first use, so that running this package as a module does not import __main__
+    # twice, and so that the `daemon run` of each task does not import the adaptor
+    if name == "main":
+        from .__main__ import main
+
+        return main
+    if name == "KeyShotAdaptor":
+        from .adaptor import KeyShotAdaptor
+
+        return KeyShotAdaptor
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -3,9 +3,8 @@
 import logging as _logging
 import sys as _sys
 
-from openjd.adaptor_runtime import EntryPoint as _EntryPoint
-
-from .adaptor import KeyShotAdaptor
+from .daemon_client import is_daemon_client_command as _is_daemon_client_command
+from .daemon_client import run_daemon_command as _run_daemon_command
 
 __all__ = ["main"]
 _logger = _logging.getLogger(__name__)
@@ -22,7 +21,11 @@ def main() -> None:
         raise RuntimeError(f"Must be run as a module. Do not run {__file__} directly")
 
     try:
-        _EntryPoint(KeyShotAdaptor).start()
+        if _is_daemon_client_command(_sys.argv[1:]):
+            # Every task runs `daemon run`, which does not need the adaptor or the runtime
+            _run_daemon_command(_sys.argv[1:])
+        else:
+            _start_entry_point()
     except Exception as e:
         _logger.error(f"Entrypoint failed: {e}")
         _sys.exit(1)
@@ -30,5 +33,13 @@ def main() -> None:
     _logger.info("Done KeyShotAdaptor main")
 
 
+def _start_entry_point() -> None:
+    from openjd.adaptor_runtime import EntryPoint
+
+    from .adaptor import KeyShotAdaptor
+
+    EntryPoint(KeyShotAdaptor).start()
+
+
 if __name__ == "__main__":
     main()
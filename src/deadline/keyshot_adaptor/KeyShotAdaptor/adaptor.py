@@ -4,22 +4,52 @@ from __future__ import annotations
 import logging
 import os
 import re
+import shutil
 import sys
+import tempfile
 import threading
 import time
 from functools import wraps
-from typing import Callable
+from typing import Any, Callable, Optional
 
-from deadline.client.api import TelemetryClient, get_deadline_cloud_library_telemetry_client
 from openjd.adaptor_runtime._version import version as openjd_adaptor_version
 from openjd.adaptor_runtime.adaptors import Adaptor, AdaptorDataValidators, SemanticVersion
 from openjd.adaptor_runtime.adaptors.configuration import AdaptorConfiguration
-from openjd.adaptor_runtime.app_handlers import RegexCallback, RegexHandler
 from openjd.adaptor_runtime.application_ipc import ActionsQueue, AdaptorServer
 from openjd.adaptor_runtime.process import LoggingSubprocess
 from openjd.adaptor_runtime_client import Action
 
 from .._version import version as adaptor_version
+from .output_handler import (
+    ACTION,
+    COMPLETE,
+    ERROR,
+    PROGRESS,
+    VERSION,
+    VIDEO_ENCODE_ERROR,
+    KeyShotOutputHandler,
+)
+from .output_mover import SCRATCH_DIR_ENV_VAR, OutputMover
+from .output_verifier import OutputVerifier
+from .pool import KeyShotProcessPool, PooledKeyShotProcess
+from .prefetch import Prefetcher
+from .preflight import (
+    check_free_space,
+    check_output_directory,
+    check_scene_file,
+    estimate_output_bytes,
+    free_space_margin_bytes,
+)
+from .progress import ProgressReporter
+from .render_cache import RenderCache, file_digest, render_cache_key
+from .render_metrics import FrameMetricsSampler, read_process_sample, summarize_frames
+from .scene_cache import SceneCache
+from .samples import sample_output_path
+from .session_events import SessionEventLog
+from .shots import expand_shots, shot_output_path
+from .startup import StartupPipeline
+from .telemetry import TelemetryRecorder
+from .tiles import tile_output_path, tile_region
 
 _logger = logging.getLogger(__name__)
 
@@ -30,7 +60,86 @@ class KeyShotNotRunningError(Exception):
 
 _FIRST_KEYSHOT_ACTIONS = ["scene_file", "output_file_path", "output_format"]
 
-_KEYSHOT_RUN_KEYS = {"frame"}
+# A single item of an Open Job Description range expression, e.g. "5", "1-10" or "1-10:2"
+_FRAME_RANGE_ITEM_RE = re.compile(r"^\s*(-?\d+)\s*(?:-\s*(-?\d+)\s*(?::\s*(-?\d+)\s*)?)?$")
+
+
+def _parse_frames(frame: Any) -> list[int]:
+    """
+    Converts the "frame" value from the run data into the list of frames to render.
+
+    Args:
+        frame (Any): A single frame number, a list of frame numbers or a range expression such as
+                     "1-10", "1-10:2" or "1-3,8,11-15", as produced by a CHUNK[INT] task parameter.
+
+    Raises:
+        ValueError: If the value is not a valid frame, frame list or range expression.
+
+    Returns:
+        list[int]: The frames to render, in order.
+    """
+    if isinstance(frame, list):
+        return [int(f) for f in frame]
+    if not isinstance(frame, str):
+        return [int(frame)]
+
+    frames: list[int] = []
+    for item in frame.split(","):
+        match = _FRAME_RANGE_ITEM_RE.match(item)
+        if not match:
+            raise ValueError(f"Invalid frame range expression: '{frame}'")
+        start, end, step = match.groups()
+        if end is None:
+            frames.append(int(start))
+            continue
+        step_value = int(step) if step is not None else (1 if int(end) >= int(start) else -1)
+        if step_value == 0:
+            raise ValueError(f"Invalid frame range expression: '{frame}'")
+        item_frames = range(int(start), int(end) + (1 if step_value > 0 else -1), step_value)
+        if not item_frames:
+            raise ValueError(f"Invalid frame range expression: '{frame}'")
+        frames.extend(item_frames)
+    return frames
+
+
+class _NotifyingActionsQueue(ActionsQueue):
+    """
+    ActionsQueue that notifies a condition whenever an action is dequeued by the adaptor server,
+    so that the adaptor can wait for the KeyShot client to consume actions without polling.
+    Dequeueing from an empty queue waits a moment for an action to be enqueued: the adaptor server
+    holds the KeyShot client's request for the next action open and retries an empty dequeue
+    after a fixed sleep, so the client gets an action as soon as it is enqueued instead.
+    """
+
+    # Longest time a dequeue from an empty queue waits for an action to be enqueued
+    _DEQUEUE_WAIT_SECONDS = 1.0
+
+    def __init__(self, condition: threading.Condition) -> None:
+        super().__init__()
+        self._condition = condition
+        self._enqueued = threading.Condition()
+
+    def enqueue_action(self, a: Action, front: bool = False) -> None:
+        with self._enqueued:
+            super().enqueue_action(a, front)
+            self._enqueued.notify_all()
+
+    def dequeue_action(self, timeout: float = _DEQUEUE_WAIT_SECONDS) -> Optional[Action]:
+        with self._enqueued:
+            self._enqueued.wait_for(lambda: len(self) > 0, timeout=timeout)
+            action = super().dequeue_action()
+        if action is not None:
+            with self._condition:
+                self._condition.notify_all()
+        return action
+
+    def clear(self) -> None:
+        """Removes every action from the queue."""
+        with self._enqueued:
+            self._actions_queue.clear()
+            self._enqueued.notify_all()
+        with self._condition:
+            self._condition.notify_all()
 
 
 def _check_for_exception(func: Callable) -> Callable:
@@ -56,39 +165,104 @@ class KeyShotAdaptor(Adaptor[AdaptorConfiguration]):
     _SERVER_END_TIMEOUT_SECONDS = 30
     _KEYSHOT_START_TIMEOUT_SECONDS = 300
     _KEYSHOT_END_TIMEOUT_SECONDS = 30
+    # How long the end of a session waits for telemetry events to be sent
+    _TELEMETRY_SHUTDOWN_TIMEOUT_SECONDS = 2.0
+    # Upper bound on how long a wait sleeps between re-checking its condition. State changes are
+    # signalled through _state_changed, this only guards against a missed notification.
+    _STATE_CHANGE_FALLBACK_SECONDS = 1.0
+    # Minimum time between two progress updates sent to the worker agent while rendering
+    _PROGRESS_REPORT_INTERVAL_SECONDS = 1.0
+    # Time between two samples of the resource usage of KeyShot while a frame renders
+    _FRAME_METRICS_SAMPLE_INTERVAL_SECONDS = 0.5
+    # Number of outputs rendered to the scratch directory that can wait to be copied to their path
+    # before KeyShot output is no longer processed
+    _SCRATCH_COPY_QUEUE_DEPTH = 4
 
     _server: AdaptorServer | None = None
     _server_thread: threading.Thread | None = None
-    _keyshot_client: LoggingSubprocess | None = None
-    _action_queue = ActionsQueue()
+    _keyshot_client: LoggingSubprocess | PooledKeyShotProcess | None = None
+    _keyshot_client_watcher: threading.Thread | None = None
+    _action_queue: _NotifyingActionsQueue
     _is_rendering: bool = False
     # If a thread raises an exception we will update this to raise in the main thread
     _exc_info: Exception | None = None
     _performing_cleanup = False
-    _regex_callbacks: list | None = None
+    _output_callbacks: dict[str, Callable[[re.Match], None]] | None = None
     _validators: AdaptorDataValidators | None = None
-    _telemetry_client: TelemetryClient | None = None
     _keyshot_version: str = ""
 
-    # Variables used for keeping track of produced outputs for progress reporting.
-    # Will be optionally changed after the scene is set.
-    _expected_outputs: int = 1  # Total number of renders to perform.
-    _produced_outputs: int = 0  # Counter for tracking number of complete renders.
+    def __init__(self, init_data: dict, **kwargs) -> None:
+        super().__init__(init_data, **kwargs)
+        # Notified whenever the render state, the action queue, the KeyShot client process or the
+        # pending exception changes, so the adaptor can wait on it instead of sleep-polling.
+        self._state_changed = threading.Condition()
+        self._server_ready = threading.Event()
+        self._action_queue = _NotifyingActionsQueue(self._state_changed)
+        # Keeps track of the renders of the current task for progress reporting.
+        self._progress = ProgressReporter(
+            self.update_status, min_interval_seconds=self._PROGRESS_REPORT_INTERVAL_SECONDS
+        )
+        # The worker's pool of KeyShot processes that outlive sessions, if it is enabled.
+        self._pool = KeyShotProcessPool.from_environment()
+        # Timings of the phases of the session and of the actions performed by KeyShot
+        self._events = SessionEventLog.from_environment()
+        # When KeyShot was launched, until KeyShot reports its version
+        self._keyshot_launched_at: float | None = None
+        # Measures the resources KeyShot uses to render each frame of the current task
+        self._frame_metrics = FrameMetricsSampler(
+            lambda: self._keyshot_client.pid if self._keyshot_client is not None else None,
+            interval_seconds=self._FRAME_METRICS_SAMPLE_INTERVAL_SECONDS,
+            clock=self._events.now,
+        )
+        self._task_frames: list[int] = []
+        self._task_frame_metrics: list[dict[str, Any]] = []
+        # KeyShot is restarted between tasks once it rendered this many frames or uses this much
+        # memory, 0 disables the limit
+        self._recycle_max_frames = int(os.environ.get("KEYSHOT_ADAPTOR_RECYCLE_MAX_FRAMES", "0"))
+        self._recycle_rss_bytes = int(
+            float(os.environ.get("KEYSHOT_ADAPTOR_RECYCLE_RSS_MB", "0")) * 1024 * 1024
+        )
+        self._frames_rendered_by_keyshot = 0
+        # KeyShot is restarted and the unfinished frames of a task are rendered again this many
+        # times if KeyShot exits unexpectedly, 0 fails the task instead
+        self._crash_retries = int(os.environ.get("KEYSHOT_ADAPTOR_CRASH_RETRIES", "0"))
+        self._crash_retry_backoff_seconds = float(
+            os.environ.get("KEYSHOT_ADAPTOR_CRASH_RETRY_BACKOFF_SECONDS", "5")
+        )
+        self._cancel_requested = False
+        # Verifies each output in the background while the next frame renders, and hashes it if
+        # a manifest directory is configured
+        self._output_verifier = OutputVerifier.from_environment(self.init_data.get("output_format"))
+        # KeyShot renders to a directory in this local directory, if it is set, and the outputs
+        # are copied to their path in the background
+        self._scratch_root = os.environ.get(SCRATCH_DIR_ENV_VAR) or None
+        # Outputs that were rendered before are copied from the render cache, if it is enabled
+        self._render_cache = RenderCache.from_environment()
+        self._scene_digest: str | None = None
+        # Scene files are copied to a local disk of the worker once, if the cache is enabled
+        self._scene_cache = SceneCache.from_environment()
+        # Reads the scene and input files in the background while KeyShot starts up, if enabled
+        self._prefetcher = Prefetcher.from_environment()
+        # When KeyShot started opening the scene, until the prefetched files are reported
+        self._scene_open_started_at: float | None = None
+        # Free disk space that is required on top of the estimated size of the outputs
+        self._free_space_margin_bytes = free_space_margin_bytes()
+        # The size of the largest output that the session rendered, 0 until one was verified
+        self._largest_output_bytes = 0
+        self._scratch_dir: str | None = None
+        self._output_mover = OutputMover(queue_depth=self._SCRATCH_COPY_QUEUE_DEPTH)
+        # Sends telemetry events in the background, the telemetry client is created on first use
+        self._telemetry = TelemetryRecorder(
+            {
+                "deadline-cloud-for-keyshot-adaptor-version": adaptor_version,
+                "open-jd-adaptor-runtime-version": openjd_adaptor_version,
+            },
+            shutdown_timeout_seconds=self._TELEMETRY_SHUTDOWN_TIMEOUT_SECONDS,
+        )
 
     @property
     def integration_data_interface_version(self) -> SemanticVersion:
-        return SemanticVersion(major=0, minor=1)
-
-    @staticmethod
-    def _get_timer(timeout: int | float) -> Callable[[], bool]:
-        """
-        Given a timeout length, returns a lambda which returns False until the timeout occurs.
-
-        Args:
-            timeout (int): The amount of time (in seconds) to wait before timing out.
-        """
-        timeout_time = time.time() + timeout
-        return lambda: time.time() >= timeout_time
+        return SemanticVersion(major=0, minor=7)
 
     @property
     def _has_exception(self) -> bool:
@@ -130,11 +304,46 @@ class KeyShotAdaptor(Adaptor[AdaptorConfiguration]):
             value (bool): A boolean indicating if KeyShot is rendering.
         """
         self._is_rendering = value
+        self._notify_state_changed()
+
+    def _notify_state_changed(self) -> None:
+        """
+        Wakes up every thread waiting in _wait_for_state so that it re-evaluates its condition.
+        """
+        with self._state_changed:
+            self._state_changed.notify_all()
+
+    def _wait_for_state(
+        self, predicate: Callable[[], bool], timeout: int | float | None = None
+    ) -> bool:
+        """
+        Blocks until the predicate returns True or the timeout elapses. The predicate is
+        re-evaluated every time _notify_state_changed is called.
+
+        Args:
+            predicate (Callable[[], bool]): The condition to wait for.
+            timeout (int | float | None): The amount of time (in seconds) to wait before giving up.
+                                          Waits indefinitely if None.
+
+        Returns:
+            bool: The last value returned by the predicate.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._state_changed:
+            while not predicate():
+                wait_time = self._STATE_CHANGE_FALLBACK_SECONDS
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    wait_time = min(wait_time, remaining)
+                self._state_changed.wait(wait_time)
+        return True
 
     def _wait_for_server(self) -> str:
         """
-        Performs a busy wait for the server path that the adaptor server is running on, then
-        returns it.
+        Waits for the adaptor server to signal that it is ready, then returns the server path
+        that it is running on.
 
         Raises:
             RuntimeError: If the server does not finish initializing
@@ -142,9 +351,7 @@ class KeyShotAdaptor(Adaptor[AdaptorConfiguration]):
         Returns:
             str: The server path where the adaptor server is running.
         """
-        is_timed_out = self._get_timer(self._SERVER_START_TIMEOUT_SECONDS)
-        while (self._server is None or self._server.server_path is None) and not is_timed_out():
-            time.sleep(0.01)
+        self._server_ready.wait(self._SERVER_START_TIMEOUT_SECONDS)
 
         if self._server is not None and self._server.server_path is not None:
             return self._server.server_path
@@ -158,7 +365,11 @@ class KeyShotAdaptor(Adaptor[AdaptorConfiguration]):
         Starts a server with the given ActionsQueue, attaches the server to the adaptor and serves
         forever in a blocking call.
         """
-        self._server = AdaptorServer(self._action_queue, self)
+        try:
+            self._server = AdaptorServer(self._action_queue, self)
+        finally:
+            # Wake up _wait_for_server even if the server failed to initialize
+            self._server_ready.set()
         self._server.serve_forever()
 
     def _start_keyshot_server_thread(self) -> None:
@@ -168,6 +379,7 @@ class KeyShotAdaptor(Adaptor[AdaptorConfiguration]):
         the server path where the server is running after the server has
         finished starting.
         """
+        self._server_ready.clear()
         self._server_thread = threading.Thread(
             target=self._start_keyshot_server, name="KeyShotAdaptorServerThread"
         )
@@ -182,38 +394,27 @@ class KeyShotAdaptor(Adaptor[AdaptorConfiguration]):
             self._validators = AdaptorDataValidators.for_adaptor(schema_dir)
         return self._validators
 
-    def _get_regex_callbacks(self) -> list[RegexCallback]:
+    def _get_output_callbacks(self) -> dict[str, Callable[[re.Match], None]]:
         """
-        Returns a list of RegexCallbacks used by the KeyShot Adaptor
+        Returns the callbacks used by the KeyShot Adaptor for each kind of KeyShot output, in the
+        order they are called when a line is of several kinds.
 
         Returns:
-            list[RegexCallback]: List of Regex Callbacks to add
+            dict[str, Callable[[re.Match], None]]: The callback for each kind of output
         """
-        if not self._regex_callbacks:
-            callback_list = []
-
-            completed_regexes = [re.compile(".*Finished Rendering.*")]
-            progress_regexes = [re.compile(".*Rendering: ([0-9]+)%.*")]
-            error_regexes = [re.compile(".*Error: .*|.*\\[Error\\].*", re.IGNORECASE)]
-            video_output_error_regexes = [
-                re.compile(
-                    ".*You cannot use EXR, TIFF 32 or PSD for the frames when encoding a movie!.*"
-                )
-            ]
-            # Capture the major minor patch version.
-            version_regexes = [re.compile("KeyShotClient: KeyShot Version ([0-9]+.[0-9]+.[0-9]+)")]
-
-            callback_list.append(RegexCallback(completed_regexes, self._handle_complete))
-            callback_list.append(RegexCallback(progress_regexes, self._handle_progress))
+        if not self._output_callbacks:
+            callbacks: dict[str, Callable[[re.Match], None]] = {
+                COMPLETE: self._handle_complete,
+                PROGRESS: self._handle_progress,
+            }
             if self.init_data.get("strict_error_checking", False):
-                callback_list.append(RegexCallback(error_regexes, self._handle_error))
-            callback_list.append(
-                RegexCallback(video_output_error_regexes, self._handle_video_encode_error)
-            )
-            callback_list.append(RegexCallback(version_regexes, self._handle_version))
+                callbacks[ERROR] = self._handle_error
+            callbacks[VIDEO_ENCODE_ERROR] = self._handle_video_encode_error
+            callbacks[VERSION] = self._handle_version
+            callbacks[ACTION] = self._handle_action
 
-            self._regex_callbacks = callback_list
-        return self._regex_callbacks
+            self._output_callbacks = callbacks
+        return self._output_callbacks
 
     def _handle_logging(self, match: re.Match) -> None:
         print(match.group(0))
@@ -221,13 +422,62 @@ class KeyShotAdaptor(Adaptor[AdaptorConfiguration]):
     @_check_for_exception
     def _handle_complete(self, match: re.Match) -> None:
         """
-        Callback for stdout that indicate completeness of a render. Updates progress to 100
+        Callback for stdout that indicate completeness of a render. Rendering is finished, and
+        progress is updated to 100, once every expected output has been produced.
         Args:
             match (re.Match): The match object from the regex pattern that was matched in the
                               message.
         """
-        self._keyshot_is_rendering = False
-        self.update_status(progress=100)
+        self._finish_frame_metrics()
+        self._frames_rendered_by_keyshot += 1
+        output_path = match.group("output_path")
+        if output_path:
+            destination = self._get_final_output_path(output_path)
+            if destination is None:
+                self._output_verifier.submit(output_path)
+            else:
+                # Blocks while too many outputs wait to be copied
+                verified = self._output_verifier.submit(output_path, manifest_path=destination)
+                self._output_mover.submit(output_path, destination, wait_for=verified)
+        if self._progress.complete_output():
+            self._keyshot_is_rendering = False
+        elif self._progress.produced_outputs < len(self._task_frames):
+            self._frame_metrics.start(self._task_frames[self._progress.produced_outputs])
+
+    def _get_scratch_output_path(self) -> str:
+        """
+        Returns:
+            str: The output file path in the scratch directory of the session, which is created
+                on first use.
+        """
+        if self._scratch_dir is None:
+            assert self._scratch_root is not None
+            os.makedirs(self._scratch_root, exist_ok=True)
+            self._scratch_dir = tempfile.mkdtemp(prefix="keyshot-adaptor-", dir=self._scratch_root)
+        return os.path.join(self._scratch_dir, os.path.basename(self.init_data["output_file_path"]))
+
+    def _get_final_output_path(self, output_path: str) -> str | None:
+        """
+        Returns:
+            str | None: The path that an output in the scratch directory is copied to, or None if
+                the output was not rendered to the scratch directory.
+        """
+        if self._scratch_dir is None or os.path.dirname(output_path) != self._scratch_dir:
+            return None
+        return os.path.join(
+            os.path.dirname(self.init_data["output_file_path"]), os.path.basename(output_path)
+        )
+
+    def _finish_frame_metrics(self) -> None:
+        """
+        Records the metrics of the frame that finished rendering in the session events.
+        """
+        metrics = self._frame_metrics.finish()
+        if metrics is None:
+            return
+        self._task_frame_metrics.append(metrics)
+        start = metrics.pop("start")
+        self._events.record("frame", "render", start, start + metrics["wall_seconds"], **metrics)
 
     @_check_for_exception
     def _handle_progress(self, match: re.Match) -> None:
@@ -237,13 +487,7 @@ class KeyShotAdaptor(Adaptor[AdaptorConfiguration]):
             match (re.Match): The match object from the regex pattern that was matched in the
                               message.
         """
-        text = match.group(0)
-        parts = text.split(" ")
-        percent = parts[-1]
-        if percent.endswith("%"):
-            percent = percent[0:-1]
-        progress = int(percent)
-        self.update_status(progress=progress)
+        self._progress.update(int(match.group(PROGRESS)))
 
     def _handle_error(self, match: re.Match) -> None:
         """
@@ -255,7 +499,8 @@ class KeyShotAdaptor(Adaptor[AdaptorConfiguration]):
         Raises:
             RuntimeError: Always raises a runtime error to halt the adaptor.
         """
-        self._exc_info = RuntimeError(f"KeyShot Encountered an Error: {match.group(0)}")
+        self._exc_info = RuntimeError(f"KeyShot Encountered an Error: {match.group(ERROR)}")
+        self._notify_state_changed()
 
     def _handle_video_encode_error(self, match: re.Match) -> None:
         """
@@ -271,11 +516,12 @@ class KeyShotAdaptor(Adaptor[AdaptorConfiguration]):
             RuntimeError: Always raises a runtime error to halt the adaptor.
         """
         self._exc_info = RuntimeError(
-            f"{match.group(0)}\n"
+            f"{match.group(VIDEO_ENCODE_ERROR)}\n"
             "This error is usually the result of Video Output being selected"
             "in KeyShot under Render->Animation->Video Output before submitting.\n"
             "To resolve please uncheck Video Output before submitting again."
         )
+        self._notify_state_changed()
 
     def _handle_version(self, match: re.Match) -> None:
         """
@@ -283,7 +529,25 @@ class KeyShotAdaptor(Adaptor[AdaptorConfiguration]):
         Args:
             match (re.Match): The match object from the regex pattern that was matched the message
         """
-        self._keyshot_version = match.groups()[0]
+        self._keyshot_version = match.group(VERSION)
+        if self._keyshot_launched_at is not None:
+            # Covers KeyShot startup, licensing and the KeyShot client connecting to the adaptor
+            self._events.record(
+                "phase", "keyshot_handshake", self._keyshot_launched_at, self._events.now()
+            )
+            self._keyshot_launched_at = None
+
+    def _handle_action(self, match: re.Match) -> None:
+        """
+        Callback for stdout that reports how long KeyShot took to perform an action.
+        Args:
+            match (re.Match): The match object from the regex pattern that was matched the message
+        """
+        end = self._events.now()
+        start = end - float(match.group("action_seconds"))
+        self._events.record("action", match.group(ACTION), start, end)
+        if match.group(ACTION) == "scene_file":
+            self._scene_open_started_at = start
 
     def _get_keyshot_client_path(self) -> str:
         """
@@ -307,12 +571,15 @@ class KeyShotAdaptor(Adaptor[AdaptorConfiguration]):
             f"following directories: {sys.path[1:]}"
         )
 
-    def _start_keyshot_client(self) -> None:
+    def _get_keyshot_args(self) -> list[str]:
         """
-        Starts the keyshot client by launching KeyShot with the keyshot_client.py file.
+        Returns the command line that runs the keyshot_client.py file in KeyShot.
 
         Raises:
-            FileNotFoundError: If the keyshot_client.py file or the scene file could not be found.
+            FileNotFoundError: If the keyshot_client.py file could not be found.
+
+        Returns:
+            list[str]: The KeyShot executable followed by its arguments.
         """
         # KeyShot has a bug where it must be started with an absolute path
         # or the render will hang (on macOS at least). The worker env can set
@@ -331,20 +598,73 @@ class KeyShotAdaptor(Adaptor[AdaptorConfiguration]):
             keyshot_exe = keyshot_exe_env
             args.append(keyshot_exe)
 
-        regexhandler = RegexHandler(self._get_regex_callbacks())
-
         keyshot_client_path = self._get_keyshot_client_path()
         args.append("-progress")
         args.append("-floating_feature")
         args.append("keyshot2")
         args.append("-script")
         args.append(keyshot_client_path)
+        return args
 
-        self._keyshot_client = LoggingSubprocess(
-            args=args,
-            stdout_handler=regexhandler,
-            stderr_handler=regexhandler,
+    def _start_keyshot_client(self) -> None:
+        """
+        Starts the keyshot client by launching KeyShot with the keyshot_client.py file. If the
+        worker's KeyShot process pool is enabled, an idle KeyShot process from the pool is reused
+        instead when there is one.
+
+        Raises:
+            FileNotFoundError: If the keyshot_client.py file or the scene file could not be found.
+        """
+        args = self._get_keyshot_args()
+        output_handler = KeyShotOutputHandler(self._get_output_callbacks())
+        self._frames_rendered_by_keyshot = 0
+
+        if self._pool is not None:
+            server_path = os.environ["KEYSHOT_ADAPTOR_SERVER_PATH"]
+            pooled_client = self._pool.acquire(args, server_path) or self._pool.spawn(
+                args, server_path
+            )
+            pooled_client.start_output(output_handler)
+            self._keyshot_client = pooled_client
+            # Top up the pool for the sessions that come after this one
+            threading.Thread(
+                target=self._pool.prewarm,
+                args=(args,),
+                name="KeyShotPoolPrewarmThread",
+                daemon=True,
+            ).start()
+        else:
+            self._keyshot_client = LoggingSubprocess(
+                args=args,
+                stdout_handler=output_handler,
+                stderr_handler=output_handler,
+            )
+        self._keyshot_client_watcher = threading.Thread(
+            target=self._watch_keyshot_client,
+            args=(self._keyshot_client,),
+            name="KeyShotClientWatcherThread",
+            daemon=True,
         )
+        self._keyshot_client_watcher.start()
+
+    def _watch_keyshot_client(
+        self, keyshot_client: LoggingSubprocess | PooledKeyShotProcess
+    ) -> None:
+        """
+        Blocks until the given KeyShot client process exits, then notifies any waiting threads so
+        that an unexpected exit is noticed immediately.
+
+        Args:
+            keyshot_client (LoggingSubprocess | PooledKeyShotProcess): The KeyShot client process
+                to watch.
+        """
+        if isinstance(keyshot_client, PooledKeyShotProcess):
+            keyshot_client.wait_for_exit()
+        else:
+            # LoggingSubprocess.wait() closes stdin and tears down the logging threads, so wait on
+            # the underlying process instead.
+            keyshot_client._process.wait()
+        self._notify_state_changed()
 
     def on_start(self) -> None:
         """
@@ -355,65 +675,553 @@ class KeyShotAdaptor(Adaptor[AdaptorConfiguration]):
             jsonschema.ValidationError: When init_data fails validation against the adaptor schema.
             jsonschema.SchemaError: When the adaptor schema itself is nonvalid.
             RuntimeError: If KeyShot did not complete initialization actions due to an exception
-            TimeoutError: If KeyShot did not complete initialization actions due to timing out.
-            FileNotFoundError: If the keyshot_client.py file could not be found.
+            TimeoutError: If KeyShot did not complete initialization actions due to timing out, or
+                another session did not finish copying the scene file to the scene cache.
+            FileNotFoundError: If the keyshot_client.py file or the scene file could not be found.
+            PermissionError: If the scene file cannot be read, or the output directory cannot be
+                written to.
+            OSError: If the disk of the output directory does not have room for an output.
             KeyError: If a configuration for the given platform and version does not exist.
         """
-        self.validators.init_data.validate(self.init_data)
-        self.update_status(progress=0, status_message="Initializing KeyShot")
-        self._start_keyshot_server_thread()
-        self._populate_action_queue()
-        self._start_keyshot_client()
+        with self._events.phase("on_start"):
+            with self._events.phase("validate_init_data"):
+                self.validators.init_data.validate(self.init_data)
+            # Fails a misconfigured session before KeyShot is launched
+            with self._events.phase("preflight"):
+                self._run_preflight_checks()
+            if self._prefetcher is not None:
+                self._start_prefetch()
+            self.update_status(progress=0, status_message="Initializing KeyShot")
+            # KeyShot takes the longest to start, so it is launched as soon as the adaptor server
+            # is running, and starts up while the rest of the session is prepared. It waits for
+            # its first actions until they are queued.
+            startup = StartupPipeline(self._events)
+            startup.add_step("start_server", self._start_keyshot_server_thread)
+            startup.add_step("launch_keyshot", self._launch_keyshot, after=["start_server"])
+            queue_after: list[str] = []
+            if self._scene_cache is not None:
+                startup.add_step("stage_scene", self._stage_scene)
+                queue_after.append("stage_scene")
+            if self._scratch_root and self.init_data.get("output_file_path"):
+                startup.add_step("create_scratch_directory", self._get_scratch_output_path)
+                queue_after.append("create_scratch_directory")
+            startup.add_step("start_telemetry", self._telemetry.start)
+            startup.add_step("queue_actions", self._populate_action_queue, after=queue_after)
+            with self._events.phase("startup"):
+                elapsed = startup.run()
+            _logger.info(startup.summary(elapsed))
+            self._wait_for_keyshot_initialization()
+        if self._prefetcher is not None:
+            _logger.info(self._prefetcher.summary(until=self._scene_open_started_at))
+
+        self._telemetry.update_common_details({"keyshot-version": self._keyshot_version})
+        self._telemetry.record_event(
+            event_type="com.amazon.rum.deadline.adaptor.runtime.start",
+            event_details=self._events.durations(),
+        )
 
-        is_timed_out = self._get_timer(self._KEYSHOT_START_TIMEOUT_SECONDS)
-        while self._keyshot_is_running and not self._has_exception and len(self._action_queue) > 0:
-            if is_timed_out():
-                raise TimeoutError(
-                    "KeyShot did not complete initialization actions in "
-                    f"{self._KEYSHOT_START_TIMEOUT_SECONDS} seconds and failed to start."
-                )
+        if len(self._action_queue) > 0:
+            raise RuntimeError(
+                "KeyShot encountered an error and was not able to complete initialization actions."
+            )
 
-            time.sleep(0.1)  # busy wait for keyshot to finish initialization
+    def _run_preflight_checks(self) -> None:
+        """
+        Checks that the scene file can be read, and that the output directory can be written to
+        and has room for an output. Creates the output directory if it does not exist.
+
+        Raises:
+            FileNotFoundError: If the scene file does not exist.
+            PermissionError: If the scene file cannot be read, or the output directory cannot be
+                written to.
+            OSError: If the disk of the output directory does not have room for an output.
+        """
+        check_scene_file(self.init_data["scene_file"])
+        output_file_path = self.init_data.get("output_file_path")
+        if output_file_path:
+            check_output_directory(os.path.dirname(output_file_path) or os.curdir)
+        self._check_free_space(output_count=1)
+
+    def _check_free_space(self, output_count: int) -> None:
+        """
+        Checks that the disk of the output directory has room for the given number of outputs,
+        and the disk of the scratch directory, which outputs are moved out of as they are
+        rendered, for one, plus a margin. An output is as large as the largest output the session
+        rendered so far, or estimated from the output format and resolution before that.
+
+        Args:
+            output_count (int): The number of outputs that are about to be rendered.
 
-        self._get_deadline_telemetry_client().record_event(
-            event_type="com.amazon.rum.deadline.adaptor.runtime.start", event_details={}
+        Raises:
+            OSError: If a disk does not have the required free space.
+        """
+        output_file_path = self.init_data.get("output_file_path")
+        if not output_file_path:
+            return
+        output_bytes = self._largest_output_bytes or estimate_output_bytes(
+            self.init_data.get("output_format"),
+            self.init_data.get("image_width"),
+            self.init_data.get("image_height"),
         )
+        check_free_space(
+            os.path.dirname(output_file_path) or os.curdir,
+            output_bytes * output_count + self._free_space_margin_bytes,
+        )
+        if self._scratch_root:
+            check_free_space(self._scratch_root, output_bytes + self._free_space_margin_bytes)
+
+    def _start_prefetch(self) -> None:
+        """
+        Starts reading the scene file and the input directories of the session in the background,
+        so that KeyShot opens them from the file cache once it has started up. A scene file that
+        is copied to the scene cache is read by the copy instead.
+        """
+        assert self._prefetcher is not None
+        paths = [] if self._scene_cache is not None else [self.init_data["scene_file"]]
+        self._prefetcher.prefetch(paths + self._get_input_directories())
+
+    def _get_input_directories(self) -> list[str]:
+        """
+        Returns:
+            list[str]: The directories within the session directory that paths are mapped to,
+                which are the directories job attachments downloads the inputs of the job to.
+        """
+        session_dir = os.path.normcase(os.path.realpath(os.getcwd()))
+        directories = []
+        for rule in self.path_mapping_rules:
+            directory = os.path.normcase(os.path.realpath(rule.destination_path))
+            try:
+                common = os.path.commonpath([session_dir, directory])
+            except ValueError:
+                # The directory is on another drive
+                continue
+            if common == session_dir and directory != session_dir:
+                directories.append(rule.destination_path)
+        return directories
+
+    def _launch_keyshot(self) -> None:
+        """
+        Launches KeyShot and records when, to time how long KeyShot takes to start up.
+        """
+        self._start_keyshot_client()
+        self._keyshot_launched_at = self._events.now()
+
+    def _stage_scene(self) -> None:
+        """
+        Copies the scene file to the scene cache on the worker, unless it is already there, and
+        opens the copy in KeyShot instead of the scene file.
+        """
+        assert self._scene_cache is not None
+        scene_file = self.init_data["scene_file"]
+        staged = self._scene_cache.stage(scene_file)
+        self.init_data["scene_file"] = staged.path
+        # The render cache uses the same digest of the scene
+        self._scene_digest = staged.digest
+        if staged.hit and self._prefetcher is not None:
+            # A copy that was cached by an earlier session may no longer be in the file cache
+            self._prefetcher.prefetch([staged.path])
+        if staged.hit:
+            _logger.info(f"Using the copy of {scene_file} in the scene cache: {staged.path}")
+        else:
+            _logger.info(f"Copied {scene_file} to the scene cache: {staged.path}")
+
+    def _wait_for_keyshot_initialization(self) -> None:
+        """
+        Waits for KeyShot to perform the initialization actions, or to fail to.
+
+        Raises:
+            TimeoutError: If KeyShot did not complete initialization actions due to timing out.
+        """
+        with self._events.phase("wait_for_keyshot"):
+            keyshot_ready = self._wait_for_state(
+                lambda: not self._keyshot_is_running
+                or self._has_exception
+                or len(self._action_queue) == 0,
+                timeout=self._KEYSHOT_START_TIMEOUT_SECONDS,
+            )
+        if not keyshot_ready:
+            raise TimeoutError(
+                "KeyShot did not complete initialization actions in "
+                f"{self._KEYSHOT_START_TIMEOUT_SECONDS} seconds and failed to start."
+            )
+
+    def _get_recycle_reason(self) -> str | None:
+        """
+        Checks whether KeyShot reached one of the limits after which it is restarted.
+
+        Returns:
+            str | None: Why KeyShot needs to be restarted, or None if it does not.
+        """
+        if (
+            self._recycle_max_frames
+            and self._frames_rendered_by_keyshot >= self._recycle_max_frames
+        ):
+            return f"it rendered {self._frames_rendered_by_keyshot} frames"
+        if self._recycle_rss_bytes and self._keyshot_client is not None:
+            sample = read_process_sample(self._keyshot_client.pid)
+            if sample is not None and sample.rss_bytes > self._recycle_rss_bytes:
+                return f"it uses {sample.rss_bytes // (1024 * 1024)} MB of memory"
+        return None
+
+    def _recycle_keyshot(self, reason: str) -> None:
+        """
+        Replaces KeyShot with a new KeyShot process that is initialized with the same actions.
+
+        Args:
+            reason (str): Why KeyShot is restarted.
+
+        Raises:
+            RuntimeError: If KeyShot did not complete initialization actions due to an exception
+            TimeoutError: If KeyShot did not complete initialization actions due to timing out.
+        """
+        _logger.info(f"Restarting KeyShot because {reason}.")
+        self.update_status(status_message="Restarting KeyShot")
+        with self._events.phase("recycle_keyshot"):
+            self._stop_keyshot_client(retire=True)
+            # Drop any action that the previous KeyShot process did not get to
+            self._action_queue.clear()
+            self._populate_action_queue()
+            self._start_keyshot_client()
+            self._keyshot_launched_at = self._events.now()
+            self._wait_for_keyshot_initialization()
 
         if len(self._action_queue) > 0:
             raise RuntimeError(
                 "KeyShot encountered an error and was not able to complete initialization actions."
             )
 
+    def _recover_keyshot(self, attempt: int) -> None:
+        """
+        Restarts KeyShot after it exited unexpectedly, once the backoff of the attempt has passed.
+        The backoff doubles with every attempt of a task.
+
+        Args:
+            attempt (int): The number of the recovery attempt within the task, starting at 1.
+
+        Raises:
+            RuntimeError: If KeyShot did not complete initialization actions due to an exception
+            TimeoutError: If KeyShot did not complete initialization actions due to timing out.
+        """
+        exit_code = self._keyshot_client.returncode if self._keyshot_client else None
+        backoff_seconds = self._crash_retry_backoff_seconds * 2 ** (attempt - 1)
+        _logger.warning(
+            f"KeyShot exited unexpectedly with exit code {exit_code}. Retrying the task in "
+            f"{backoff_seconds:g}s (attempt {attempt} of {self._crash_retries})."
+        )
+        start = self._events.now()
+        time.sleep(backoff_seconds)
+        self._recycle_keyshot(f"it exited unexpectedly with exit code {exit_code}")
+        self._events.record(
+            "recovery",
+            "keyshot_exit",
+            start,
+            self._events.now(),
+            attempt=attempt,
+            exit_code=exit_code,
+        )
+
+    def _can_recover(self, attempt: int) -> bool:
+        """Returns whether KeyShot can be restarted after it exited unexpectedly."""
+        return not self._cancel_requested and attempt < self._crash_retries
+
+    def _render_outputs(self, outputs: list[tuple[dict[str, Any], int]]) -> None:
+        """
+        Renders the given outputs in KeyShot with a single render action and waits until they are
+        rendered or KeyShot exits. Consecutive frames of the same shot are rendered as one chunk,
+        and KeyShot switches between the shots without returning to the adaptor.
+
+        Args:
+            outputs (list[tuple[dict[str, Any], int]]): The arguments of the render action and the
+                frame of each output, in order.
+        """
+        chunks: list[dict[str, Any]] = []
+        for render_args, frame in outputs:
+            if chunks and chunks[-1]["args"] is render_args:
+                chunks[-1]["frames"].append(frame)
+            else:
+                chunks.append({"args": render_args, "frames": [frame]})
+        shots = [{"frames": chunk["frames"], **chunk["args"]} for chunk in chunks]
+
+        self._frame_metrics.start(outputs[0][1])
+        self._keyshot_is_rendering = True
+
+        self._action_queue.enqueue_action(
+            Action("render", shots[0] if len(shots) == 1 else {"shots": shots})
+        )
+
+        # Wait for the render to finish so that on_cleanup is not called
+        try:
+            self._wait_for_state(lambda: not self._keyshot_is_rendering or self._has_exception)
+        finally:
+            # Drop the measurement of a frame that did not finish
+            self._frame_metrics.finish()
+
+    def _get_tile_render_args(self, tile: dict, output_path: str | None = None) -> dict[str, Any]:
+        """
+        Returns the arguments of the render action that render one tile of each frame, to the
+        output path of the tile.
+
+        Args:
+            tile (dict): The row and column of the tile, from the run data.
+            output_path (str | None): The path that the tiles are stitched into, the output path
+                of the job by default.
+
+        Raises:
+            ValueError: If the init data does not have the size of the image, the grid of tiles
+                and the output file path, or the tile is not in the grid.
+        """
+        missing = [
+            name
+            for name in ("image_width", "image_height", "tiles", "output_file_path")
+            if name not in self.init_data
+        ]
+        if missing:
+            raise ValueError(f"Rendering a tile requires {', '.join(missing)} in the init data")
+        width = self.init_data["image_width"]
+        height = self.init_data["image_height"]
+        region = tile_region(
+            width,
+            height,
+            self.init_data["tiles"]["rows"],
+            self.init_data["tiles"]["columns"],
+            tile["row"],
+            tile["column"],
+        )
+        return {
+            "region": list(region),
+            "width": width,
+            "height": height,
+            "output_file_path": tile_output_path(
+                output_path or self._get_output_file_path(), tile["row"], tile["column"]
+            ),
+        }
+
+    def _get_output_file_path(self) -> str:
+        """
+        Returns:
+            str: The path KeyShot renders to, in the scratch directory if it is enabled.
+        """
+        if self._scratch_root:
+            return self._get_scratch_output_path()
+        return self.init_data["output_file_path"]
+
+    def _get_render_args(
+        self, run_data: dict, shot: dict[str, str] | None = None
+    ) -> dict[str, Any]:
+        """
+        Returns the arguments of the render action of a task besides its frames: the camera,
+        model set and studio of the shot, the region of the tile that the task renders, and the number of
+        samples and the seed that it renders with. Each shot, tile and seed is rendered to an
+        output path of its own.
+
+        Args:
+            run_data (dict): The run data of the task.
+            shot (dict[str, str] | None): The camera, model set and studio to render, if any.
+
+        Raises:
+            ValueError: If the tile is not valid, the task renders a shot or with a seed and the
+                init data does not have an output file path, or the task renders with a seed and
+                the init data does not have an EXR output format.
+        """
+        render_args: dict[str, Any] = {}
+        output_path = self._get_output_file_path() if "output_file_path" in self.init_data else None
+        if shot:
+            if not output_path:
+                raise ValueError(
+                    "Rendering a camera, model set or studio requires output_file_path in the "
+                    "init data"
+                )
+            output_path = shot_output_path(output_path, **shot)
+            render_args.update(shot, output_file_path=output_path)
+        if "tile" in run_data:
+            render_args.update(self._get_tile_render_args(run_data["tile"], output_path))
+        if "seed" in run_data:
+            if not output_path:
+                raise ValueError("Rendering with a seed requires output_file_path in the init data")
+            # Averaging clipped and tone mapped 8 bit images would darken the highlights
+            if self.init_data.get("output_format") != "RENDER_OUTPUT_EXR":
+                raise ValueError(
+                    "Splitting the samples of a frame across tasks requires the output format "
+                    "RENDER_OUTPUT_EXR"
+                )
+            output_path = render_args.get("output_file_path") or output_path
+            render_args.update(
+                samples=run_data["samples"],
+                seed=run_data["seed"],
+                output_file_path=sample_output_path(output_path, run_data["seed"]),
+            )
+        return render_args
+
+    def _fetch_cached_outputs(
+        self, outputs: list[tuple[dict[str, Any], int]]
+    ) -> tuple[list[tuple[dict[str, Any], int]], list[tuple[str, str]]]:
+        """
+        Copies the outputs that are in the render cache to their path. An output is the same if
+        the scene, the frame, the output format, the render options and the KeyShot version are.
+
+        Args:
+            outputs (list[tuple[dict[str, Any], int]]): The arguments of the render action and the
+                frame of each output of the task.
+
+        Returns:
+            tuple[list[tuple[dict[str, Any], int]], list[tuple[str, str]]]: The outputs that are
+                not in the cache and need to be rendered, and the cache key and path of each of
+                them, to add them to the cache once they are rendered.
+        """
+        if self._render_cache is None or "output_file_path" not in self.init_data:
+            return outputs, []
+        if not self._keyshot_version:
+            _logger.warning("Not using the render cache because the KeyShot version is not known")
+            return outputs, []
+        if self._scene_digest is None:
+            self._scene_digest = file_digest(self.init_data["scene_file"])
+
+        missing = []
+        keys = []
+        for render_args, frame in outputs:
+            output_path = render_args.get("output_file_path") or self._get_output_file_path()
+            output_path = output_path.replace("%d", str(frame))
+            output_path = self._get_final_output_path(output_path) or output_path
+            key = render_cache_key(
+                scene=self._scene_digest,
+                frame=frame,
+                output_format=self.init_data.get("output_format"),
+                render_options={
+                    name: value for name, value in render_args.items() if name != "output_file_path"
+                },
+                keyshot_version=self._keyshot_version,
+            )
+            if self._render_cache.fetch(key, output_path):
+                _logger.info(f"Copied {output_path} from the render cache")
+            else:
+                missing.append((render_args, frame))
+                keys.append((key, output_path))
+        return missing, keys
+
     def on_run(self, run_data: dict) -> None:
         """
-        This starts a render in KeyShot for the given frame, scene and layer(s) and
-        performs a busy wait until the render completes.
+        This starts a render in KeyShot for the given frame or chunk of frames and waits until every
+        frame has been rendered. KeyShot renders the whole chunk without returning to the adaptor
+        between frames. If the run data has cameras, model sets or studios, the chunk is rendered
+        for every camera of every model set in every studio, to an output path of its own for each,
+        without loading the scene again. If the run data has a tile, only the region of the image
+        that the tile covers is rendered. If the run data has a seed, the given number of samples
+        are rendered with that seed. If the render cache is enabled on the worker, outputs that were
+        rendered before are copied from the cache instead, and the rendered outputs are added to it.
+        If KeyShot exited and crash retries are enabled on the worker, KeyShot is restarted and the
+        frames that were not rendered yet are rendered again.
+
+        Raises:
+            KeyShotNotRunningError: If KeyShot is not running or exits during the render, and
+                cannot be restarted.
+            RuntimeError: If KeyShot did not write a valid output, or an output could not be
+                copied to its path.
+            jsonschema.ValidationError: When run_data fails validation against the adaptor schema.
+            ValueError: If the frame range expression, the tile or the seed in run_data is not
+                valid, or the run data needs an output file path that the init data does not
+                have.
+            OSError: If the disk of the output directory does not have room for the outputs of
+                the task.
         """
 
+        attempt = 0
         if not self._keyshot_is_running:
-            raise KeyShotNotRunningError("Cannot render because KeyShot is not running.")
+            if not self._can_recover(attempt):
+                raise KeyShotNotRunningError("Cannot render because KeyShot is not running.")
+            attempt += 1
+            self._recover_keyshot(attempt)
 
-        run_data["frame"] = int(run_data["frame"])
         self.validators.run_data.validate(run_data)
-        self._is_rendering = True
-
-        for name in _KEYSHOT_RUN_KEYS:
-            if name in run_data:
-                self._action_queue.enqueue_action(Action(name, {name: run_data[name]}))
+        frames = _parse_frames(run_data["frame"])
+        shots = expand_shots(
+            run_data.get("camera"), run_data.get("studio"), run_data.get("model_set")
+        )
+        task_render_args = [self._get_render_args(run_data, shot) for shot in shots] or [
+            self._get_render_args(run_data)
+        ]
+        # Every frame of a shot is rendered before KeyShot switches to the next shot
+        outputs = [(render_args, frame) for render_args in task_render_args for frame in frames]
+        with self._events.phase("fetch_cached_outputs"):
+            outputs, cache_keys = self._fetch_cached_outputs(outputs)
+        if outputs:
+            self._check_free_space(output_count=len(outputs))
+            self._render_task_outputs(outputs, attempt)
+        self._finish_outputs()
+
+        if self._render_cache is not None:
+            for key, output_path in cache_keys:
+                self._render_cache.store(key, output_path)
+            self._render_cache.evict()
+            _logger.info(self._render_cache.summary())
+
+    def _render_task_outputs(self, outputs: list[tuple[dict[str, Any], int]], attempt: int) -> None:
+        """
+        Renders the outputs of a task, restarting KeyShot and rendering the outputs that were not
+        rendered yet if KeyShot exited and crash retries are enabled on the worker.
 
-        self._action_queue.enqueue_action(Action("start_render", {"frame": run_data["frame"]}))
+        Args:
+            outputs (list[tuple[dict[str, Any], int]]): The arguments of the render action and the
+                frame of each output, in order.
+            attempt (int): The number of times KeyShot was restarted during the task.
 
-        while self._keyshot_is_rendering and not self._has_exception:
-            time.sleep(0.1)  # busy wait so that on_cleanup is not called
+        Raises:
+            KeyShotNotRunningError: If KeyShot exits during the render and cannot be restarted.
+        """
+        recycle_reason = self._get_recycle_reason()
+        if recycle_reason is not None:
+            self._recycle_keyshot(recycle_reason)
+
+        self._progress.start(expected_outputs=len(outputs))
+        self._task_frames = [frame for _, frame in outputs]
+        self._task_frame_metrics = []
+        try:
+            while True:
+                # Outputs that completed before KeyShot exited are not rendered again
+                self._render_outputs(outputs[self._progress.produced_outputs :])
+                if self._keyshot_is_running or not self._keyshot_client:
+                    break
+                if not self._can_recover(attempt):
+                    #  This is always an error case because the KeyShot Client should still be
+                    #  running and waiting for the next command. If the thread finished, then we
+                    #  cannot continue
+                    exit_code = self._keyshot_client.returncode
+                    raise KeyShotNotRunningError(
+                        "KeyShot exited early and did not render successfully, please check render "
+                        f"logs. Exit code {exit_code}"
+                    )
+                if self._progress.produced_outputs >= len(outputs):
+                    # Every frame was rendered, KeyShot is restarted by the next task
+                    break
+                attempt += 1
+                self._recover_keyshot(attempt)
+        finally:
+            if self._task_frame_metrics:
+                _logger.info(summarize_frames(self._task_frame_metrics))
+
+    def _finish_outputs(self) -> None:
+        """
+        Waits until the outputs of the task have been verified and copied from the scratch
+        directory to their path, so that they are in place when the task ends.
 
-        if not self._keyshot_is_running and self._keyshot_client:  # Client will always exist here.
-            #  This is always an error case because the KeyShot Client should still be running and
-            #  waiting for the next command. If the thread finished, then we cannot continue
-            exit_code = self._keyshot_client.returncode
-            raise KeyShotNotRunningError(
-                "KeyShot exited early and did not render successfully, please check render logs. "
-                f"Exit code {exit_code}"
+        Raises:
+            RuntimeError: If KeyShot did not write a valid output, or an output could not be
+                copied to its path.
+        """
+        with self._events.phase("verify_outputs"):
+            results = self._output_verifier.wait()
+        with self._events.phase("copy_outputs"):
+            copy_errors = self._output_mover.flush()
+        sizes = [result["size"] for result in results if result["size"] is not None]
+        self._largest_output_bytes = max([self._largest_output_bytes, *sizes])
+        invalid = [f"{result['path']}: {result['error']}" for result in results if result["error"]]
+        if invalid:
+            raise RuntimeError("KeyShot did not write valid outputs:\n" + "\n".join(invalid))
+        if copy_errors:
+            raise RuntimeError(
+                "Could not copy outputs from the scratch directory:\n" + "\n".join(copy_errors)
             )
+        if results:
+            _logger.info(f"Verified {len(results)} output(s)")
 
     def on_stop(self) -> None:
         """ """
@@ -425,16 +1233,8 @@ class KeyShotAdaptor(Adaptor[AdaptorConfiguration]):
         """
         self._performing_cleanup = True
 
-        self._action_queue.enqueue_action(Action("close"), front=True)
-        is_timed_out = self._get_timer(self._KEYSHOT_END_TIMEOUT_SECONDS)
-        while self._keyshot_is_running and not is_timed_out():
-            time.sleep(0.1)
-        if self._keyshot_is_running and self._keyshot_client:
-            _logger.error(
-                "KeyShot did not complete cleanup actions and failed to gracefully shutdown. "
-                "Terminating."
-            )
-            self._keyshot_client.terminate()
+        # Do not return KeyShot to the pool if the session ended in an error
+        self._stop_keyshot_client(retire=self._exc_info is not None)
 
         if self._server:
             self._server.shutdown()
@@ -444,13 +1244,60 @@ class KeyShotAdaptor(Adaptor[AdaptorConfiguration]):
             if self._server_thread.is_alive():
                 _logger.error("Failed to shutdown the KeyShot Adaptor server.")
 
+        self._frame_metrics.stop()
+        # Copy the outputs of a task that did not finish, so that no rendered frame is lost
+        for error in self._output_mover.close():
+            _logger.error(f"Could not copy output from the scratch directory: {error}")
+        self._output_verifier.close()
+        if self._prefetcher is not None:
+            self._prefetcher.close()
+        if self._scratch_dir is not None:
+            shutil.rmtree(self._scratch_dir, ignore_errors=True)
+            self._scratch_dir = None
+        if self._output_verifier.path and self._output_verifier.manifest:
+            _logger.info(f"Wrote the manifest of the outputs to {self._output_verifier.path}")
+        if self._events.path:
+            _logger.info(f"Wrote the timings of this session to {self._events.path}")
+        self._events.close()
+        self._telemetry.close()
         self._performing_cleanup = False
 
+    def _stop_keyshot_client(self, retire: bool = False) -> None:
+        """
+        Closes the KeyShot client, terminating KeyShot if it does not exit in time. A KeyShot
+        process from the pool goes back to the pool instead of exiting, unless it is retired.
+
+        Args:
+            retire (bool): Whether a KeyShot process from the pool exits instead.
+        """
+        pooled_client = (
+            self._keyshot_client if isinstance(self._keyshot_client, PooledKeyShotProcess) else None
+        )
+        if self._pool is not None and pooled_client is not None:
+            # Retire KeyShot instead if it is worn out
+            retire = retire or self._pool.should_retire(pooled_client)
+            self._action_queue.enqueue_action(Action("close", {"retire": retire}), front=True)
+        else:
+            self._action_queue.enqueue_action(Action("close"), front=True)
+        self._wait_for_state(
+            lambda: not self._keyshot_is_running, timeout=self._KEYSHOT_END_TIMEOUT_SECONDS
+        )
+        if self._keyshot_is_running and self._keyshot_client:
+            _logger.error(
+                "KeyShot did not complete cleanup actions and failed to gracefully shutdown. "
+                "Terminating."
+            )
+            self._keyshot_client.terminate()
+
+        if self._pool is not None and pooled_client is not None:
+            self._pool.release(pooled_client)
+
     def on_cancel(self):
         """
         Cancels the current render if KeyShot is rendering.
         """
         _logger.info("CANCEL REQUESTED")
+        self._cancel_requested = True
         if not self._keyshot_client or not self._keyshot_is_running:
             _logger.info("Nothing to cancel because KeyShot is not running")
             return
@@ -465,19 +1312,14 @@ class KeyShotAdaptor(Adaptor[AdaptorConfiguration]):
         """
         for name in _FIRST_KEYSHOT_ACTIONS:
             if name in self.init_data:
-                self._action_queue.enqueue_action(Action(name, {name: self.init_data[name]}))
-
-    def _get_deadline_telemetry_client(self):
-        """
-        Wrapper around the Deadline Client Library telemetry client, in order to set package-specific information
-        """
-        if not self._telemetry_client:
-            self._telemetry_client = get_deadline_cloud_library_telemetry_client()
-            self._telemetry_client.update_common_details(
-                {
-                    "deadline-cloud-for-keyshot-adaptor-version": adaptor_version,
-                    "keyshot-version": self._keyshot_version,
-                    "open-jd-adaptor-runtime-version": openjd_adaptor_version,
-                }
-            )
-        return self._telemetry_client
+                args = {name: self.init_data[name]}
+                if name == "output_file_path" and self._scratch_root:
+                    args[name] = self._get_scratch_output_path()
+                if name == "scene_file":
+                    # KeyShot skips opening the scene if it already has it open, e.g. when it is
+                    # reused from the process pool
+                    args["force_reload"] = self.init_data.get("force_scene_reload", False)
+                    args["content_hash"] = os.environ.get(
+                        "KEYSHOT_ADAPTOR_SCENE_CONTENT_HASH", ""
+                    ).lower() in ("1", "true")
+                self._action_queue.enqueue_action(Action(name, args))
@@ -0,0 +1,233 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+"""
+A lightweight client for the `daemon run` and `daemon stop` commands. Every task of a job runs
+`daemon run`, which only forwards the run data to the adaptor that `daemon start` runs in the
+background and relays its output. This module does that without importing the adaptor or the
+OpenJD adaptor runtime, using the same protocol as the runtime's frontend: HTTP requests over
+the UNIX socket of the background adaptor.
+"""
+from __future__ import annotations
+
+import http.client
+import json
+import os
+import re
+import signal
+import socket
+import sys
+import threading
+import time
+import urllib.parse
+from argparse import ArgumentParser
+from types import FrameType
+from typing import Any, Optional
+
+__all__ = ["AdaptorFailedError", "is_daemon_client_command", "run_daemon_command"]
+
+# The environment variable that `daemon start` sets to the socket of the background adaptor
+_SOCKET_ENV_VAR = "OPENJD_ADAPTOR_SOCKET"
+# Lines of adaptor output that the worker agent reads, printed as they are
+_OPENJD_LOG_REGEX = re.compile(r"^openjd_\S+: ")
+# The name of the log level that the runtime's frontend prints adaptor output with
+_ADAPTOR_OUTPUT_LEVEL_NAME = "ADAPTOR_OUTPUT"
+_EMPTY_OUTPUT_ID = "EMPTY"
+
+
+class AdaptorFailedError(Exception):
+    """Raised when the background adaptor reports that the command failed."""
+
+    pass
+
+
+def is_daemon_client_command(argv: list[str]) -> bool:
+    """
+    Args:
+        argv (list[str]): The command line arguments, without the program name.
+
+    Returns:
+        bool: Whether the command is handled by this module. The runtime handles every other
+            command, and handles `daemon run` and `daemon stop` on Windows, where the background
+            adaptor listens on a named pipe instead of a UNIX socket.
+    """
+    return (
+        sys.platform != "win32"
+        and argv[:1] == ["daemon"]
+        and argv[1:2] in (["run"], ["stop"])
+        and not {"-h", "--help"}.intersection(argv)
+    )
+
+
+def run_daemon_command(argv: list[str]) -> None:
+    """
+    Runs `daemon run` or `daemon stop` against the background adaptor, printing its output.
+
+    Args:
+        argv (list[str]): The command line arguments, without the program name.
+
+    Raises:
+        AdaptorFailedError: If the background adaptor reports that the command failed.
+        RuntimeError: If the socket of the background adaptor is not known.
+        OSError: If the background adaptor could not be reached.
+    """
+    parser = ArgumentParser(prog="keyshot-openjd daemon")
+    subparsers = parser.add_subparsers(dest="subcommand", required=True)
+    run_parser = subparsers.add_parser("run")
+    run_parser.add_argument("--run-data", default="")
+    stop_parser = subparsers.add_parser("stop")
+    for subparser in (run_parser, stop_parser):
+        subparser.add_argument("--connection-file", required=False)
+    args = parser.parse_args(argv[1:])
+
+    # Adaptor output may have characters that the default encoding of stdout cannot encode
+    sys.stdout.reconfigure(encoding="utf-8")  # type: ignore[union-attr]
+    client = _DaemonClient(_load_socket_path(args.connection_file))
+    if args.subcommand == "run":
+        client.run(_load_data(args.run_data))
+    else:
+        client.stop()
+
+
+def _load_socket_path(connection_file: Optional[str]) -> str:
+    if connection_file:
+        with open(os.path.abspath(connection_file), encoding="utf-8") as f:
+            return json.load(f)["socket"]
+    socket_path = os.environ.get(_SOCKET_ENV_VAR)
+    if not socket_path:
+        raise RuntimeError(
+            f"Either --connection-file or the {_SOCKET_ENV_VAR} environment variable is required"
+        )
+    return socket_path
+
+
+def _load_data(data: str) -> dict:
+    """
+    Parses run data the way the runtime does: a JSON or YAML string, or the path of a file with
+    one in the format file://path/to/file.json.
+
+    Raises:
+        ValueError: If the data is not a dict.
+    """
+    if not data:
+        return {}
+    if data.startswith("file://"):
+        with open(data[len("file://") :], encoding="utf-8") as f:
+            data = f.read()
+    try:
+        loaded = json.loads(data)
+    except json.JSONDecodeError:
+        # Only imported for the run data that is not JSON, importing it takes a while
+        import yaml
+
+        loaded = yaml.safe_load(data)
+    if not isinstance(loaded, dict):
+        raise ValueError(f"Expected loaded data to be a dict, but got {type(loaded)}")
+    return loaded
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path: str, timeout: float) -> None:
+        super().__init__("localhost", timeout=timeout)
+        self._socket_path = socket_path
+
+    def connect(self) -> None:
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self._socket_path)
+
+
+class _DaemonClient:
+    """
+    Sends requests to the background adaptor, and polls it for its state and output until the
+    request completes. The poll interval starts short and doubles up to the interval that the
+    runtime's frontend polls at, so that short tasks end as soon as they are done.
+    """
+
+    _REQUEST_TIMEOUT_SECONDS = 5.0
+    _MIN_HEARTBEAT_INTERVAL_SECONDS = 0.02
+    _MAX_HEARTBEAT_INTERVAL_SECONDS = 1.0
+    # How long to wait between polls once the request is canceled, for the cancel to take effect
+    _CANCELED_HEARTBEAT_INTERVAL_SECONDS = 0.25
+
+    def __init__(self, socket_path: str) -> None:
+        self._socket_path = socket_path
+        self._canceled = threading.Event()
+        # OpenJD cancels a task with an interrupt signal
+        signal.signal(signal.SIGINT, self._cancel)
+        signal.signal(signal.SIGTERM, self._cancel)
+
+    def run(self, run_data: dict) -> None:
+        self._request("PUT", "/run", body=run_data)
+        self._wait_until_idle("run")
+
+    def stop(self) -> None:
+        self._request("PUT", "/stop")
+        # The adaptor stops then cleans up
+        self._wait_until_idle("cleanup")
+        self._request("PUT", "/shutdown")
+
+    def _cancel(self, signum: int, frame: Optional[FrameType]) -> None:
+        print("INFO: Interrupt signal received.", flush=True)
+        self._request("PUT", "/cancel")
+        self._canceled.set()
+
+    def _request(
+        self, method: str, path: str, params: Optional[dict] = None, body: Optional[dict] = None
+    ) -> bytes:
+        if params:
+            path = f"{path}?{urllib.parse.urlencode(params)}"
+        connection = _UnixHTTPConnection(self._socket_path, timeout=self._REQUEST_TIMEOUT_SECONDS)
+        try:
+            connection.request(method, path, body=json.dumps(body) if body else None)
+            response = connection.getresponse()
+            content = response.read()
+        finally:
+            connection.close()
+        if response.status >= 400:
+            raise http.client.HTTPException(
+                f"Received unexpected HTTP status code {response.status}: {response.reason}"
+            )
+        return content
+
+    def _heartbeat(self, ack_id: Optional[str]) -> dict[str, Any]:
+        return json.loads(
+            self._request("GET", "/heartbeat", {"ack_id": ack_id} if ack_id else None)
+        )
+
+    def _wait_until_idle(self, state: str) -> None:
+        """
+        Polls the background adaptor, printing its output, until it is idle in the given state
+        or canceled.
+
+        Raises:
+            AdaptorFailedError: If the adaptor reported a failure.
+        """
+        failure_message = None
+        ack_id = None
+        interval = self._MIN_HEARTBEAT_INTERVAL_SECONDS
+        while True:
+            heartbeat = self._heartbeat(ack_id)
+            output = heartbeat["output"]["output"]
+            for line in output.splitlines():
+                if _OPENJD_LOG_REGEX.match(line):
+                    sys.stdout.write(f"{line}\n")
+                else:
+                    sys.stdout.write(f"{_ADAPTOR_OUTPUT_LEVEL_NAME}: {line}\n")
+            sys.stdout.flush()
+            if heartbeat["failed"]:
+                failure_message = output
+
+            ack_id = heartbeat["output"]["id"]
+            if heartbeat["state"] in (state, "canceled") and heartbeat["status"] == "idle":
+                break
+            if self._canceled.is_set():
+                time.sleep(self._CANCELED_HEARTBEAT_INTERVAL_SECONDS)
+            else:
+                self._canceled.wait(timeout=interval)
+                interval = min(interval * 2, self._MAX_HEARTBEAT_INTERVAL_SECONDS)
+
+        # ACK the output of the last heartbeat, so that the next command does not print it again
+        if ack_id != _EMPTY_OUTPUT_ID:
+            self._heartbeat(ack_id)
+
+        if failure_message:
+            raise AdaptorFailedError(failure_message)
@@ -0,0 +1,153 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+from __future__ import annotations
+
+import logging
+import re
+from typing import Callable, Mapping
+
+from openjd.adaptor_runtime.app_handlers import RegexHandler
+
+__all__ = [
+    "COMPLETE",
+    "PROGRESS",
+    "ERROR",
+    "VIDEO_ENCODE_ERROR",
+    "VERSION",
+    "ACTION",
+    "KeyShotOutputClassifier",
+    "KeyShotOutputHandler",
+]
+
+COMPLETE = "complete"
+PROGRESS = "progress"
+ERROR = "error"
+VIDEO_ENCODE_ERROR = "video_encode_error"
+VERSION = "version"
+ACTION = "action"
+
+# For each kind of KeyShot output line, in dispatch order: the literals of which at least one must
+# be in a line for it to be of that kind, whether those literals are case-insensitive, and the
+# pattern that extracts the named group of the same name as the kind.
+_OUTPUT_KINDS: dict[str, tuple[tuple[str, ...], bool, str]] = {
+    # The path of the output follows the literal when the KeyShot client reports it
+    COMPLETE: (
+        ("Finished Rendering",),
+        False,
+        r".*?(?P<complete>Finished Rendering)(?: (?P<output_path>.+))?",
+    ),
+    PROGRESS: (("Rendering: ",), False, r".*Rendering: (?P<progress>[0-9]+)%"),
+    ERROR: (("error: ", "[error]"), True, r"(?P<error>.*?(?i:Error: |\[Error\]).*)"),
+    VIDEO_ENCODE_ERROR: (
+        ("You cannot use EXR",),
+        False,
+        r"(?P<video_encode_error>.*?"
+        r"You cannot use EXR, TIFF 32 or PSD for the frames when encoding a movie!.*)",
+    ),
+    # Capture the major minor patch version.
+    VERSION: (
+        ("KeyShotClient: KeyShot Version ",),
+        False,
+        r".*?KeyShotClient: KeyShot Version (?P<version>[0-9]+.[0-9]+.[0-9]+)",
+    ),
+    # The name and duration of an action performed by the KeyShot client
+    ACTION: (
+        ("KeyShotClient: Action ",),
+        False,
+        r".*?KeyShotClient: Action (?P<action>\w+) took (?P<action_seconds>[0-9.]+)s",
+    ),
+}
+
+
+class KeyShotOutputClassifier:
+    """
+    Classifies lines of KeyShot output in a single pass. Plain substring checks find the kinds a
+    line can be of from their literals, and lines that cannot be of any kind are rejected there.
+    Every other line is matched once, at its start, against a combined pattern with one optional
+    lookahead per candidate kind. The named group of each kind is set when the line is of that
+    kind, so a line can be of several kinds at once.
+    """
+
+    def __init__(self, kinds: list[str]) -> None:
+        """
+        Args:
+            kinds (list[str]): The kinds of output to detect, in dispatch order.
+        """
+        self.kinds = list(kinds)
+        self._prefilters = [(kind, *_OUTPUT_KINDS[kind][:2]) for kind in self.kinds]
+        # Combined patterns, compiled on first use, keyed by the candidate kinds they detect
+        self._patterns: dict[tuple[str, ...], re.Pattern[str]] = {}
+
+    def _get_pattern(self, kinds: tuple[str, ...]) -> re.Pattern[str]:
+        pattern = self._patterns.get(kinds)
+        if pattern is None:
+            pattern = re.compile(
+                "".join(f"(?=(?:{_OUTPUT_KINDS[kind][2]})?)" for kind in kinds), re.DOTALL
+            )
+            self._patterns[kinds] = pattern
+        return pattern
+
+    def classify(self, line: str) -> re.Match | None:
+        """
+        Classifies a line of KeyShot output.
+
+        Args:
+            line (str): The line to classify.
+
+        Returns:
+            re.Match | None: A match whose named groups are set for each kind the line is of, or
+                None if the line cannot be of any kind. Kinds that were ruled out by the
+                prefilter have no group in the match.
+        """
+        folded = None
+        candidates = []
+        for kind, literals, casefold in self._prefilters:
+            if casefold:
+                if folded is None:
+                    folded = line.lower()
+                text = folded
+            else:
+                text = line
+            for literal in literals:
+                if literal in text:
+                    candidates.append(kind)
+                    break
+        if not candidates:
+            return None
+        return self._get_pattern(tuple(candidates)).match(line)
+
+
+class KeyShotOutputHandler(RegexHandler):
+    """
+    A Logging Handler that classifies each logged line of KeyShot output with a
+    KeyShotOutputClassifier and calls the callback of every kind the line is of.
+    """
+
+    def __init__(
+        self, callbacks: Mapping[str, Callable[[re.Match], None]], level: int = logging.NOTSET
+    ) -> None:
+        """
+        Args:
+            callbacks (Mapping[str, Callable[[re.Match], None]]): The callback for each kind of
+                output, in dispatch order. Each callback is given the classifier's match and reads
+                the named group of its kind.
+            level (int, optional): A minimum level of message that will be handled.
+                Defaults to logging.NOTSET.
+        """
+        super().__init__([], level)
+        self.callbacks = dict(callbacks)
+        self.classifier = KeyShotOutputClassifier(list(self.callbacks))
+
+    def emit(self, record: logging.LogRecord) -> None:
+        """
+        Method which is called by the logger when a string is logged to a logger
+        this handler has been added to.
+        Args:
+            record (logging.LogRecord): The log record of the logged string
+        """
+        match = self.classifier.classify(record.msg)
+        if match is None:
+            return
+        groups = match.groupdict()
+        for kind, callback in self.callbacks.items():
+            if groups.get(kind) is not None:
+                callback(match)
@@ -0,0 +1,151 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+from __future__ import annotations
+
+import logging
+import os
+import queue
+import shutil
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, NamedTuple, Optional
+
+__all__ = ["SCRATCH_DIR_ENV_VAR", "OutputMover"]
+
+_logger = logging.getLogger(__name__)
+
+# Local directory on the worker that KeyShot renders to before outputs are copied to their path
+SCRATCH_DIR_ENV_VAR = "KEYSHOT_ADAPTOR_SCRATCH_DIR"
+
+
+class _Move(NamedTuple):
+    source: str
+    destination: str
+    wait_for: Optional[Future]
+
+
+class OutputMover:
+    """
+    Copies outputs that KeyShot rendered to a local scratch directory to their final path on a
+    background thread, so that KeyShot can render the next frame while the previous one is written
+    to slow storage such as a network share. At most queue_depth outputs wait to be copied, after
+    that submitting an output blocks until one is copied. A copy is retried with a doubling backoff
+    before it fails, and the scratch file is removed once it is copied.
+    """
+
+    def __init__(
+        self,
+        queue_depth: int = 4,
+        attempts: int = 3,
+        backoff_seconds: float = 1.0,
+        copy: Callable[[str, str], object] = shutil.copy2,
+    ) -> None:
+        """
+        Args:
+            queue_depth (int): The number of outputs that can wait to be copied.
+            attempts (int): The number of times a copy is attempted before it fails.
+            backoff_seconds (float): The time to wait before the first retry of a copy.
+            copy (Callable[[str, str], object]): Copies a file to another path, keeping its
+                modification time.
+        """
+        self._queue: queue.Queue[Optional[_Move]] = queue.Queue(maxsize=queue_depth)
+        self._attempts = attempts
+        self._backoff_seconds = backoff_seconds
+        self._copy = copy
+        self._lock = threading.Lock()
+        self._errors: list[str] = []
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, source: str, destination: str, wait_for: Optional[Future] = None) -> None:
+        """
+        Queues an output to be copied, blocking while the queue is full.
+
+        Args:
+            source (str): The path of the output in the scratch directory.
+            destination (str): The final path of the output.
+            wait_for (Optional[Future]): Work that reads the scratch file and must finish before
+                the scratch file is removed, e.g. its verification.
+        """
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="KeyShotOutputMoverThread", daemon=True
+            )
+            self._thread.start()
+        self._queue.put(_Move(source, destination, wait_for))
+
+    def flush(self) -> list[str]:
+        """
+        Waits until every queued output has been copied.
+
+        Returns:
+            list[str]: A description of each output that could not be copied since the last call.
+        """
+        self._queue.join()
+        with self._lock:
+            errors, self._errors = self._errors, []
+        return errors
+
+    def close(self) -> list[str]:
+        """
+        Copies the outputs that are still queued and stops the background thread.
+
+        Returns:
+            list[str]: A description of each output that could not be copied since the last flush.
+        """
+        errors = self.flush()
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+        return errors
+
+    def _run(self) -> None:
+        while True:
+            move = self._queue.get()
+            try:
+                if move is None:
+                    return
+                self._move(move)
+            finally:
+                self._queue.task_done()
+
+    def _move(self, move: _Move) -> None:
+        if move.wait_for is not None:
+            # Failures are reported by whoever submitted the work
+            move.wait_for.exception()
+
+        if not os.path.exists(move.source):
+            # KeyShot did not write the output, which is not fixed by retrying
+            with self._lock:
+                self._errors.append(f"{move.destination}: {move.source} does not exist")
+            return
+
+        start = time.monotonic()
+        temp_path = f"{move.destination}.{os.getpid()}.tmp"
+        for attempt in range(1, self._attempts + 1):
+            try:
+                os.makedirs(os.path.dirname(move.destination) or ".", exist_ok=True)
+                # Copy next to the destination and rename it so that a partial copy is never seen
+                self._copy(move.source, temp_path)
+                os.replace(temp_path, move.destination)
+                break
+            except OSError as e:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                if attempt == self._attempts:
+                    with self._lock:
+                        self._errors.append(f"{move.destination}: {e}")
+                    _logger.error(f"Could not copy {move.source} to {move.destination}: {e}")
+                    return
+                backoff_seconds = self._backoff_seconds * 2 ** (attempt - 1)
+                _logger.warning(
+                    f"Could not copy {move.source} to {move.destination}, retrying in "
+                    f"{backoff_seconds:g}s: {e}"
+                )
+                time.sleep(backoff_seconds)
+
+        _logger.info(f"Copied {move.destination} in {time.monotonic() - start:.2f}s")
+        try:
+            os.remove(move.source)
+        except OSError as e:
+            _logger.warning(f"Could not remove {move.source}: {e}")
@@ -0,0 +1,219 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, NamedTuple, Optional
+
+from xxhash import xxh3_128
+
+from .._fileutil import write_json_atomic
+
+__all__ = ["OUTPUT_MANIFEST_DIR_ENV_VAR", "HASH_ALGORITHM", "verify_output", "OutputVerifier"]
+
+_logger = logging.getLogger(__name__)
+
+# Directory on the worker where each session writes the manifest of the outputs it verified
+OUTPUT_MANIFEST_DIR_ENV_VAR = "KEYSHOT_ADAPTOR_OUTPUT_MANIFEST_DIR"
+
+# The name job attachments uses for the xxh3 128 bit hash, so that the digests can be reused
+HASH_ALGORITHM = "xxh128"
+
+_HASH_CHUNK_BYTES = 1024 * 1024
+
+_TIFF_HEADERS = (b"II*\x00", b"MM\x00*", b"II+\x00", b"MM\x00+")
+
+
+class _FormatSignature(NamedTuple):
+    # The extensions that outputs of the format are written with
+    extensions: tuple[str, ...]
+    # The magic numbers that files of the format start with
+    headers: tuple[bytes, ...]
+    # The bytes that complete files of the format end with, for formats that have them
+    trailer: Optional[bytes] = None
+
+
+# The signature of each output format that KeyShot renders to
+_SIGNATURES: dict[str, _FormatSignature] = {
+    "RENDER_OUTPUT_PNG": _FormatSignature(
+        (".png",), (b"\x89PNG\r\n\x1a\n",), b"IEND\xae\x42\x60\x82"
+    ),
+    "RENDER_OUTPUT_JPEG": _FormatSignature((".jpg", ".jpeg"), (b"\xff\xd8\xff",), b"\xff\xd9"),
+    "RENDER_OUTPUT_EXR": _FormatSignature((".exr",), (b"\x76\x2f\x31\x01",)),
+    "RENDER_OUTPUT_TIFF8": _FormatSignature((".tif", ".tiff"), _TIFF_HEADERS),
+    "RENDER_OUTPUT_TIFF32": _FormatSignature((".tif", ".tiff"), _TIFF_HEADERS),
+    "RENDER_OUTPUT_PSD8": _FormatSignature((".psd", ".psb"), (b"8BPS",)),
+    "RENDER_OUTPUT_PSD16": _FormatSignature((".psd", ".psb"), (b"8BPS",)),
+    "RENDER_OUTPUT_PSD32": _FormatSignature((".psd", ".psb"), (b"8BPS",)),
+}
+
+
+def _get_signature(path: str, output_format: Optional[str]) -> Optional[_FormatSignature]:
+    """
+    Returns the signature to check an output against, or None if the output format is unknown or
+    the extension of the output does not match it, as KeyShot may then write another format.
+    """
+    signature = _SIGNATURES.get(output_format or "")
+    if signature is None or os.path.splitext(path)[1].lower() not in signature.extensions:
+        return None
+    return signature
+
+
+def verify_output(
+    path: str, output_format: Optional[str] = None, compute_hash: bool = True
+) -> dict[str, Any]:
+    """
+    Checks that a rendered output exists and is not empty. When the output is hashed, it is also
+    read in full to compute its digest and to check that it has the header and trailer of its
+    output format, if the format is known and matches the extension of the output.
+
+    Args:
+        path (str): The path of the output.
+        output_format (Optional[str]): The output format that KeyShot was asked to render to.
+        compute_hash (bool): Whether to read the output to hash it and check its format, or
+            only check its size.
+
+    Returns:
+        dict[str, Any]: The path, size, mtime in microseconds and digest of the output, and an
+            error that describes why the output is not valid, or None if it is valid.
+    """
+    record: dict[str, Any] = {"path": path, "size": None, "mtime": None, "hash": None}
+    try:
+        stat = os.stat(path)
+        record["size"] = stat.st_size
+        record["mtime"] = stat.st_mtime_ns // 1000
+        if stat.st_size == 0:
+            return {**record, "error": "The output is empty"}
+        if not compute_hash:
+            return {**record, "error": None}
+
+        signature = _get_signature(path, output_format)
+        extension = os.path.splitext(path)[1].lower()[1:]
+        hasher = xxh3_128()
+        tail = b""
+        with open(path, "rb") as output_file:
+            chunk = output_file.read(_HASH_CHUNK_BYTES)
+            if signature and not chunk.startswith(signature.headers):
+                return {**record, "error": f"The output is not a valid {extension} file"}
+            while chunk:
+                hasher.update(chunk)
+                tail = (tail + chunk)[-16:]
+                chunk = output_file.read(_HASH_CHUNK_BYTES)
+
+        if signature and signature.trailer and signature.trailer not in tail:
+            return {**record, "error": f"The output is not a complete {extension} file"}
+        record["hash"] = hasher.hexdigest()
+    except FileNotFoundError:
+        return {**record, "error": "The output does not exist"}
+    except OSError as e:
+        return {**record, "error": f"The output could not be read: {e}"}
+    return {**record, "error": None}
+
+
+class OutputVerifier:
+    """
+    Verifies rendered outputs on background threads while KeyShot renders the next frame. When a
+    directory is configured, the outputs are also read in full to check their format and hash
+    them, and are listed in a manifest that uses the same hash algorithm as job attachments,
+    written as JSON to a file per session. Otherwise only the size of each output is checked, so
+    that outputs on network storage are not read back.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        output_format: Optional[str] = None,
+        max_workers: int = 2,
+    ) -> None:
+        """
+        Args:
+            directory (Optional[str]): The directory to write the manifest of the session in, or
+                None to only check the size of the outputs and keep the manifest in memory.
+            output_format (Optional[str]): The output format that KeyShot renders to.
+            max_workers (int): The number of outputs that are verified at the same time.
+        """
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="KeyShotOutputVerifier"
+        )
+        self._lock = threading.Lock()
+        self._pending: list[Future] = []
+        self._output_format = output_format
+        self.manifest: list[dict[str, Any]] = []
+        self.path: Optional[str] = None
+        if directory:
+            session_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+            self.path = os.path.join(directory, f"keyshot-outputs-{session_id}.json")
+
+    @classmethod
+    def from_environment(cls, output_format: Optional[str] = None) -> OutputVerifier:
+        """
+        Args:
+            output_format (Optional[str]): The output format that KeyShot renders to.
+
+        Returns:
+            OutputVerifier: A verifier that writes its manifest to the directory configured on
+                the worker.
+        """
+        return cls(os.environ.get(OUTPUT_MANIFEST_DIR_ENV_VAR) or None, output_format)
+
+    def submit(self, path: str, manifest_path: Optional[str] = None) -> Future:
+        """
+        Starts verifying an output in the background.
+
+        Args:
+            path (str): The path of the output.
+            manifest_path (Optional[str]): The path of the output in the manifest, if the output
+                is moved after it is verified.
+
+        Returns:
+            Future: Completes once the output is verified.
+        """
+        future = self._executor.submit(self._verify, path, manifest_path or path)
+        with self._lock:
+            self._pending.append(future)
+        return future
+
+    def _verify(self, path: str, manifest_path: str) -> dict[str, Any]:
+        record = verify_output(path, self._output_format, compute_hash=self.path is not None)
+        return {**record, "path": manifest_path}
+
+    def wait(self) -> list[dict[str, Any]]:
+        """
+        Waits until every submitted output has been verified, adds them to the manifest and
+        writes the manifest.
+
+        Returns:
+            list[dict[str, Any]]: The verification results of the outputs submitted since the
+                last call, as returned by verify_output.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, []
+        results = [future.result() for future in pending]
+        if results:
+            with self._lock:
+                self.manifest.extend(result for result in results if result["error"] is None)
+            self._write_manifest()
+        return results
+
+    def _write_manifest(self) -> None:
+        if self.path is None:
+            return
+        with self._lock:
+            paths = [
+                {key: record[key] for key in ("hash", "mtime", "path", "size")}
+                for record in self.manifest
+            ]
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            write_json_atomic(self.path, {"hashAlg": HASH_ALGORITHM, "paths": paths})
+        except OSError as e:
+            _logger.warning(f"Could not write the output manifest {self.path}: {e}")
+
+    def close(self) -> None:
+        """Verifies the outputs that are still pending and stops the background threads."""
+        self.wait()
+        self._executor.shutdown()
@@ -0,0 +1,530 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+from __future__ import annotations
+
+import getpass
+import hashlib
+import json
+import logging
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from typing import Optional, Sequence
+
+from .._fileutil import ProcessLock, read_json, write_json_atomic
+from ..pool_protocol import (
+    ALIVE_LOCK_FILE,
+    LEASE_FILE,
+    LEASE_LOCK_FILE,
+    LOG_FILE,
+    PID_FILE,
+    POOL_IDLE_TIMEOUT_ENV_VAR,
+    POOL_SLOT_ENV_VAR,
+    STATE_FILE,
+    STATUS_IDLE,
+    STATUS_LEASED,
+    STATUS_STARTING,
+)
+
+__all__ = ["KeyShotProcessPool", "PooledKeyShotProcess"]
+
+_logger = logging.getLogger(__name__)
+
+# Environment variables of the session that a pooled KeyShot process, which outlives the session,
+# must not inherit: the session, job and queue identity, and the AWS credentials of the queue
+_SESSION_ENV_VAR_PREFIXES = ("OPENJD_", "DEADLINE_", "AWS_")
+# Variables with one of the prefixes above that KeyShot does need
+_KEPT_ENV_VARS = ("DEADLINE_CLOUD_PYTHONPATH",)
+_SESSION_ENV_VARS = ("KEYSHOT_ADAPTOR_SERVER_PATH",)
+# Environment variables that change which KeyShot, Python and licenses a pooled KeyShot process
+# uses, so that it is only reused by sessions that would start it with the same values
+_FINGERPRINT_ENV_VARS = (
+    "PATH",
+    "PATHEXT",
+    "PYTHONPATH",
+    "PYTHONHOME",
+    "LD_LIBRARY_PATH",
+    "DYLD_LIBRARY_PATH",
+    "DEADLINE_CLOUD_PYTHONPATH",
+)
+_FINGERPRINT_ENV_VAR_PREFIXES = ("CONDA_", "KEYSHOT", "LUXION_")
+# The settings of the adaptor, which the KeyShot process does not read
+_ADAPTOR_ENV_VAR_PREFIX = "KEYSHOT_ADAPTOR_"
+
+
+def _pool_environment() -> dict[str, str]:
+    """
+    Returns:
+        dict[str, str]: The environment of the adaptor without the variables of the session.
+    """
+    return {
+        name: value
+        for name, value in os.environ.items()
+        if name in _KEPT_ENV_VARS
+        or not (name.startswith(_SESSION_ENV_VAR_PREFIXES) or name in _SESSION_ENV_VARS)
+    }
+
+
+def _environment_fingerprint(env: dict[str, str]) -> str:
+    """
+    Returns:
+        str: A hash of the variables of the environment that a pooled KeyShot process must have
+            been started with to be reused.
+    """
+    relevant = {
+        name: value
+        for name, value in env.items()
+        if (name in _FINGERPRINT_ENV_VARS or name.startswith(_FINGERPRINT_ENV_VAR_PREFIXES))
+        and not name.startswith(_ADAPTOR_ENV_VAR_PREFIX)
+    }
+    return hashlib.sha256(json.dumps(relevant, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _pid_is_running(pid: int) -> bool:
+    """
+    Returns:
+        bool: Whether a process with the given PID is running.
+    """
+    if pid <= 0:
+        return False
+    if sys.platform == "win32":
+        import ctypes
+
+        process_query_limited_information = 0x1000
+        still_active = 259
+        kernel32 = ctypes.windll.kernel32  # type: ignore[attr-defined]
+        handle = kernel32.OpenProcess(process_query_limited_information, False, pid)
+        if not handle:
+            return False
+        try:
+            exit_code = ctypes.c_ulong()
+            kernel32.GetExitCodeProcess(handle, ctypes.byref(exit_code))
+            return exit_code.value == still_active
+        finally:
+            kernel32.CloseHandle(handle)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # The process exists but belongs to another user
+        return True
+    return True
+
+
+class PooledKeyShotProcess:
+    """
+    A KeyShot process from the worker's KeyShot process pool, leased by this adaptor. Provides the
+    parts of the LoggingSubprocess interface that the adaptor uses. While leased, the output that
+    KeyShot writes to the slot's log file is logged and passed to the output handler.
+    """
+
+    _OUTPUT_POLL_INTERVAL_SECONDS = 0.05
+
+    def __init__(
+        self,
+        slot_dir: str,
+        lease_lock: ProcessLock,
+        uses: int,
+        popen: Optional[subprocess.Popen] = None,
+    ) -> None:
+        """
+        Args:
+            slot_dir (str): The slot directory of the process.
+            lease_lock (ProcessLock): The held lease lock of the slot.
+            uses (int): How many leases the process served before this one.
+            popen (Optional[subprocess.Popen]): The process, if this adaptor started it.
+        """
+        self.slot_dir = slot_dir
+        self.uses = uses
+        self._lease_lock = lease_lock
+        self._alive_lock = ProcessLock(os.path.join(slot_dir, ALIVE_LOCK_FILE))
+        self._popen = popen
+        self._output_thread: Optional[threading.Thread] = None
+        self._stop_output = threading.Event()
+        log_path = os.path.join(slot_dir, LOG_FILE)
+        self._output_offset = os.path.getsize(log_path) if os.path.exists(log_path) else 0
+
+    @property
+    def pid(self) -> int:
+        """Returns the PID of the KeyShot process"""
+        if self._popen is not None:
+            return self._popen.pid
+        return int((read_json(os.path.join(self.slot_dir, STATE_FILE)) or {}).get("pid", -1))
+
+    @property
+    def process_is_alive(self) -> bool:
+        """Whether the KeyShot process is running, leased by this adaptor or not."""
+        if self._popen is not None:
+            # Started by this adaptor, and possibly still loading before it takes the alive lock
+            return self._popen.poll() is None
+        return self._alive_lock.is_held_elsewhere()
+
+    @property
+    def is_running(self) -> bool:
+        """
+        Whether the KeyShot process is running and still serving this adaptor's lease. The KeyShot
+        client removes the lease file when it goes back to the pool.
+        """
+        return self.process_is_alive and os.path.exists(os.path.join(self.slot_dir, LEASE_FILE))
+
+    @property
+    def returncode(self) -> int | None:
+        """The exit code of the process if this adaptor started it, None otherwise."""
+        return self._popen.poll() if self._popen is not None else None
+
+    def wait_for_exit(self) -> None:
+        """
+        Blocks until the process stops serving this adaptor's lease. A process that this adaptor
+        started is waited on, so that its exit is noticed and reaped at once. For other processes,
+        and for the end of the lease, the slot is checked at the output poll interval.
+        """
+        while self.is_running:
+            self._wait(self._OUTPUT_POLL_INTERVAL_SECONDS)
+
+    def _wait(self, timeout: float) -> None:
+        """Waits up to the timeout for the process to exit."""
+        if self._popen is None:
+            time.sleep(timeout)
+            return
+        try:
+            self._popen.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            pass
+
+    def terminate(self, grace_time_s: float = 60) -> None:
+        """
+        Terminates the KeyShot process, waiting up to the grace time for it to exit before it is
+        killed.
+        """
+        if not self.process_is_alive:
+            return
+        pid = self.pid
+        _logger.info(f"Terminating pooled KeyShot process (pid={pid}).")
+        if sys.platform == "win32" or grace_time_s == 0:
+            os.kill(pid, signal.SIGTERM if sys.platform == "win32" else signal.SIGKILL)
+            return
+        os.kill(pid, signal.SIGTERM)
+        deadline = time.monotonic() + grace_time_s
+        while self.process_is_alive and time.monotonic() < deadline:
+            self._wait(min(self._OUTPUT_POLL_INTERVAL_SECONDS, deadline - time.monotonic()))
+        if self.process_is_alive:
+            os.kill(pid, signal.SIGKILL)
+            self._wait(self._OUTPUT_POLL_INTERVAL_SECONDS)
+
+    def start_output(self, handler: logging.Handler) -> None:
+        """
+        Starts logging the output of the KeyShot process from the start of this lease, passing
+        every line to the given handler.
+        """
+        self._output_thread = threading.Thread(
+            target=self._follow_output,
+            args=(handler,),
+            name="PooledKeyShotOutputThread",
+            daemon=True,
+        )
+        self._output_thread.start()
+
+    def stop_output(self) -> None:
+        """Stops logging the output of the process, after logging what it has written so far."""
+        self._stop_output.set()
+        if self._output_thread is not None:
+            self._output_thread.join()
+
+    def _follow_output(self, handler: logging.Handler) -> None:
+        log_path = os.path.join(self.slot_dir, LOG_FILE)
+        with open(log_path, encoding="utf-8", errors="backslashreplace") as log_file:
+            log_file.seek(self._output_offset)
+            partial_line = ""
+            while True:
+                stopping = self._stop_output.is_set()
+                data = log_file.read()
+                if data:
+                    lines = (partial_line + data).split("\n")
+                    partial_line = lines.pop()
+                    for line in lines:
+                        line = line.rstrip("\r")
+                        _logger.info(line)
+                        handler.emit(logging.makeLogRecord({"msg": line}))
+                elif stopping:
+                    return
+                else:
+                    time.sleep(self._OUTPUT_POLL_INTERVAL_SECONDS)
+
+    def release_lease(self) -> None:
+        """Releases this adaptor's lease on the process."""
+        self.stop_output()
+        self._lease_lock.release()
+
+
+class KeyShotProcessPool:
+    """
+    Manages the worker-local pool of KeyShot processes. Processes stay running between sessions
+    in the pool and are leased to one adaptor at a time, so that back-to-back sessions on a worker
+    skip the KeyShot cold start. Pooled processes exit by themselves after being idle for the idle
+    timeout, and are retired after serving the maximum number of leases.
+
+    The pool is enabled by setting the KEYSHOT_ADAPTOR_POOL_DIR environment variable on the worker.
+    """
+
+    _LEASE_ACK_TIMEOUT_SECONDS = 10
+    # How long a process that was started can take to take over its slot before it is dead
+    _KEYSHOT_START_TIMEOUT_SECONDS = 300
+
+    def __init__(
+        self,
+        pool_dir: str,
+        size: int = 0,
+        idle_timeout_seconds: float = 900,
+        max_uses: int = 20,
+    ) -> None:
+        """
+        Args:
+            pool_dir (str): The directory of the pool. Processes are only shared between sessions
+                that run as the same user.
+            size (int): The number of idle processes to keep ready in addition to the ones in use.
+            idle_timeout_seconds (float): How long a process stays idle in the pool before exiting.
+            max_uses (int): The number of leases a process serves before it is retired.
+        """
+        self.pool_dir = os.path.join(pool_dir, getpass.getuser())
+        self.size = size
+        self.idle_timeout_seconds = idle_timeout_seconds
+        self.max_uses = max_uses
+        # The processes that this adaptor started, by slot directory, which are reaped once they
+        # exit so that they do not linger as zombies while the adaptor runs
+        self._started: dict[str, subprocess.Popen] = {}
+        self._started_lock = threading.Lock()
+
+    @classmethod
+    def from_environment(cls) -> Optional[KeyShotProcessPool]:
+        """
+        Returns:
+            Optional[KeyShotProcessPool]: The pool configured by the worker's environment, or None
+                if the pool is not enabled.
+        """
+        pool_dir = os.environ.get("KEYSHOT_ADAPTOR_POOL_DIR", "")
+        if not pool_dir:
+            return None
+        return cls(
+            pool_dir,
+            size=int(os.environ.get("KEYSHOT_ADAPTOR_POOL_SIZE", "0")),
+            idle_timeout_seconds=float(os.environ.get(POOL_IDLE_TIMEOUT_ENV_VAR, "900")),
+            max_uses=int(os.environ.get("KEYSHOT_ADAPTOR_POOL_MAX_USES", "20")),
+        )
+
+    def _slot_dirs(self) -> list[str]:
+        if not os.path.isdir(self.pool_dir):
+            return []
+        return [
+            os.path.join(self.pool_dir, name)
+            for name in sorted(os.listdir(self.pool_dir))
+            if os.path.isdir(os.path.join(self.pool_dir, name))
+        ]
+
+    def _idle_slots(self, args: Sequence[str]) -> list[tuple[str, dict]]:
+        """
+        Returns the slots with an idle process that was started with the given arguments and the
+        same environment as this adaptor would start it with.
+        """
+        fingerprint = _environment_fingerprint(_pool_environment())
+        idle = []
+        for slot_dir in self._slot_dirs():
+            state = read_json(os.path.join(slot_dir, STATE_FILE))
+            if (
+                state
+                and state.get("status") == STATUS_IDLE
+                and state.get("args") == list(args)
+                and state.get("env_fingerprint") == fingerprint
+            ):
+                idle.append((slot_dir, state))
+        return idle
+
+    def acquire(self, args: Sequence[str], server_path: str) -> Optional[PooledKeyShotProcess]:
+        """
+        Leases an idle KeyShot process that was started with the given arguments and environment
+        and connects it to the adaptor server.
+
+        Args:
+            args (Sequence[str]): The arguments KeyShot would be started with.
+            server_path (str): The path of the adaptor server to connect to.
+
+        Returns:
+            Optional[PooledKeyShotProcess]: The leased process, or None if no process is idle.
+        """
+        self.remove_dead_slots()
+        for slot_dir, state in self._idle_slots(args):
+            lease_lock = ProcessLock(os.path.join(slot_dir, LEASE_LOCK_FILE))
+            if not lease_lock.try_acquire():
+                continue  # Leased by another adaptor
+            with self._started_lock:
+                popen = self._started.get(slot_dir)
+            process = PooledKeyShotProcess(
+                slot_dir, lease_lock, uses=int(state.get("uses", 0)), popen=popen
+            )
+            if process.process_is_alive and self._lease(slot_dir, server_path):
+                _logger.info(f"Reusing pooled KeyShot process (pid={process.pid}).")
+                return process
+            lease_lock.release()
+        return None
+
+    def _lease(self, slot_dir: str, server_path: str) -> bool:
+        """Hands a slot's process the adaptor server path and waits for it to take the lease."""
+        lease_id = str(uuid.uuid4())
+        lease_path = os.path.join(slot_dir, LEASE_FILE)
+        write_json_atomic(lease_path, {"lease_id": lease_id, "server_path": server_path})
+        deadline = time.monotonic() + self._LEASE_ACK_TIMEOUT_SECONDS
+        while time.monotonic() < deadline:
+            state = read_json(os.path.join(slot_dir, STATE_FILE)) or {}
+            if state.get("status") == STATUS_LEASED and state.get("lease_id") == lease_id:
+                return True
+            time.sleep(0.01)
+        # The process went away, e.g. it exited because it was idle for too long
+        try:
+            os.remove(lease_path)
+        except FileNotFoundError:
+            pass
+        return False
+
+    def _start(
+        self, args: Sequence[str], lease_server_path: Optional[str]
+    ) -> tuple[str, ProcessLock, subprocess.Popen]:
+        """
+        Starts a KeyShot process in a new slot. The process is detached from the adaptor so that
+        it keeps running after the adaptor exits, and is started in its slot directory without
+        the environment variables of the session, which it outlives.
+        """
+        slot_dir = os.path.join(self.pool_dir, str(uuid.uuid4()))
+        os.makedirs(slot_dir)
+        lease_lock = ProcessLock(os.path.join(slot_dir, LEASE_LOCK_FILE))
+        if lease_server_path is not None:
+            lease_lock.try_acquire()
+            write_json_atomic(
+                os.path.join(slot_dir, LEASE_FILE),
+                {"lease_id": str(uuid.uuid4()), "server_path": lease_server_path},
+            )
+        env = _pool_environment()
+        fingerprint = _environment_fingerprint(env)
+        env[POOL_SLOT_ENV_VAR] = slot_dir
+        env[POOL_IDLE_TIMEOUT_ENV_VAR] = str(self.idle_timeout_seconds)
+        env["PYTHONUNBUFFERED"] = "1"
+        popen_kwargs: dict = {}
+        if sys.platform == "win32":
+            popen_kwargs["creationflags"] = (
+                subprocess.DETACHED_PROCESS  # type: ignore[attr-defined]
+                | subprocess.CREATE_NEW_PROCESS_GROUP  # type: ignore[attr-defined]
+            )
+        else:
+            popen_kwargs["start_new_session"] = True
+        state_path = os.path.join(slot_dir, STATE_FILE)
+        state = {
+            "args": list(args),
+            "env_fingerprint": fingerprint,
+            "status": STATUS_STARTING,
+            "started_at": time.time(),
+        }
+        write_json_atomic(state_path, state)
+        with open(os.path.join(slot_dir, LOG_FILE), "ab") as log_file:
+            popen = subprocess.Popen(
+                list(args),
+                stdin=subprocess.DEVNULL,
+                stdout=log_file,
+                stderr=subprocess.STDOUT,
+                env=env,
+                cwd=slot_dir,
+                **popen_kwargs,
+            )
+        # Record the PID so that the slot is not taken for dead while KeyShot starts up. It has a
+        # file of its own, since the KeyShot client may already be writing the state file.
+        write_json_atomic(os.path.join(slot_dir, PID_FILE), {"pid": popen.pid})
+        with self._started_lock:
+            self._started[slot_dir] = popen
+        return slot_dir, lease_lock, popen
+
+    def _reap(self) -> None:
+        """Reaps the processes that this adaptor started and that have exited."""
+        with self._started_lock:
+            for slot_dir, popen in list(self._started.items()):
+                if popen.poll() is not None:
+                    del self._started[slot_dir]
+
+    def spawn(self, args: Sequence[str], server_path: str) -> PooledKeyShotProcess:
+        """
+        Starts a new pooled KeyShot process that is leased to this adaptor from the start.
+
+        Args:
+            args (Sequence[str]): The arguments to start KeyShot with.
+            server_path (str): The path of the adaptor server to connect to.
+
+        Returns:
+            PooledKeyShotProcess: The leased process.
+        """
+        slot_dir, lease_lock, popen = self._start(args, lease_server_path=server_path)
+        _logger.info(f"Started pooled KeyShot process (pid={popen.pid}).")
+        return PooledKeyShotProcess(slot_dir, lease_lock, uses=0, popen=popen)
+
+    def prewarm(self, args: Sequence[str]) -> None:
+        """
+        Starts idle KeyShot processes until the pool has as many idle processes as its size.
+
+        Args:
+            args (Sequence[str]): The arguments to start KeyShot with.
+        """
+        self._reap()
+        missing = self.size - len(self._idle_slots(args))
+        for _ in range(missing):
+            _, _, popen = self._start(args, lease_server_path=None)
+            _logger.info(f"Pre-warming pooled KeyShot process (pid={popen.pid}).")
+
+    def should_retire(self, process: PooledKeyShotProcess) -> bool:
+        """Whether the process has served its maximum number of leases."""
+        return process.uses + 1 >= self.max_uses
+
+    def release(self, process: PooledKeyShotProcess) -> None:
+        """
+        Returns a leased process to the pool, or removes its slot if the process is gone.
+        """
+        process.release_lease()
+        if not process.process_is_alive:
+            shutil.rmtree(process.slot_dir, ignore_errors=True)
+        self._reap()
+
+    def remove_dead_slots(self) -> None:
+        """Removes the slots of processes that are no longer running."""
+        self._reap()
+        for slot_dir in self._slot_dirs():
+            alive_lock = ProcessLock(os.path.join(slot_dir, ALIVE_LOCK_FILE))
+            lease_lock = ProcessLock(os.path.join(slot_dir, LEASE_LOCK_FILE))
+            if alive_lock.is_held_elsewhere() or lease_lock.is_held_elsewhere():
+                continue
+            if self._is_starting(slot_dir):
+                continue
+            shutil.rmtree(slot_dir, ignore_errors=True)
+
+    def _is_starting(self, slot_dir: str) -> bool:
+        """
+        Whether the process of a slot is still starting up, before its KeyShot client takes the
+        alive lock. It is, while its PID is running and it has not taken longer than the start
+        timeout. A slot that was just created has no state or PID yet.
+        """
+        state = read_json(os.path.join(slot_dir, STATE_FILE))
+        if state is not None and state.get("status") != STATUS_STARTING:
+            return False
+        state = state or {}
+        try:
+            age = time.time() - float(state.get("started_at", os.path.getmtime(slot_dir)))
+        except OSError:
+            return False
+        pid = (read_json(os.path.join(slot_dir, PID_FILE)) or {}).get("pid")
+        if pid is None:
+            return age <= self._LEASE_ACK_TIMEOUT_SECONDS
+        if age > self._KEYSHOT_START_TIMEOUT_SECONDS:
+            _logger.warning(
+                f"Pooled KeyShot process (pid={pid}) did not start in "
+                f"{self._KEYSHOT_START_TIMEOUT_SECONDS} seconds, removing its slot."
+            )
+            return False
+        return _pid_is_running(int(pid))
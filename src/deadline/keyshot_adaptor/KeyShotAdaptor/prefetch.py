@@ -0,0 +1,185 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+"""
+Reads the scene file and the input files of a session on background threads while KeyShot starts
+up, so that they are in the file cache of the operating system when KeyShot opens them instead of
+KeyShot waiting for the disk or the network.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Iterable, Optional
+
+__all__ = ["PREFETCH_MAX_MB_ENV_VAR", "PREFETCH_THREADS_ENV_VAR", "Prefetcher"]
+
+_logger = logging.getLogger(__name__)
+
+# The most data in MB that a session prefetches, which enables prefetching when it is over 0.
+# Prefetching is off by default, since reading files that KeyShot does not open competes with
+# KeyShot and other sessions for the disk, the network and the file cache.
+PREFETCH_MAX_MB_ENV_VAR = "KEYSHOT_ADAPTOR_PREFETCH_MAX_MB"
+# The number of files that are read at the same time
+PREFETCH_THREADS_ENV_VAR = "KEYSHOT_ADAPTOR_PREFETCH_THREADS"
+_DEFAULT_MAX_MB = 0
+_DEFAULT_THREADS = 4
+
+_READ_BLOCK_SIZE = 1024 * 1024
+
+
+class Prefetcher:
+    """
+    Reads files on a bounded number of background threads, in the order they are given, until
+    the files read add up to the size limit. Files are read rather than hinted to the operating
+    system, since read ahead hints are ignored by network file systems and are not available on
+    Windows. Counts the files and bytes read, and when each read finished.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        max_workers: int = _DEFAULT_THREADS,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        Args:
+            max_bytes (int): The most data that is read, files that do not fit are skipped.
+            max_workers (int): The number of files that are read at the same time.
+            clock (Callable[[], float]): Returns the current monotonic time in seconds.
+        """
+        self.max_bytes = max_bytes
+        self._clock = clock
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="KeyShotPrefetch"
+        )
+        self._lock = threading.Lock()
+        self._pending: list[Future] = []
+        self._scheduled_bytes = 0
+        self._closed = False
+        self._start: Optional[float] = None
+        self.files = 0
+        self.bytes = 0
+        self.skipped = 0
+        # When each read finished and how long it took
+        self._reads: list[tuple[float, float]] = []
+
+    @classmethod
+    def from_environment(cls) -> Optional[Prefetcher]:
+        """
+        Returns:
+            Optional[Prefetcher]: A prefetcher with the size limit from the
+                KEYSHOT_ADAPTOR_PREFETCH_MAX_MB environment variable and the number of threads
+                from KEYSHOT_ADAPTOR_PREFETCH_THREADS, or None if prefetching is not enabled.
+        """
+        max_mb = float(os.environ.get(PREFETCH_MAX_MB_ENV_VAR, _DEFAULT_MAX_MB))
+        if max_mb <= 0:
+            return None
+        max_workers = int(os.environ.get(PREFETCH_THREADS_ENV_VAR, _DEFAULT_THREADS))
+        return cls(int(max_mb * 1024 * 1024), max_workers=max(max_workers, 1))
+
+    def prefetch(self, paths: Iterable[str]) -> None:
+        """
+        Starts reading files in the background. Never blocks.
+
+        Args:
+            paths (Iterable[str]): The files to read, and directories to read every file in.
+        """
+        with self._lock:
+            if self._start is None:
+                self._start = self._clock()
+        for path in paths:
+            if os.path.isdir(path):
+                self._submit(self._prefetch_directory, path)
+            else:
+                self._submit_file(path)
+
+    def _submit(self, fn: Callable[[str], None], path: str) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._pending.append(self._executor.submit(fn, path))
+
+    def _submit_file(self, path: str) -> None:
+        try:
+            size = os.path.getsize(path)
+        except OSError as e:
+            _logger.debug(f"Could not prefetch {path}: {e}")
+            return
+        with self._lock:
+            if self._scheduled_bytes + size > self.max_bytes:
+                self.skipped += 1
+                return
+            self._scheduled_bytes += size
+        self._submit(self._read, path)
+
+    def _prefetch_directory(self, directory: str) -> None:
+        for root, dirnames, filenames in os.walk(directory):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                if self._closed:
+                    return
+                self._submit_file(os.path.join(root, filename))
+
+    def _read(self, path: str) -> None:
+        start = self._clock()
+        buffer = bytearray(_READ_BLOCK_SIZE)
+        size = 0
+        try:
+            with open(path, "rb", buffering=0) as f:
+                while not self._closed:
+                    count = f.readinto(buffer)
+                    if not count:
+                        break
+                    size += count
+        except OSError as e:
+            _logger.debug(f"Could not prefetch {path}: {e}")
+            return
+        end = self._clock()
+        with self._lock:
+            self.files += 1
+            self.bytes += size
+            self._reads.append((end, end - start))
+
+    def wait(self) -> None:
+        """Waits until every file that was submitted so far has been read."""
+        while True:
+            with self._lock:
+                pending, self._pending = self._pending, []
+            if not pending:
+                return
+            for future in pending:
+                future.result()
+
+    def summary(self, until: Optional[float] = None) -> str:
+        """
+        Returns the files and bytes read so far, and how much of the reading finished before the
+        given time, e.g. when KeyShot started opening the scene, which KeyShot would otherwise
+        have waited for.
+
+        Args:
+            until (Optional[float]): The monotonic time of the clock of the prefetcher, or None
+                for now.
+        """
+        until = self._clock() if until is None else until
+        with self._lock:
+            saved = sum(seconds for end, seconds in self._reads if end <= until)
+            elapsed = 0.0
+            if self._reads and self._start is not None:
+                elapsed = max(end for end, _ in self._reads) - self._start
+            files, size, skipped = self.files, self.bytes, self.skipped
+        message = (
+            f"Prefetched {files} file(s), {size / (1024 * 1024):.1f} MB in {elapsed:.2f}s, "
+            f"{saved:.2f}s of reading finished before KeyShot needed it"
+        )
+        if skipped:
+            limit_mb = self.max_bytes // (1024 * 1024)
+            message += f", skipped {skipped} file(s) over the {limit_mb} MB limit"
+        return message
+
+    def close(self) -> None:
+        """Stops reading, and drops the files that were not read yet."""
+        with self._lock:
+            self._closed = True
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,123 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+"""
+Checks that a session can render before KeyShot is launched: that the scene file can be read, and
+that the output directory can be written to and has room for the outputs. A misconfigured task
+then fails in milliseconds instead of once KeyShot started up or rendered a frame.
+"""
+from __future__ import annotations
+
+import errno
+import os
+import shutil
+import tempfile
+from typing import Optional
+
+__all__ = [
+    "FREE_SPACE_MARGIN_MB_ENV_VAR",
+    "check_free_space",
+    "check_output_directory",
+    "check_scene_file",
+    "estimate_output_bytes",
+    "free_space_margin_bytes",
+]
+
+# The free disk space in MB that is required on top of the estimated size of the outputs
+FREE_SPACE_MARGIN_MB_ENV_VAR = "KEYSHOT_ADAPTOR_FREE_SPACE_MARGIN_MB"
+_DEFAULT_FREE_SPACE_MARGIN_MB = 512
+
+# The size of an uncompressed pixel of each output format
+_BYTES_PER_PIXEL = {
+    "RENDER_OUTPUT_PNG": 4,
+    "RENDER_OUTPUT_JPEG": 3,
+    "RENDER_OUTPUT_EXR": 16,
+    "RENDER_OUTPUT_TIFF8": 4,
+    "RENDER_OUTPUT_TIFF32": 16,
+    "RENDER_OUTPUT_PSD8": 4,
+    "RENDER_OUTPUT_PSD16": 8,
+    "RENDER_OUTPUT_PSD32": 16,
+}
+_DEFAULT_BYTES_PER_PIXEL = 16
+# How much smaller than uncompressed a typical render of each compressed output format is. KeyShot
+# writes TIFF and PSD images without compression.
+_COMPRESSION_RATIOS = {
+    "RENDER_OUTPUT_PNG": 2,
+    "RENDER_OUTPUT_JPEG": 8,
+    "RENDER_OUTPUT_EXR": 2,
+}
+
+
+def estimate_output_bytes(
+    output_format: Optional[str], width: Optional[int], height: Optional[int]
+) -> int:
+    """
+    Returns:
+        int: The disk space that a typical output of the given format and resolution takes up,
+            or 0 if the resolution is not known.
+    """
+    if not width or not height:
+        return 0
+    bytes_per_pixel = _BYTES_PER_PIXEL.get(output_format or "", _DEFAULT_BYTES_PER_PIXEL)
+    return width * height * bytes_per_pixel // _COMPRESSION_RATIOS.get(output_format or "", 1)
+
+
+def free_space_margin_bytes() -> int:
+    """
+    Returns:
+        int: The free disk space that is required on top of the outputs, from the
+            KEYSHOT_ADAPTOR_FREE_SPACE_MARGIN_MB environment variable.
+    """
+    margin_mb = float(os.environ.get(FREE_SPACE_MARGIN_MB_ENV_VAR, _DEFAULT_FREE_SPACE_MARGIN_MB))
+    return int(margin_mb * 1024 * 1024)
+
+
+def check_scene_file(scene_file: str) -> None:
+    """
+    Checks that the scene file exists and can be read.
+
+    Raises:
+        FileNotFoundError: If the scene file does not exist.
+        PermissionError: If the scene file cannot be read.
+    """
+    if not os.path.isfile(scene_file):
+        raise FileNotFoundError(f"The scene file {scene_file} does not exist")
+    try:
+        with open(scene_file, "rb") as f:
+            f.read(1)
+    except OSError as e:
+        raise PermissionError(f"The scene file {scene_file} cannot be read: {e}") from e
+
+
+def check_output_directory(directory: str) -> None:
+    """
+    Creates the output directory if it does not exist, and checks that files can be written to it
+    by writing a temporary file.
+
+    Raises:
+        PermissionError: If the directory cannot be created or written to.
+    """
+    try:
+        os.makedirs(directory, exist_ok=True)
+        with tempfile.TemporaryFile(dir=directory, prefix=".keyshot-preflight-"):
+            pass
+    except OSError as e:
+        raise PermissionError(f"The output directory {directory} cannot be written to: {e}") from e
+
+
+def check_free_space(directory: str, required_bytes: int) -> None:
+    """
+    Checks that the disk of a directory, or of its closest parent that exists, has the required
+    free space.
+
+    Raises:
+        OSError: If the disk does not have the required free space.
+    """
+    path = os.path.abspath(directory)
+    while not os.path.exists(path) and os.path.dirname(path) != path:
+        path = os.path.dirname(path)
+    free_bytes = shutil.disk_usage(path).free
+    if free_bytes < required_bytes:
+        raise OSError(
+            errno.ENOSPC,
+            f"The disk of {directory} has {free_bytes // (1024 * 1024)} MB free, but "
+            f"{required_bytes // (1024 * 1024)} MB are needed for the outputs",
+        )
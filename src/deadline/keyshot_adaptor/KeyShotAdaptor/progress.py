@@ -0,0 +1,144 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+from __future__ import annotations
+
+import threading
+import time
+from typing import Callable, Optional
+
+__all__ = ["ProgressReporter"]
+
+
+def _format_duration(seconds: float) -> str:
+    """
+    Formats a duration as a short human readable string, e.g. "45s", "3m 05s" or "1h 02m".
+    """
+    seconds = int(round(seconds))
+    if seconds < 60:
+        return f"{seconds}s"
+    minutes, seconds = divmod(seconds, 60)
+    if minutes < 60:
+        return f"{minutes}m {seconds:02d}s"
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h {minutes:02d}m"
+
+
+class ProgressReporter:
+    """
+    Aggregates the progress of every render in a task into the progress of the task, and reports
+    it along with an estimate of the remaining time.
+
+    Each render reports its own progress from 0 to 100 percent. This maps that progress onto the
+    share of the task that the render represents. Reported progress never goes backwards, is only
+    reported when it changes, and at most once per interval, except when an output completes.
+    The remaining time is estimated from the throughput of the task so far.
+    """
+
+    def __init__(
+        self,
+        report: Callable[..., None],
+        min_interval_seconds: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        Args:
+            report (Callable[..., None]): Called with the keyword arguments progress and
+                status_message to report progress, e.g. Adaptor.update_status.
+            min_interval_seconds (float): The minimum time between two progress reports.
+            clock (Callable[[], float]): Returns the current time in seconds.
+        """
+        self._report = report
+        self._min_interval_seconds = min_interval_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.expected_outputs = 1
+        self.produced_outputs = 0
+        self._progress = 0.0
+        self._start_time = clock()
+        self._last_report_time: Optional[float] = None
+        self._last_reported: Optional[float] = None
+
+    @property
+    def progress(self) -> float:
+        """The progress of the task, from 0 to 100."""
+        return self._progress
+
+    def start(self, expected_outputs: int) -> None:
+        """
+        Starts tracking the progress of a new task.
+
+        Args:
+            expected_outputs (int): The number of renders the task performs.
+        """
+        with self._lock:
+            self.expected_outputs = max(expected_outputs, 1)
+            self.produced_outputs = 0
+            self._progress = 0.0
+            self._start_time = self._clock()
+            self._last_report_time = None
+            self._last_reported = None
+
+    def update(self, percent: float) -> None:
+        """
+        Records the progress of the render that is currently running.
+
+        Args:
+            percent (float): The progress of the current render, from 0 to 100.
+        """
+        with self._lock:
+            current = min(max(percent, 0.0), 100.0)
+            self._set_progress(
+                (100 * self.produced_outputs + current) / self.expected_outputs, force=False
+            )
+
+    def complete_output(self) -> bool:
+        """
+        Records that the render that was running produced its output.
+
+        Returns:
+            bool: True if every expected output of the task has been produced.
+        """
+        with self._lock:
+            self.produced_outputs = min(self.produced_outputs + 1, self.expected_outputs)
+            self._set_progress(100 * self.produced_outputs / self.expected_outputs, force=True)
+            return self.produced_outputs >= self.expected_outputs
+
+    def estimate_remaining_seconds(self) -> Optional[float]:
+        """
+        Estimates the time until the task completes from its throughput so far.
+
+        Returns:
+            Optional[float]: The estimated remaining seconds, or None before there is any progress.
+        """
+        elapsed = self._clock() - self._start_time
+        if self._progress <= 0 or elapsed <= 0:
+            return None
+        return elapsed * (100 - self._progress) / self._progress
+
+    def _set_progress(self, progress: float, force: bool) -> None:
+        # Progress of a render can go backwards, e.g. between render passes
+        self._progress = max(self._progress, min(progress, 100.0))
+        rounded = round(self._progress, 1)
+        if rounded == self._last_reported:
+            return
+        now = self._clock()
+        if (
+            not force
+            and self._last_report_time is not None
+            and now - self._last_report_time < self._min_interval_seconds
+        ):
+            return
+        self._last_report_time = now
+        self._last_reported = rounded
+        self._report(progress=rounded, status_message=self._status_message())
+
+    def _status_message(self) -> str:
+        if self.produced_outputs >= self.expected_outputs:
+            return f"Rendered {self.expected_outputs} of {self.expected_outputs} outputs"
+        message = (
+            f"Rendering output {self.produced_outputs + 1} of {self.expected_outputs}"
+            f" ({self._progress:.1f}%)"
+        )
+        remaining = self.estimate_remaining_seconds()
+        if remaining is not None:
+            message += f", about {_format_duration(remaining)} remaining"
+        return message
@@ -0,0 +1,211 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+"""
+A cache of rendered outputs, keyed by the content of everything that determines an output: the
+scene, the frame, the output format, the render options and the KeyShot version. A task that
+renders an output that is in the cache copies it from the cache instead of rendering it, so that
+resubmitting a job that failed or was canceled only renders the frames that are missing.
+
+The cache is a directory on the worker, or a shared directory that several workers use. Entries
+are written to a temporary file and renamed into place, so that a reader never sees a partial
+entry. Once a task has stored its outputs, the least recently used entries are removed while the
+cache is larger than its limit.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import uuid
+from typing import Any, Optional
+
+__all__ = [
+    "RENDER_CACHE_DIR_ENV_VAR",
+    "RENDER_CACHE_MAX_MB_ENV_VAR",
+    "RenderCache",
+    "file_digest",
+    "render_cache_key",
+]
+
+_logger = logging.getLogger(__name__)
+
+# Directory of the render cache, which enables the cache when it is set
+RENDER_CACHE_DIR_ENV_VAR = "KEYSHOT_ADAPTOR_RENDER_CACHE_DIR"
+# The size in MB that the cache is kept under by removing the least recently used entries
+RENDER_CACHE_MAX_MB_ENV_VAR = "KEYSHOT_ADAPTOR_RENDER_CACHE_MAX_MB"
+_DEFAULT_MAX_MB = 10 * 1024
+
+_HASH_BLOCK_SIZE = 8 * 1024 * 1024
+# 256 bit digests keep the paths of the entries short enough for Windows
+_DIGEST_SIZE = 32
+_TEMP_PREFIX = "."
+
+
+def file_digest(path: str) -> str:
+    """
+    Returns:
+        str: The hex digest of the contents of a file.
+    """
+    digest = hashlib.blake2b(digest_size=_DIGEST_SIZE)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def render_cache_key(**parts: Any) -> str:
+    """
+    Returns the key of the output that is rendered with the given parts, e.g. the digest of the
+    scene and the frame. The parts must be JSON serializable.
+    """
+    encoded = json.dumps(parts, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return hashlib.blake2b(encoded, digest_size=_DIGEST_SIZE).hexdigest()
+
+
+class RenderCache:
+    """
+    Stores rendered outputs by their key, and copies them out of the cache on a hit. Counts the
+    hits and misses of the session.
+    """
+
+    def __init__(self, directory: str, max_bytes: int) -> None:
+        """
+        Args:
+            directory (str): The directory of the cache, which is created if it does not exist.
+            max_bytes (int): The size that the cache is kept under.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+        self.evicted = 0
+        self._stored_since_eviction = False
+
+    @classmethod
+    def from_environment(cls) -> Optional[RenderCache]:
+        """
+        Returns:
+            Optional[RenderCache]: The cache in the directory from the
+                KEYSHOT_ADAPTOR_RENDER_CACHE_DIR environment variable, with the size limit from
+                KEYSHOT_ADAPTOR_RENDER_CACHE_MAX_MB, or None if the cache is not enabled.
+        """
+        directory = os.environ.get(RENDER_CACHE_DIR_ENV_VAR)
+        if not directory:
+            return None
+        max_mb = float(os.environ.get(RENDER_CACHE_MAX_MB_ENV_VAR, _DEFAULT_MAX_MB))
+        return cls(directory, int(max_mb * 1024 * 1024))
+
+    def _entry_path(self, key: str) -> str:
+        # Spread the entries across subdirectories so that no directory gets too large
+        return os.path.join(self.directory, key[:2], key)
+
+    def fetch(self, key: str, destination: str) -> bool:
+        """
+        Copies the output with the given key from the cache to its destination, if it is in the
+        cache.
+
+        Args:
+            key (str): The key of the output.
+            destination (str): The path to copy the output to.
+
+        Returns:
+            bool: Whether the output was in the cache.
+        """
+        entry = self._entry_path(key)
+        if not os.path.isfile(entry):
+            self.misses += 1
+            return False
+        directory = os.path.dirname(destination)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = os.path.join(directory, f"{_TEMP_PREFIX}{uuid.uuid4().hex}.tmp")
+        try:
+            shutil.copyfile(entry, temp_path)
+            os.replace(temp_path, destination)
+        except FileNotFoundError:
+            # Another worker evicted the entry after it was found
+            self._remove(temp_path)
+            self.misses += 1
+            return False
+        except BaseException:
+            self._remove(temp_path)
+            raise
+        try:
+            # Mark the entry as recently used
+            os.utime(entry)
+        except OSError:
+            pass
+        self.hits += 1
+        return True
+
+    def store(self, key: str, source: str) -> None:
+        """
+        Adds an output to the cache. An output that cannot be added is logged and skipped, since
+        the cache only saves time. The cache can be larger than its limit until evict is called.
+
+        Args:
+            key (str): The key of the output.
+            source (str): The path of the rendered output.
+        """
+        entry = self._entry_path(key)
+        temp_path = os.path.join(os.path.dirname(entry), f"{_TEMP_PREFIX}{uuid.uuid4().hex}.tmp")
+        try:
+            os.makedirs(os.path.dirname(entry), exist_ok=True)
+            shutil.copyfile(source, temp_path)
+            os.replace(temp_path, entry)
+        except OSError as e:
+            self._remove(temp_path)
+            _logger.warning(f"Could not add {source} to the render cache: {e}")
+            return
+        self.stored += 1
+        self._stored_since_eviction = True
+
+    def evict(self) -> None:
+        """
+        Removes the least recently used entries while the cache is larger than its limit. Every
+        entry of the cache is looked at, so this is called once after storing the outputs of a
+        task rather than after each output, and does nothing if nothing was stored since.
+        """
+        if not self._stored_since_eviction:
+            return
+        self._stored_since_eviction = False
+        entries = []
+        total = 0
+        for directory, _, filenames in os.walk(self.directory):
+            for filename in filenames:
+                if filename.startswith(_TEMP_PREFIX):
+                    continue
+                path = os.path.join(directory, filename)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, path))
+                total += stat.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if self._remove(path):
+                self.evicted += 1
+            total -= size
+
+    @staticmethod
+    def _remove(path: str) -> bool:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def summary(self) -> str:
+        """
+        Returns:
+            str: The hits, misses, stored and evicted entries of the session.
+        """
+        return (
+            f"Render cache: {self.hits} hit(s), {self.misses} miss(es), {self.stored} stored, "
+            f"{self.evicted} evicted"
+        )
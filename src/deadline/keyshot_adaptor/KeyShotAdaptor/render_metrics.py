@@ -0,0 +1,195 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Any, Callable, NamedTuple, Optional
+
+__all__ = ["ProcessSample", "read_process_sample", "FrameMetricsSampler", "summarize_frames"]
+
+_CLOCK_TICKS_PER_SECOND = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+
+class ProcessSample(NamedTuple):
+    """Resource usage of a process at one point in time."""
+
+    cpu_user_seconds: float
+    cpu_system_seconds: float
+    rss_bytes: int
+    threads: int
+
+
+def read_process_sample(pid: int) -> Optional[ProcessSample]:
+    """
+    Reads the resource usage of a process from /proc.
+
+    Args:
+        pid (int): The process to read.
+
+    Returns:
+        Optional[ProcessSample]: The resource usage, or None if it cannot be read, e.g. because the
+            process exited or the platform has no /proc file system.
+    """
+    try:
+        with open(f"/proc/{pid}/stat", encoding="utf-8") as stat_file:
+            stat = stat_file.read()
+        with open(f"/proc/{pid}/status", encoding="utf-8") as status_file:
+            status = dict(line.split(":", 1) for line in status_file if ":" in line)
+        # The process name in parentheses can contain spaces, the fields after it cannot. utime
+        # and stime are the 14th and 15th fields of the stat file.
+        fields = stat[stat.rindex(")") + 2 :].split()
+        return ProcessSample(
+            cpu_user_seconds=int(fields[11]) / _CLOCK_TICKS_PER_SECOND,
+            cpu_system_seconds=int(fields[12]) / _CLOCK_TICKS_PER_SECOND,
+            rss_bytes=int(status.get("VmRSS", "0 kB").split()[0]) * 1024,
+            threads=int(status.get("Threads", "0")),
+        )
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class FrameMetricsSampler:
+    """
+    Measures the resources that a process uses to render each frame: the wall time, the user and
+    system CPU time, and the peak resident set size and thread count. CPU time is measured at the
+    start and end of a frame, the peak values are sampled by a background thread while a frame
+    renders. Only the wall time is measured on platforms without a /proc file system.
+    """
+
+    def __init__(
+        self,
+        get_pid: Callable[[], Optional[int]],
+        interval_seconds: float = 0.5,
+        clock: Callable[[], float] = time.monotonic,
+        read_sample: Callable[[int], Optional[ProcessSample]] = read_process_sample,
+    ) -> None:
+        """
+        Args:
+            get_pid (Callable[[], Optional[int]]): Returns the process that renders, if any.
+            interval_seconds (float): The time between two samples while a frame renders.
+            clock (Callable[[], float]): Returns the current monotonic time in seconds.
+            read_sample (Callable[[int], Optional[ProcessSample]]): Reads the resource usage of a
+                process.
+        """
+        self._get_pid = get_pid
+        self._interval_seconds = interval_seconds
+        self._clock = clock
+        self._read_sample = read_sample
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._frame: Optional[int] = None
+        self._start_time = 0.0
+        self._start_sample: Optional[ProcessSample] = None
+        self._peak_rss_bytes = 0
+        self._max_threads = 0
+
+    def _sample(self) -> Optional[ProcessSample]:
+        pid = self._get_pid()
+        if pid is None:
+            return None
+        sample = self._read_sample(pid)
+        if sample is not None:
+            self._peak_rss_bytes = max(self._peak_rss_bytes, sample.rss_bytes)
+            self._max_threads = max(self._max_threads, sample.threads)
+        return sample
+
+    def start(self, frame: int) -> None:
+        """
+        Starts measuring the render of a frame.
+
+        Args:
+            frame (int): The frame that starts rendering.
+        """
+        with self._lock:
+            self._frame = frame
+            self._start_time = self._clock()
+            self._peak_rss_bytes = 0
+            self._max_threads = 0
+            self._start_sample = self._sample()
+            if self._thread is None:
+                self._stop.clear()
+                self._thread = threading.Thread(
+                    target=self._run, name="KeyShotFrameMetricsThread", daemon=True
+                )
+                self._thread.start()
+
+    def finish(self) -> Optional[dict[str, Any]]:
+        """
+        Stops measuring the frame that is rendering.
+
+        Returns:
+            Optional[dict[str, Any]]: The metrics of the frame, or None if no frame was rendering.
+                The resource usage metrics are None if they could not be measured.
+        """
+        with self._lock:
+            if self._frame is None:
+                return None
+            end_sample = self._sample()
+            record: dict[str, Any] = {
+                "frame": self._frame,
+                "start": self._start_time,
+                "wall_seconds": round(self._clock() - self._start_time, 6),
+                "cpu_user_seconds": None,
+                "cpu_system_seconds": None,
+                "peak_rss_bytes": self._peak_rss_bytes or None,
+                "max_threads": self._max_threads or None,
+            }
+            if self._start_sample is not None and end_sample is not None:
+                record["cpu_user_seconds"] = round(
+                    end_sample.cpu_user_seconds - self._start_sample.cpu_user_seconds, 6
+                )
+                record["cpu_system_seconds"] = round(
+                    end_sample.cpu_system_seconds - self._start_sample.cpu_system_seconds, 6
+                )
+            self._frame = None
+            return record
+
+    def stop(self) -> None:
+        """Stops the sampling thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._interval_seconds):
+            with self._lock:
+                if self._frame is not None:
+                    self._sample()
+
+
+def _format_bytes(num_bytes: float) -> str:
+    for unit in ("B", "KiB", "MiB"):
+        if num_bytes < 1024:
+            return f"{num_bytes:.1f} {unit}"
+        num_bytes /= 1024
+    return f"{num_bytes:.2f} GiB"
+
+
+def summarize_frames(records: list[dict[str, Any]]) -> str:
+    """
+    Summarizes the metrics of the frames of a task in one line for the task log.
+
+    Args:
+        records (list[dict[str, Any]]): The metrics of each frame, as returned by
+            FrameMetricsSampler.finish.
+    """
+    count = len(records)
+    wall = sum(record["wall_seconds"] for record in records)
+    summary = f"Rendered {count} frame(s) in {wall:.1f}s (avg {wall / max(count, 1):.1f}s/frame)"
+    cpu = [
+        record["cpu_user_seconds"] + record["cpu_system_seconds"]
+        for record in records
+        if record["cpu_user_seconds"] is not None
+    ]
+    if cpu:
+        summary += f", CPU {sum(cpu):.1f}s (avg {sum(cpu) / len(cpu):.1f}s/frame)"
+    peak_rss = [record["peak_rss_bytes"] for record in records if record["peak_rss_bytes"]]
+    if peak_rss:
+        summary += f", peak RSS {_format_bytes(max(peak_rss))}"
+    threads = [record["max_threads"] for record in records if record["max_threads"]]
+    if threads:
+        summary += f", max threads {max(threads)}"
+    return summary
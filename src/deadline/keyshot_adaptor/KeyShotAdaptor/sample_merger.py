@@ -0,0 +1,467 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+"""
+Merges the outputs of the tasks that rendered the samples of a frame with different seeds into
+the frame, by averaging them. The sum of the outputs is kept in a memory-mapped file, and every
+output is read and added to it one block of scanlines at a time, so the frame can be larger than
+the memory of the worker.
+
+Only scanline OpenEXR images without compression or with ZIP compression can be merged.
+
+Usage: python -m deadline.keyshot_adaptor.KeyShotAdaptor.sample_merger
+    --output-file-path <path> --frames <frames> --sample-tasks <tasks>
+    [--camera <camera>] [--model-set <model set>] [--studio <studio>]
+    [--scratch-dir <dir>] [--keep-samples]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import struct
+import tempfile
+import time
+import zlib
+from types import TracebackType
+from typing import Iterator, NamedTuple, Optional, Type
+
+try:
+    import numpy as np
+except ImportError as e:
+    raise ImportError(
+        "Merging samples requires numpy, install it with: "
+        "pip install 'deadline-cloud-for-keyshot[assemble]'"
+    ) from e
+
+from .samples import sample_output_path
+from .shots import add_shot_arguments, shot_output_path
+
+__all__ = ["ExrChannel", "ExrImage", "ExrWriter", "SampleAccumulator", "merge_samples", "main"]
+
+_EXR_MAGIC = b"\x76\x2f\x31\x01"
+# Version 2 of the file format, a single part image of scanlines
+_EXR_VERSION = 2
+# The flags of the version field for tiled, deep and multi-part images
+_UNSUPPORTED_VERSION_FLAGS = 0x200 | 0x800 | 0x1000
+_NO_COMPRESSION, _ZIPS_COMPRESSION, _ZIP_COMPRESSION = 0, 2, 3
+_LINES_PER_BLOCK = {_NO_COMPRESSION: 1, _ZIPS_COMPRESSION: 1, _ZIP_COMPRESSION: 16}
+_INCREASING_Y = 0
+# The zlib compression level that OpenEXR writes ZIP compressed images with by default
+_ZIP_LEVEL = 4
+# The data type of each pixel type of a channel: UINT, HALF and FLOAT
+_PIXEL_DTYPES = {0: np.dtype("<u4"), 1: np.dtype("<f2"), 2: np.dtype("<f4")}
+# Attributes that the writer sets itself, the others are copied from the merged images
+_WRITTEN_ATTRIBUTES = {"channels", "compression", "dataWindow", "lineOrder"}
+
+
+class ExrChannel(NamedTuple):
+    name: str
+    pixel_type: int
+    x_sampling: int = 1
+    y_sampling: int = 1
+
+
+def _read_null_terminated(data: bytes, offset: int) -> tuple[str, int]:
+    end = data.index(b"\x00", offset)
+    return data[offset:end].decode(), end + 1
+
+
+def _parse_channels(value: bytes) -> list[ExrChannel]:
+    channels = []
+    offset = 0
+    while value[offset] != 0:
+        name, offset = _read_null_terminated(value, offset)
+        pixel_type, _, x_sampling, y_sampling = struct.unpack_from("<iB3xii", value, offset)
+        offset += 16
+        channels.append(ExrChannel(name, pixel_type, x_sampling, y_sampling))
+    return channels
+
+
+def _encode_channels(channels: list[ExrChannel]) -> bytes:
+    return (
+        b"".join(
+            channel.name.encode()
+            + b"\x00"
+            + struct.pack("<iB3xii", channel.pixel_type, 0, channel.x_sampling, channel.y_sampling)
+            for channel in channels
+        )
+        + b"\x00"
+    )
+
+
+def _unzip(data: bytes, size: int) -> bytes:
+    """Reverses the ZIP compression of a block: zlib, a delta predictor and byte interleaving."""
+    if len(data) == size:
+        # Blocks that do not get smaller when compressed are stored as they are
+        return data
+    predicted = np.frombuffer(zlib.decompress(data), dtype=np.uint8)
+    deltas = predicted - np.uint8(128)
+    deltas[0] = predicted[0]
+    interleaved = np.cumsum(deltas, dtype=np.uint8)
+    raw = np.empty_like(interleaved)
+    half = (interleaved.size + 1) // 2
+    raw[0::2] = interleaved[:half]
+    raw[1::2] = interleaved[half:]
+    return raw.tobytes()
+
+
+def _zip(raw: bytes) -> bytes:
+    data = np.frombuffer(raw, dtype=np.uint8)
+    interleaved = np.concatenate([data[0::2], data[1::2]])
+    predicted = np.empty_like(interleaved)
+    predicted[:1] = interleaved[:1]
+    predicted[1:] = np.diff(interleaved) + np.uint8(128)
+    compressed = zlib.compress(predicted.tobytes(), _ZIP_LEVEL)
+    return compressed if len(compressed) < len(raw) else raw
+
+
+class ExrImage:
+    """
+    A scanline OpenEXR image that is read one block of scanlines at a time.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Reads the header of the image.
+
+        Args:
+            path (str): The path of the image.
+
+        Raises:
+            ValueError: If the file is not an OpenEXR image or the image is not supported.
+        """
+        self.path = path
+        with open(path, "rb") as exr_file:
+            magic_and_version = exr_file.read(8)
+            if magic_and_version[:4] != _EXR_MAGIC:
+                raise ValueError(f"{path} is not an OpenEXR image")
+            (version,) = struct.unpack("<I", magic_and_version[4:])
+            if version & 0xFF != _EXR_VERSION or version & _UNSUPPORTED_VERSION_FLAGS:
+                raise ValueError(
+                    f"{path} is not supported, only single part scanline OpenEXR images can be merged"
+                )
+            self.attributes: dict[str, tuple[str, bytes]] = {}
+            while True:
+                name = self._read_string(exr_file)
+                if not name:
+                    break
+                attribute_type = self._read_string(exr_file)
+                (size,) = struct.unpack("<i", exr_file.read(4))
+                self.attributes[name] = (attribute_type, exr_file.read(size))
+            self._header_end = exr_file.tell()
+
+        try:
+            self.channels = _parse_channels(self.attributes["channels"][1])
+            self.compression = self.attributes["compression"][1][0]
+            self.data_window = struct.unpack("<iiii", self.attributes["dataWindow"][1])
+        except (KeyError, IndexError, struct.error) as e:
+            raise ValueError(f"{path} does not have a valid OpenEXR header: {e}") from e
+        if self.compression not in _LINES_PER_BLOCK:
+            raise ValueError(
+                f"{path} is not supported, only OpenEXR images without compression or with ZIP "
+                f"compression can be merged, not compression {self.compression}"
+            )
+        if any(channel.x_sampling != 1 or channel.y_sampling != 1 for channel in self.channels):
+            raise ValueError(f"{path} is not supported, it has subsampled channels")
+        self.width = self.data_window[2] - self.data_window[0] + 1
+        self.height = self.data_window[3] - self.data_window[1] + 1
+        self._line_dtype = np.dtype(
+            [
+                (channel.name, _PIXEL_DTYPES[channel.pixel_type], (self.width,))
+                for channel in self.channels
+            ]
+        )
+
+    @staticmethod
+    def _read_string(exr_file) -> str:
+        characters = bytearray()
+        while True:
+            character = exr_file.read(1)
+            if not character:
+                raise ValueError("The OpenEXR header ends early")
+            if character == b"\x00":
+                return characters.decode()
+            characters += character
+
+    def read_blocks(self) -> Iterator[tuple[int, np.ndarray]]:
+        """
+        Reads the image one block of scanlines at a time.
+
+        Yields:
+            tuple[int, np.ndarray]: The row of the image that the block starts at, from 0, and the
+                pixels of the block with the shape (rows, width, channels) and the dtype float64.
+                The channels are in the order of self.channels.
+        """
+        lines_per_block = _LINES_PER_BLOCK[self.compression]
+        block_count = -(-self.height // lines_per_block)
+        with open(self.path, "rb") as exr_file:
+            exr_file.seek(self._header_end)
+            offsets = struct.unpack(f"<{block_count}Q", exr_file.read(8 * block_count))
+            for offset in offsets:
+                exr_file.seek(offset)
+                y, size = struct.unpack("<ii", exr_file.read(8))
+                row = y - self.data_window[1]
+                lines = min(lines_per_block, self.height - row)
+                raw = exr_file.read(size)
+                if self.compression != _NO_COMPRESSION:
+                    raw = _unzip(raw, lines * self._line_dtype.itemsize)
+                block = np.frombuffer(raw, dtype=self._line_dtype, count=lines)
+                yield row, np.stack(
+                    [block[channel.name] for channel in self.channels], axis=-1
+                ).astype(np.float64)
+
+
+class ExrWriter:
+    """
+    Writes a scanline OpenEXR image with ZIP compression, one block of 16 scanlines at a time.
+    The image is written to a temporary file next to its path, and moved to its path once every
+    block has been written.
+    """
+
+    LINES_PER_BLOCK = _LINES_PER_BLOCK[_ZIP_COMPRESSION]
+
+    def __init__(self, path: str, like: ExrImage) -> None:
+        """
+        Args:
+            path (str): The path of the image.
+            like (ExrImage): An image with the channels, size and attributes of the image.
+        """
+        self.path = path
+        self._channels = like.channels
+        self._height = like.height
+        self._y_min = like.data_window[1]
+        self._line_dtype = np.dtype(
+            [
+                (channel.name, _PIXEL_DTYPES[channel.pixel_type], (like.width,))
+                for channel in like.channels
+            ]
+        )
+        self._offsets: list[int] = []
+        self._temp_path = f"{path}.{os.getpid()}.tmp"
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._file = open(self._temp_path, "wb")
+
+        attributes = {
+            "channels": ("chlist", _encode_channels(like.channels)),
+            "compression": ("compression", bytes([_ZIP_COMPRESSION])),
+            "dataWindow": ("box2i", struct.pack("<iiii", *like.data_window)),
+            "lineOrder": ("lineOrder", bytes([_INCREASING_Y])),
+            **{
+                name: value
+                for name, value in like.attributes.items()
+                if name not in _WRITTEN_ATTRIBUTES
+            },
+        }
+        self._file.write(_EXR_MAGIC + struct.pack("<I", _EXR_VERSION))
+        for name, (attribute_type, value) in attributes.items():
+            self._file.write(f"{name}\x00{attribute_type}\x00".encode())
+            self._file.write(struct.pack("<i", len(value)) + value)
+        self._file.write(b"\x00")
+        self._offset_table_position = self._file.tell()
+        block_count = -(-self._height // self.LINES_PER_BLOCK)
+        # Written once the offsets of the blocks are known
+        self._file.write(b"\x00" * 8 * block_count)
+
+    def write_block(self, pixels: np.ndarray) -> None:
+        """
+        Writes the next block of scanlines of the image.
+
+        Args:
+            pixels (np.ndarray): The pixels of the block with the shape (rows, width, channels),
+                with LINES_PER_BLOCK rows except for the last block of the image.
+        """
+        row = len(self._offsets) * self.LINES_PER_BLOCK
+        expected_rows = min(self.LINES_PER_BLOCK, self._height - row)
+        if pixels.shape[0] != expected_rows:
+            raise ValueError(f"Expected a block of {expected_rows} rows, got {pixels.shape[0]}")
+        block = np.empty(pixels.shape[0], dtype=self._line_dtype)
+        for index, channel in enumerate(self._channels):
+            values = pixels[..., index]
+            if channel.pixel_type == 0:
+                values = np.rint(values)
+            block[channel.name] = values
+        data = _zip(block.tobytes())
+        self._offsets.append(self._file.tell())
+        self._file.write(struct.pack("<ii", self._y_min + row, len(data)) + data)
+
+    def close(self) -> None:
+        """
+        Finishes the image and moves it to its path.
+
+        Raises:
+            ValueError: If not every block of the image has been written.
+        """
+        block_count = -(-self._height // self.LINES_PER_BLOCK)
+        if len(self._offsets) != block_count:
+            self.abort()
+            raise ValueError(
+                f"Wrote {len(self._offsets)} of the {block_count} blocks of {self.path}"
+            )
+        self._file.seek(self._offset_table_position)
+        self._file.write(struct.pack(f"<{block_count}Q", *self._offsets))
+        self._file.close()
+        os.replace(self._temp_path, self.path)
+
+    def abort(self) -> None:
+        """Removes the partially written image."""
+        self._file.close()
+        if os.path.exists(self._temp_path):
+            os.remove(self._temp_path)
+
+    def __enter__(self) -> ExrWriter:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class SampleAccumulator:
+    """
+    Sums images with the same channels and size in a memory-mapped file, to write their average.
+    The sums are kept in double precision, in a temporary file that is removed when the
+    accumulator is closed.
+    """
+
+    def __init__(self, like: ExrImage, directory: Optional[str] = None) -> None:
+        """
+        Args:
+            like (ExrImage): An image with the channels and size of the images to add.
+            directory (Optional[str]): The directory of the file of the sums, the default
+                temporary directory if it is None.
+        """
+        self._like = like
+        self.count = 0
+        handle, self._path = tempfile.mkstemp(prefix="keyshot-samples-", dir=directory)
+        os.close(handle)
+        self._sums: Optional[np.memmap] = np.memmap(
+            self._path,
+            dtype=np.float64,
+            mode="w+",
+            shape=(like.height, like.width, len(like.channels)),
+        )
+
+    def add(self, image: ExrImage) -> None:
+        """
+        Adds an image to the sums, one block of scanlines at a time.
+
+        Raises:
+            ValueError: If the image does not have the channels and size of the accumulator.
+        """
+        assert self._sums is not None
+        if image.channels != self._like.channels or image.data_window != self._like.data_window:
+            raise ValueError(
+                f"{image.path} does not have the channels and data window of {self._like.path}"
+            )
+        for row, block in image.read_blocks():
+            self._sums[row : row + block.shape[0]] += block
+        self.count += 1
+
+    def write_average(self, output_path: str) -> None:
+        """
+        Writes the average of the images that were added, one block of scanlines at a time.
+        """
+        assert self._sums is not None and self.count
+        with ExrWriter(output_path, self._like) as writer:
+            for row in range(0, self._like.height, writer.LINES_PER_BLOCK):
+                writer.write_block(self._sums[row : row + writer.LINES_PER_BLOCK] / self.count)
+
+    def close(self) -> None:
+        """Removes the file of the sums."""
+        # Unmaps the file, there are no other references to the array
+        self._sums = None
+        if os.path.exists(self._path):
+            os.remove(self._path)
+
+    def __enter__(self) -> SampleAccumulator:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.close()
+
+
+def merge_samples(
+    output_path: str, sample_paths: list[str], scratch_dir: Optional[str] = None
+) -> None:
+    """
+    Averages the images that were rendered with different seeds into the output.
+
+    Args:
+        output_path (str): The path of the merged image.
+        sample_paths (list[str]): The paths of the images to average.
+        scratch_dir (Optional[str]): The directory of the memory-mapped sums, next to the output
+            if it is None.
+
+    Raises:
+        ValueError: If an image is missing, is not a supported OpenEXR image or does not have the
+            channels and size of the others.
+    """
+    if not sample_paths:
+        raise ValueError("There are no images to merge")
+    for sample_path in sample_paths:
+        if not os.path.isfile(sample_path):
+            raise ValueError(f"The samples {sample_path} do not exist")
+    first = ExrImage(sample_paths[0])
+    with SampleAccumulator(first, scratch_dir or os.path.dirname(output_path) or None) as sums:
+        sums.add(first)
+        for sample_path in sample_paths[1:]:
+            sums.add(ExrImage(sample_path))
+        sums.write_average(output_path)
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Averages the samples that KeyShot rendered of each frame with different "
+        "seeds into the frame."
+    )
+    parser.add_argument("--output-file-path", required=True, help="The render output path.")
+    parser.add_argument("--frames", required=True, help="The frames to merge e.g. 1-3,8,11-15")
+    parser.add_argument(
+        "--sample-tasks",
+        type=int,
+        required=True,
+        help="The number of tasks that rendered samples of each frame, with the seeds 1 to N.",
+    )
+    parser.add_argument(
+        "--scratch-dir",
+        help="The directory of the memory-mapped sums, next to the output by default.",
+    )
+    add_shot_arguments(parser)
+    parser.add_argument(
+        "--keep-samples", action="store_true", help="Keep the samples once they are merged."
+    )
+    args = parser.parse_args(argv)
+
+    # Imported here since it imports the OpenJD adaptor runtime
+    from .adaptor import _parse_frames
+
+    shot_path = shot_output_path(args.output_file_path, args.camera, args.studio, args.model_set)
+    for frame in _parse_frames(args.frames):
+        output_path = shot_path.replace("%d", str(frame))
+        sample_paths = [
+            sample_output_path(output_path, seed) for seed in range(1, args.sample_tasks + 1)
+        ]
+        start = time.monotonic()
+        merge_samples(output_path, sample_paths, args.scratch_dir)
+        print(
+            f"Merged {len(sample_paths)} samples into {output_path} in "
+            f"{time.monotonic() - start:.2f}s",
+            flush=True,
+        )
+        if not args.keep_samples:
+            for sample_path in sample_paths:
+                os.remove(sample_path)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
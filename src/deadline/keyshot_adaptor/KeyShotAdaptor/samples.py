@@ -0,0 +1,19 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+"""
+Splits the samples of a frame across tasks that render with different seeds, so that their
+outputs can be averaged into the frame by the sample_merger module.
+"""
+from __future__ import annotations
+
+import os
+
+__all__ = ["sample_output_path"]
+
+
+def sample_output_path(output_path: str, seed: int) -> str:
+    """
+    Returns the path that the samples rendered with a seed are written to, next to the output
+    they are merged into, e.g. render.%d.seed-3.exr for the seed 3 of render.%d.exr.
+    """
+    root, extension = os.path.splitext(output_path)
+    return f"{root}.seed-{seed}{extension}"
@@ -0,0 +1,291 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+"""
+A cache of scene files on a local disk of the worker, so that the sessions of a job that run on
+the same worker read the scene from the network once instead of once per session.
+
+A scene file is copied into the cache while its contents are hashed, and the copy is named after
+the hash, so that the same scene is cached once whatever path it was copied from. An index maps
+the path, size and modification time of a scene file to the hash of its contents, so that a
+scene that is already cached is not read again. Sessions that stage the same scene at the same
+time take turns with a lock file per scene, copies are renamed into place once complete, and the
+least recently used copies are removed once the cache is larger than its limit. When a copy was
+last used is recorded by the modification time of a marker file of its own, since KeyShot tells
+whether the open scene changed by the modification time of the copy. A lock file per copy keeps a
+copy from being removed while a session marks it as used, and a copy that was used since the
+cache was scanned for eviction is not removed.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import time
+import uuid
+from typing import NamedTuple, Optional
+
+from .._fileutil import ProcessLock, read_json, write_json_atomic
+
+__all__ = [
+    "SCENE_CACHE_DIR_ENV_VAR",
+    "SCENE_CACHE_MAX_MB_ENV_VAR",
+    "SceneCache",
+    "StagedScene",
+]
+
+_logger = logging.getLogger(__name__)
+
+# Directory on a local disk of the worker to cache scene files in, which enables the cache
+SCENE_CACHE_DIR_ENV_VAR = "KEYSHOT_ADAPTOR_SCENE_CACHE_DIR"
+# The size in MB that the cache is kept under by removing the least recently used scene files
+SCENE_CACHE_MAX_MB_ENV_VAR = "KEYSHOT_ADAPTOR_SCENE_CACHE_MAX_MB"
+_DEFAULT_MAX_MB = 20 * 1024
+
+_COPY_BLOCK_SIZE = 8 * 1024 * 1024
+# The same digest as the render cache uses for scene files, see render_cache.file_digest
+_DIGEST_SIZE = 32
+_TEMP_PREFIX = "."
+
+
+class StagedScene(NamedTuple):
+    """A scene file in the cache."""
+
+    path: str
+    # The 256 bit blake2b hex digest of the contents of the scene file
+    digest: str
+    # Whether the scene file was already in the cache
+    hit: bool
+
+
+class SceneCache:
+    """
+    Copies scene files into a directory on the worker, keyed by the hash of their contents.
+    """
+
+    _LOCK_POLL_INTERVAL_SECONDS = 0.1
+
+    def __init__(self, directory: str, max_bytes: int, lock_timeout_seconds: float = 3600) -> None:
+        """
+        Args:
+            directory (str): The directory of the cache, which is created if it does not exist.
+            max_bytes (int): The size that the cache is kept under.
+            lock_timeout_seconds (float): How long to wait for another session that is copying
+                the same scene file into the cache.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock_timeout_seconds = lock_timeout_seconds
+        self._scenes_dir = os.path.join(directory, "scenes")
+        self._index_dir = os.path.join(directory, "index")
+        self._locks_dir = os.path.join(directory, "locks")
+        self._used_dir = os.path.join(directory, "used")
+
+    @classmethod
+    def from_environment(cls) -> Optional[SceneCache]:
+        """
+        Returns:
+            Optional[SceneCache]: The cache in the directory from the
+                KEYSHOT_ADAPTOR_SCENE_CACHE_DIR environment variable, with the size limit from
+                KEYSHOT_ADAPTOR_SCENE_CACHE_MAX_MB, or None if the cache is not enabled.
+        """
+        directory = os.environ.get(SCENE_CACHE_DIR_ENV_VAR)
+        if not directory:
+            return None
+        max_mb = float(os.environ.get(SCENE_CACHE_MAX_MB_ENV_VAR, _DEFAULT_MAX_MB))
+        return cls(directory, int(max_mb * 1024 * 1024))
+
+    def stage(self, scene_file: str) -> StagedScene:
+        """
+        Returns the copy of a scene file in the cache, and copies the scene file into the cache
+        first if it is not there.
+
+        Args:
+            scene_file (str): The path of the scene file.
+
+        Raises:
+            FileNotFoundError: If the scene file does not exist.
+            TimeoutError: If another session copied the scene file for longer than the lock
+                timeout.
+        """
+        for directory in (self._scenes_dir, self._index_dir, self._locks_dir, self._used_dir):
+            os.makedirs(directory, exist_ok=True)
+        stat = os.stat(scene_file)
+        source = f"{os.path.realpath(scene_file)}\0{stat.st_size}\0{stat.st_mtime_ns}"
+        source_key = hashlib.blake2b(source.encode("utf-8"), digest_size=16).hexdigest()
+        extension = os.path.splitext(scene_file)[1]
+
+        lock = ProcessLock(os.path.join(self._locks_dir, f"{source_key}.lock"))
+        self._acquire(lock)
+        try:
+            index_path = os.path.join(self._index_dir, f"{source_key}.json")
+            index = read_json(index_path)
+            if index is not None:
+                path = self._scene_path(index["digest"], extension)
+                if self._mark_used(path):
+                    return StagedScene(path, index["digest"], hit=True)
+            digest = self._copy(scene_file, extension)
+            write_json_atomic(index_path, {"digest": digest, "source": scene_file})
+        finally:
+            lock.release()
+
+        path = self._scene_path(digest, extension)
+        self._evict(keep=path)
+        return StagedScene(path, digest, hit=False)
+
+    def _scene_path(self, digest: str, extension: str) -> str:
+        return os.path.join(self._scenes_dir, f"{digest}{extension}")
+
+    def _scene_lock(self, path: str) -> ProcessLock:
+        """Returns the lock that a session holds while it marks a copy as used or removes it."""
+        return ProcessLock(os.path.join(self._locks_dir, f"{os.path.basename(path)}.lock"))
+
+    def _mark_used(self, path: str) -> bool:
+        """
+        Marks a copy in the cache as recently used, so that it is not evicted.
+
+        Returns:
+            bool: False if the copy was evicted.
+        """
+        lock = self._scene_lock(path)
+        self._acquire(lock)
+        try:
+            if not os.path.isfile(path):
+                return False
+            self._touch_used_marker(path)
+        finally:
+            lock.release()
+        return True
+
+    def _used_marker(self, path: str) -> str:
+        """Returns the file whose modification time is when a copy in the cache was last used."""
+        return os.path.join(self._used_dir, os.path.basename(path))
+
+    def _touch_used_marker(self, path: str) -> None:
+        marker = self._used_marker(path)
+        with open(marker, "a"):
+            pass
+        os.utime(marker)
+
+    def _last_used(self, path: str) -> int:
+        """
+        Returns:
+            int: When a copy in the cache was last used, in nanoseconds, or when it was copied if
+                it has no marker.
+        """
+        try:
+            return os.stat(self._used_marker(path)).st_mtime_ns
+        except FileNotFoundError:
+            return os.stat(path).st_mtime_ns
+
+    def _acquire(self, lock: ProcessLock) -> None:
+        deadline = time.monotonic() + self.lock_timeout_seconds
+        while not lock.try_acquire():
+            if time.monotonic() >= deadline:
+                raise TimeoutError(
+                    f"Another session did not finish caching the scene file in "
+                    f"{self.lock_timeout_seconds} seconds"
+                )
+            time.sleep(self._LOCK_POLL_INTERVAL_SECONDS)
+
+    def _copy(self, scene_file: str, extension: str) -> str:
+        """
+        Copies a scene file into the cache while hashing it, so that the file is read once.
+
+        Returns:
+            str: The digest of the contents of the scene file.
+        """
+        temp_path = os.path.join(self._scenes_dir, f"{_TEMP_PREFIX}{uuid.uuid4().hex}.tmp")
+        digest = hashlib.blake2b(digest_size=_DIGEST_SIZE)
+        try:
+            with open(scene_file, "rb") as source, open(temp_path, "wb") as copy:
+                for block in iter(lambda: source.read(_COPY_BLOCK_SIZE), b""):
+                    digest.update(block)
+                    copy.write(block)
+            path = self._scene_path(digest.hexdigest(), extension)
+            lock = self._scene_lock(path)
+            self._acquire(lock)
+            try:
+                if os.path.isfile(path):
+                    # The same contents were cached from another path
+                    os.remove(temp_path)
+                else:
+                    os.replace(temp_path, path)
+                self._touch_used_marker(path)
+            finally:
+                lock.release()
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return digest.hexdigest()
+
+    def _evict(self, keep: str) -> None:
+        """
+        Removes the least recently used scene files while the cache is larger than its limit.
+        Only one session evicts at a time. A scene file that another session is marking as used,
+        that was used since the cache was scanned, or that cannot be removed because it is open
+        is skipped.
+
+        Args:
+            keep (str): The scene file that the session uses, which is never removed.
+        """
+        lock = ProcessLock(os.path.join(self._locks_dir, "evict.lock"))
+        if not lock.try_acquire():
+            return
+        try:
+            scenes = self._scan()
+            total = sum(size for _, size, _ in scenes)
+            for last_used, size, path in sorted(scenes):
+                if total <= self.max_bytes:
+                    break
+                if path != keep and self._remove_unused(path, last_used):
+                    total -= size
+        finally:
+            lock.release()
+
+    def _scan(self) -> list[tuple[int, int, str]]:
+        """
+        Returns:
+            list[tuple[int, int, str]]: When each scene file in the cache was last used in
+                nanoseconds, its size and its path.
+        """
+        scenes = []
+        for entry in os.scandir(self._scenes_dir):
+            if entry.name.startswith(_TEMP_PREFIX) or not entry.is_file():
+                continue
+            try:
+                scenes.append((self._last_used(entry.path), entry.stat().st_size, entry.path))
+            except FileNotFoundError:
+                continue
+        return scenes
+
+    def _remove_unused(self, path: str, last_used: int) -> bool:
+        """
+        Removes a scene file from the cache unless it was used since it was scanned.
+
+        Args:
+            path (str): The scene file.
+            last_used (int): When the scene file was last used in nanoseconds, when it was
+                scanned.
+
+        Returns:
+            bool: True if the scene file was removed.
+        """
+        lock = self._scene_lock(path)
+        if not lock.try_acquire():
+            # Another session is marking the scene file as used
+            return False
+        try:
+            if self._last_used(path) != last_used:
+                return False
+            os.remove(path)
+            try:
+                os.remove(self._used_marker(path))
+            except FileNotFoundError:
+                pass
+        except OSError as e:
+            _logger.debug(f"Could not remove {path} from the scene cache: {e}")
+            return False
+        finally:
+            lock.release()
+        _logger.info(f"Removed {path} from the scene cache")
+        return True
@@ -0,0 +1,122 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import IO, Any, Callable, Iterator, Optional
+
+__all__ = ["EVENT_LOG_DIR_ENV_VAR", "SessionEventLog"]
+
+_logger = logging.getLogger(__name__)
+
+# Directory on the worker where each session writes its events as JSON lines
+EVENT_LOG_DIR_ENV_VAR = "KEYSHOT_ADAPTOR_EVENT_LOG_DIR"
+
+
+class SessionEventLog:
+    """
+    Records how long each phase of a session and each action performed by KeyShot took. Times are
+    monotonic and relative to the start of the session. The events are kept in memory for
+    telemetry, and written as JSON lines to a file per session when a directory is configured.
+    The session_report module aggregates those files.
+    """
+
+    def __init__(
+        self, directory: Optional[str] = None, clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        """
+        Args:
+            directory (Optional[str]): The directory to write the event file of the session in,
+                or None to only keep the events in memory.
+            clock (Callable[[], float]): Returns the current monotonic time in seconds.
+        """
+        self._clock = clock
+        self._start = clock()
+        self._lock = threading.Lock()
+        self.events: list[dict[str, Any]] = []
+        self.path: Optional[str] = None
+        self._file: Optional[IO[str]] = None
+        if directory:
+            try:
+                os.makedirs(directory, exist_ok=True)
+                session_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+                self.path = os.path.join(directory, f"keyshot-adaptor-{session_id}.jsonl")
+                self._file = open(self.path, "a", encoding="utf-8")
+            except OSError as e:
+                _logger.warning(f"Could not create the session event file in {directory}: {e}")
+                self.path = None
+
+    @classmethod
+    def from_environment(cls) -> SessionEventLog:
+        """
+        Returns:
+            SessionEventLog: An event log that writes to the directory configured on the worker.
+        """
+        return cls(os.environ.get(EVENT_LOG_DIR_ENV_VAR) or None)
+
+    def now(self) -> float:
+        """Returns the current monotonic time of the clock of the event log."""
+        return self._clock()
+
+    def record(self, kind: str, name: str, start: float, end: float, **details: Any) -> None:
+        """
+        Records an event that started and ended at the given monotonic times.
+
+        Args:
+            kind (str): The kind of event, e.g. "phase" or "action".
+            name (str): The name of the phase or action.
+            start (float): When the event started.
+            end (float): When the event ended.
+            **details (Any): Additional JSON serializable details of the event.
+        """
+        event = {
+            "kind": kind,
+            "name": name,
+            "start": round(start - self._start, 6),
+            "duration": round(end - start, 6),
+            **details,
+        }
+        with self._lock:
+            self.events.append(event)
+            if self._file is not None:
+                self._file.write(json.dumps(event) + "\n")
+                self._file.flush()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """
+        Records the time spent in the body of the with statement as a phase, even if it raises.
+
+        Args:
+            name (str): The name of the phase.
+        """
+        start = self._clock()
+        try:
+            yield
+        finally:
+            self.record("phase", name, start, self._clock())
+
+    def durations(self) -> dict[str, float]:
+        """
+        Returns:
+            dict[str, float]: The total duration of each phase and action recorded so far, keyed
+                by "<kind>.<name>".
+        """
+        totals: dict[str, float] = {}
+        with self._lock:
+            for event in self.events:
+                key = f"{event['kind']}.{event['name']}"
+                totals[key] = round(totals.get(key, 0.0) + event["duration"], 6)
+        return totals
+
+    def close(self) -> None:
+        """Closes the event file."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
@@ -0,0 +1,107 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+"""
+Aggregates the session event files written by the KeyShot Adaptor into duration percentiles for
+each phase and action.
+
+Usage: python -m deadline.keyshot_adaptor.KeyShotAdaptor.session_report <file or directory>...
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import sys
+from typing import Iterable, Iterator, Optional
+
+__all__ = ["read_events", "summarize", "main"]
+
+_PERCENTILES = (50, 90, 99)
+
+
+def _event_files(paths: Iterable[str]) -> Iterator[str]:
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.endswith(".jsonl"):
+                    yield os.path.join(path, name)
+        else:
+            yield path
+
+
+def read_events(paths: Iterable[str]) -> Iterator[dict]:
+    """
+    Reads the events of session event files, skipping lines that are not valid events.
+
+    Args:
+        paths (Iterable[str]): Session event files, or directories of them.
+    """
+    for path in _event_files(paths):
+        with open(path, encoding="utf-8") as event_file:
+            for line in event_file:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(event, dict) and {"kind", "name", "duration"} <= event.keys():
+                    yield event
+
+
+def _percentile(sorted_values: list[float], percentile: float) -> float:
+    """Returns the nearest-rank percentile of a sorted, non-empty list."""
+    rank = max(math.ceil(percentile / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def summarize(events: Iterable[dict]) -> dict[str, dict[str, float]]:
+    """
+    Aggregates events into statistics of the durations of each phase and action.
+
+    Args:
+        events (Iterable[dict]): The events, as read by read_events.
+
+    Returns:
+        dict[str, dict[str, float]]: For each "<kind>.<name>", the count of events and the p50,
+            p90, p99 and max of their durations in seconds.
+    """
+    durations: dict[str, list[float]] = {}
+    for event in events:
+        durations.setdefault(f"{event['kind']}.{event['name']}", []).append(
+            float(event["duration"])
+        )
+
+    summary = {}
+    for key, values in sorted(durations.items()):
+        values.sort()
+        stats = {"count": float(len(values))}
+        for percentile in _PERCENTILES:
+            stats[f"p{percentile}"] = _percentile(values, percentile)
+        stats["max"] = values[-1]
+        summary[key] = stats
+    return summary
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Reports duration percentiles of KeyShot Adaptor session phases and actions."
+    )
+    parser.add_argument("paths", nargs="+", help="Session event files or directories of them.")
+    parser.add_argument("--json", action="store_true", help="Print the summary as JSON.")
+    args = parser.parse_args(argv)
+
+    summary = summarize(read_events(args.paths))
+    if args.json:
+        json.dump(summary, sys.stdout, indent=2)
+        print()
+        return
+
+    width = max([len(key) for key in summary] + [len("phase")])
+    columns = ["count", *(f"p{p}" for p in _PERCENTILES), "max"]
+    print(f"{'phase':<{width}}  " + "  ".join(f"{c:>9}" for c in columns))
+    for key, stats in summary.items():
+        row = [f"{int(stats['count']):>9}"] + [f"{stats[c]:>9.3f}" for c in columns[1:]]
+        print(f"{key:<{width}}  " + "  ".join(row))
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
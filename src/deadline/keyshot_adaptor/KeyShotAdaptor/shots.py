@@ -0,0 +1,98 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+"""
+Renders several cameras, model sets or studios of a scene in one task, so that the scene is
+loaded once for all of them. Each combination of a studio, a model set and a camera is a shot with
+an output path of its own.
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import os
+import re
+from typing import Optional, Union
+
+__all__ = ["SHOT_KEYS", "add_shot_arguments", "expand_shots", "shot_output_path"]
+
+# The views of a shot, in the order KeyShot switches to them and they are named in output paths.
+# A studio can change the model set and camera, so it is switched to first.
+SHOT_KEYS = ("studio", "model_set", "camera")
+
+# Characters that are not safe in a file name on every platform. "." separates the names of the
+# views in an output path, so it is replaced as well.
+_UNSAFE_NAME_CHARACTERS = re.compile(r"[^A-Za-z0-9_-]")
+# The number of bytes of the hash that tells apart names that only differ in unsafe characters
+_NAME_HASH_SIZE = 4
+
+
+def _file_name_part(name: str) -> str:
+    """
+    Returns the name with the characters that are not safe in a file name replaced with
+    underscores, followed by a short hash of the name if any were replaced, so that names that
+    only differ in those characters, e.g. "Front/Left" and "Front Left", get different paths,
+    and the views of a shot cannot be split differently, e.g. studio "A" with camera "B.C" and
+    studio "A.B" with camera "C".
+    """
+    safe_name = _UNSAFE_NAME_CHARACTERS.sub("_", name)
+    if safe_name == name:
+        return name
+    digest = hashlib.blake2b(name.encode("utf-8"), digest_size=_NAME_HASH_SIZE).hexdigest()
+    return f"{safe_name}-{digest}"
+
+
+def _as_list(value: Union[str, list[str], None]) -> list[Optional[str]]:
+    if value is None:
+        return [None]
+    if isinstance(value, str):
+        return [value]
+    return list(value)
+
+
+def expand_shots(
+    camera: Union[str, list[str], None] = None,
+    studio: Union[str, list[str], None] = None,
+    model_set: Union[str, list[str], None] = None,
+) -> list[dict[str, str]]:
+    """
+    Returns the shots that render every camera of every model set in every studio, in the order
+    they are rendered: all cameras of the first model set of the first studio first. A shot only
+    names the views that are given, and no shots are returned when none is given.
+    """
+    if camera is None and studio is None and model_set is None:
+        return []
+    shots = []
+    for studio_name in _as_list(studio):
+        for model_set_name in _as_list(model_set):
+            for camera_name in _as_list(camera):
+                views = (studio_name, model_set_name, camera_name)
+                shots.append({key: name for key, name in zip(SHOT_KEYS, views) if name is not None})
+    return shots
+
+
+def shot_output_path(
+    output_path: str,
+    camera: Optional[str] = None,
+    studio: Optional[str] = None,
+    model_set: Optional[str] = None,
+) -> str:
+    """
+    Returns the path that a shot is rendered to, next to the output path of the job, e.g.
+    render.%d.Packshot.Front.png for the camera Front in the studio Packshot of render.%d.png.
+    Characters of the names that are not safe in a file name are replaced with underscores, and
+    a short hash of the name is added to those names.
+    """
+    root, extension = os.path.splitext(output_path)
+    for name in (studio, model_set, camera):
+        if name is not None:
+            root += "." + _file_name_part(name)
+    return f"{root}{extension}"
+
+
+def add_shot_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    Adds the --camera, --model-set and --studio arguments of the shot that a command line tool
+    assembles the outputs of, which are passed to shot_output_path.
+    """
+    parser.add_argument("--camera", help="The camera that the outputs were rendered with.")
+    parser.add_argument("--model-set", help="The model set that the outputs were rendered with.")
+    parser.add_argument("--studio", help="The studio that the outputs were rendered with.")
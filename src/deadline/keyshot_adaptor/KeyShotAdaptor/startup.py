@@ -0,0 +1,133 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+"""
+Runs the steps that start a session as a small pipeline: each step runs on a thread of its own as
+soon as the steps it depends on have finished, so that steps that do not depend on each other,
+e.g. launching KeyShot and copying the scene file, overlap instead of running one after another.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+from typing import Callable, Iterable, NamedTuple, Optional
+
+from .session_events import SessionEventLog
+
+__all__ = ["StartupPipeline"]
+
+_logger = logging.getLogger(__name__)
+
+
+class _Step(NamedTuple):
+    name: str
+    func: Callable[[], object]
+    after: tuple[str, ...]
+
+
+class StartupPipeline:
+    """
+    Runs steps once the steps they depend on have finished, and records each step as a phase of
+    the session. A step whose dependency failed is skipped, and running the pipeline raises the
+    error of the step that failed first once every step has finished or was skipped.
+    """
+
+    def __init__(self, events: SessionEventLog) -> None:
+        """
+        Args:
+            events (SessionEventLog): The event log that the time of each step is recorded in.
+        """
+        self._events = events
+        self._steps: dict[str, _Step] = {}
+        self._lock = threading.Lock()
+        self._done: dict[str, threading.Event] = {}
+        self._failed: set[str] = set()
+        self._error: Optional[BaseException] = None
+        # The start and end of each step that ran, relative to the start of the pipeline
+        self.timings: dict[str, tuple[float, float]] = {}
+        self._start = 0.0
+
+    def add_step(self, name: str, func: Callable[[], object], after: Iterable[str] = ()) -> None:
+        """
+        Adds a step to the pipeline.
+
+        Args:
+            name (str): The name of the step, which is also the name of its phase.
+            func (Callable[[], object]): Performs the step, its return value is ignored.
+            after (Iterable[str]): The names of the steps that must finish before this one
+                starts, which must have been added before it.
+
+        Raises:
+            ValueError: If a step with the same name was added, or a dependency was not added.
+        """
+        if name in self._steps:
+            raise ValueError(f"The startup step {name} was added twice")
+        after = tuple(after)
+        for dependency in after:
+            if dependency not in self._steps:
+                raise ValueError(f"The startup step {name} depends on unknown step {dependency}")
+        self._steps[name] = _Step(name, func, after)
+
+    def run(self) -> float:
+        """
+        Runs every step and waits for them to finish.
+
+        Raises:
+            BaseException: The error of the step that failed first.
+
+        Returns:
+            float: How long the pipeline took, in seconds.
+        """
+        self._start = self._events.now()
+        self._done = {name: threading.Event() for name in self._steps}
+        threads = [
+            threading.Thread(
+                target=self._run_step, args=(step,), name=f"KeyShotStartup-{step.name}", daemon=True
+            )
+            for step in self._steps.values()
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if self._error is not None:
+            raise self._error
+        return self._events.now() - self._start
+
+    def _run_step(self, step: _Step) -> None:
+        try:
+            for dependency in step.after:
+                self._done[dependency].wait()
+            with self._lock:
+                if any(dependency in self._failed for dependency in step.after):
+                    self._failed.add(step.name)
+                    _logger.debug(
+                        f"Skipped the startup step {step.name}, a step it depends on failed"
+                    )
+                    return
+            start = self._events.now()
+            try:
+                with self._events.phase(step.name):
+                    step.func()
+            except BaseException as e:
+                with self._lock:
+                    self._failed.add(step.name)
+                    if self._error is None:
+                        self._error = e
+            self.timings[step.name] = (start - self._start, self._events.now() - self._start)
+        finally:
+            self._done[step.name].set()
+
+    def summary(self, elapsed: float) -> str:
+        """
+        Returns the time of each step and the time saved by running steps at the same time.
+
+        Args:
+            elapsed (float): How long the pipeline took, as returned by run.
+        """
+        durations = {
+            name: self.timings[name][1] - self.timings[name][0]
+            for name in self._steps
+            if name in self.timings
+        }
+        steps = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in durations.items())
+        saved = max(sum(durations.values()) - elapsed, 0.0)
+        return f"Startup took {elapsed:.2f}s ({steps}), {saved:.2f}s saved by overlapping steps"
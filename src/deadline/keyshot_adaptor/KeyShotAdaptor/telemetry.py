@@ -0,0 +1,172 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+from __future__ import annotations
+
+import atexit
+import logging
+import queue
+import threading
+import time
+from typing import Any, Callable, NamedTuple, Optional
+
+__all__ = ["TelemetryRecorder"]
+
+_logger = logging.getLogger(__name__)
+
+
+class _Event(NamedTuple):
+    event_type: str
+    event_details: dict[str, Any]
+
+
+def _get_deadline_telemetry_client() -> Any:
+    # Imported here because deadline.client.api imports boto3, which takes longer than the rest of
+    # the adaptor to import
+    from deadline.client.api import get_deadline_cloud_library_telemetry_client
+
+    return get_deadline_cloud_library_telemetry_client()
+
+
+class TelemetryRecorder:
+    """
+    Records telemetry events without slowing down the adaptor. The Deadline Cloud telemetry
+    client, which imports boto3 and reads the Deadline Cloud configuration, is created on a
+    background thread when the first event is recorded, and the events are handed to it from that
+    thread. At most queue_size events wait to be handed over, later events are dropped. Closing
+    the recorder waits at most shutdown_timeout_seconds for the events to be sent.
+    """
+
+    def __init__(
+        self,
+        common_details: dict[str, Any],
+        queue_size: int = 64,
+        shutdown_timeout_seconds: float = 2.0,
+        client_factory: Callable[[], Any] = _get_deadline_telemetry_client,
+    ) -> None:
+        """
+        Args:
+            common_details (dict[str, Any]): Details that are included in every event.
+            queue_size (int): The number of events that can wait to be handed to the client.
+            shutdown_timeout_seconds (float): How long closing the recorder waits for the events
+                to be sent.
+            client_factory (Callable[[], Any]): Returns the Deadline Cloud telemetry client.
+        """
+        self._common_details = dict(common_details)
+        self._queue: queue.Queue[Optional[_Event]] = queue.Queue(maxsize=queue_size)
+        self._shutdown_timeout_seconds = shutdown_timeout_seconds
+        self._client_factory = client_factory
+        self._lock = threading.Lock()
+        self._client: Any = None
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+    def update_common_details(self, details: dict[str, Any]) -> None:
+        """
+        Updates the details that are included in the events recorded from now on.
+
+        Args:
+            details (dict[str, Any]): The details to add or replace.
+        """
+        with self._lock:
+            self._common_details.update(details)
+
+    def start(self) -> None:
+        """
+        Starts creating the telemetry client in the background before the first event is
+        recorded, so that the event is sent without waiting for the client. Never blocks.
+        """
+        with self._lock:
+            if not self._closed:
+                self._start_thread()
+
+    def _start_thread(self) -> None:
+        # Must be called with the lock held
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="KeyShotTelemetryThread", daemon=True
+            )
+            self._thread.start()
+
+    def record_event(self, event_type: str, event_details: dict[str, Any]) -> None:
+        """
+        Queues an event to be sent in the background. Never blocks.
+
+        Args:
+            event_type (str): The type of the event.
+            event_details (dict[str, Any]): The details of the event.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._start_thread()
+            event = _Event(event_type, {**self._common_details, **event_details})
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            _logger.debug(f"Dropped the telemetry event {event_type}, too many events are queued")
+
+    def close(self) -> None:
+        """
+        Sends the events that are still queued, giving up once the shutdown timeout has passed.
+        No events are recorded after the recorder is closed.
+        """
+        with self._lock:
+            self._closed = True
+            thread = self._thread
+        if thread is None:
+            return
+
+        deadline = time.monotonic() + self._shutdown_timeout_seconds
+        try:
+            self._queue.put(None, timeout=self._shutdown_timeout_seconds)
+        except queue.Full:
+            pass
+        thread.join(timeout=max(deadline - time.monotonic(), 0))
+        if thread.is_alive():
+            _logger.debug("Gave up on creating the telemetry client before the shutdown timeout")
+            return
+
+        try:
+            self._stop_client(deadline)
+        except Exception as e:
+            # Telemetry never fails the adaptor
+            _logger.debug(f"Could not stop the telemetry client: {e}")
+
+    def _stop_client(self, deadline: float) -> None:
+        """
+        The client sends the events on a thread of its own, that Python waits for without a
+        timeout when it exits. The client has no public way to stop that thread, so its internals
+        are only used if they are there, and the recorder otherwise leaves the client alone.
+        """
+        sender = getattr(self._client, "processing_thread", None)
+        event_queue = getattr(self._client, "event_queue", None)
+        exit_cleanly = getattr(self._client, "_exit_cleanly", None)
+        if sender is None or event_queue is None:
+            return
+        if exit_cleanly is not None:
+            atexit.unregister(exit_cleanly)
+        try:
+            event_queue.put_nowait(None)
+        except queue.Full:
+            pass
+        sender.join(timeout=max(deadline - time.monotonic(), 0))
+        if sender.is_alive():
+            _logger.debug("Gave up on sending telemetry events before the shutdown timeout")
+
+    def _run(self) -> None:
+        try:
+            self._client = self._client_factory()
+        except Exception as e:
+            # Telemetry never fails the adaptor
+            _logger.debug(f"Could not create the telemetry client: {e}")
+            return
+
+        while True:
+            event = self._queue.get()
+            if event is None:
+                return
+            try:
+                self._client.record_event(
+                    event_type=event.event_type, event_details=event.event_details
+                )
+            except Exception as e:
+                _logger.debug(f"Could not record the telemetry event {event.event_type}: {e}")
@@ -0,0 +1,411 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+"""
+Stitches the tiles of each frame that separate tasks rendered into the full image. The tiles are
+read one row of tiles at a time and written to the output as they are read, so that only one row
+of tiles is in memory however large the image is.
+
+Usage: python -m deadline.keyshot_adaptor.KeyShotAdaptor.tile_stitcher
+    --output-file-path <path> --frames <frames> --rows <rows> --columns <columns>
+    --width <width> --height <height>
+    [--camera <camera>] [--model-set <model set>] [--studio <studio>] [--keep-tiles]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import struct
+import time
+import zlib
+from types import TracebackType
+from typing import Optional, Type
+
+try:
+    import numpy as np
+except ImportError as e:
+    raise ImportError(
+        "Stitching tiles requires numpy, install it with: "
+        "pip install 'deadline-cloud-for-keyshot[assemble]'"
+    ) from e
+
+from .shots import add_shot_arguments, shot_output_path
+from .tiles import tile_output_path, tile_region
+
+__all__ = ["read_png", "PngWriter", "stitch_tiles", "main"]
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# The PNG color type of images with each number of channels: grey, grey and alpha, RGB and RGBA
+_COLOR_TYPES = {1: 0, 2: 4, 3: 2, 4: 6}
+_CHANNELS = {color_type: channels for channels, color_type in _COLOR_TYPES.items()}
+_FILTER_NONE, _FILTER_SUB, _FILTER_UP, _FILTER_AVERAGE, _FILTER_PAETH = range(5)
+
+
+def _read_chunks(png_file) -> tuple[bytes, bytes]:
+    """Reads the IHDR chunk and the concatenated IDAT chunks of a PNG file."""
+    header = b""
+    data = []
+    while True:
+        length_and_type = png_file.read(8)
+        if len(length_and_type) < 8:
+            raise ValueError("The PNG file ends before its IEND chunk")
+        length, chunk_type = struct.unpack(">I4s", length_and_type)
+        chunk = png_file.read(length)
+        (crc,) = struct.unpack(">I", png_file.read(4))
+        if len(chunk) < length or zlib.crc32(chunk_type + chunk) != crc:
+            raise ValueError(f"The {chunk_type.decode(errors='replace')} chunk is corrupt")
+        if chunk_type == b"IHDR":
+            header = chunk
+        elif chunk_type == b"IDAT":
+            data.append(chunk)
+        elif chunk_type == b"IEND":
+            return header, b"".join(data)
+
+
+def _unfilter(filtered: np.ndarray, bytes_per_pixel: int) -> np.ndarray:
+    """
+    Reverses the filter of each scanline of a PNG image. The None, Sub and Up filters are
+    reversed one scanline at a time with vectorized operations. The Average and Paeth filters
+    depend on the previous pixel of the same scanline, so the scanlines from the first one that
+    uses them on are reversed by _unfilter_diagonals instead.
+
+    Args:
+        filtered (np.ndarray): The scanlines, each starting with its filter type byte.
+        bytes_per_pixel (int): The number of bytes of each pixel.
+
+    Returns:
+        np.ndarray: The bytes of the scanlines.
+    """
+    height, stride = filtered.shape[0], filtered.shape[1] - 1
+    filter_types = filtered[:, 0]
+    unknown = np.flatnonzero(filter_types > _FILTER_PAETH)
+    if unknown.size:
+        y = unknown[0]
+        raise ValueError(f"Scanline {y} has the unknown filter type {filter_types[y]}")
+    sequential = np.flatnonzero(filter_types >= _FILTER_AVERAGE)
+    first_sequential = int(sequential[0]) if sequential.size else height
+
+    rows = np.empty((height, stride), dtype=np.uint8)
+    previous = np.zeros(stride, dtype=np.uint8)
+    for y in range(first_sequential):
+        filter_type = filter_types[y]
+        line = filtered[y, 1:]
+        if filter_type == _FILTER_NONE:
+            rows[y] = line
+        elif filter_type == _FILTER_SUB:
+            # Each byte adds the byte of the same channel in the pixel to the left, a running sum
+            rows[y] = np.cumsum(line.reshape(-1, bytes_per_pixel), axis=0, dtype=np.uint8).ravel()
+        else:
+            rows[y] = line + previous
+        previous = rows[y]
+    if first_sequential < height:
+        rows[first_sequential:] = _unfilter_diagonals(
+            filtered[first_sequential:], previous, bytes_per_pixel
+        )
+    return rows
+
+
+def _unfilter_diagonals(
+    filtered: np.ndarray, previous: np.ndarray, bytes_per_pixel: int
+) -> np.ndarray:
+    """
+    Reverses every filter type of the scanlines one diagonal of pixels at a time. A pixel only
+    depends on the pixels to its left, above it and above and to the left of it, so the pixels
+    on a diagonal from the bottom left to the top right do not depend on each other. An image of
+    height by width pixels takes height + width - 1 vectorized steps instead of a step for every
+    byte.
+
+    Args:
+        filtered (np.ndarray): The scanlines, each starting with its filter type byte.
+        previous (np.ndarray): The bytes of the scanline above the first one, zeros if none.
+        bytes_per_pixel (int): The number of bytes of each pixel.
+
+    Returns:
+        np.ndarray: The bytes of the scanlines.
+    """
+    height, width = filtered.shape[0], (filtered.shape[1] - 1) // bytes_per_pixel
+    # The pixels with a row above and a column to the left of them, so that the neighbors of
+    # every pixel are in the array. The pixels are reversed in place, in a flat array where the
+    # pixels of a diagonal are every width-th pixel.
+    padded = np.zeros((height + 1, width + 1, bytes_per_pixel), dtype=np.uint8)
+    padded[0, 1:] = previous.reshape(width, bytes_per_pixel)
+    padded[1:, 1:] = filtered[:, 1:].reshape(height, width, bytes_per_pixel)
+    pixels = padded.reshape(-1, bytes_per_pixel)
+    filter_types = filtered[:, :1].astype(np.int16)
+    # The index of the first pixel of the image in the flat array
+    origin = width + 2
+    for diagonal in range(height + width - 1):
+        first_row = max(diagonal - width + 1, 0)
+        last_row = min(diagonal, height - 1)
+        # The pixel in row y of the diagonal is at origin + diagonal + y * width
+        start = origin + diagonal + first_row * width
+        end = origin + diagonal + last_row * width + 1
+        left = pixels[start - 1 : end - 1 : width].astype(np.int16)
+        up = pixels[start - width - 1 : end - width - 1 : width].astype(np.int16)
+        up_left = pixels[start - width - 2 : end - width - 2 : width].astype(np.int16)
+        filter_type = filter_types[first_row : last_row + 1]
+
+        distance_left = np.abs(up - up_left)
+        distance_up = np.abs(left - up_left)
+        distance_up_left = np.abs(left + up - 2 * up_left)
+        paeth = np.where(
+            (distance_left <= distance_up) & (distance_left <= distance_up_left),
+            left,
+            np.where(distance_up <= distance_up_left, up, up_left),
+        )
+        predictor = np.where(filter_type == _FILTER_SUB, left, 0)
+        predictor = np.where(filter_type == _FILTER_UP, up, predictor)
+        predictor = np.where(filter_type == _FILTER_AVERAGE, (left + up) >> 1, predictor)
+        predictor = np.where(filter_type == _FILTER_PAETH, paeth, predictor)
+        pixels[start:end:width] += predictor.astype(np.uint8)
+    return padded[1:, 1:].reshape(height, width * bytes_per_pixel)
+
+
+def read_png(path: str) -> np.ndarray:
+    """
+    Reads a PNG image that is not interlaced, with 8 or 16 bits per channel and without a palette.
+
+    Args:
+        path (str): The path of the image.
+
+    Returns:
+        np.ndarray: The pixels of the image, with the shape (height, width, channels) and the
+            dtype uint8 or uint16.
+
+    Raises:
+        ValueError: If the file is not a PNG image or the image is not supported.
+    """
+    with open(path, "rb") as png_file:
+        if png_file.read(len(_PNG_SIGNATURE)) != _PNG_SIGNATURE:
+            raise ValueError(f"{path} is not a PNG image")
+        try:
+            header, data = _read_chunks(png_file)
+        except (ValueError, struct.error) as e:
+            raise ValueError(f"{path} is not a valid PNG image: {e}") from e
+
+    width, height, bit_depth, color_type, _, _, interlace = struct.unpack(">IIBBBBB", header)
+    if bit_depth not in (8, 16) or color_type not in _CHANNELS or interlace:
+        raise ValueError(
+            f"{path} is not supported, only PNG images without a palette or interlacing and with 8 "
+            "or 16 bits per channel can be stitched"
+        )
+    channels = _CHANNELS[color_type]
+    bytes_per_pixel = channels * bit_depth // 8
+    filtered = np.frombuffer(zlib.decompress(data), dtype=np.uint8)
+    if filtered.size != height * (width * bytes_per_pixel + 1):
+        raise ValueError(f"{path} does not have the number of pixels of its size")
+    rows = _unfilter(filtered.reshape(height, width * bytes_per_pixel + 1), bytes_per_pixel)
+    if bit_depth == 16:
+        return rows.view(">u2").astype(np.uint16).reshape(height, width, channels)
+    return rows.reshape(height, width, channels)
+
+
+def _write_chunk(png_file, chunk_type: bytes, data: bytes) -> None:
+    png_file.write(struct.pack(">I", len(data)) + chunk_type + data)
+    png_file.write(struct.pack(">I", zlib.crc32(chunk_type + data)))
+
+
+class PngWriter:
+    """
+    Writes a PNG image a few rows at a time. The image is written to a temporary file next to its
+    path, and moved to its path once every row has been written.
+    """
+
+    def __init__(
+        self, path: str, width: int, height: int, channels: int, dtype: np.dtype, level: int = 6
+    ) -> None:
+        """
+        Args:
+            path (str): The path of the image.
+            width (int): The width of the image in pixels.
+            height (int): The height of the image in pixels.
+            channels (int): The number of channels: 1 for grey, 2 for grey and alpha, 3 for RGB
+                and 4 for RGBA.
+            dtype (np.dtype): uint8 or uint16.
+            level (int): The zlib compression level.
+        """
+        self.path = path
+        self._width = width
+        self._height = height
+        self._channels = channels
+        self._dtype = np.dtype(dtype)
+        self._rows_written = 0
+        self._compressor = zlib.compressobj(level)
+        self._temp_path = f"{path}.{os.getpid()}.tmp"
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._file = open(self._temp_path, "wb")
+        self._file.write(_PNG_SIGNATURE)
+        bit_depth = self._dtype.itemsize * 8
+        _write_chunk(
+            self._file,
+            b"IHDR",
+            struct.pack(">IIBBBBB", width, height, bit_depth, _COLOR_TYPES[channels], 0, 0, 0),
+        )
+
+    def write_rows(self, rows: np.ndarray) -> None:
+        """
+        Writes the next rows of the image.
+
+        Args:
+            rows (np.ndarray): Pixels with the shape (rows, width, channels).
+        """
+        if rows.shape[1:] != (self._width, self._channels) or rows.dtype != self._dtype:
+            raise ValueError(
+                f"Expected rows of {self._width} pixels of {self._channels} {self._dtype} "
+                f"channels, got the shape {rows.shape} and dtype {rows.dtype}"
+            )
+        if self._rows_written + rows.shape[0] > self._height:
+            raise ValueError(f"The image only has {self._height} rows")
+        # PNG stores 16 bit channels most significant byte first
+        scanlines = (
+            np.ascontiguousarray(rows, dtype=self._dtype.newbyteorder(">"))
+            .view(np.uint8)
+            .reshape(rows.shape[0], -1)
+        )
+        # Every scanline starts with its filter type, None
+        filtered = np.empty((scanlines.shape[0], scanlines.shape[1] + 1), dtype=np.uint8)
+        filtered[:, 0] = _FILTER_NONE
+        filtered[:, 1:] = scanlines
+        data = self._compressor.compress(filtered.tobytes())
+        if data:
+            _write_chunk(self._file, b"IDAT", data)
+        self._rows_written += rows.shape[0]
+
+    def close(self) -> None:
+        """
+        Finishes the image and moves it to its path.
+
+        Raises:
+            ValueError: If not every row of the image has been written.
+        """
+        if self._rows_written != self._height:
+            self.abort()
+            raise ValueError(
+                f"Wrote {self._rows_written} of the {self._height} rows of {self.path}"
+            )
+        _write_chunk(self._file, b"IDAT", self._compressor.flush())
+        _write_chunk(self._file, b"IEND", b"")
+        self._file.close()
+        os.replace(self._temp_path, self.path)
+
+    def abort(self) -> None:
+        """Removes the partially written image."""
+        self._file.close()
+        if os.path.exists(self._temp_path):
+            os.remove(self._temp_path)
+
+    def __enter__(self) -> PngWriter:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def stitch_tiles(output_path: str, rows: int, columns: int, width: int, height: int) -> list[str]:
+    """
+    Stitches the tiles of an image into the image, one row of tiles at a time. A tile is either
+    the size of its region of the image, or the size of the whole image with its region rendered.
+
+    Args:
+        output_path (str): The path of the image. The tiles are next to it, as named by
+            tiles.tile_output_path.
+        rows (int): The number of rows of tiles.
+        columns (int): The number of columns of tiles.
+        width (int): The width of the image in pixels.
+        height (int): The height of the image in pixels.
+
+    Returns:
+        list[str]: The paths of the tiles.
+
+    Raises:
+        ValueError: If the image is not a PNG image, or a tile is missing, is not a supported PNG
+            image, or does not match the size and channels of its region.
+    """
+    if os.path.splitext(output_path)[1].lower() != ".png":
+        raise ValueError(f"Only PNG images can be stitched from tiles, not {output_path}")
+
+    tile_paths: list[str] = []
+    writer: Optional[PngWriter] = None
+    try:
+        for row in range(1, rows + 1):
+            band: list[np.ndarray] = []
+            for column in range(1, columns + 1):
+                region = tile_region(width, height, rows, columns, row, column)
+                tile_path = tile_output_path(output_path, row, column)
+                if not os.path.isfile(tile_path):
+                    raise ValueError(f"The tile {tile_path} does not exist")
+                pixels = read_png(tile_path)
+                if pixels.shape[:2] == (height, width):
+                    pixels = pixels[
+                        region.y : region.y + region.height, region.x : region.x + region.width
+                    ]
+                if pixels.shape[:2] != (region.height, region.width):
+                    raise ValueError(
+                        f"The tile {tile_path} is {pixels.shape[1]}x{pixels.shape[0]} pixels, "
+                        f"expected {region.width}x{region.height} pixels"
+                    )
+                if band and pixels.shape[2:] + (pixels.dtype,) != band[0].shape[2:] + (
+                    band[0].dtype,
+                ):
+                    raise ValueError(
+                        f"The tile {tile_path} has different channels than {tile_paths[0]}"
+                    )
+                band.append(pixels)
+                tile_paths.append(tile_path)
+
+            if writer is None:
+                writer = PngWriter(output_path, width, height, band[0].shape[2], band[0].dtype)
+            writer.write_rows(np.concatenate(band, axis=1))
+    except BaseException:
+        if writer is not None:
+            writer.abort()
+        raise
+    assert writer is not None
+    writer.close()
+    return tile_paths
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Stitches the tiles that KeyShot rendered of each frame into the full image."
+    )
+    parser.add_argument("--output-file-path", required=True, help="The render output path.")
+    parser.add_argument("--frames", required=True, help="The frames to stitch e.g. 1-3,8,11-15")
+    parser.add_argument("--rows", type=int, required=True, help="The number of rows of tiles.")
+    parser.add_argument(
+        "--columns", type=int, required=True, help="The number of columns of tiles."
+    )
+    parser.add_argument("--width", type=int, required=True, help="The image width in pixels.")
+    parser.add_argument("--height", type=int, required=True, help="The image height in pixels.")
+    add_shot_arguments(parser)
+    parser.add_argument(
+        "--keep-tiles", action="store_true", help="Keep the tiles once they are stitched."
+    )
+    args = parser.parse_args(argv)
+
+    # Imported here since it imports the OpenJD adaptor runtime
+    from .adaptor import _parse_frames
+
+    shot_path = shot_output_path(args.output_file_path, args.camera, args.studio, args.model_set)
+    for frame in _parse_frames(args.frames):
+        output_path = shot_path.replace("%d", str(frame))
+        start = time.monotonic()
+        tile_paths = stitch_tiles(output_path, args.rows, args.columns, args.width, args.height)
+        print(
+            f"Stitched {len(tile_paths)} tiles into {output_path} in "
+            f"{time.monotonic() - start:.2f}s",
+            flush=True,
+        )
+        if not args.keep_tiles:
+            for tile_path in tile_paths:
+                os.remove(tile_path)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
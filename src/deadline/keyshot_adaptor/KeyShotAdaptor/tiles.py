@@ -0,0 +1,57 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+"""
+Splits a still image into a grid of tiles, so that the tiles of a frame can be rendered by separate
+tasks and stitched back together by the tile_stitcher module.
+"""
+from __future__ import annotations
+
+import os
+from typing import NamedTuple
+
+__all__ = ["Region", "tile_region", "tile_output_path"]
+
+
+class Region(NamedTuple):
+    """A rectangle of pixels of an image, from its top left corner."""
+
+    x: int
+    y: int
+    width: int
+    height: int
+
+
+def tile_region(width: int, height: int, rows: int, columns: int, row: int, column: int) -> Region:
+    """
+    Returns the pixels of an image that a tile covers. The tiles of a row all have the same
+    height and the tiles of a column all have the same width, which differ by at most one pixel
+    between rows or columns.
+
+    Args:
+        width (int): The width of the image in pixels.
+        height (int): The height of the image in pixels.
+        rows (int): The number of rows of tiles.
+        columns (int): The number of columns of tiles.
+        row (int): The row of the tile, from 1 at the top.
+        column (int): The column of the tile, from 1 on the left.
+
+    Raises:
+        ValueError: If the tile is not in the grid, or the image is too small for the grid.
+    """
+    if not (1 <= row <= rows and 1 <= column <= columns):
+        raise ValueError(f"Tile ({row}, {column}) is not in a grid of {rows}x{columns} tiles")
+    if rows > height or columns > width:
+        raise ValueError(
+            f"An image of {width}x{height} pixels cannot be split into {rows}x{columns} tiles"
+        )
+    x = (column - 1) * width // columns
+    y = (row - 1) * height // rows
+    return Region(x, y, column * width // columns - x, row * height // rows - y)
+
+
+def tile_output_path(output_path: str, row: int, column: int) -> str:
+    """
+    Returns the path that a tile is rendered to, next to the output it is stitched into, e.g.
+    render.%d.tile-1-2.png for the tile in row 1 and column 2 of render.%d.png.
+    """
+    root, extension = os.path.splitext(output_path)
+    return f"{root}.tile-{row}-{column}{extension}"
@@ -3,6 +3,7 @@ from __future__ import annotations
 
 import os
 import sys
+import time
 
 import lux
 
@@ -25,11 +26,27 @@ if "openjd" not in sys.modules.keys():
 if sys.platform == "win32":
     import pywin32_bootstrap  # type: ignore # noqa: I001 F401 E402
 
+from http import HTTPStatus  # noqa: E402
 from types import FrameType  # noqa: E402
-from typing import Optional  # noqa: E402
+from typing import Optional, Tuple  # noqa: E402
 
+from deadline.keyshot_adaptor._fileutil import (  # noqa: E402
+    ProcessLock,
+    read_json,
+    write_json_atomic,
+)
 from deadline.keyshot_adaptor.KeyShotClient.keyshot_handler import KeyShotHandler  # noqa: E402
-from openjd.adaptor_runtime_client import ClientInterface  # noqa: E402
+from deadline.keyshot_adaptor.pool_protocol import (  # noqa: E402
+    ALIVE_LOCK_FILE,
+    LEASE_FILE,
+    LEASE_LOCK_FILE,
+    POOL_IDLE_TIMEOUT_ENV_VAR,
+    POOL_SLOT_ENV_VAR,
+    STATE_FILE,
+    STATUS_IDLE,
+    STATUS_LEASED,
+)
+from openjd.adaptor_runtime_client import Action, ClientInterface  # noqa: E402
 
 try:
     import lux  # type: ignore
@@ -42,20 +59,117 @@ class KeyShotClient(ClientInterface):
     Client that runs in KeyShot for the KeyShot Adaptor
     """
 
-    def __init__(self, server_path: str) -> None:
+    def __init__(self, server_path: str, lease_lock_path: Optional[str] = None) -> None:
+        """
+        Args:
+            server_path (str): The path of the adaptor server to connect to.
+            lease_lock_path (Optional[str]): The lease lock of the pool slot when KeyShot runs in
+                the worker's KeyShot process pool. A pooled client returns from poll() when the
+                adaptor closes it, or when the adaptor holding the lease is gone, instead of
+                exiting KeyShot.
+        """
         super().__init__(server_path=server_path)
         major_version, minor_version = lux.getKeyShotDisplayVersion()
         print(f"KeyShotClient: KeyShot Version {major_version}.{minor_version}")
         self.actions.update(KeyShotHandler().action_dict)
+        self._lease_lock = ProcessLock(lease_lock_path) if lease_lock_path else None
+        self.retire = False
+
+    def _request_next_action(self) -> Tuple[int, str, Optional[Action]]:
+        # The adaptor holds the lease lock for as long as it uses this process. If it is gone,
+        # its server is gone too, so go back to the pool instead of polling a dead server.
+        if self._lease_lock is not None and not self._lease_lock.is_held_elsewhere():
+            print("KeyShotClient: The adaptor released the lease, returning to the pool")
+            return HTTPStatus.OK, HTTPStatus.OK.phrase, Action("close", {"retire": False})
+        return super()._request_next_action()
+
+    def _perform_action(self, a: Action) -> None:
+        # Report how long each action took so that the adaptor can record it
+        start = time.monotonic()
+        try:
+            super()._perform_action(a)
+        finally:
+            print(
+                f"KeyShotClient: Action {a.name} took {time.monotonic() - start:.3f}s", flush=True
+            )
 
     def close(self, args: Optional[dict] = None) -> None:
-        sys.exit(0)
+        if self._lease_lock is None:
+            sys.exit(0)
+        self.retire = bool((args or {}).get("retire", False))
 
     def graceful_shutdown(self, signum: int, frame: FrameType | None):
         sys.exit(0)
 
 
+def _wait_for_lease(lease_path: str, idle_timeout_seconds: float) -> Optional[dict]:
+    """
+    Waits for an adaptor to lease this process.
+
+    Returns:
+        Optional[dict]: The lease, or None if no adaptor leased the process before the timeout.
+    """
+    deadline = time.monotonic() + idle_timeout_seconds
+    while time.monotonic() < deadline:
+        lease = read_json(lease_path)
+        if lease is not None:
+            return lease
+        time.sleep(0.05)
+    return None
+
+
+def serve_pool(slot_dir: str) -> None:
+    """
+    Serves adaptors one lease at a time while this KeyShot process is in the worker's KeyShot
+    process pool. Returns when the process was idle for longer than the idle timeout or when the
+    adaptor retires it.
+
+    Args:
+        slot_dir (str): The pool slot directory of this process.
+    """
+    alive_lock = ProcessLock(os.path.join(slot_dir, ALIVE_LOCK_FILE))
+    if not alive_lock.try_acquire():
+        raise OSError(f"Another KeyShot process is already running in the pool slot {slot_dir}")
+    idle_timeout_seconds = float(os.environ.get(POOL_IDLE_TIMEOUT_ENV_VAR, "900"))
+    state_path = os.path.join(slot_dir, STATE_FILE)
+    lease_path = os.path.join(slot_dir, LEASE_FILE)
+    state = read_json(state_path) or {}
+    state.update(pid=os.getpid(), uses=0)
+
+    try:
+        while True:
+            state.update(status=STATUS_IDLE, lease_id=None)
+            write_json_atomic(state_path, state)
+            lease = _wait_for_lease(lease_path, idle_timeout_seconds)
+            if lease is None:
+                print("KeyShotClient: Idle timeout reached, leaving the pool")
+                return
+            state.update(status=STATUS_LEASED, lease_id=lease.get("lease_id"))
+            write_json_atomic(state_path, state)
+
+            client = KeyShotClient(
+                lease["server_path"], lease_lock_path=os.path.join(slot_dir, LEASE_LOCK_FILE)
+            )
+            try:
+                client.poll()
+            except Exception as e:
+                print(f"KeyShotClient: Lease ended with an error: {e}", file=sys.stderr)
+            state["uses"] += 1
+            os.remove(lease_path)
+            if client.retire:
+                print("KeyShotClient: Retired by the adaptor, leaving the pool")
+                return
+    finally:
+        state.update(status="exited", lease_id=None)
+        write_json_atomic(state_path, state)
+
+
 def main():
+    slot_dir = os.environ.get(POOL_SLOT_ENV_VAR)
+    if slot_dir:
+        serve_pool(slot_dir)
+        sys.exit(0)
+
     server_path = os.environ.get("KEYSHOT_ADAPTOR_SERVER_PATH")
     if not server_path:
         raise OSError(
@@ -1,19 +1,65 @@
 # Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
 from __future__ import annotations
 
+import hashlib
 import os as os
 from pprint import pprint
-from typing import Any, Callable, Dict
+from typing import Any, Callable, Dict, Optional, Tuple
 
 try:
     import lux  # type: ignore
 except ImportError:  # pragma: no cover
     raise OSError("Could not find the KeyShot module. Are you running this inside of KeyShot?")
 
+_HASH_BLOCK_SIZE = 8 * 1024 * 1024
+
+
+def _scene_fingerprint(scene_file: str, content_hash: bool) -> Tuple[Any, ...]:
+    """
+    Returns a fingerprint that changes whenever the scene file changes.
+
+    Args:
+        scene_file (str): The path of the scene file.
+        content_hash (bool): Whether to include a hash of the contents of the file, for file
+            systems where the size and modification time are not enough to detect a change.
+
+    Returns:
+        Tuple[Any, ...]: The path, size, modification time and optionally content hash of the file.
+    """
+    stat = os.stat(scene_file)
+    fingerprint: Tuple[Any, ...] = (os.path.realpath(scene_file), stat.st_size, stat.st_mtime_ns)
+    if content_hash:
+        digest = hashlib.blake2b()
+        with open(scene_file, "rb") as f:
+            for block in iter(lambda: f.read(_HASH_BLOCK_SIZE), b""):
+                digest.update(block)
+        fingerprint += (digest.hexdigest(),)
+    return fingerprint
+
+
+def _check_can_set_seed(opts: Any) -> None:
+    """
+    Raises:
+        RuntimeError: If the render options of this KeyShot version cannot set the seed of a
+            render, so that the samples of a frame cannot be split across tasks.
+    """
+    if not hasattr(opts, "setSeed"):
+        raise RuntimeError(
+            "This version of KeyShot cannot set the seed of a render, so the samples of a frame "
+            "cannot be split across tasks. "
+            "Render each frame in a single task, or use a version of KeyShot whose render "
+            "options have setSeed."
+        )
+
 
 class KeyShotHandler:
     action_dict: Dict[str, Callable[[Dict[str, Any]], None]] = {}
     render_kwargs: Dict[str, Any]
+    # The scene that is open in this KeyShot process, shared by every handler that the process
+    # creates so that a KeyShot process that is reused by another session knows what it has open.
+    loaded_scene_fingerprint: Optional[Tuple[Any, ...]] = None
+    scene_loads_performed = 0
+    scene_loads_skipped = 0
 
     def __init__(self) -> None:
         """
@@ -24,7 +70,12 @@ class KeyShotHandler:
             "output_file_path": self.set_output_file_path,
             "output_format": self.set_output_format,
             "frame": self.set_frame,
+            "frames": self.set_frames,
+            "camera": self.set_camera,
+            "model_set": self.set_model_set,
+            "studio": self.set_studio,
             "start_render": self.start_render,
+            "render": self.render,
         }
         self.render_kwargs = {}
         self.output_path = ""
@@ -43,24 +94,89 @@ class KeyShotHandler:
 
     def start_render(self, data: dict) -> None:
         """
-        Call the "Render Image" command
+        Call the "Render Image" command for every frame that was set, one after the other,
+        without returning to the adaptor between frames.
 
         Args:
             data (dict):
 
         Raises:
-            RuntimeError: .
+            RuntimeError: If the samples are set and KeyShot cannot set the seed of a render.
         """
-        print("Starting Render...")
-        frame = self.render_kwargs["frame"]
+        frames = self.render_kwargs["frames"]
         opts = lux.getRenderOptions()
         opts.setAddToQueue(False)
-        lux.setAnimationFrame(frame)
-        output_path = self.output_path.replace("%d", str(frame))
+        region = self.render_kwargs.get("region")
+        if region is not None:
+            # The region of the image to render, as (x, y, width, height) in pixels
+            opts.setRegion(tuple(region))
+        if self.render_kwargs.get("samples") is not None:
+            _check_can_set_seed(opts)
+            opts.setMaxSamplesRendering(self.render_kwargs["samples"])
+            # Each task renders different samples of the frame, which are averaged together
+            opts.setSeed(self.render_kwargs["seed"])
+        size = {
+            name: self.render_kwargs[name]
+            for name in ("width", "height")
+            if self.render_kwargs.get(name) is not None
+        }
         pprint(f"KeyShot Render Options: {opts}", indent=4)
         print(f"KeyShot Render Output Format: {self.output_format_code}")
-        lux.renderImage(path=output_path, opts=opts, format=self.output_format_code)
-        print(f"Finished Rendering {output_path}")
+        for frame in frames:
+            print(f"Starting Render of frame {frame}...")
+            lux.setAnimationFrame(frame)
+            output_path = self.output_path.replace("%d", str(frame))
+            lux.renderImage(path=output_path, opts=opts, format=self.output_format_code, **size)
+            print(f"Finished Rendering {output_path}")
+
+    def render(self, data: dict) -> None:
+        """
+        Renders a chunk of frames with a single action, instead of one action to set the frames
+        and another to start the render.
+
+        Args:
+            data (dict): The data given from the Adaptor. Keys expected: ['frames'] or ['shots'],
+                optional: ['output_file_path', 'output_format'] to override the output of this
+                render, ['studio', 'model_set', 'camera'] to switch to those views first,
+                ['width', 'height'] to set the size of the image, ['region'] to only render
+                the region [x, y, width, height] of the image, e.g. a tile, and ['samples',
+                'seed'] to render that many samples with that seed. Each of the ['shots'] is
+                rendered in turn with the keys of the shot added to the other keys, so that
+                several views of the scene are rendered without opening it again. The output
+                overrides only apply to this render.
+
+        Raises:
+            RuntimeError: If the samples are set and KeyShot cannot set the seed of a render.
+        """
+        if data.get("samples") is not None:
+            # Fail before switching views or rendering anything, as every task would otherwise
+            # render the same samples
+            _check_can_set_seed(lux.getRenderOptions())
+        if "shots" in data:
+            shared = {name: value for name, value in data.items() if name != "shots"}
+            for shot in data["shots"]:
+                self.render({**shared, **shot})
+            return
+
+        # A studio can change the model set and camera, so it is switched to first
+        if "studio" in data:
+            self.set_studio(data)
+        if "model_set" in data:
+            self.set_model_set(data)
+        if "camera" in data:
+            self.set_camera(data)
+        for name in ("region", "width", "height", "samples", "seed"):
+            self.render_kwargs[name] = data.get(name)
+        output_path, output_format_code = self.output_path, self.output_format_code
+        try:
+            if "output_file_path" in data:
+                self.set_output_file_path(data)
+            if "output_format" in data:
+                self.set_output_format(data)
+            self.set_frames(data)
+            self.start_render(data)
+        finally:
+            self.output_path, self.output_format_code = output_path, output_format_code
 
     def set_output_format(self, data: dict) -> None:
         """
@@ -86,20 +202,94 @@ class KeyShotHandler:
 
     def set_frame(self, data: dict) -> None:
         """
-        Sets the frame to render
+        Sets a single frame to render
 
         Args:
             data (dict):
 
         """
-        self.render_kwargs["frame"] = int(data.get("frame", ""))
+        self.render_kwargs["frames"] = [int(data.get("frame", ""))]
+
+    def set_frames(self, data: dict) -> None:
+        """
+        Sets the chunk of frames to render
+
+        Args:
+            data (dict): The data given from the Adaptor. Keys expected: ['frames']
+
+        """
+        self.render_kwargs["frames"] = [int(frame) for frame in data.get("frames", [])]
+
+    def _switch_view(
+        self, kind: str, name: str, names: list[str], switch: Callable[[str], Any]
+    ) -> None:
+        """
+        Switches the scene to one of its cameras, model sets or studios. The open scene then
+        differs from its file, so a session that reuses this KeyShot process opens it again.
+
+        Args:
+            kind (str): What is switched, e.g. 'camera'.
+            name (str): The name to switch to.
+            names (list[str]): The names that the scene has.
+            switch (Callable[[str], Any]): The lux function that switches to a name.
+
+        Raises:
+            RuntimeError: If the scene does not have the name
+        """
+        if name not in names:
+            raise RuntimeError(
+                f"The scene does not have the {kind} '{name}'. Its {kind}s are: {', '.join(names)}"
+            )
+        print(f"Switching to {kind} {name}")
+        KeyShotHandler.loaded_scene_fingerprint = None
+        switch(name)
+
+    def set_camera(self, data: dict) -> None:
+        """
+        Switches the view of the scene to a camera
+
+        Args:
+            data (dict): The data given from the Adaptor. Keys expected: ['camera']
+
+        Raises:
+            RuntimeError: If the scene does not have the camera
+        """
+        self._switch_view("camera", data.get("camera", ""), lux.getCameras(), lux.setCamera)
+
+    def set_model_set(self, data: dict) -> None:
+        """
+        Switches the scene to a model set
+
+        Args:
+            data (dict): The data given from the Adaptor. Keys expected: ['model_set']
+
+        Raises:
+            RuntimeError: If the scene does not have the model set
+        """
+        self._switch_view(
+            "model set", data.get("model_set", ""), lux.getModelSets(), lux.setModelSet
+        )
+
+    def set_studio(self, data: dict) -> None:
+        """
+        Switches the scene to a studio, with the camera, environment and other settings of the
+        studio
+
+        Args:
+            data (dict): The data given from the Adaptor. Keys expected: ['studio']
+
+        Raises:
+            RuntimeError: If the scene does not have the studio
+        """
+        self._switch_view("studio", data.get("studio", ""), lux.getStudios(), lux.setStudio)
 
     def set_scene_file(self, data: dict) -> None:
         """
-        Opens the scene file in KeyShot.
+        Opens the scene file in KeyShot, unless the same, unchanged scene file is already open.
 
         Args:
-            data (dict): The data given from the Adaptor. Keys expected: ['scene_file']
+            data (dict): The data given from the Adaptor. Keys expected: ['scene_file'], optional:
+                ['force_reload', 'content_hash']
 
         Raises:
             FileNotFoundError: If path to the scene file does not yield a file
@@ -108,4 +298,18 @@ class KeyShotHandler:
         print("scene_file", scene_file)
         if not os.path.isfile(scene_file):
             raise FileNotFoundError(f"The scene file '{scene_file}' does not exist")
-        lux.openFile(scene_file)
+
+        fingerprint = _scene_fingerprint(scene_file, bool(data.get("content_hash", False)))
+        if not data.get("force_reload", False) and fingerprint == self.loaded_scene_fingerprint:
+            KeyShotHandler.scene_loads_skipped += 1
+            print(f"Scene file {scene_file} is already open, skipping reload")
+        else:
+            # Forget the open scene first in case opening the new one fails halfway
+            KeyShotHandler.loaded_scene_fingerprint = None
+            lux.openFile(scene_file)
+            KeyShotHandler.loaded_scene_fingerprint = fingerprint
+            KeyShotHandler.scene_loads_performed += 1
+        print(
+            f"Scene loads performed: {self.scene_loads_performed}, "
+            f"skipped: {self.scene_loads_skipped}"
+        )
@@ -0,0 +1,110 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+"""
+File helpers shared by the parts of the adaptor that coordinate through files on the worker: the
+KeyShot process pool, the scene cache and the output verifier.
+
+This module is imported inside KeyShot, so it must only use the Python standard library.
+"""
+from __future__ import annotations
+
+import json
+import os
+import sys
+from typing import IO, Any, Optional
+
+if sys.platform == "win32":
+    import msvcrt
+else:
+    import fcntl
+
+__all__ = ["ProcessLock", "read_json", "write_json_atomic"]
+
+
+class ProcessLock:
+    """
+    An exclusive, non-blocking lock on a file. The operating system releases the lock when the
+    process holding it exits, so a lock that can be acquired means that its previous holder is
+    gone.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._file: Optional[IO[str]] = None
+
+    @property
+    def is_held(self) -> bool:
+        """Whether this object holds the lock."""
+        return self._file is not None
+
+    def try_acquire(self) -> bool:
+        """
+        Acquires the lock if no other holder has it.
+
+        Returns:
+            bool: True if the lock was acquired.
+        """
+        if self._file is not None:
+            return True
+        lock_file = open(self.path, "a+", encoding="utf-8")
+        try:
+            lock_file.seek(0)
+            if sys.platform == "win32":
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._file = lock_file
+        return True
+
+    def release(self) -> None:
+        """Releases the lock if this object holds it."""
+        if self._file is None:
+            return
+        try:
+            self._file.seek(0)
+            if sys.platform == "win32":
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        finally:
+            self._file.close()
+            self._file = None
+
+    def is_held_elsewhere(self) -> bool:
+        """
+        Returns:
+            bool: True if another holder has the lock.
+        """
+        if self._file is not None:
+            return False
+        if self.try_acquire():
+            self.release()
+            return False
+        return True
+
+
+def read_json(path: str) -> Optional[dict[str, Any]]:
+    """
+    Reads a JSON object from a file.
+
+    Returns:
+        Optional[dict[str, Any]]: The object, or None if the file does not exist or is not valid.
+    """
+    try:
+        with open(path, encoding="utf-8") as json_file:
+            contents = json.load(json_file)
+    except (OSError, ValueError):
+        return None
+    return contents if isinstance(contents, dict) else None
+
+
+def write_json_atomic(path: str, contents: dict[str, Any]) -> None:
+    """
+    Writes a JSON object to a file so that readers never see a partially written file.
+    """
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as json_file:
+        json.dump(contents, json_file)
+    os.replace(temp_path, path)
@@ -0,0 +1,45 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+"""
+Files shared by the KeyShot Adaptor and KeyShot processes in a worker's KeyShot process pool.
+
+Each pooled KeyShot process owns a slot directory in the pool. The KeyShot client running in it
+holds the slot's alive lock for as long as it runs, records its status in the slot's state file
+and waits for a lease file that tells it which adaptor server to connect to. An adaptor holds the
+slot's lease lock while it uses the process.
+
+The slots are read and written with the helpers in the _fileutil module. This module is imported
+inside KeyShot, so it must only use the Python standard library.
+"""
+from __future__ import annotations
+
+__all__ = [
+    "POOL_SLOT_ENV_VAR",
+    "POOL_IDLE_TIMEOUT_ENV_VAR",
+    "STATE_FILE",
+    "PID_FILE",
+    "LEASE_FILE",
+    "LEASE_LOCK_FILE",
+    "ALIVE_LOCK_FILE",
+    "LOG_FILE",
+    "STATUS_STARTING",
+    "STATUS_IDLE",
+    "STATUS_LEASED",
+]
+
+# Set on pooled KeyShot processes to the path of their slot directory
+POOL_SLOT_ENV_VAR = "KEYSHOT_ADAPTOR_POOL_SLOT"
+# Set on pooled KeyShot processes to how long they stay idle before exiting
+POOL_IDLE_TIMEOUT_ENV_VAR = "KEYSHOT_ADAPTOR_POOL_IDLE_TIMEOUT_SECONDS"
+
+STATE_FILE = "state.json"
+# Written by the adaptor that started the process, with the PID of the process
+PID_FILE = "pid.json"
+LEASE_FILE = "lease.json"
+LEASE_LOCK_FILE = "lease.lock"
+ALIVE_LOCK_FILE = "alive.lock"
+LOG_FILE = "keyshot.log"
+
+# Written by the adaptor that started the process, until the KeyShot client takes over the slot
+STATUS_STARTING = "starting"
+STATUS_IDLE = "idle"
+STATUS_LEASED = "leased"
@@ -16,6 +16,30 @@ import lux
 
 RENDER_SUBMITTER_SETTINGS_FILE_EXT = ".deadline_render_settings.json"
 SUBMISSION_MODE_KEY = "submission_mode"
+FRAME_SPLIT_KEY = "frame_split"
+# How each frame can be split across tasks, in the order of the options of the dialog
+FRAME_SPLIT_TILES = "tiles"
+FRAME_SPLIT_SAMPLES = "samples"
+FRAME_SPLIT_OPTIONS = [
+    (None, "Render each frame in a single task"),
+    (FRAME_SPLIT_TILES, "Split each frame into tiles (PNG output only)"),
+    # Needs a version of KeyShot whose render options can set the seed of a render
+    # (lux.RenderOptions.setSeed), on the workers as well as here, see keyshot_can_set_seed
+    (
+        FRAME_SPLIT_SAMPLES,
+        "Split the samples of each frame (EXR output only, needs a KeyShot version that can set "
+        "the render seed)",
+    ),
+]
+# The image size that tiled rendering defaults to when the render resolution of the scene is unknown
+DEFAULT_IMAGE_SIZE = (3840, 2160)
+# The views of the scene that a job can render every one of, in the order they are combined, as
+# (dialog option, dialog label, task parameter, run data key)
+VARIANT_OPTIONS = [
+    ("render_every_studio", "Render every studio", "Studio", "studio"),
+    ("render_every_model_set", "Render every model set", "ModelSet", "model_set"),
+    ("render_every_camera", "Render every camera", "Camera", "camera"),
+]
 # Unique ID required to allow KeyShot to save selections for a dialog
 DEADLINE_CLOUD_DIALOG_ID = "e309ce79-3ee8-446a-8308-10d16dfcbb42"
 
@@ -96,13 +120,27 @@ class Settings:
             self.referenced_paths = asset_references["referencedPaths"]
 
 
-def construct_job_template(filename: str) -> dict:
+def construct_job_template(
+    filename: str,
+    frame_split: Optional[str] = None,
+    variants: Optional[dict[str, list[str]]] = None,
+    image_size: Tuple[int, int] = DEFAULT_IMAGE_SIZE,
+) -> dict:
     """
     Constructs and returns a dict containing a valid job template for the KeyShot job.
     The return value is safe to convert/dump to JSON or YAML.
+
+    variants maps the task parameters of VARIANT_OPTIONS to the names of the views of the scene
+    that are rendered, e.g. {"Camera": ["Front", "Top"]}, which adds a task per camera of each
+    chunk of frames. When frame_split is FRAME_SPLIT_TILES, each frame is split into a grid of tiles that are
+    rendered by separate tasks. When it is FRAME_SPLIT_SAMPLES, the samples of each frame are
+    split across tasks that render with different seeds. A second step then assembles each
+    frame from the outputs of its tasks. image_size is the default (width, height) in pixels of
+    the image that is split into tiles.
     """
-    return {
+    job_template: dict[str, Any] = {
         "specificationVersion": "jobtemplate-2023-09",
+        "extensions": ["TASK_CHUNKING"],
         "name": filename,
         "parameterDefinitions": [
             {
@@ -129,6 +167,18 @@ def construct_job_template(filename: str) -> dict:
                 "description": "The frames to render e.g. 1-3,8,11-15",
                 "minLength": 1,
             },
+            {
+                "name": "ChunkSize",
+                "type": "INT",
+                "userInterface": {
+                    "control": "SPIN_BOX",
+                    "label": "Frames Per Task",
+                    "groupLabel": "KeyShot Settings",
+                },
+                "description": "The number of frames that each task renders in a single KeyShot session.",
+                "default": 1,
+                "minValue": 1,
+            },
             {
                 "name": "OutputFilePath",
                 "type": "PATH",
@@ -171,7 +221,15 @@ def construct_job_template(filename: str) -> dict:
                 },
                 "parameterSpace": {
                     "taskParameterDefinitions": [
-                        {"name": "Frame", "type": "INT", "range": "{{Param.Frames}}"}
+                        {
+                            "name": "Frame",
+                            "type": "CHUNK[INT]",
+                            "range": "{{Param.Frames}}",
+                            "chunks": {
+                                "defaultTaskCount": "{{Param.ChunkSize}}",
+                                "rangeConstraint": "NONCONTIGUOUS",
+                            },
+                        }
                     ]
                 },
                 "stepEnvironments": [
@@ -226,7 +284,7 @@ def construct_job_template(filename: str) -> dict:
                             "name": "runData",
                             "filename": "run-data.yaml",
                             "type": "TEXT",
-                            "data": "frame: {{Task.Param.Frame}}\n",
+                            "data": "frame: '{{Task.Param.Frame}}'\n",
                         }
                     ],
                     "actions": {
@@ -247,6 +305,222 @@ def construct_job_template(filename: str) -> dict:
             }
         ],
     }
+    if variants:
+        add_variants(job_template, variants)
+    if frame_split == FRAME_SPLIT_TILES:
+        add_tiled_rendering(job_template, image_size)
+    elif frame_split == FRAME_SPLIT_SAMPLES:
+        add_sample_splitting(job_template)
+    if variants:
+        # Every task parameter of the step is combined with every other one
+        for step in job_template["steps"]:
+            parameter_space = step["parameterSpace"]
+            parameter_space["combination"] = " * ".join(
+                param["name"] for param in parameter_space["taskParameterDefinitions"]
+            )
+    return job_template
+
+
+def _add_int_parameters(
+    job_template: dict, group_label: str, parameters: list[Tuple[str, str, str, int]]
+) -> None:
+    job_template["parameterDefinitions"].extend(
+        {
+            "name": name,
+            "type": "INT",
+            "userInterface": {
+                "control": "SPIN_BOX",
+                "label": label,
+                "groupLabel": group_label,
+            },
+            "description": description,
+            "default": default,
+            "minValue": 1,
+        }
+        for name, label, description, default in parameters
+    )
+
+
+def _restrict_output_format(job_template: dict, output_format: str) -> None:
+    for parameter in job_template["parameterDefinitions"]:
+        if parameter["name"] == "OutputFormat":
+            parameter["allowedValues"] = [output_format]
+            parameter["default"] = output_format
+
+
+def _add_frame_assembly_step(job_template: dict, name: str, module: str, args: list[str]) -> None:
+    """
+    Adds a step that runs once every task of the Render step is done, and runs the given module
+    of the adaptor for each chunk of frames, and each view of the scene that the job renders, to
+    assemble the frames from the outputs of the tasks.
+    """
+    render_step = job_template["steps"][0]
+    # Each view of the scene is assembled from its own outputs
+    variant_options = {parameter: key for _, _, parameter, key in VARIANT_OPTIONS}
+    frame_param, *render_params = render_step["parameterSpace"]["taskParameterDefinitions"]
+    variant_params = [param for param in render_params if param["name"] in variant_options]
+    variant_args = [
+        arg
+        for param in variant_params
+        for arg in (
+            f"--{variant_options[param['name']].replace('_', '-')}",
+            f"{{{{Task.Param.{param['name']}}}}}",
+        )
+    ]
+    job_template["steps"].append(
+        {
+            "name": name,
+            "dependencies": [{"dependsOn": render_step["name"]}],
+            "hostRequirements": render_step["hostRequirements"],
+            "parameterSpace": {"taskParameterDefinitions": [frame_param, *variant_params]},
+            "script": {
+                "actions": {
+                    "onRun": {
+                        "command": "python",
+                        "args": [
+                            "-m",
+                            f"deadline.keyshot_adaptor.KeyShotAdaptor.{module}",
+                            "--output-file-path",
+                            "{{Param.OutputFilePath}}",
+                            "--frames",
+                            "{{Task.Param.Frame}}",
+                            *variant_args,
+                            *args,
+                        ],
+                        "cancelation": {"mode": "NOTIFY_THEN_TERMINATE"},
+                    }
+                },
+            },
+        }
+    )
+
+
+def add_variants(job_template: dict, variants: dict[str, list[str]]) -> None:
+    """
+    Adds a task parameter to the Render step of the job template for each view of the scene in
+    variants, in the order of VARIANT_OPTIONS, so that each chunk of frames is rendered by a task
+    per combination of the views. The adaptor switches to the views of a task before rendering
+    it, and renders each combination to an output path of its own.
+    """
+    render_step = job_template["steps"][0]
+    run_data = render_step["script"]["embeddedFiles"][0]
+    for _, _, parameter, key in VARIANT_OPTIONS:
+        if not variants.get(parameter):
+            continue
+        render_step["parameterSpace"]["taskParameterDefinitions"].append(
+            {"name": parameter, "type": "STRING", "range": list(variants[parameter])}
+        )
+        # A block scalar takes the name as it is, even if it has quotes or colons
+        run_data["data"] += f"{key}: |-\n  {{{{Task.Param.{parameter}}}}}\n"
+
+
+def add_tiled_rendering(
+    job_template: dict, image_size: Tuple[int, int] = DEFAULT_IMAGE_SIZE
+) -> None:
+    """
+    Splits the frames that the Render step of the job template renders into TileRows x
+    TileColumns tiles, one task per tile of each chunk of frames, and adds an AssembleTiles step
+    that stitches the tiles of each frame together once every tile is rendered. Only PNG output
+    can be stitched. The ImageWidth and ImageHeight parameters default to image_size.
+    """
+    image_width, image_height = image_size
+    _add_int_parameters(
+        job_template,
+        "Tiled Rendering",
+        [
+            ("TileRows", "Tile Rows", "The number of rows of tiles of each frame.", 2),
+            ("TileColumns", "Tile Columns", "The number of columns of tiles of each frame.", 2),
+            (
+                "ImageWidth",
+                "Image Width",
+                "The width of the rendered image in pixels.",
+                image_width,
+            ),
+            (
+                "ImageHeight",
+                "Image Height",
+                "The height of the rendered image in pixels.",
+                image_height,
+            ),
+        ],
+    )
+    _restrict_output_format(job_template, "PNG")
+
+    render_step = job_template["steps"][0]
+    render_step["parameterSpace"]["taskParameterDefinitions"].extend(
+        [
+            {"name": "TileRow", "type": "INT", "range": "1-{{Param.TileRows}}"},
+            {"name": "TileColumn", "type": "INT", "range": "1-{{Param.TileColumns}}"},
+        ]
+    )
+    init_data = render_step["stepEnvironments"][0]["script"]["embeddedFiles"][0]
+    init_data["data"] += (
+        "image_width: {{Param.ImageWidth}}\n"
+        "image_height: {{Param.ImageHeight}}\n"
+        "tiles:\n"
+        "  rows: {{Param.TileRows}}\n"
+        "  columns: {{Param.TileColumns}}\n"
+    )
+    run_data = render_step["script"]["embeddedFiles"][0]
+    run_data["data"] += (
+        "tile:\n" "  row: {{Task.Param.TileRow}}\n" "  column: {{Task.Param.TileColumn}}\n"
+    )
+
+    _add_frame_assembly_step(
+        job_template,
+        "AssembleTiles",
+        "tile_stitcher",
+        [
+            "--rows",
+            "{{Param.TileRows}}",
+            "--columns",
+            "{{Param.TileColumns}}",
+            "--width",
+            "{{Param.ImageWidth}}",
+            "--height",
+            "{{Param.ImageHeight}}",
+        ],
+    )
+
+
+def add_sample_splitting(job_template: dict) -> None:
+    """
+    Splits the samples of the frames that the Render step of the job template renders across
+    SampleTasks tasks per chunk of frames, each rendering SamplesPerTask samples with a seed of
+    its own, and adds a MergeSamples step that averages the outputs of each frame once every
+    task is done. Only EXR output can be averaged.
+    """
+    _add_int_parameters(
+        job_template,
+        "Sample Splitting",
+        [
+            (
+                "SampleTasks",
+                "Tasks Per Frame",
+                "The number of tasks that render the samples of each frame, with different seeds.",
+                4,
+            ),
+            (
+                "SamplesPerTask",
+                "Samples Per Task",
+                "The number of samples that each task renders. Each frame gets the samples of "
+                "every task.",
+                64,
+            ),
+        ],
+    )
+    _restrict_output_format(job_template, "EXR")
+
+    render_step = job_template["steps"][0]
+    render_step["parameterSpace"]["taskParameterDefinitions"].append(
+        {"name": "Seed", "type": "INT", "range": "1-{{Param.SampleTasks}}"}
+    )
+    run_data = render_step["script"]["embeddedFiles"][0]
+    run_data["data"] += "samples: {{Param.SamplesPerTask}}\nseed: {{Task.Param.Seed}}\n"
+
+    _add_frame_assembly_step(
+        job_template, "MergeSamples", "sample_merger", ["--sample-tasks", "{{Param.SampleTasks}}"]
+    )
 
 
 def construct_asset_references(settings: Settings) -> dict:
@@ -365,8 +639,14 @@ def options_dialog() -> dict[str, Any]:
         Option 1: Dropdown to select whether to submit just the scene file itself
                   or all external file references as well by packing/unpacking a
                   KSP bundle before submission.
+        Option 2: Dropdown to select whether each frame is rendered by a single task, split
+                  into tiles or has its samples split across tasks.
+        Options 3-5: Checkboxes to select whether every studio, model set and camera of the
+                  scene is rendered, by a task each, instead of the current one.
     Returns a dictionary of the selected option values in the format:
-        {'SUBMISSION_MODE_KEY': [1, 'only the scene BIP file']}
+        {'SUBMISSION_MODE_KEY': [1, 'only the scene BIP file'],
+         'FRAME_SPLIT_KEY': [0, 'Render each frame in a single task'],
+         'render_every_camera': True, ...}
     """
     dialog_items = [
         (
@@ -375,7 +655,15 @@ def options_dialog() -> dict[str, Any]:
             "What files would you like to attach to the job?",
             0,
             ["The scene BIP file and all external files references", "Only the scene BIP file"],
-        )
+        ),
+        (
+            FRAME_SPLIT_KEY,
+            lux.DIALOG_ITEM,
+            "How should each frame be rendered?",
+            0,
+            [label for _, label in FRAME_SPLIT_OPTIONS],
+        ),
+        *((key, lux.DIALOG_CHECK, label, False) for key, label, _, _ in VARIANT_OPTIONS),
     ]
     selections = lux.getInputDialog(
         title="AWS Deadline Cloud Submission Options",
@@ -386,6 +674,54 @@ def options_dialog() -> dict[str, Any]:
     return selections
 
 
+def get_scene_variants(dialog_selections: dict[str, Any]) -> dict[str, list[str]]:
+    """
+    Returns the names of the studios, model sets and cameras of the open scene that the options
+    dialog selected to render every one of, by the task parameter of VARIANT_OPTIONS that
+    renders them.
+    """
+    get_names = {"Studio": lux.getStudios, "ModelSet": lux.getModelSets, "Camera": lux.getCameras}
+    return {
+        parameter: list(get_names[parameter]())
+        for key, _, parameter, _ in VARIANT_OPTIONS
+        # Older sticky dialog selections do not have the views
+        if dialog_selections.get(key)
+    }
+
+
+def keyshot_can_set_seed() -> bool:
+    """
+    Returns whether the render options of this version of KeyShot can set the seed of a render,
+    which splitting the samples of a frame across tasks needs.
+    """
+    return hasattr(lux.getRenderOptions(), "setSeed")
+
+
+def get_render_resolution(scene_info: dict[str, Any]) -> Tuple[int, int]:
+    """
+    Returns the (width, height) in pixels that the open scene renders at, from the scene info
+    of KeyShot, or DEFAULT_IMAGE_SIZE if the scene info does not have it.
+    """
+    try:
+        width, height = int(scene_info["width"]), int(scene_info["height"])
+    except (KeyError, TypeError, ValueError):
+        return DEFAULT_IMAGE_SIZE
+    if width <= 0 or height <= 0:
+        return DEFAULT_IMAGE_SIZE
+    return width, height
+
+
+def get_conda_packages(major_version: int, frame_split: Optional[str] = None) -> str:
+    """
+    Returns the conda packages that the job installs on the worker. The steps that assemble the
+    tiles or samples of each frame need numpy, which the adaptor does not depend on.
+    """
+    packages = [f"keyshot={major_version}.*", "keyshot-openjd=0.3.*"]
+    if frame_split is not None:
+        packages.append("numpy")
+    return " ".join(packages)
+
+
 def save_ksp_bundle(directory: str, bundle_name: str) -> str:
     """
     Saves out the current scene and any file references to a ksp bundle in a
@@ -487,6 +823,17 @@ def main_inner():
         # Dialog was canceled. Raise an exception so Keyshot does not show the script's result status as "Success"
         raise Exception("Submission was canceled.")
 
+    # Older sticky dialog selections do not have the frame split
+    frame_split, _ = FRAME_SPLIT_OPTIONS[dialog_selections.get(FRAME_SPLIT_KEY, [0])[0]]
+    if frame_split == FRAME_SPLIT_SAMPLES and not keyshot_can_set_seed():
+        # Raise an exception so Keyshot shows the script's result status as "Failure"
+        raise Exception(
+            "This version of KeyShot cannot set the seed of a render, so the samples of a frame "
+            "cannot be split across tasks. Render each frame in a single task instead."
+        )
+    output_format = "EXR" if frame_split == FRAME_SPLIT_SAMPLES else "PNG"
+    variants = get_scene_variants(dialog_selections)
+
     scene_info = lux.getSceneInfo()
     scene_file = scene_info["file"]
     scene_name, _ = os.path.splitext(scene_info["name"])
@@ -501,11 +848,13 @@ def main_inner():
             },
             {
                 "name": "OutputFilePath",
-                "value": os.path.join(os.path.dirname(scene_file), f"{scene_name}.%d.png"),
+                "value": os.path.join(
+                    os.path.dirname(scene_file), f"{scene_name}.%d.{output_format.lower()}"
+                ),
             },
             {
                 "name": "OutputFormat",
-                "value": "PNG",
+                "value": output_format,
             },
         ],
         input_filenames=[],
@@ -533,12 +882,17 @@ def main_inner():
         settings.parameter_values.append(
             {
                 "name": "CondaPackages",
-                "value": f"keyshot={major_version}.* keyshot-openjd=0.3.*",
+                "value": get_conda_packages(major_version, frame_split),
             }
         )
         settings.parameter_values.append({"name": "CondaChannels", "value": "deadline-cloud"})
 
-        job_template = construct_job_template(scene_name)
+        job_template = construct_job_template(
+            scene_name,
+            frame_split=frame_split,
+            variants=variants,
+            image_size=get_render_resolution(scene_info),
+        )
         asset_references = construct_asset_references(settings)
         parameter_values = construct_parameter_values(settings)
 
@@ -0,0 +1,101 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+"""
+Measures the per-task overhead the adaptor adds on top of the render itself, comparing the
+event-driven waits against the previous sleep-polling loops.
+
+Run with `hatch run benchmark` (or `pytest -s test/benchmark`) to see the report. The number of
+frames can be changed with the KEYSHOT_BENCHMARK_FRAMES environment variable.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import statistics
+import threading
+import time
+from typing import Callable
+from unittest.mock import Mock
+
+from deadline.keyshot_adaptor.KeyShotAdaptor.adaptor import KeyShotAdaptor
+from deadline.keyshot_adaptor.KeyShotAdaptor.output_handler import KeyShotOutputHandler
+
+_FRAMES = int(os.environ.get("KEYSHOT_BENCHMARK_FRAMES", "20"))
+_RENDER_SECONDS = 0.005
+
+
+class _SleepPollingKeyShotAdaptor(KeyShotAdaptor):
+    """The adaptor with the sleep-polling waits it used before they were event-driven"""
+
+    def _wait_for_state(
+        self, predicate: Callable[[], bool], timeout: int | float | None = None
+    ) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not predicate():
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.1)
+        return True
+
+
+class _FakeKeyShot:
+    """
+    Stands in for the KeyShot process and the KeyShotClient running inside it. Pulls actions from
+    the adaptor's queue the same way the adaptor server does and writes KeyShot-like output lines
+    through the adaptor's regex callbacks.
+    """
+
+    def __init__(self, adaptor: KeyShotAdaptor) -> None:
+        self._adaptor = adaptor
+        self._handler = KeyShotOutputHandler(adaptor._get_output_callbacks())
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self) -> _FakeKeyShot:
+        self._adaptor._keyshot_client = Mock(is_running=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _emit(self, line: str) -> None:
+        self._handler.emit(logging.LogRecord("keyshot", logging.INFO, "", 0, line, None, None))
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            action = self._adaptor._action_queue.dequeue_action()
+            if action is None:
+                # Mirrors the adaptor server, which polls the queue while the client waits
+                time.sleep(0.01)
+            elif action.name == "render":
+                self._emit("Rendering: 50%")
+                time.sleep(_RENDER_SECONDS)
+                self._emit("Finished Rendering")
+
+
+def _measure_task_overhead(adaptor_cls: type[KeyShotAdaptor]) -> list[float]:
+    adaptor = adaptor_cls({"scene_file": "scene.bip"})
+    overheads = []
+    with _FakeKeyShot(adaptor):
+        for frame in range(1, _FRAMES + 1):
+            start = time.perf_counter()
+            adaptor.on_run({"frame": frame})
+            overheads.append(time.perf_counter() - start - _RENDER_SECONDS)
+    return overheads
+
+
+def test_event_driven_waits_reduce_task_overhead():
+    polling = _measure_task_overhead(_SleepPollingKeyShotAdaptor)
+    event_driven = _measure_task_overhead(KeyShotAdaptor)
+
+    print(
+        f"\nPer-task adaptor overhead over {_FRAMES} frames ({_RENDER_SECONDS * 1000:.0f} ms render)"
+    )
+    for name, samples in (("sleep-polling", polling), ("event-driven", event_driven)):
+        print(
+            f"  {name:>13}: mean {statistics.mean(samples) * 1000:7.2f} ms, "
+            f"max {max(samples) * 1000:7.2f} ms"
+        )
+
+    assert statistics.mean(event_driven) < statistics.mean(polling) / 2
@@ -0,0 +1,254 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+"""
+Measures the overhead of the adaptor end to end, through the same `daemon start`, `daemon run` and
+`daemon stop` commands that a job runs, with the fake KeyShot executable in test/fake_keyshot
+rendering instantly. Reports:
+- cold start: the time `daemon start` takes to start the adaptor, launch KeyShot and open a scene
+- per-frame overhead: the time `daemon run` takes for a task of one frame, and per frame of a chunk
+- IPC round trip: the time the KeyShot client takes to get an action from the adaptor server,
+  and the time an action takes to reach a KeyShot client that is waiting for one
+- entry point latency: the time `daemon run` takes for a task of one frame through the adaptor's
+  entry point, through the OpenJD adaptor runtime's entry point, and the startup time of Python
+- throughput: the frames per second of a task of each of KEYSHOT_BENCHMARK_E2E_FRAMES frames
+
+Run with `hatch run benchmark` (or `pytest -s test/benchmark`) to see the report. Only runs on
+Linux and macOS, where the fake KeyShot executable can be started directly.
+"""
+from __future__ import annotations
+
+import contextlib
+import io
+import json
+import os
+import queue as queue_module
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+from openjd.adaptor_runtime.application_ipc import ActionsQueue
+from openjd.adaptor_runtime_client import Action
+
+from deadline.keyshot_adaptor.KeyShotAdaptor.adaptor import KeyShotAdaptor
+
+_FAKE_KEYSHOT_DIR = Path(__file__).parents[1] / "fake_keyshot"
+_FRAME_COUNTS = [
+    int(count) for count in os.environ.get("KEYSHOT_BENCHMARK_E2E_FRAMES", "1,100,10000").split(",")
+]
+_COLD_STARTS = 3
+_SINGLE_FRAME_TASKS = 10
+_ROUND_TRIPS = 1000
+_HAND_OVERS = 200
+_ENTRY_POINT_TASKS = 10
+
+_ADAPTOR_ENTRY_POINT = ["-m", "deadline.keyshot_adaptor.KeyShotAdaptor"]
+# The entry point that handled every command before the adaptor handled `daemon run` itself
+_RUNTIME_ENTRY_POINT = [
+    "-c",
+    "from openjd.adaptor_runtime import EntryPoint\n"
+    "from deadline.keyshot_adaptor.KeyShotAdaptor.adaptor import KeyShotAdaptor\n"
+    "EntryPoint(KeyShotAdaptor).start()",
+]
+
+pytestmark = pytest.mark.skipif(
+    sys.platform == "win32", reason="The fake KeyShot executable does not run on Windows"
+)
+
+
+def _print_stats(name: str, samples: list[float], unit: str = "ms", scale: float = 1000) -> None:
+    samples = sorted(samples)
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    print(
+        f"  {name:>26}: mean {statistics.mean(samples) * scale:8.2f} {unit}, "
+        f"p50 {statistics.median(samples) * scale:8.2f} {unit}, p99 {p99 * scale:8.2f} {unit}"
+    )
+
+
+class _Daemon:
+    """Runs the adaptor as a daemon with the fake KeyShot, the way a job does."""
+
+    def __init__(self, directory: Path) -> None:
+        directory.mkdir(parents=True, exist_ok=True)
+        self._connection_file = directory / "connection.json"
+        self._scene_file = directory / "scene.bip"
+        self._scene_file.touch()
+        self.output_dir = directory / "renders"
+        self._env = {
+            **os.environ,
+            "KEYSHOT_EXECUTABLE": str(_FAKE_KEYSHOT_DIR / "keyshot"),
+            # The fake KeyShot runs with the python3 of the interpreter that runs the benchmark
+            "PATH": os.pathsep.join([os.path.dirname(sys.executable), os.environ.get("PATH", "")]),
+        }
+
+    def _command(self, *args: str, entry_point: list[str] = _ADAPTOR_ENTRY_POINT) -> float:
+        start = time.perf_counter()
+        subprocess.run(
+            [
+                sys.executable,
+                *entry_point,
+                "daemon",
+                *args,
+                "--connection-file",
+                str(self._connection_file),
+            ],
+            env=self._env,
+            check=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        return time.perf_counter() - start
+
+    def start(self) -> float:
+        init_data = {
+            "scene_file": str(self._scene_file),
+            "output_file_path": str(self.output_dir / "frame.%d.png"),
+            "output_format": "RENDER_OUTPUT_PNG",
+        }
+        return self._command("start", "--init-data", json.dumps(init_data))
+
+    def run(self, frame: int | str, entry_point: list[str] = _ADAPTOR_ENTRY_POINT) -> float:
+        return self._command(
+            "run", "--run-data", json.dumps({"frame": frame}), entry_point=entry_point
+        )
+
+    def stop(self) -> float:
+        return self._command("stop")
+
+
+@pytest.fixture
+def daemon(tmp_path) -> Iterator[_Daemon]:
+    daemon = _Daemon(tmp_path)
+    daemon.start()
+    yield daemon
+    daemon.stop()
+
+
+def test_cold_start(tmp_path):
+    starts = []
+    stops = []
+    for i in range(_COLD_STARTS):
+        daemon = _Daemon(tmp_path / str(i))
+        starts.append(daemon.start())
+        stops.append(daemon.stop())
+
+    print(f"\nCold start over {_COLD_STARTS} sessions")
+    _print_stats("daemon start", starts)
+    _print_stats("daemon stop", stops)
+
+
+def test_per_frame_overhead(daemon):
+    # The first task pays for imports and caches that later tasks reuse
+    daemon.run(0)
+    tasks = [daemon.run(frame) for frame in range(1, _SINGLE_FRAME_TASKS + 1)]
+    chunk_frames = 100
+    chunk = daemon.run(f"1001-{1000 + chunk_frames}")
+
+    print(f"\nPer-frame overhead with a render time of 0 ms over {_SINGLE_FRAME_TASKS} tasks")
+    _print_stats("daemon run of 1 frame", tasks)
+    print(f"  {'per frame of a chunk':>26}: {chunk / chunk_frames * 1000:8.2f} ms")
+    assert len(list(daemon.output_dir.iterdir())) == 1 + _SINGLE_FRAME_TASKS + chunk_frames
+
+
+def _measure_ipc(queue: ActionsQueue | None) -> tuple[list[float], list[float]]:
+    """
+    Measures the round trip of the KeyShot client's request for an action that is already queued,
+    and the time it takes an action to reach a client that is waiting for one.
+
+    Args:
+        queue (ActionsQueue | None): The queue of the adaptor server, or None for the adaptor's.
+    """
+    from deadline.keyshot_adaptor.KeyShotClient.keyshot_client import KeyShotClient
+
+    adaptor = KeyShotAdaptor({"scene_file": "scene.bip"})
+    if queue is not None:
+        adaptor._action_queue = queue  # type: ignore[assignment]
+    adaptor._start_keyshot_server_thread()
+    # The server logs every request
+    with contextlib.redirect_stderr(io.StringIO()):
+        try:
+            client = KeyShotClient(os.environ["KEYSHOT_ADAPTOR_SERVER_PATH"])
+            round_trips = []
+            for frame in range(_ROUND_TRIPS):
+                adaptor._action_queue.enqueue_action(Action("frame", {"frame": frame}))
+                start = time.perf_counter()
+                _, _, action = client._request_next_action()
+                round_trips.append(time.perf_counter() - start)
+                assert action is not None and action.args == {"frame": frame}
+
+            received: queue_module.Queue[float] = queue_module.Queue()
+
+            def wait_for_actions() -> None:
+                for _ in range(_HAND_OVERS):
+                    client._request_next_action()
+                    received.put(time.perf_counter())
+
+            waiter = threading.Thread(target=wait_for_actions)
+            waiter.start()
+            hand_overs = []
+            for frame in range(_HAND_OVERS):
+                # Give the client time to send its request, as it does while KeyShot is idle
+                time.sleep(0.002)
+                start = time.perf_counter()
+                adaptor._action_queue.enqueue_action(Action("frame", {"frame": frame}))
+                hand_overs.append(received.get() - start)
+            waiter.join()
+        finally:
+            assert adaptor._server is not None
+            adaptor._server.shutdown()
+            assert adaptor._server_thread is not None
+            adaptor._server_thread.join()
+    return round_trips, hand_overs
+
+
+def test_ipc_round_trip(monkeypatch):
+    monkeypatch.syspath_prepend(str(_FAKE_KEYSHOT_DIR))
+    # Restored once the test ends, the adaptor sets it to the path of its server
+    monkeypatch.setenv("KEYSHOT_ADAPTOR_SERVER_PATH", "")
+
+    polling_round_trips, polling_hand_overs = _measure_ipc(ActionsQueue())
+    round_trips, hand_overs = _measure_ipc(None)
+
+    print(f"\nIPC round trip of the KeyShot client over {_ROUND_TRIPS} queued actions")
+    _print_stats("runtime actions queue", polling_round_trips, unit="us", scale=1_000_000)
+    _print_stats("adaptor actions queue", round_trips, unit="us", scale=1_000_000)
+    print(f"Time for {_HAND_OVERS} actions to reach a waiting KeyShot client")
+    _print_stats("runtime actions queue", polling_hand_overs, unit="us", scale=1_000_000)
+    _print_stats("adaptor actions queue", hand_overs, unit="us", scale=1_000_000)
+
+    assert statistics.median(hand_overs) < statistics.median(polling_hand_overs)
+
+
+def test_entry_point_latency(daemon):
+    # The first task pays for imports and caches that later tasks reuse
+    daemon.run(0)
+    adaptor_tasks = [daemon.run(frame) for frame in range(1, _ENTRY_POINT_TASKS + 1)]
+    runtime_tasks = [
+        daemon.run(frame, entry_point=_RUNTIME_ENTRY_POINT)
+        for frame in range(1, _ENTRY_POINT_TASKS + 1)
+    ]
+    python_starts = []
+    for _ in range(_ENTRY_POINT_TASKS):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "pass"], check=True)
+        python_starts.append(time.perf_counter() - start)
+
+    print(f"\nEntry point latency of `daemon run` of 1 frame over {_ENTRY_POINT_TASKS} tasks")
+    _print_stats("adaptor entry point", adaptor_tasks)
+    _print_stats("runtime entry point", runtime_tasks)
+    _print_stats("python startup", python_starts)
+    assert statistics.median(adaptor_tasks) < statistics.median(runtime_tasks)
+
+
+@pytest.mark.parametrize("frames", _FRAME_COUNTS)
+def test_throughput(daemon, frames):
+    elapsed = daemon.run(f"1-{frames}")
+
+    print(
+        f"\nThroughput of a task of {frames} frame(s): {frames / elapsed:8.1f} frames/s "
+        f"({elapsed:.2f} s, {elapsed / frames * 1000:.2f} ms/frame)"
+    )
+    assert len(list(daemon.output_dir.iterdir())) == frames
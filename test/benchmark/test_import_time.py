@@ -0,0 +1,47 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+"""
+Measures how long a new Python process takes to import the adaptor, which every session pays
+before KeyShot is launched, and checks it against a budget.
+
+The budget in seconds can be changed with the KEYSHOT_BENCHMARK_IMPORT_BUDGET_SECONDS environment
+variable.
+"""
+from __future__ import annotations
+
+import os
+import re
+import subprocess
+import sys
+
+_ADAPTOR_MODULE = "deadline.keyshot_adaptor.KeyShotAdaptor.adaptor"
+# About 4 times the import time on a developer machine, to catch regressions
+_IMPORT_TIME_BUDGET_SECONDS = float(
+    os.environ.get("KEYSHOT_BENCHMARK_IMPORT_BUDGET_SECONDS", "0.6")
+)
+_RUNS = 5
+
+
+def _import_seconds(module: str) -> float:
+    """Returns the cumulative import time of a module, imported in a new Python process."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    for line in result.stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \|\s*(\S+)", line)
+        if match and match.group(2) == module:
+            return int(match.group(1)) / 1_000_000
+    raise AssertionError(f"{module} was not imported")
+
+
+def test_adaptor_import_time():
+    import_times = sorted(_import_seconds(_ADAPTOR_MODULE) for _ in range(_RUNS))
+
+    print(
+        f"Imported {_ADAPTOR_MODULE} in {import_times[0] * 1000:.0f} ms "
+        f"(median {import_times[len(import_times) // 2] * 1000:.0f} ms over {_RUNS} runs)"
+    )
+    # The fastest import, the first one can be slowed down by a cold file system cache
+    assert import_times[0] < _IMPORT_TIME_BUDGET_SECONDS
@@ -0,0 +1,125 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+"""
+Compares the throughput of the single-pass KeyShot output classifier against the separate
+leading-`.*` RegexCallbacks the adaptor registered before, over a synthetic KeyShot log, and
+checks that both dispatch exactly the same callbacks with the same values.
+
+The number of log lines can be changed with the KEYSHOT_BENCHMARK_LOG_LINES environment variable.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import random
+import re
+import time
+from typing import Callable
+
+from openjd.adaptor_runtime.app_handlers import RegexCallback, RegexHandler
+
+from deadline.keyshot_adaptor.KeyShotAdaptor.output_handler import (
+    COMPLETE,
+    ERROR,
+    PROGRESS,
+    VERSION,
+    VIDEO_ENCODE_ERROR,
+    KeyShotOutputHandler,
+)
+
+_LOG_LINES = int(os.environ.get("KEYSHOT_BENCHMARK_LOG_LINES", "1000000"))
+
+_VIDEO_ENCODE_ERROR_LINE = (
+    "You cannot use EXR, TIFF 32 or PSD for the frames when encoding a movie!"
+)
+
+
+def _synthetic_keyshot_log(line_count: int) -> list[logging.LogRecord]:
+    """A log dominated by -progress output, with the other kinds of lines mixed in"""
+    rng = random.Random(0)
+    lines = []
+    for i in range(line_count):
+        roll = rng.random()
+        if roll < 0.70:
+            lines.append(f"Rendering: {rng.randint(0, 100)}%")
+        elif roll < 0.92:
+            lines.append(f"[Info] Loaded texture 'C:/assets/textures/wood_{i}.png' (2048x2048)")
+        elif roll < 0.96:
+            lines.append(f"Finished Rendering C:/renders/turntable.{i}.png")
+        elif roll < 0.98:
+            lines.append(f"[Error] Could not find texture 'C:/assets/missing_{i}.png'")
+        elif roll < 0.99:
+            lines.append(_VIDEO_ENCODE_ERROR_LINE)
+        else:
+            lines.append("KeyShotClient: KeyShot Version 2024.3.1")
+    return [logging.LogRecord("keyshot", logging.INFO, "", 0, line, None, None) for line in lines]
+
+
+def _previous_regex_handler(record: Callable[[str, str], None]) -> RegexHandler:
+    """The RegexCallbacks the adaptor registered before the single-pass classifier"""
+    return RegexHandler(
+        [
+            RegexCallback([re.compile(".*Finished Rendering.*")], lambda m: record(COMPLETE, "")),
+            RegexCallback(
+                [re.compile(".*Rendering: ([0-9]+)%.*")], lambda m: record(PROGRESS, m.group(1))
+            ),
+            RegexCallback(
+                [re.compile(".*Error: .*|.*\\[Error\\].*", re.IGNORECASE)],
+                lambda m: record(ERROR, m.group(0)),
+            ),
+            RegexCallback(
+                [re.compile(f".*{re.escape(_VIDEO_ENCODE_ERROR_LINE)}.*")],
+                lambda m: record(VIDEO_ENCODE_ERROR, m.group(0)),
+            ),
+            RegexCallback(
+                [re.compile("KeyShotClient: KeyShot Version ([0-9]+.[0-9]+.[0-9]+)")],
+                lambda m: record(VERSION, m.group(1)),
+            ),
+        ]
+    )
+
+
+def _classifier_handler(record: Callable[[str, str], None]) -> KeyShotOutputHandler:
+    return KeyShotOutputHandler(
+        {
+            COMPLETE: lambda m: record(COMPLETE, ""),
+            PROGRESS: lambda m: record(PROGRESS, m.group(PROGRESS)),
+            ERROR: lambda m: record(ERROR, m.group(ERROR)),
+            VIDEO_ENCODE_ERROR: lambda m: record(VIDEO_ENCODE_ERROR, m.group(VIDEO_ENCODE_ERROR)),
+            VERSION: lambda m: record(VERSION, m.group(VERSION)),
+        }
+    )
+
+
+def _replay(
+    make_handler: Callable[[Callable[[str, str], None]], logging.Handler],
+    log: list[logging.LogRecord],
+) -> tuple[float, list[tuple[int, str, str]]]:
+    dispatched: list[tuple[int, str, str]] = []
+    line_number = 0
+
+    def record(kind: str, value: str) -> None:
+        dispatched.append((line_number, kind, value))
+
+    handler = make_handler(record)
+    start = time.perf_counter()
+    for line_number, log_record in enumerate(log):
+        handler.emit(log_record)
+    return time.perf_counter() - start, dispatched
+
+
+def test_classifier_is_faster_and_dispatches_identically():
+    log = _synthetic_keyshot_log(_LOG_LINES)
+
+    previous_seconds, previous_dispatched = _replay(_previous_regex_handler, log)
+    classifier_seconds, classifier_dispatched = _replay(_classifier_handler, log)
+
+    print(f"\nDispatching {_LOG_LINES} lines of KeyShot output")
+    for name, seconds in (
+        ("regex callbacks", previous_seconds),
+        ("classifier", classifier_seconds),
+    ):
+        print(f"  {name:>15}: {seconds:6.2f} s, {_LOG_LINES / seconds:10.0f} lines/s")
+    print(f"  speedup: {previous_seconds / classifier_seconds:.1f}x")
+
+    assert classifier_dispatched == previous_dispatched
+    assert classifier_seconds < previous_seconds
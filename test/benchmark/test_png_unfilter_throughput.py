@@ -0,0 +1,153 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+"""
+Compares the time the tile stitcher takes to read an adaptively filtered PNG image, like the
+images KeyShot and libpng write, against reversing the Average and Paeth filters byte by byte as
+the stitcher did before, and checks that both read the same pixels.
+
+The size of the image can be changed with the KEYSHOT_BENCHMARK_PNG_SIZE environment variable.
+"""
+from __future__ import annotations
+
+import os
+import struct
+import time
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+from deadline.keyshot_adaptor.KeyShotAdaptor.tile_stitcher import read_png
+
+_SIZE = int(os.environ.get("KEYSHOT_BENCHMARK_PNG_SIZE", "2048"))
+_CHANNELS = 4
+
+
+def _predictors(rows: np.ndarray, bytes_per_pixel: int) -> list[np.ndarray]:
+    """The predictor of every byte for each of the five filter types"""
+    rows = rows.astype(np.int16)
+    up = np.zeros_like(rows)
+    up[1:] = rows[:-1]
+    left = np.zeros_like(rows)
+    left[:, bytes_per_pixel:] = rows[:, :-bytes_per_pixel]
+    up_left = np.zeros_like(rows)
+    up_left[1:, bytes_per_pixel:] = rows[:-1, :-bytes_per_pixel]
+    distance_left = np.abs(up - up_left)
+    distance_up = np.abs(left - up_left)
+    distance_up_left = np.abs(left + up - 2 * up_left)
+    paeth = np.where(
+        (distance_left <= distance_up) & (distance_left <= distance_up_left),
+        left,
+        np.where(distance_up <= distance_up_left, up, up_left),
+    )
+    return [np.zeros_like(rows), left, up, (left + up) >> 1, paeth]
+
+
+def _write_adaptive_png(path: Path, pixels: np.ndarray) -> np.ndarray:
+    """
+    Writes an 8 bit PNG image with the filter of each scanline chosen like libpng does, by the
+    smallest sum of the filtered bytes as signed values.
+
+    Returns:
+        np.ndarray: The filter type of each scanline.
+    """
+    height, width, channels = pixels.shape
+    rows = pixels.reshape(height, -1)
+    filtered = np.stack(
+        [(rows - predictor).astype(np.uint8) for predictor in _predictors(rows, channels)]
+    )
+    filter_types = np.abs(filtered.view(np.int8).astype(np.int64)).sum(axis=2).argmin(axis=0)
+    scanlines = np.empty((height, rows.shape[1] + 1), dtype=np.uint8)
+    scanlines[:, 0] = filter_types
+    scanlines[:, 1:] = filtered[filter_types, np.arange(height)]
+
+    def chunk(chunk_type: bytes, data: bytes) -> bytes:
+        crc = struct.pack(">I", zlib.crc32(chunk_type + data))
+        return struct.pack(">I", len(data)) + chunk_type + data + crc
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)
+    path.write_bytes(
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", header)
+        + chunk(b"IDAT", zlib.compress(scanlines.tobytes(), 6))
+        + chunk(b"IEND", b"")
+    )
+    return filter_types
+
+
+def _rendered_image(size: int) -> np.ndarray:
+    """Smooth gradients with noise and hard edges, so that every filter type gets chosen"""
+    rng = np.random.default_rng(0)
+    y, x = np.mgrid[0:size, 0:size].astype(np.float64) / size
+    image = np.empty((size, size, _CHANNELS), dtype=np.float64)
+    image[..., 0] = 255 * x
+    image[..., 1] = 255 * (0.5 + 0.5 * np.sin(12 * x + 7 * y))
+    image[..., 2] = 255 * ((x - 0.5) ** 2 + (y - 0.5) ** 2 < 0.1)
+    image[..., 3] = 255
+    image[: size // 2, :, :3] += rng.normal(0, 6, (size // 2, size, 3))
+    return np.clip(image, 0, 255).astype(np.uint8)
+
+
+def _read_png_bytewise(path: Path) -> np.ndarray:
+    """Reads an 8 bit RGBA PNG image, reversing the filters byte by byte"""
+    data = path.read_bytes()
+    width, height = struct.unpack(">II", data[16:24])
+    idat_length = struct.unpack(">I", data[33:37])[0]
+    raw = zlib.decompress(data[41 : 41 + idat_length])
+    stride = width * _CHANNELS
+    previous = bytearray(stride)
+    rows = []
+    for y in range(height):
+        filter_type = raw[y * (stride + 1)]
+        current = bytearray(raw[y * (stride + 1) + 1 : (y + 1) * (stride + 1)])
+        for i in range(stride):
+            left = current[i - _CHANNELS] if i >= _CHANNELS else 0
+            up = previous[i]
+            up_left = previous[i - _CHANNELS] if i >= _CHANNELS else 0
+            if filter_type == 0:
+                predictor = 0
+            elif filter_type == 1:
+                predictor = left
+            elif filter_type == 2:
+                predictor = up
+            elif filter_type == 3:
+                predictor = (left + up) >> 1
+            else:
+                estimate = left + up - up_left
+                distance_left = abs(estimate - left)
+                distance_up = abs(estimate - up)
+                distance_up_left = abs(estimate - up_left)
+                if distance_left <= distance_up and distance_left <= distance_up_left:
+                    predictor = left
+                elif distance_up <= distance_up_left:
+                    predictor = up
+                else:
+                    predictor = up_left
+            current[i] = (current[i] + predictor) & 0xFF
+        rows.append(bytes(current))
+        previous = current
+    return np.frombuffer(b"".join(rows), dtype=np.uint8).reshape(height, width, _CHANNELS)
+
+
+def test_read_png_is_faster_than_bytewise_unfiltering(tmp_path):
+    pixels = _rendered_image(_SIZE)
+    path = tmp_path / "tile.png"
+    filter_types = _write_adaptive_png(path, pixels)
+
+    start = time.perf_counter()
+    vectorized = read_png(str(path))
+    vectorized_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    bytewise = _read_png_bytewise(path)
+    bytewise_seconds = time.perf_counter() - start
+
+    counts = np.bincount(filter_types, minlength=5)
+    megapixels = _SIZE * _SIZE / 1_000_000
+    print(f"\nReading an adaptively filtered {_SIZE}x{_SIZE} RGBA PNG image")
+    print("  scanlines per filter: " + ", ".join(str(count) for count in counts))
+    for name, seconds in (("byte by byte", bytewise_seconds), ("read_png", vectorized_seconds)):
+        print(f"  {name:>12}: {seconds:6.2f} s, {megapixels / seconds:8.2f} megapixels/s")
+    print(f"  speedup: {bytewise_seconds / vectorized_seconds:.1f}x")
+
+    np.testing.assert_array_equal(vectorized, pixels)
+    np.testing.assert_array_equal(bytewise, pixels)
+    assert vectorized_seconds < bytewise_seconds
@@ -0,0 +1,238 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+"""
+A simulated KeyShot `lux` module with the part of the API that the KeyShot client uses. It prints
+the output that KeyShot prints while rendering and writes small, valid image files, so that the
+adaptor can be run end to end without KeyShot. It is imported by the fake keyshot executable in
+this directory.
+
+The timings are configured with environment variables:
+- FAKE_KEYSHOT_SCENE_LOAD_SECONDS: How long opening a scene takes. Defaults to 0.
+- FAKE_KEYSHOT_RENDER_SECONDS: How long rendering a frame takes. Defaults to 0.
+- FAKE_KEYSHOT_PROGRESS_STEPS: How many progress lines a render prints. Defaults to 4.
+- FAKE_KEYSHOT_VERSION: The KeyShot version, e.g. "2024.3". Defaults to "2024.3".
+
+The cameras, model sets and studios of the scene are configured with FAKE_KEYSHOT_CAMERAS,
+FAKE_KEYSHOT_MODEL_SETS and FAKE_KEYSHOT_STUDIOS, as comma separated names. They default to
+"Camera", "Model Set" and "Studio".
+"""
+from __future__ import annotations
+
+import os
+import random
+import struct
+import sys
+import time
+import zlib
+from typing import Any, Optional
+
+RENDER_OUTPUT_PNG = 0
+RENDER_OUTPUT_JPEG = 1
+RENDER_OUTPUT_EXR = 2
+RENDER_OUTPUT_TIFF8 = 3
+RENDER_OUTPUT_TIFF32 = 4
+RENDER_OUTPUT_PSD8 = 5
+RENDER_OUTPUT_PSD16 = 6
+RENDER_OUTPUT_PSD32 = 7
+
+_SCENE_LOAD_SECONDS = float(os.environ.get("FAKE_KEYSHOT_SCENE_LOAD_SECONDS", "0"))
+_RENDER_SECONDS = float(os.environ.get("FAKE_KEYSHOT_RENDER_SECONDS", "0"))
+_PROGRESS_STEPS = max(int(os.environ.get("FAKE_KEYSHOT_PROGRESS_STEPS", "4")), 1)
+_VERSION = os.environ.get("FAKE_KEYSHOT_VERSION", "2024.3")
+_CAMERAS = os.environ.get("FAKE_KEYSHOT_CAMERAS", "Camera").split(",")
+_MODEL_SETS = os.environ.get("FAKE_KEYSHOT_MODEL_SETS", "Model Set").split(",")
+_STUDIOS = os.environ.get("FAKE_KEYSHOT_STUDIOS", "Studio").split(",")
+
+
+def _png_chunk(kind: bytes, data: bytes) -> bytes:
+    return (
+        struct.pack(">I", len(data))
+        + kind
+        + data
+        + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+    )
+
+
+# A 1x1 grey pixel in each output format, or the header of the format where a valid file is not
+# needed by anything that reads the outputs
+_IMAGES = {
+    RENDER_OUTPUT_PNG: b"\x89PNG\r\n\x1a\n"
+    + _png_chunk(b"IHDR", struct.pack(">IIBBBBB", 1, 1, 8, 0, 0, 0, 0))
+    + _png_chunk(b"IDAT", zlib.compress(b"\x00\x80"))
+    + _png_chunk(b"IEND", b""),
+    RENDER_OUTPUT_JPEG: b"\xff\xd8\xff\xe0\x00\x10JFIF\x00\x01\x01\x00\x00\x01\x00\x01\x00\x00"
+    + b"\xff\xd9",
+    RENDER_OUTPUT_TIFF8: b"II*\x00\x08\x00\x00\x00",
+    RENDER_OUTPUT_TIFF32: b"II*\x00\x08\x00\x00\x00",
+    RENDER_OUTPUT_PSD8: b"8BPS\x00\x01",
+    RENDER_OUTPUT_PSD16: b"8BPS\x00\x01",
+    RENDER_OUTPUT_PSD32: b"8BPS\x00\x01",
+}
+
+_animation_frame = 0
+_camera = _CAMERAS[0]
+_model_set = _MODEL_SETS[0]
+_studio = _STUDIOS[0]
+
+
+def _exr_attribute(name: str, attribute_type: str, value: bytes) -> bytes:
+    return f"{name}\x00{attribute_type}\x00".encode() + struct.pack("<i", len(value)) + value
+
+
+def _exr_image(width: int, height: int, seed: Optional[int]) -> bytes:
+    """
+    Returns an uncompressed RGB OpenEXR image of a gradient, with noise that depends on the seed
+    when there is one, so that the average of the images of many seeds approaches the gradient.
+    """
+    noise = random.Random(seed)
+    channels = b"".join(
+        name + b"\x00" + struct.pack("<iB3xii", 2, 0, 1, 1) for name in (b"B", b"G", b"R")
+    )
+    window = struct.pack("<iiii", 0, 0, width - 1, height - 1)
+    header = (
+        b"\x76\x2f\x31\x01\x02\x00\x00\x00"
+        + _exr_attribute("channels", "chlist", channels + b"\x00")
+        + _exr_attribute("compression", "compression", b"\x00")
+        + _exr_attribute("dataWindow", "box2i", window)
+        + _exr_attribute("displayWindow", "box2i", window)
+        + _exr_attribute("lineOrder", "lineOrder", b"\x00")
+        + _exr_attribute("pixelAspectRatio", "float", struct.pack("<f", 1))
+        + _exr_attribute("screenWindowCenter", "v2f", struct.pack("<ff", 0, 0))
+        + _exr_attribute("screenWindowWidth", "float", struct.pack("<f", 1))
+        + b"\x00"
+    )
+    line_size = 3 * 4 * width
+    offset = len(header) + 8 * height
+    offsets = b"".join(struct.pack("<Q", offset + y * (8 + line_size)) for y in range(height))
+    lines = []
+    for y in range(height):
+        values = [
+            # B, G and R
+            [0.5, y / height, x / width][channel]
+            + (noise.uniform(-0.25, 0.25) if seed is not None else 0)
+            for channel in range(3)
+            for x in range(width)
+        ]
+        lines.append(struct.pack(f"<ii{len(values)}f", y, line_size, *values))
+    return header + offsets + b"".join(lines)
+
+
+def _png_image(width: int, height: int, region: tuple[int, int, int, int]) -> bytes:
+    """
+    Returns an RGB PNG image of the given region of a width x height image, where the color of
+    each pixel depends on its position in the whole image, so that stitched tiles can be checked.
+    """
+    x, y, region_width, region_height = region
+    scanlines = bytearray()
+    for row in range(y, y + region_height):
+        scanlines.append(0)
+        for column in range(x, x + region_width):
+            scanlines += bytes((column % 256, row % 256, (7 * column + 3 * row) % 256))
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + _png_chunk(b"IHDR", struct.pack(">IIBBBBB", region_width, region_height, 8, 2, 0, 0, 0))
+        + _png_chunk(b"IDAT", zlib.compress(bytes(scanlines)))
+        + _png_chunk(b"IEND", b"")
+    )
+
+
+class RenderOptions:
+    def __init__(self) -> None:
+        self._options: dict[str, Any] = {"add_to_queue": True}
+
+    def setAddToQueue(self, add_to_queue: bool) -> None:
+        self._options["add_to_queue"] = add_to_queue
+
+    def setRegion(self, region: tuple[int, int, int, int]) -> None:
+        self._options["region"] = region
+
+    def setMaxSamplesRendering(self, samples: int) -> None:
+        self._options["max_samples"] = samples
+
+    def setSeed(self, seed: int) -> None:
+        self._options["seed"] = seed
+
+    def __repr__(self) -> str:
+        return f"RenderOptions({self._options})"
+
+
+def getKeyShotDisplayVersion() -> tuple[int, int]:
+    major, minor = _VERSION.split(".")[:2]
+    return int(major), int(minor)
+
+
+def openFile(path: str) -> bool:
+    print(f"Loading scene {path}")
+    time.sleep(_SCENE_LOAD_SECONDS)
+    print(f"Scene loaded in {_SCENE_LOAD_SECONDS:.2f} seconds")
+    return True
+
+
+def getCameras() -> list[str]:
+    return list(_CAMERAS)
+
+
+def setCamera(name: str) -> bool:
+    global _camera
+    if name not in _CAMERAS:
+        return False
+    _camera = name
+    return True
+
+
+def getModelSets() -> list[str]:
+    return list(_MODEL_SETS)
+
+
+def setModelSet(name: str) -> bool:
+    global _model_set
+    if name not in _MODEL_SETS:
+        return False
+    _model_set = name
+    return True
+
+
+def getStudios() -> list[str]:
+    return list(_STUDIOS)
+
+
+def setStudio(name: str) -> bool:
+    global _studio
+    if name not in _STUDIOS:
+        return False
+    _studio = name
+    return True
+
+
+def getRenderOptions() -> RenderOptions:
+    return RenderOptions()
+
+
+def setAnimationFrame(frame: int) -> None:
+    global _animation_frame
+    _animation_frame = frame
+
+
+def renderImage(
+    path: str,
+    width: Optional[int] = None,
+    height: Optional[int] = None,
+    opts: Optional[RenderOptions] = None,
+    format: int = RENDER_OUTPUT_PNG,
+) -> bool:
+    for step in range(1, _PROGRESS_STEPS + 1):
+        time.sleep(_RENDER_SECONDS / _PROGRESS_STEPS)
+        print(f"Rendering: {100 * step // _PROGRESS_STEPS}%")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    options = opts._options if opts is not None else {}
+    region = options.get("region")
+    with open(path, "wb") as image_file:
+        if format == RENDER_OUTPUT_EXR:
+            image_file.write(_exr_image(width or 1, height or 1, options.get("seed")))
+        elif format == RENDER_OUTPUT_PNG and (width or region):
+            # A region render is written with the size of the region
+            width, height = width or 1, height or 1
+            image_file.write(_png_image(width, height, region or (0, 0, width, height)))
+        else:
+            image_file.write(_IMAGES[format])
+    sys.stdout.flush()
+    return True
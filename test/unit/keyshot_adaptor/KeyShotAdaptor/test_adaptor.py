@@ -1,10 +1,31 @@
 # Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
 import json
+import logging
+import os
+import re
+import threading
+import time
 from pathlib import Path
+from typing import Optional
+from unittest.mock import Mock
 
 import pytest
+from openjd.adaptor_runtime_client import Action
 
-from deadline.keyshot_adaptor.KeyShotAdaptor.adaptor import KeyShotAdaptor
+from deadline.keyshot_adaptor.KeyShotAdaptor import adaptor as adaptor_module
+from deadline.keyshot_adaptor.KeyShotAdaptor.adaptor import (
+    KeyShotAdaptor,
+    KeyShotNotRunningError,
+    _parse_frames,
+)
+from deadline.keyshot_adaptor.KeyShotAdaptor.output_handler import (
+    COMPLETE,
+    KeyShotOutputClassifier,
+    KeyShotOutputHandler,
+)
+from deadline.keyshot_adaptor.KeyShotAdaptor.pool import PooledKeyShotProcess
+from deadline.keyshot_adaptor.KeyShotAdaptor.render_metrics import ProcessSample
+from deadline.keyshot_adaptor.KeyShotAdaptor.shots import expand_shots
 
 # if this changes, the `integration_data_interface_version` should also be bumped
 CURRENT_INIT_DATA_SCHEMA = {
@@ -25,6 +46,17 @@ CURRENT_INIT_DATA_SCHEMA = {
                 "RENDER_OUTPUT_PSD32",
             ]
         },
+        "force_scene_reload": {"type": "boolean"},
+        "image_width": {"type": "integer", "minimum": 1},
+        "image_height": {"type": "integer", "minimum": 1},
+        "tiles": {
+            "type": "object",
+            "properties": {
+                "rows": {"type": "integer", "minimum": 1},
+                "columns": {"type": "integer", "minimum": 1},
+            },
+            "required": ["rows", "columns"],
+        },
     },
     "required": ["scene_file"],
 }
@@ -33,7 +65,44 @@ CURRENT_INIT_DATA_SCHEMA = {
 CURRENT_RUN_DATA_SCHEMA = {
     "$schema": "https://json-schema.org/draft/2020-12/schema",
     "type": "object",
-    "properties": {"frame": {"type": "number"}},
+    "properties": {
+        "frame": {
+            "anyOf": [
+                {"type": "number"},
+                {"type": "string", "pattern": "^[0-9 ,:-]+$"},
+                {"type": "array", "items": {"type": "number"}, "minItems": 1},
+            ]
+        },
+        "camera": {
+            "anyOf": [
+                {"type": "string", "minLength": 1},
+                {"type": "array", "items": {"type": "string", "minLength": 1}, "minItems": 1},
+            ]
+        },
+        "studio": {
+            "anyOf": [
+                {"type": "string", "minLength": 1},
+                {"type": "array", "items": {"type": "string", "minLength": 1}, "minItems": 1},
+            ]
+        },
+        "model_set": {
+            "anyOf": [
+                {"type": "string", "minLength": 1},
+                {"type": "array", "items": {"type": "string", "minLength": 1}, "minItems": 1},
+            ]
+        },
+        "tile": {
+            "type": "object",
+            "properties": {
+                "row": {"type": "integer", "minimum": 1},
+                "column": {"type": "integer", "minimum": 1},
+            },
+            "required": ["row", "column"],
+        },
+        "samples": {"type": "integer", "minimum": 1},
+        "seed": {"type": "integer", "minimum": 0},
+    },
+    "dependentRequired": {"samples": ["seed"], "seed": ["samples"]},
     "required": ["frame"],
 }
 
@@ -83,4 +152,677 @@ def test_if_init_data_and_run_data_schema_are_changed_schema_version_is_bumped(i
     # if init_data.schema.json or run_data.schema.json are changed, these must
     # also be bumped
     assert semantic_version.major == 0
-    assert semantic_version.minor == 1
+    assert semantic_version.minor == 7
+
+
+def test_dequeue_action_wakes_up_waiters(init_data):
+    adaptor = KeyShotAdaptor(init_data)
+    adaptor._STATE_CHANGE_FALLBACK_SECONDS = 60
+    adaptor._action_queue.enqueue_action(Action("scene_file", {}))
+
+    dequeuer = threading.Timer(0.05, adaptor._action_queue.dequeue_action)
+    dequeuer.start()
+    assert adaptor._wait_for_state(lambda: len(adaptor._action_queue) == 0, timeout=5)
+    dequeuer.join()
+
+
+def test_dequeue_action_waits_for_an_action_to_be_enqueued(init_data):
+    adaptor = KeyShotAdaptor(init_data)
+    enqueuer = threading.Timer(
+        0.05, adaptor._action_queue.enqueue_action, args=(Action("render", {"frames": [1]}),)
+    )
+
+    assert adaptor._action_queue.dequeue_action(timeout=0.01) is None
+    enqueuer.start()
+    assert adaptor._action_queue.dequeue_action(timeout=60) == Action("render", {"frames": [1]})
+    enqueuer.join()
+
+
+def test_wait_for_state_times_out(init_data):
+    adaptor = KeyShotAdaptor(init_data)
+
+    assert not adaptor._wait_for_state(lambda: False, timeout=0.01)
+
+
+def dequeue_actions(adaptor: KeyShotAdaptor, count: int) -> list:
+    """Dequeues the given number of actions, waiting for the adaptor to enqueue them."""
+    actions: list = []
+    deadline = time.monotonic() + 10
+    while len(actions) < count and time.monotonic() < deadline:
+        action = adaptor._action_queue.dequeue_action(timeout=deadline - time.monotonic())
+        if action is not None:
+            actions.append(action)
+    return actions
+
+
+def complete_match(output_path: Optional[str] = None) -> re.Match:
+    """Returns the match of the line the KeyShot client prints when it rendered an output."""
+    line = f"Finished Rendering {output_path}" if output_path else "Finished Rendering"
+    match = KeyShotOutputClassifier([COMPLETE]).classify(line)
+    assert match is not None
+    return match
+
+
+def test_on_run_returns_when_render_completes(init_data):
+    adaptor = KeyShotAdaptor(init_data)
+    adaptor._STATE_CHANGE_FALLBACK_SECONDS = 60
+    adaptor._keyshot_client = Mock(is_running=True)
+
+    def complete_render():
+        dequeue_actions(adaptor, 1)
+        adaptor._handle_complete(complete_match())
+
+    completer = threading.Timer(0.05, complete_render)
+    completer.start()
+    adaptor.on_run({"frame": 1})
+    completer.join()
+
+    assert not adaptor._keyshot_is_rendering
+
+
+def test_on_run_raises_when_keyshot_errors(init_data):
+    adaptor = KeyShotAdaptor(init_data)
+    adaptor._STATE_CHANGE_FALLBACK_SECONDS = 60
+    adaptor._keyshot_client = Mock(is_running=True)
+
+    error = threading.Timer(0.05, adaptor._handle_error, args=(Mock(),))
+    error.start()
+    with pytest.raises(RuntimeError, match="KeyShot Encountered an Error"):
+        adaptor.on_run({"frame": 1})
+    error.join()
+
+
+def test_on_run_verifies_outputs(init_data, tmp_path, monkeypatch):
+    monkeypatch.setenv("KEYSHOT_ADAPTOR_OUTPUT_MANIFEST_DIR", str(tmp_path / "manifests"))
+    adaptor = KeyShotAdaptor(init_data)
+    adaptor._STATE_CHANGE_FALLBACK_SECONDS = 60
+    adaptor._keyshot_client = Mock(is_running=True)
+    valid = tmp_path / "frame.1.jpg"
+    valid.write_bytes(b"\xff\xd8\xff\xe0 image \xff\xd9")
+
+    def render():
+        dequeue_actions(adaptor, 1)
+        adaptor._handle_complete(complete_match(str(valid)))
+        adaptor._handle_complete(complete_match(str(tmp_path / "frame.2.jpg")))
+
+    renderer = threading.Timer(0.05, render)
+    renderer.start()
+    with pytest.raises(RuntimeError, match="frame.2.jpg: The output does not exist"):
+        adaptor.on_run({"frame": "1-2"})
+    renderer.join()
+
+    assert [record["path"] for record in adaptor._output_verifier.manifest] == [str(valid)]
+    # The next free space check uses the size of the rendered output
+    assert adaptor._largest_output_bytes == valid.stat().st_size
+    assert adaptor._output_verifier.path is not None
+    manifest = json.loads(Path(adaptor._output_verifier.path).read_text())
+    assert manifest["hashAlg"] == "xxh128"
+    assert [record["path"] for record in manifest["paths"]] == [str(valid)]
+    adaptor._output_verifier.close()
+
+
+def test_on_run_copies_outputs_from_scratch_directory(init_data, tmp_path, monkeypatch):
+    monkeypatch.setenv("KEYSHOT_ADAPTOR_SCRATCH_DIR", str(tmp_path / "scratch"))
+    init_data["output_file_path"] = str(tmp_path / "renders" / "frame.%d.png")
+    adaptor = KeyShotAdaptor(init_data)
+    adaptor._STATE_CHANGE_FALLBACK_SECONDS = 60
+    adaptor._keyshot_client = Mock(is_running=True)
+
+    adaptor._populate_action_queue()
+    actions = dequeue_actions(adaptor, 3)
+    scratch_path = actions[1].args["output_file_path"]
+    assert scratch_path.startswith(str(tmp_path / "scratch"))
+    assert scratch_path.endswith("frame.%d.png")
+
+    def render():
+        dequeue_actions(adaptor, 1)
+        output_path = scratch_path.replace("%d", "1")
+        Path(output_path).write_bytes(b"\x89PNG\r\n\x1a\n pixels IEND\xae\x42\x60\x82")
+        adaptor._handle_complete(complete_match(output_path))
+
+    renderer = threading.Timer(0.05, render)
+    renderer.start()
+    adaptor.on_run({"frame": 1})
+    renderer.join()
+
+    assert (tmp_path / "renders" / "frame.1.png").exists()
+    assert [record["path"] for record in adaptor._output_verifier.manifest] == [
+        str(tmp_path / "renders" / "frame.1.png")
+    ]
+    adaptor._keyshot_client.is_running = False
+    adaptor.on_cleanup()
+    assert list((tmp_path / "scratch").iterdir()) == []
+
+
+def test_wait_for_server_fails_when_server_does_not_start(init_data):
+    adaptor = KeyShotAdaptor(init_data)
+    adaptor._SERVER_START_TIMEOUT_SECONDS = 0
+
+    with pytest.raises(RuntimeError, match="did not finish initializing"):
+        adaptor._wait_for_server()
+
+
+@pytest.mark.parametrize(
+    "frame, expected",
+    [
+        (5, [5]),
+        (5.0, [5]),
+        ("5", [5]),
+        ([3, 1, 2], [3, 1, 2]),
+        ("1-4", [1, 2, 3, 4]),
+        ("1-10:3", [1, 4, 7, 10]),
+        ("3-1", [3, 2, 1]),
+        ("1-3,8,11-12", [1, 2, 3, 8, 11, 12]),
+    ],
+)
+def test_parse_frames(frame, expected):
+    assert _parse_frames(frame) == expected
+
+
+@pytest.mark.parametrize("frame", ["", "a", "1-", "1-5:0", "1-5:-1"])
+def test_parse_frames_rejects_invalid_range_expressions(frame):
+    with pytest.raises(ValueError, match="Invalid frame range expression"):
+        _parse_frames(frame)
+
+
+def test_on_run_renders_chunk_in_one_call(init_data):
+    adaptor = KeyShotAdaptor(init_data)
+    adaptor._STATE_CHANGE_FALLBACK_SECONDS = 60
+    adaptor._keyshot_client = Mock(is_running=True)
+    actions = []
+
+    def render_chunk():
+        actions.extend(dequeue_actions(adaptor, 1))
+        for _ in range(3):
+            assert adaptor._keyshot_is_rendering
+            adaptor._handle_complete(complete_match())
+
+    renderer = threading.Timer(0.05, render_chunk)
+    renderer.start()
+    adaptor.on_run({"frame": "1-3"})
+    renderer.join()
+
+    assert actions == [
+        Action("render", {"frames": [1, 2, 3]}),
+    ]
+    assert adaptor._progress.produced_outputs == 3
+    assert [event["frame"] for event in adaptor._events.events if event["kind"] == "frame"] == [
+        1,
+        2,
+        3,
+    ]
+    assert not adaptor._keyshot_is_rendering
+
+
+def test_on_run_renders_the_region_of_a_tile(init_data, tmp_path, monkeypatch):
+    monkeypatch.setenv("KEYSHOT_ADAPTOR_SCRATCH_DIR", str(tmp_path / "scratch"))
+    init_data.update(
+        output_file_path=str(tmp_path / "frame.%d.png"),
+        image_width=1920,
+        image_height=1080,
+        tiles={"rows": 2, "columns": 3},
+    )
+    adaptor = KeyShotAdaptor(init_data)
+    adaptor._STATE_CHANGE_FALLBACK_SECONDS = 60
+    adaptor._keyshot_client = Mock(is_running=True)
+    actions = []
+
+    def render_tile():
+        actions.extend(dequeue_actions(adaptor, 1))
+        adaptor._handle_complete(complete_match())
+
+    renderer = threading.Timer(0.05, render_tile)
+    renderer.start()
+    adaptor.on_run({"frame": 1, "tile": {"row": 2, "column": 3}})
+    renderer.join()
+    adaptor._keyshot_client.is_running = False
+    adaptor.on_cleanup()
+
+    (action,) = actions
+    assert action.args["frames"] == [1]
+    assert action.args["region"] == [1280, 540, 640, 540]
+    assert (action.args["width"], action.args["height"]) == (1920, 1080)
+    # Rendered to the scratch directory, next to where the frame is rendered
+    assert action.args["output_file_path"].startswith(str(tmp_path / "scratch"))
+    assert action.args["output_file_path"].endswith("frame.%d.tile-2-3.png")
+
+
+def test_on_run_renders_every_camera_of_the_chunk_in_one_action(init_data):
+    init_data["output_file_path"] = "/renders/frame.%d.png"
+    adaptor = KeyShotAdaptor(init_data)
+    adaptor._STATE_CHANGE_FALLBACK_SECONDS = 60
+    adaptor._keyshot_client = Mock(is_running=True)
+    actions = []
+
+    def render_shots():
+        actions.extend(dequeue_actions(adaptor, 1))
+        for _ in range(4):
+            adaptor._handle_complete(complete_match())
+
+    renderer = threading.Timer(0.05, render_shots)
+    renderer.start()
+    adaptor.on_run({"frame": "1-2", "camera": ["Front", "Top"], "studio": "Packshot"})
+    renderer.join()
+
+    assert actions == [
+        Action(
+            "render",
+            {
+                "shots": [
+                    {
+                        "frames": [1, 2],
+                        "studio": "Packshot",
+                        "camera": camera,
+                        "output_file_path": f"/renders/frame.%d.Packshot.{camera}.png",
+                    }
+                    for camera in ("Front", "Top")
+                ]
+            },
+        )
+    ]
+    assert adaptor._progress.produced_outputs == 4
+    assert [event["frame"] for event in adaptor._events.events if event["kind"] == "frame"] == [
+        1,
+        2,
+        1,
+        2,
+    ]
+
+
+def test_on_run_rejects_a_camera_without_an_output_file_path(init_data):
+    del init_data["output_file_path"]
+    adaptor = KeyShotAdaptor(init_data)
+    adaptor._keyshot_client = Mock(is_running=True)
+
+    with pytest.raises(ValueError, match="requires output_file_path"):
+        adaptor.on_run({"frame": 1, "camera": "Front"})
+
+
+# The smallest file that the output verifier accepts as a PNG
+PNG = b"\x89PNG\r\n\x1a\n" + b"IEND\xae\x42\x60\x82"
+
+
+def test_on_run_copies_cached_outputs_instead_of_rendering(init_data, tmp_path, monkeypatch):
+    monkeypatch.setenv("KEYSHOT_ADAPTOR_RENDER_CACHE_DIR", str(tmp_path / "cache"))
+    scene_file = tmp_path / "scene.bip"
+    scene_file.write_bytes(b"scene")
+    init_data.update(scene_file=str(scene_file), output_file_path=str(tmp_path / "frame.%d.png"))
+    actions = []
+
+    def render(adaptor):
+        actions.extend(dequeue_actions(adaptor, 1))
+        for frame in actions[-1].args["frames"]:
+            output_path = tmp_path / f"frame.{frame}.png"
+            output_path.write_bytes(PNG)
+            adaptor._handle_complete(complete_match(str(output_path)))
+
+    def run_task(frame):
+        adaptor = KeyShotAdaptor(init_data)
+        adaptor._STATE_CHANGE_FALLBACK_SECONDS = 60
+        adaptor._keyshot_client = Mock(is_running=True)
+        adaptor._keyshot_version = "2024.3.0"
+        renderer = threading.Timer(0.05, render, [adaptor])
+        renderer.start()
+        adaptor.on_run({"frame": frame})
+        renderer.join()
+        return adaptor
+
+    run_task("1-2")
+    (tmp_path / "frame.1.png").unlink()
+    # A resubmitted job only renders the frame that was not rendered before
+    adaptor = run_task("1-3")
+
+    assert [action.args["frames"] for action in actions] == [[1, 2], [3]]
+    assert (tmp_path / "frame.1.png").read_bytes() == PNG
+    assert adaptor._render_cache is not None
+    assert (adaptor._render_cache.hits, adaptor._render_cache.misses) == (2, 1)
+
+
+@pytest.mark.parametrize(
+    "run_data, expected",
+    [
+        (
+            {"samples": 64, "seed": 3},
+            {"samples": 64, "seed": 3, "output_file_path": "/renders/frame.%d.seed-3.exr"},
+        ),
+        (
+            {"samples": 64, "seed": 3, "tile": {"row": 1, "column": 2}},
+            {
+                "region": [50, 0, 50, 100],
+                "width": 100,
+                "height": 100,
+                "samples": 64,
+                "seed": 3,
+                "output_file_path": "/renders/frame.%d.tile-1-2.seed-3.exr",
+            },
+        ),
+        (
+            {"samples": 64, "seed": 3, "camera": "Front"},
+            {
+                "camera": "Front",
+                "samples": 64,
+                "seed": 3,
+                "output_file_path": "/renders/frame.%d.Front.seed-3.exr",
+            },
+        ),
+    ],
+)
+def test_get_render_args_renders_samples_with_a_seed(init_data, run_data, expected):
+    init_data.update(
+        output_file_path="/renders/frame.%d.exr",
+        output_format="RENDER_OUTPUT_EXR",
+        image_width=100,
+        image_height=100,
+        tiles={"rows": 1, "columns": 2},
+    )
+    adaptor = KeyShotAdaptor(init_data)
+
+    shots = expand_shots(run_data.get("camera"))
+
+    assert adaptor._get_render_args({"frame": 1, **run_data}, *shots) == expected
+
+
+def test_on_run_rejects_a_seed_without_exr_output(init_data):
+    adaptor = KeyShotAdaptor(init_data)
+    adaptor._keyshot_client = Mock(is_running=True)
+
+    with pytest.raises(ValueError, match="requires the output format RENDER_OUTPUT_EXR"):
+        adaptor.on_run({"frame": 1, "samples": 16, "seed": 1})
+
+
+def test_on_run_rejects_a_tile_without_the_size_of_the_image(init_data):
+    adaptor = KeyShotAdaptor(init_data)
+    adaptor._keyshot_client = Mock(is_running=True)
+
+    with pytest.raises(ValueError, match="image_width, image_height, tiles"):
+        adaptor.on_run({"frame": 1, "tile": {"row": 1, "column": 1}})
+
+
+@pytest.mark.parametrize("crash_retries", [0, 1])
+def test_on_run_rerenders_unfinished_frames_after_keyshot_exits(
+    init_data, crash_retries, monkeypatch
+):
+    monkeypatch.setenv("KEYSHOT_ADAPTOR_CRASH_RETRIES", str(crash_retries))
+    monkeypatch.setenv("KEYSHOT_ADAPTOR_CRASH_RETRY_BACKOFF_SECONDS", "0")
+    adaptor = KeyShotAdaptor(init_data)
+    adaptor._STATE_CHANGE_FALLBACK_SECONDS = 60
+    crashed_client = Mock(is_running=True, returncode=-11)
+    adaptor._keyshot_client = crashed_client
+    adaptor._recycle_keyshot = Mock(  # type: ignore[method-assign]
+        side_effect=lambda reason: setattr(adaptor, "_keyshot_client", Mock(is_running=True))
+    )
+    actions = []
+
+    def crash_then_render():
+        actions.extend(dequeue_actions(adaptor, 1))
+        adaptor._handle_complete(complete_match())
+        with adaptor._state_changed:
+            crashed_client.is_running = False
+            adaptor._state_changed.notify_all()
+        if crash_retries:
+            actions.extend(dequeue_actions(adaptor, 1))
+            for _ in range(2):
+                adaptor._handle_complete(complete_match())
+
+    renderer = threading.Timer(0.05, crash_then_render)
+    renderer.start()
+    if crash_retries:
+        adaptor.on_run({"frame": "1-3"})
+    else:
+        with pytest.raises(KeyShotNotRunningError, match="Exit code -11"):
+            adaptor.on_run({"frame": "1-3"})
+    renderer.join()
+
+    if crash_retries:
+        adaptor._recycle_keyshot.assert_called_once_with(
+            "it exited unexpectedly with exit code -11"
+        )
+        assert actions[1:] == [
+            Action("render", {"frames": [2, 3]}),
+        ]
+        assert adaptor._progress.produced_outputs == 3
+        recoveries = [event for event in adaptor._events.events if event["kind"] == "recovery"]
+        assert [(event["attempt"], event["exit_code"]) for event in recoveries] == [(1, -11)]
+    else:
+        adaptor._recycle_keyshot.assert_not_called()
+
+
+def test_on_run_does_not_recover_after_cancel(init_data, monkeypatch):
+    monkeypatch.setenv("KEYSHOT_ADAPTOR_CRASH_RETRIES", "3")
+    adaptor = KeyShotAdaptor(init_data)
+    adaptor._keyshot_client = Mock(is_running=True)
+    adaptor._keyshot_client.terminate.side_effect = lambda grace_time_s: setattr(
+        adaptor._keyshot_client, "is_running", False
+    )
+
+    adaptor.on_cancel()
+
+    with pytest.raises(KeyShotNotRunningError, match="KeyShot is not running"):
+        adaptor.on_run({"frame": 1})
+
+
+@pytest.mark.parametrize(
+    "error, worn_out, retire", [(False, False, False), (True, False, True), (False, True, True)]
+)
+def test_on_cleanup_returns_pooled_keyshot_to_pool(init_data, error, worn_out, retire):
+    adaptor = KeyShotAdaptor(init_data)
+    adaptor._pool = Mock(should_retire=Mock(return_value=worn_out))
+    adaptor._keyshot_client = Mock(spec=PooledKeyShotProcess, is_running=False)
+    if error:
+        adaptor._exc_info = RuntimeError("KeyShot Encountered an Error")
+
+    adaptor.on_cleanup()
+
+    assert adaptor._action_queue.dequeue_action() == Action("close", {"retire": retire})
+    adaptor._pool.release.assert_called_once_with(adaptor._keyshot_client)
+
+
+def test_on_start_launches_keyshot_while_the_session_is_prepared(init_data, tmp_path, monkeypatch):
+    monkeypatch.setenv("KEYSHOT_ADAPTOR_SCENE_CACHE_DIR", str(tmp_path / "cache"))
+    (tmp_path / "scene.bip").write_bytes(b"scene")
+    init_data["scene_file"] = str(tmp_path / "scene.bip")
+    init_data["output_file_path"] = str(tmp_path / "renders" / "frame.%d.png")
+    adaptor = KeyShotAdaptor(init_data)
+    adaptor._STATE_CHANGE_FALLBACK_SECONDS = 60
+    adaptor._telemetry = Mock()
+    adaptor._prefetcher = None
+    launched = threading.Event()
+    performed: list = []
+    keyshot = threading.Thread(target=lambda: performed.extend(dequeue_actions(adaptor, 3)))
+
+    def start_keyshot_client():
+        adaptor._keyshot_client = Mock(is_running=True)
+        launched.set()
+        # KeyShot waits for its first actions until they are queued
+        keyshot.start()
+
+    def stage_scene():
+        # Only finishes if KeyShot is launched while the scene is staged
+        assert launched.wait(timeout=10)
+
+    adaptor._start_keyshot_server_thread = Mock()  # type: ignore[method-assign]
+    adaptor._start_keyshot_client = Mock(side_effect=start_keyshot_client)  # type: ignore[method-assign]
+    adaptor._stage_scene = Mock(side_effect=stage_scene)  # type: ignore[method-assign]
+
+    adaptor.on_start()
+    keyshot.join()
+
+    assert [action.name for action in performed] == [
+        "scene_file",
+        "output_file_path",
+        "output_format",
+    ]
+    assert (tmp_path / "renders").is_dir()
+    adaptor._telemetry.start.assert_called_once_with()
+    assert {
+        "phase.preflight",
+        "phase.startup",
+        "phase.start_server",
+        "phase.launch_keyshot",
+        "phase.stage_scene",
+        "phase.start_telemetry",
+        "phase.queue_actions",
+    } <= set(adaptor._events.durations())
+
+
+def test_on_start_fails_before_launching_keyshot_when_the_scene_is_missing(init_data, tmp_path):
+    init_data["scene_file"] = str(tmp_path / "missing.bip")
+    adaptor = KeyShotAdaptor(init_data)
+    adaptor._start_keyshot_client = Mock()  # type: ignore[method-assign]
+
+    with pytest.raises(FileNotFoundError, match="missing.bip does not exist"):
+        adaptor.on_start()
+
+    adaptor._start_keyshot_client.assert_not_called()
+
+
+def test_check_free_space_covers_the_outputs_of_the_task(init_data, tmp_path, monkeypatch):
+    monkeypatch.setenv("KEYSHOT_ADAPTOR_FREE_SPACE_MARGIN_MB", "1")
+    monkeypatch.setenv("KEYSHOT_ADAPTOR_SCRATCH_DIR", str(tmp_path / "scratch"))
+    init_data.update(
+        output_file_path=str(tmp_path / "renders" / "frame.%d.exr"),
+        output_format="RENDER_OUTPUT_EXR",
+        image_width=200,
+        image_height=100,
+    )
+    adaptor = KeyShotAdaptor(init_data)
+    check_free_space = Mock()
+    monkeypatch.setattr(adaptor_module, "check_free_space", check_free_space)
+
+    adaptor._check_free_space(output_count=3)
+    # Once the session rendered outputs, their size is used instead of the estimate
+    adaptor._largest_output_bytes = 5000
+    adaptor._check_free_space(output_count=3)
+
+    # A compressed EXR output is estimated at half the size of its uncompressed pixels, and the
+    # scratch directory only holds an output until it is moved to the output directory
+    estimated_bytes = 200 * 100 * 16 // 2
+    assert check_free_space.call_args_list == [
+        ((str(tmp_path / "renders"), 3 * estimated_bytes + 1024 * 1024),),
+        ((str(tmp_path / "scratch"), estimated_bytes + 1024 * 1024),),
+        ((str(tmp_path / "renders"), 3 * 5000 + 1024 * 1024),),
+        ((str(tmp_path / "scratch"), 5000 + 1024 * 1024),),
+    ]
+
+
+def test_start_prefetch_reads_the_scene_and_the_attached_inputs(init_data, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    inputs = tmp_path / "assetroot-1234"
+    rules = [
+        {
+            "source_path_format": "WINDOWS",
+            "source_path": "C:\\assets",
+            "destination_path": str(inputs),
+        },
+        # Shared storage that is mapped outside of the session directory is not prefetched
+        {"source_path_format": "WINDOWS", "source_path": "Z:\\", "destination_path": "/mnt/share"},
+    ]
+    adaptor = KeyShotAdaptor(init_data, path_mapping_data={"path_mapping_rules": rules})
+    adaptor._prefetcher = Mock()
+
+    adaptor._start_prefetch()
+
+    adaptor._prefetcher.prefetch.assert_called_once_with([init_data["scene_file"], str(inputs)])
+
+
+def test_stage_scene_opens_the_copy_in_the_scene_cache(init_data, tmp_path, monkeypatch):
+    monkeypatch.setenv("KEYSHOT_ADAPTOR_SCENE_CACHE_DIR", str(tmp_path / "cache"))
+    scene_file = tmp_path / "share" / "scene.bip"
+    scene_file.parent.mkdir()
+    scene_file.write_bytes(b"scene")
+    init_data["scene_file"] = str(scene_file)
+    adaptor = KeyShotAdaptor(init_data)
+
+    adaptor._stage_scene()
+    adaptor._populate_action_queue()
+
+    action = dequeue_actions(adaptor, 1)[0]
+    assert action.name == "scene_file"
+    staged_scene = action.args["scene_file"]
+    assert os.path.dirname(staged_scene) == str(tmp_path / "cache" / "scenes")
+    assert Path(staged_scene).read_bytes() == b"scene"
+    # The render cache reuses the digest of the scene instead of hashing it again
+    assert staged_scene.endswith(f"{adaptor._scene_digest}.bip")
+
+
+@pytest.mark.parametrize("force_scene_reload", [False, True])
+def test_populate_action_queue_passes_scene_reload_options(
+    init_data, force_scene_reload, monkeypatch
+):
+    monkeypatch.setenv("KEYSHOT_ADAPTOR_SCENE_CONTENT_HASH", "true")
+    init_data["force_scene_reload"] = force_scene_reload
+    adaptor = KeyShotAdaptor(init_data)
+
+    adaptor._populate_action_queue()
+
+    assert adaptor._action_queue.dequeue_action() == Action(
+        "scene_file",
+        {
+            "scene_file": init_data["scene_file"],
+            "force_reload": force_scene_reload,
+            "content_hash": True,
+        },
+    )
+
+
+def test_records_keyshot_handshake_and_action_timings(init_data):
+    adaptor = KeyShotAdaptor(init_data)
+    handler = KeyShotOutputHandler(adaptor._get_output_callbacks())
+    adaptor._keyshot_launched_at = adaptor._events.now()
+
+    for line in [
+        "KeyShotClient: KeyShot Version 2024.3.1",
+        "KeyShotClient: Action scene_file took 2.500s",
+    ]:
+        handler.emit(logging.LogRecord("keyshot", logging.INFO, "", 0, line, None, None))
+
+    durations = adaptor._events.durations()
+    assert durations.keys() == {"phase.keyshot_handshake", "action.scene_file"}
+    assert durations["action.scene_file"] == 2.5
+    assert adaptor._keyshot_version == "2024.3.1"
+
+
+def test_get_recycle_reason(init_data, monkeypatch):
+    monkeypatch.setenv("KEYSHOT_ADAPTOR_RECYCLE_MAX_FRAMES", "2")
+    monkeypatch.setenv("KEYSHOT_ADAPTOR_RECYCLE_RSS_MB", "100")
+    adaptor = KeyShotAdaptor(init_data)
+    adaptor._keyshot_client = Mock(is_running=True, pid=1234)
+    rss = {"bytes": 50 * 1024 * 1024}
+    monkeypatch.setattr(
+        adaptor_module,
+        "read_process_sample",
+        lambda pid: ProcessSample(0.0, 0.0, rss["bytes"], 1),
+    )
+
+    assert adaptor._get_recycle_reason() is None
+    rss["bytes"] = 150 * 1024 * 1024
+    assert adaptor._get_recycle_reason() == "it uses 150 MB of memory"
+    adaptor._frames_rendered_by_keyshot = 2
+    assert adaptor._get_recycle_reason() == "it rendered 2 frames"
+
+
+def test_recycle_keyshot_replays_initialization(init_data):
+    adaptor = KeyShotAdaptor(init_data)
+    adaptor._STATE_CHANGE_FALLBACK_SECONDS = 60
+    adaptor._keyshot_client = Mock(is_running=True)
+    performed = []
+
+    def stop_keyshot_client(retire):
+        adaptor._action_queue.enqueue_action(Action("close"), front=True)
+        adaptor._keyshot_client = None
+
+    def start_keyshot_client():
+        adaptor._keyshot_client = Mock(is_running=True)
+        performed.extend(dequeue_actions(adaptor, 3))
+
+    adaptor._stop_keyshot_client = Mock(side_effect=stop_keyshot_client)  # type: ignore[method-assign]
+    adaptor._start_keyshot_client = Mock(side_effect=start_keyshot_client)  # type: ignore[method-assign]
+
+    adaptor._recycle_keyshot("it rendered 2 frames")
+
+    adaptor._stop_keyshot_client.assert_called_once_with(retire=True)
+    assert [action.name for action in performed] == [
+        "scene_file",
+        "output_file_path",
+        "output_format",
+    ]
@@ -0,0 +1,164 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+from __future__ import annotations
+
+import json
+import sys
+from typing import Any, Optional
+from unittest.mock import Mock
+
+import pytest
+
+from deadline.keyshot_adaptor.KeyShotAdaptor import daemon_client
+from deadline.keyshot_adaptor.KeyShotAdaptor.daemon_client import (
+    AdaptorFailedError,
+    is_daemon_client_command,
+    run_daemon_command,
+)
+
+
+def heartbeat(state: str, status: str, output: str = "", failed: bool = False) -> bytes:
+    output_id = "chunk-" + str(abs(hash(output))) if output else "EMPTY"
+    return json.dumps(
+        {
+            "state": state,
+            "status": status,
+            "output": {"id": output_id, "output": output},
+            "failed": failed,
+        }
+    ).encode()
+
+
+class FakeDaemon:
+    """Answers the requests of the client with the heartbeats it is given, in order."""
+
+    def __init__(self, *heartbeats: bytes) -> None:
+        self.heartbeats = list(heartbeats)
+        self.requests: list[tuple[str, str, Optional[dict], Optional[dict]]] = []
+
+    def request(
+        self, method: str, path: str, params: Optional[dict] = None, body: Optional[dict] = None
+    ) -> bytes:
+        self.requests.append((method, path, params, body))
+        if path == "/heartbeat":
+            return self.heartbeats.pop(0) if self.heartbeats else heartbeat("run", "idle")
+        return b""
+
+
+@pytest.fixture
+def connection_file(tmp_path):
+    path = tmp_path / "connection.json"
+    path.write_text(json.dumps({"socket": str(tmp_path / "socket")}))
+    return str(path)
+
+
+@pytest.fixture(autouse=True)
+def fake_signals(monkeypatch):
+    monkeypatch.setattr(daemon_client.signal, "signal", Mock())
+
+
+def run_against(monkeypatch, daemon: FakeDaemon, argv: list[str]) -> None:
+    monkeypatch.setattr(
+        daemon_client._DaemonClient,
+        "_request",
+        lambda self, *args, **kwargs: daemon.request(*args, **kwargs),
+    )
+    monkeypatch.setattr(daemon_client._DaemonClient, "_MIN_HEARTBEAT_INTERVAL_SECONDS", 0)
+    run_daemon_command(argv)
+
+
+@pytest.mark.parametrize(
+    "argv, expected",
+    [
+        (["daemon", "run", "--run-data", "{}"], True),
+        (["daemon", "stop"], True),
+        (["daemon", "start", "--init-data", "{}"], False),
+        (["daemon", "run", "--help"], False),
+        (["run", "--run-data", "{}"], False),
+        ([], False),
+    ],
+)
+def test_is_daemon_client_command(argv, expected):
+    assert is_daemon_client_command(argv) is (expected and sys.platform != "win32")
+
+
+def test_run_sends_run_data_and_prints_output_until_idle(monkeypatch, connection_file, capsys):
+    daemon = FakeDaemon(
+        heartbeat("run", "working", "STDOUT: Rendering: 50%\nopenjd_progress: 50.0"),
+        heartbeat("run", "idle", "INFO: Verified 1 output(s)"),
+    )
+
+    run_against(
+        monkeypatch,
+        daemon,
+        ["daemon", "run", "--run-data", '{"frame": 1}', "--connection-file", connection_file],
+    )
+
+    assert daemon.requests[0] == ("PUT", "/run", None, {"frame": 1})
+    # The output of every heartbeat is acknowledged, including the last one
+    acks = [params for method, path, params, body in daemon.requests if path == "/heartbeat"]
+    assert acks[1:] == [
+        {"ack_id": json.loads(reply)["output"]["id"]}
+        for reply in (
+            heartbeat("run", "working", "STDOUT: Rendering: 50%\nopenjd_progress: 50.0"),
+            heartbeat("run", "idle", "INFO: Verified 1 output(s)"),
+        )
+    ]
+    assert capsys.readouterr().out.splitlines() == [
+        "ADAPTOR_OUTPUT: STDOUT: Rendering: 50%",
+        "openjd_progress: 50.0",
+        "ADAPTOR_OUTPUT: INFO: Verified 1 output(s)",
+    ]
+
+
+def test_run_raises_when_the_adaptor_fails(monkeypatch, connection_file):
+    daemon = FakeDaemon(heartbeat("run", "idle", "openjd_fail: no frame", failed=True))
+
+    with pytest.raises(AdaptorFailedError, match="openjd_fail: no frame"):
+        run_against(
+            monkeypatch,
+            daemon,
+            ["daemon", "run", "--run-data", "{}", "--connection-file", connection_file],
+        )
+
+
+def test_stop_waits_for_cleanup_then_shuts_down(monkeypatch, connection_file):
+    daemon = FakeDaemon(heartbeat("stop", "working"), heartbeat("cleanup", "idle"))
+
+    run_against(monkeypatch, daemon, ["daemon", "stop", "--connection-file", connection_file])
+
+    assert [(method, path) for method, path, _, _ in daemon.requests] == [
+        ("PUT", "/stop"),
+        ("GET", "/heartbeat"),
+        ("GET", "/heartbeat"),
+        ("PUT", "/shutdown"),
+    ]
+
+
+def test_uses_socket_from_environment_without_connection_file(monkeypatch):
+    monkeypatch.setenv("OPENJD_ADAPTOR_SOCKET", "/tmp/socket")
+    assert daemon_client._load_socket_path(None) == "/tmp/socket"
+
+    monkeypatch.delenv("OPENJD_ADAPTOR_SOCKET")
+    with pytest.raises(RuntimeError):
+        daemon_client._load_socket_path(None)
+
+
+@pytest.mark.parametrize(
+    "data, expected",
+    [
+        ("", {}),
+        ('{"frame": 1}', {"frame": 1}),
+        ("frame: 1-10", {"frame": "1-10"}),
+    ],
+)
+def test_load_data(data: str, expected: dict[str, Any]):
+    assert daemon_client._load_data(data) == expected
+
+
+def test_load_data_from_file(tmp_path):
+    run_data = tmp_path / "run_data.json"
+    run_data.write_text('{"frame": 2}')
+
+    assert daemon_client._load_data(f"file://{run_data}") == {"frame": 2}
+    with pytest.raises(ValueError):
+        daemon_client._load_data("[1, 2]")
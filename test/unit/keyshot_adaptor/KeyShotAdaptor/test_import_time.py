@@ -0,0 +1,62 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+"""
+Every `keyshot-openjd` command starts a new Python process. The `daemon run` of each task must
+not import the adaptor or the OpenJD adaptor runtime, and the adaptor must not import anything it
+does not need to start. How long the import takes is measured by
+test/benchmark/test_import_time.py.
+"""
+from __future__ import annotations
+
+import re
+import subprocess
+import sys
+
+_ADAPTOR_MODULE = "deadline.keyshot_adaptor.KeyShotAdaptor.adaptor"
+_ENTRY_POINT_MODULE = "deadline.keyshot_adaptor.KeyShotAdaptor.__main__"
+# Only imported once they are used, from a background thread
+_DEFERRED_MODULES = ("boto3", "botocore", "deadline.client")
+# Optional dependencies that only the steps that assemble the outputs of a frame import
+_ASSEMBLY_MODULES = ("numpy",)
+
+
+def _import(module: str) -> dict[str, float]:
+    """
+    Imports a module in a new Python process.
+
+    Returns:
+        dict[str, float]: The cumulative import time in seconds of each imported module.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    import_times = {}
+    for line in result.stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \|\s*(\S+)", line)
+        if match:
+            import_times[match.group(2)] = int(match.group(1)) / 1_000_000
+    return import_times
+
+
+def test_adaptor_does_not_import_deferred_modules():
+    imported = _import(_ADAPTOR_MODULE)
+
+    assert [module for module in imported if module.startswith(_DEFERRED_MODULES)] == []
+
+
+def test_adaptor_does_not_import_assembly_dependencies():
+    imported = _import(_ADAPTOR_MODULE)
+
+    assert [module for module in imported if module.startswith(_ASSEMBLY_MODULES)] == []
+
+
+def test_entry_point_does_not_import_adaptor_or_runtime():
+    imported = _import(_ENTRY_POINT_MODULE)
+
+    assert [
+        module
+        for module in imported
+        if module.startswith((_ADAPTOR_MODULE, "openjd.adaptor_runtime", *_DEFERRED_MODULES))
+    ] == []
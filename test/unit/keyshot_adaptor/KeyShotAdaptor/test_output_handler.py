@@ -0,0 +1,92 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+import logging
+from unittest.mock import Mock
+
+import pytest
+
+from deadline.keyshot_adaptor.KeyShotAdaptor.output_handler import (
+    ACTION,
+    COMPLETE,
+    ERROR,
+    PROGRESS,
+    VERSION,
+    VIDEO_ENCODE_ERROR,
+    KeyShotOutputClassifier,
+    KeyShotOutputHandler,
+)
+
+ALL_KINDS = [COMPLETE, PROGRESS, ERROR, VIDEO_ENCODE_ERROR, VERSION, ACTION]
+
+
+@pytest.mark.parametrize(
+    "line, expected_groups",
+    [
+        (
+            "Finished Rendering C:/renders/frame.1.png",
+            {COMPLETE: "Finished Rendering", "output_path": "C:/renders/frame.1.png"},
+        ),
+        ("Finished Rendering", {COMPLETE: "Finished Rendering"}),
+        ("Rendering: 42%", {PROGRESS: "42"}),
+        ("Rendering: 10% Rendering: 20%", {PROGRESS: "20"}),
+        ("[ERROR] Could not load texture", {ERROR: "[ERROR] Could not load texture"}),
+        ("render error: out of memory", {ERROR: "render error: out of memory"}),
+        (
+            "You cannot use EXR, TIFF 32 or PSD for the frames when encoding a movie!",
+            {
+                VIDEO_ENCODE_ERROR: (
+                    "You cannot use EXR, TIFF 32 or PSD for the frames when encoding a movie!"
+                )
+            },
+        ),
+        ("KeyShotClient: KeyShot Version 2024.3.1", {VERSION: "2024.3.1"}),
+        (
+            "KeyShotClient: Action scene_file took 12.345s",
+            {ACTION: "scene_file", "action_seconds": "12.345"},
+        ),
+        (
+            "Error: Finished Rendering early, Rendering: 99%",
+            {
+                COMPLETE: "Finished Rendering",
+                "output_path": "early, Rendering: 99%",
+                PROGRESS: "99",
+                ERROR: "Error: Finished Rendering early, Rendering: 99%",
+            },
+        ),
+    ],
+)
+def test_classify(line, expected_groups):
+    match = KeyShotOutputClassifier(ALL_KINDS).classify(line)
+
+    assert match is not None
+    assert {kind: group for kind, group in match.groupdict().items() if group} == expected_groups
+
+
+@pytest.mark.parametrize(
+    "line",
+    ["Loading scene", "Rendering frame 3", "Rendering: abc%", "Errors: 0", "KeyShot Version 12"],
+)
+def test_classify_ignores_other_output(line):
+    match = KeyShotOutputClassifier(ALL_KINDS).classify(line)
+
+    assert match is None or not any(match.groupdict().values())
+
+
+def test_classify_only_detects_enabled_kinds():
+    classifier = KeyShotOutputClassifier([COMPLETE, PROGRESS])
+
+    assert classifier.classify("[Error] Could not load texture") is None
+
+
+def test_handler_calls_callback_of_every_matching_kind_in_order():
+    calls = []
+    callbacks = {
+        kind: Mock(side_effect=lambda match, kind=kind: calls.append(kind)) for kind in ALL_KINDS
+    }
+    handler = KeyShotOutputHandler(callbacks)
+
+    handler.emit(
+        logging.LogRecord("keyshot", logging.INFO, "", 0, "Error: Rendering: 5%", None, None)
+    )
+
+    assert calls == [PROGRESS, ERROR]
+    assert callbacks[PROGRESS].call_args.args[0].group(PROGRESS) == "5"
@@ -0,0 +1,87 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+import shutil
+import threading
+from concurrent.futures import Future
+from unittest.mock import Mock
+
+from deadline.keyshot_adaptor.KeyShotAdaptor.output_mover import OutputMover
+
+
+def test_copies_outputs_to_destination_and_removes_scratch_files(tmp_path):
+    mover = OutputMover()
+    for frame in (1, 2):
+        (tmp_path / f"frame.{frame}.png").write_bytes(b"pixels")
+
+    for frame in (1, 2):
+        mover.submit(
+            str(tmp_path / f"frame.{frame}.png"), str(tmp_path / "final" / f"frame.{frame}.png")
+        )
+
+    assert mover.flush() == []
+    assert sorted(path.name for path in (tmp_path / "final").iterdir()) == [
+        "frame.1.png",
+        "frame.2.png",
+    ]
+    assert not (tmp_path / "frame.1.png").exists()
+    assert mover.close() == []
+
+
+def test_retries_failed_copies(tmp_path):
+    attempts = []
+
+    def flaky_copy(source, destination):
+        attempts.append(source)
+        if len(attempts) == 1:
+            raise OSError("network is unreachable")
+        shutil.copy2(source, destination)
+
+    mover = OutputMover(backoff_seconds=0, copy=flaky_copy)
+    (tmp_path / "frame.png").write_bytes(b"pixels")
+
+    mover.submit(str(tmp_path / "frame.png"), str(tmp_path / "final.png"))
+
+    assert mover.close() == []
+    assert len(attempts) == 2
+    assert (tmp_path / "final.png").read_bytes() == b"pixels"
+
+
+def test_reports_outputs_that_could_not_be_copied(tmp_path):
+    mover = OutputMover(attempts=2, backoff_seconds=0, copy=Mock(side_effect=OSError("disk full")))
+    (tmp_path / "frame.png").write_bytes(b"pixels")
+
+    mover.submit(str(tmp_path / "frame.png"), str(tmp_path / "final.png"))
+    mover.submit(str(tmp_path / "missing.png"), str(tmp_path / "missing_final.png"))
+
+    errors = mover.close()
+    assert errors == [
+        f"{tmp_path / 'final.png'}: disk full",
+        f"{tmp_path / 'missing_final.png'}: {tmp_path / 'missing.png'} does not exist",
+    ]
+    # The scratch file is kept when it could not be copied
+    assert (tmp_path / "frame.png").exists()
+
+
+def test_submit_blocks_while_queue_is_full(tmp_path):
+    submitted = threading.Event()
+    verified: Future = Future()
+    mover = OutputMover(queue_depth=1)
+    (tmp_path / "frame.1.png").write_bytes(b"pixels")
+    (tmp_path / "frame.2.png").write_bytes(b"pixels")
+    (tmp_path / "frame.3.png").write_bytes(b"pixels")
+
+    # The first output is waiting for its verification, the second fills the queue
+    mover.submit(str(tmp_path / "frame.1.png"), str(tmp_path / "final.1.png"), wait_for=verified)
+    mover.submit(str(tmp_path / "frame.2.png"), str(tmp_path / "final.2.png"))
+
+    def submit_third_output():
+        mover.submit(str(tmp_path / "frame.3.png"), str(tmp_path / "final.3.png"))
+        submitted.set()
+
+    submitter = threading.Thread(target=submit_third_output)
+    submitter.start()
+
+    assert not submitted.wait(0.1)
+    verified.set_result(None)
+    submitter.join()
+    assert mover.close() == []
+    assert (tmp_path / "final.3.png").exists()
@@ -0,0 +1,115 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+import json
+from unittest.mock import patch
+
+import pytest
+from xxhash import xxh3_128
+
+from deadline.keyshot_adaptor.KeyShotAdaptor.output_verifier import OutputVerifier, verify_output
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"pixels" + b"\x00\x00\x00\x00IEND\xae\x42\x60\x82"
+
+
+@pytest.mark.parametrize(
+    "name, output_format, contents",
+    [
+        ("frame.png", "RENDER_OUTPUT_PNG", PNG),
+        ("frame.exr", "RENDER_OUTPUT_EXR", b"\x76\x2f\x31\x01pixels"),
+        ("frame.tif", "RENDER_OUTPUT_TIFF8", b"MM\x00*pixels"),
+        ("frame.psd", "RENDER_OUTPUT_PSD16", b"8BPSpixels"),
+        ("frame.unknown", "RENDER_OUTPUT_PNG", b"pixels"),
+        ("frame.png", None, b"pixels"),
+        # The extension does not match the format, so the format is not checked
+        ("frame.png", "RENDER_OUTPUT_EXR", b"\x76\x2f\x31\x01pixels"),
+    ],
+)
+def test_verify_output_hashes_valid_outputs(tmp_path, name, output_format, contents):
+    path = tmp_path / name
+    path.write_bytes(contents)
+
+    record = verify_output(str(path), output_format)
+
+    assert record["error"] is None
+    assert record["size"] == len(contents)
+    assert record["hash"] == xxh3_128(contents).hexdigest()
+
+
+@pytest.mark.parametrize(
+    "name, output_format, contents, error",
+    [
+        ("missing.png", "RENDER_OUTPUT_PNG", None, "does not exist"),
+        ("empty.png", "RENDER_OUTPUT_PNG", b"", "is empty"),
+        ("frame.png", "RENDER_OUTPUT_PNG", b"GIF89a", "not a valid png file"),
+        ("truncated.png", "RENDER_OUTPUT_PNG", PNG[:-4], "not a complete png file"),
+        (
+            "truncated.jpg",
+            "RENDER_OUTPUT_JPEG",
+            b"\xff\xd8\xff\xe0pixels",
+            "not a complete jpg file",
+        ),
+    ],
+)
+def test_verify_output_rejects_invalid_outputs(tmp_path, name, output_format, contents, error):
+    path = tmp_path / name
+    if contents is not None:
+        path.write_bytes(contents)
+
+    record = verify_output(str(path), output_format)
+
+    assert error in record["error"]
+    assert record["hash"] is None
+
+
+def test_verify_output_only_checks_size_without_hash(tmp_path):
+    path = tmp_path / "frame.png"
+    path.write_bytes(b"GIF89a")
+
+    with patch("builtins.open") as mock_open:
+        record = verify_output(str(path), "RENDER_OUTPUT_PNG", compute_hash=False)
+
+    mock_open.assert_not_called()
+    assert record["error"] is None
+    assert record["size"] == 6
+    assert record["hash"] is None
+
+
+def test_output_verifier_does_not_hash_without_manifest_directory(tmp_path):
+    verifier = OutputVerifier(output_format="RENDER_OUTPUT_PNG")
+    (tmp_path / "frame.1.png").write_bytes(PNG)
+    (tmp_path / "frame.2.png").write_bytes(b"")
+
+    verifier.submit(str(tmp_path / "frame.1.png"))
+    verifier.submit(str(tmp_path / "frame.2.png"))
+    results = verifier.wait()
+    verifier.close()
+
+    assert [result["error"] for result in results] == [None, "The output is empty"]
+    assert [result["hash"] for result in results] == [None, None]
+    assert verifier.path is None
+
+
+def test_output_verifier_writes_manifest_of_valid_outputs(tmp_path):
+    verifier = OutputVerifier(str(tmp_path / "manifests"), "RENDER_OUTPUT_PNG")
+    (tmp_path / "frame.1.png").write_bytes(PNG)
+
+    verifier.submit(str(tmp_path / "frame.1.png"))
+    verifier.submit(str(tmp_path / "frame.2.png"))
+    results = verifier.wait()
+    verifier.close()
+
+    assert [result["error"] is None for result in results] == [True, False]
+    assert verifier.path is not None
+    with open(verifier.path, encoding="utf-8") as manifest_file:
+        manifest = json.load(manifest_file)
+    assert manifest == {
+        "hashAlg": "xxh128",
+        "paths": [
+            {
+                "hash": xxh3_128(PNG).hexdigest(),
+                "mtime": results[0]["mtime"],
+                "path": str(tmp_path / "frame.1.png"),
+                "size": len(PNG),
+            }
+        ],
+    }
+    assert verifier.wait() == []
@@ -0,0 +1,270 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+import os
+import subprocess
+import sys
+import threading
+import time
+from unittest import mock
+
+import pytest
+
+from deadline.keyshot_adaptor.KeyShotAdaptor import pool as pool_module
+from deadline.keyshot_adaptor.KeyShotAdaptor.pool import KeyShotProcessPool
+from deadline.keyshot_adaptor._fileutil import ProcessLock, read_json, write_json_atomic
+from deadline.keyshot_adaptor.pool_protocol import (
+    ALIVE_LOCK_FILE,
+    LEASE_FILE,
+    LEASE_LOCK_FILE,
+    PID_FILE,
+    STATE_FILE,
+    STATUS_IDLE,
+    STATUS_LEASED,
+    STATUS_STARTING,
+)
+
+ARGS = ["keyshot", "-headless", "-script", "keyshot_client.py"]
+
+
+@pytest.fixture
+def pool(tmp_path) -> KeyShotProcessPool:
+    return KeyShotProcessPool(str(tmp_path), size=1, max_uses=3)
+
+
+@pytest.fixture
+def idle_slot(pool):
+    """Creates a slot with an idle pooled process that acknowledges the first lease it gets."""
+    slot_dir = os.path.join(pool.pool_dir, "slot")
+    os.makedirs(slot_dir)
+    alive_lock = ProcessLock(os.path.join(slot_dir, ALIVE_LOCK_FILE))
+    alive_lock.try_acquire()
+    state = {
+        "status": STATUS_IDLE,
+        "args": ARGS,
+        "env_fingerprint": pool_module._environment_fingerprint(pool_module._pool_environment()),
+        "pid": os.getpid(),
+        "uses": 1,
+    }
+    write_json_atomic(os.path.join(slot_dir, STATE_FILE), state)
+
+    stop = threading.Event()
+
+    def acknowledge_lease():
+        lease_path = os.path.join(slot_dir, LEASE_FILE)
+        while not os.path.exists(lease_path):
+            if stop.wait(0.01):
+                return
+        lease = read_json(lease_path)
+        assert lease is not None
+        state.update(status=STATUS_LEASED, lease_id=lease["lease_id"])
+        write_json_atomic(os.path.join(slot_dir, STATE_FILE), state)
+
+    thread = threading.Thread(target=acknowledge_lease, daemon=True)
+    thread.start()
+    yield slot_dir
+    stop.set()
+    thread.join()
+    alive_lock.release()
+
+
+def test_process_lock_is_exclusive(tmp_path):
+    path = str(tmp_path / "test.lock")
+    lock = ProcessLock(path)
+    other = ProcessLock(path)
+
+    assert lock.try_acquire()
+    assert not other.try_acquire()
+    assert other.is_held_elsewhere()
+    lock.release()
+    assert not other.is_held_elsewhere()
+    assert other.try_acquire()
+
+
+def test_from_environment(tmp_path, monkeypatch):
+    monkeypatch.delenv("KEYSHOT_ADAPTOR_POOL_DIR", raising=False)
+    assert KeyShotProcessPool.from_environment() is None
+
+    monkeypatch.setenv("KEYSHOT_ADAPTOR_POOL_DIR", str(tmp_path))
+    monkeypatch.setenv("KEYSHOT_ADAPTOR_POOL_SIZE", "2")
+    pool = KeyShotProcessPool.from_environment()
+
+    assert pool is not None
+    assert pool.pool_dir.startswith(str(tmp_path))
+    assert pool.size == 2
+
+
+def test_acquire_leases_idle_process(pool, idle_slot):
+    process = pool.acquire(ARGS, "/tmp/server.sock")
+
+    assert process is not None
+    assert process.slot_dir == idle_slot
+    assert process.uses == 1
+    assert process.is_running
+    assert read_json(os.path.join(idle_slot, LEASE_FILE)) == {
+        "lease_id": mock.ANY,
+        "server_path": "/tmp/server.sock",
+    }
+    assert ProcessLock(os.path.join(idle_slot, LEASE_LOCK_FILE)).is_held_elsewhere()
+
+    # The client removes the lease file when it returns to the pool
+    os.remove(os.path.join(idle_slot, LEASE_FILE))
+    assert not process.is_running
+    pool.release(process)
+    assert not ProcessLock(os.path.join(idle_slot, LEASE_LOCK_FILE)).is_held_elsewhere()
+    assert os.path.isdir(idle_slot)
+
+
+def test_acquire_ignores_processes_started_with_other_arguments(pool, idle_slot):
+    assert pool.acquire(["keyshot", "-script", "other.py"], "/tmp/server.sock") is None
+
+
+@pytest.mark.parametrize(
+    "name, value",
+    [
+        ("PATH", "/other/bin"),
+        ("CONDA_PREFIX", "/other/conda/env"),
+        ("LUXION_LICENSE_FILE", "4986@other-license-server"),
+    ],
+)
+def test_acquire_ignores_processes_started_with_another_environment(
+    pool, idle_slot, monkeypatch, name, value
+):
+    monkeypatch.setenv(name, value)
+
+    assert pool.acquire(ARGS, "/tmp/server.sock") is None
+
+
+def test_acquire_ignores_session_and_adaptor_environment(pool, idle_slot, monkeypatch):
+    monkeypatch.setenv("OPENJD_SESSION_ID", "other-session")
+    monkeypatch.setenv("KEYSHOT_ADAPTOR_SERVER_PATH", "/tmp/other.sock")
+    monkeypatch.setenv("KEYSHOT_ADAPTOR_RECYCLE_MAX_FRAMES", "10")
+
+    process = pool.acquire(ARGS, "/tmp/server.sock")
+
+    assert process is not None
+    pool.release(process)
+
+
+def test_acquire_ignores_leased_processes(pool, idle_slot):
+    lease_lock = ProcessLock(os.path.join(idle_slot, LEASE_LOCK_FILE))
+    lease_lock.try_acquire()
+
+    assert pool.acquire(ARGS, "/tmp/server.sock") is None
+    lease_lock.release()
+
+
+def test_remove_dead_slots(pool, monkeypatch):
+    slot_dir = os.path.join(pool.pool_dir, "dead")
+    os.makedirs(slot_dir)
+    write_json_atomic(os.path.join(slot_dir, STATE_FILE), {"status": STATUS_IDLE, "args": ARGS})
+    os.utime(slot_dir, (0, 0))
+
+    pool.remove_dead_slots()
+
+    assert not os.path.exists(slot_dir)
+
+
+@pytest.mark.parametrize(
+    "state, pid_is_running, removed",
+    [
+        ({"pid": 1234, "started_at": time.time()}, True, False),
+        ({"pid": 1234, "started_at": time.time()}, False, True),
+        ({"pid": 1234, "started_at": time.time() - 3600}, True, True),
+        ({"started_at": time.time()}, False, False),
+        ({"started_at": time.time() - 3600}, False, True),
+    ],
+)
+def test_remove_dead_slots_keeps_starting_processes(
+    pool, monkeypatch, state, pid_is_running, removed
+):
+    slot_dir = os.path.join(pool.pool_dir, "starting")
+    os.makedirs(slot_dir)
+    if "pid" in state:
+        write_json_atomic(os.path.join(slot_dir, PID_FILE), {"pid": state.pop("pid")})
+    state.update(status=STATUS_STARTING, args=ARGS)
+    write_json_atomic(os.path.join(slot_dir, STATE_FILE), state)
+    monkeypatch.setattr(pool_module, "_pid_is_running", mock.Mock(return_value=pid_is_running))
+
+    pool.remove_dead_slots()
+
+    assert os.path.exists(slot_dir) != removed
+
+
+def test_pid_is_running():
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+
+    assert pool_module._pid_is_running(os.getpid())
+    assert not pool_module._pid_is_running(process.pid)
+
+
+def test_start_records_the_pid_and_scrubs_the_environment(pool, monkeypatch):
+    monkeypatch.setenv("OPENJD_SESSION_ID", "session")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "secret")
+    monkeypatch.setenv("DEADLINE_JOB_ID", "job")
+    monkeypatch.setenv("DEADLINE_CLOUD_PYTHONPATH", "/deps")
+    popen = mock.Mock(pid=4321)
+    monkeypatch.setattr(subprocess, "Popen", mock.Mock(return_value=popen))
+
+    slot_dir, lease_lock, _ = pool._start(ARGS, None)
+
+    assert read_json(os.path.join(slot_dir, STATE_FILE)) == {
+        "args": ARGS,
+        "env_fingerprint": pool_module._environment_fingerprint(pool_module._pool_environment()),
+        "status": STATUS_STARTING,
+        "started_at": mock.ANY,
+    }
+    assert read_json(os.path.join(slot_dir, PID_FILE)) == {"pid": 4321}
+    kwargs = subprocess.Popen.call_args.kwargs  # type: ignore[attr-defined]
+    assert kwargs["cwd"] == slot_dir
+    env = kwargs["env"]
+    assert "OPENJD_SESSION_ID" not in env
+    assert "AWS_SECRET_ACCESS_KEY" not in env
+    assert "DEADLINE_JOB_ID" not in env
+    assert env["DEADLINE_CLOUD_PYTHONPATH"] == "/deps"
+    assert env["PATH"] == os.environ["PATH"]
+
+
+def test_should_retire(pool, idle_slot):
+    process = pool.acquire(ARGS, "/tmp/server.sock")
+
+    assert process is not None
+    assert not pool.should_retire(process)
+    process.uses = 2
+    assert pool.should_retire(process)
+    pool.release(process)
+
+
+def test_remove_dead_slots_reaps_exited_prewarmed_processes(pool, monkeypatch):
+    popen = mock.Mock(pid=4321)
+    popen.poll.return_value = None
+    monkeypatch.setattr(subprocess, "Popen", mock.Mock(return_value=popen))
+
+    pool.prewarm(ARGS)
+    pool.remove_dead_slots()
+    assert list(pool._started.values()) == [popen]
+
+    popen.poll.return_value = 0
+    pool.remove_dead_slots()
+    assert pool._started == {}
+
+
+def test_wait_for_exit_waits_on_a_started_process(pool, monkeypatch):
+    popen = mock.Mock(pid=4321)
+    popen.poll.return_value = None
+    monkeypatch.setattr(subprocess, "Popen", mock.Mock(return_value=popen))
+    process = pool.spawn(ARGS, "/tmp/server.sock")
+    results: list = [subprocess.TimeoutExpired("keyshot", 0.05), 0]
+
+    def wait(timeout):
+        result = results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        popen.poll.return_value = result
+        return result
+
+    popen.wait.side_effect = wait
+    with mock.patch.object(pool_module.time, "sleep") as sleep_mock:
+        process.wait_for_exit()
+
+    assert popen.wait.call_args_list == [mock.call(timeout=0.05), mock.call(timeout=0.05)]
+    sleep_mock.assert_not_called()
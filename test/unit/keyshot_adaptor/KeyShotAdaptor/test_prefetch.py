@@ -0,0 +1,79 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+from deadline.keyshot_adaptor.KeyShotAdaptor.prefetch import (
+    PREFETCH_MAX_MB_ENV_VAR,
+    PREFETCH_THREADS_ENV_VAR,
+    Prefetcher,
+)
+
+
+def test_prefetch_reads_files_and_directories(tmp_path):
+    scene_file = tmp_path / "scene.bip"
+    scene_file.write_bytes(b"s" * 100)
+    textures = tmp_path / "inputs" / "textures"
+    textures.mkdir(parents=True)
+    (textures / "wood.png").write_bytes(b"w" * 50)
+    (textures / "metal.png").write_bytes(b"m" * 25)
+    prefetcher = Prefetcher(max_bytes=1024, max_workers=2)
+
+    prefetcher.prefetch([str(scene_file), str(tmp_path / "inputs"), str(tmp_path / "missing")])
+    prefetcher.wait()
+    prefetcher.close()
+
+    assert (prefetcher.files, prefetcher.bytes, prefetcher.skipped) == (3, 175, 0)
+
+
+def test_prefetch_skips_files_over_the_size_limit(tmp_path):
+    for name, size in (("scene.bip", 60), ("large.hdr", 50), ("small.png", 30)):
+        (tmp_path / name).write_bytes(b"x" * size)
+    prefetcher = Prefetcher(max_bytes=100)
+
+    prefetcher.prefetch([str(tmp_path / name) for name in ("scene.bip", "large.hdr", "small.png")])
+    prefetcher.wait()
+    prefetcher.close()
+
+    assert (prefetcher.files, prefetcher.bytes, prefetcher.skipped) == (2, 90, 1)
+    assert "skipped 1 file(s) over the" in prefetcher.summary()
+
+
+def test_summary_counts_the_reads_that_finished_in_time(tmp_path):
+    times = iter([10.0, 10.0, 12.0, 12.0, 15.0])
+    scene_file = tmp_path / "scene.bip"
+    scene_file.write_bytes(b"s" * 1024 * 1024)
+    texture = tmp_path / "texture.png"
+    texture.write_bytes(b"t")
+    prefetcher = Prefetcher(max_bytes=4 * 1024 * 1024, max_workers=1, clock=lambda: next(times))
+
+    prefetcher.prefetch([str(scene_file), str(texture)])
+    prefetcher.wait()
+    prefetcher.close()
+
+    # The scene was read from 10s to 12s, before KeyShot opened it at 13s, the texture after
+    assert prefetcher.summary(until=13.0) == (
+        "Prefetched 2 file(s), 1.0 MB in 5.00s, 2.00s of reading finished before KeyShot needed it"
+    )
+
+
+def test_close_stops_reading(tmp_path):
+    scene_file = tmp_path / "scene.bip"
+    scene_file.write_bytes(b"s")
+    prefetcher = Prefetcher(max_bytes=1024)
+
+    prefetcher.close()
+    prefetcher.prefetch([str(scene_file)])
+
+    assert prefetcher.files == 0
+
+
+def test_from_environment(monkeypatch):
+    monkeypatch.delenv(PREFETCH_MAX_MB_ENV_VAR, raising=False)
+    monkeypatch.setenv(PREFETCH_THREADS_ENV_VAR, "8")
+    assert Prefetcher.from_environment() is None
+
+    monkeypatch.setenv(PREFETCH_MAX_MB_ENV_VAR, "1024")
+    prefetcher = Prefetcher.from_environment()
+    assert prefetcher is not None
+    assert prefetcher.max_bytes == 1024 * 1024 * 1024
+    prefetcher.close()
+
+    monkeypatch.setenv(PREFETCH_MAX_MB_ENV_VAR, "0")
+    assert Prefetcher.from_environment() is None
@@ -0,0 +1,84 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+import errno
+import os
+import shutil
+from collections import namedtuple
+from unittest import mock
+
+import pytest
+
+from deadline.keyshot_adaptor.KeyShotAdaptor.preflight import (
+    FREE_SPACE_MARGIN_MB_ENV_VAR,
+    check_free_space,
+    check_output_directory,
+    check_scene_file,
+    estimate_output_bytes,
+    free_space_margin_bytes,
+)
+
+DiskUsage = namedtuple("DiskUsage", ["total", "used", "free"])
+
+
+@pytest.mark.parametrize(
+    "output_format, width, height, expected",
+    [
+        ("RENDER_OUTPUT_PNG", 1920, 1080, 1920 * 1080 * 4 // 2),
+        ("RENDER_OUTPUT_JPEG", 800, 600, 800 * 600 * 3 // 8),
+        ("RENDER_OUTPUT_EXR", 100, 50, 100 * 50 * 16 // 2),
+        ("RENDER_OUTPUT_PSD16", 10, 10, 10 * 10 * 8),
+        (None, 10, 10, 10 * 10 * 16),
+        ("RENDER_OUTPUT_PNG", None, None, 0),
+    ],
+)
+def test_estimate_output_bytes(output_format, width, height, expected):
+    assert estimate_output_bytes(output_format, width, height) == expected
+
+
+def test_check_scene_file(tmp_path):
+    scene_file = tmp_path / "scene.bip"
+    scene_file.write_bytes(b"scene")
+
+    check_scene_file(str(scene_file))
+    with pytest.raises(FileNotFoundError, match="does not exist"):
+        check_scene_file(str(tmp_path / "missing.bip"))
+    with mock.patch("builtins.open", side_effect=PermissionError("Permission denied")):
+        with pytest.raises(PermissionError, match="cannot be read: Permission denied"):
+            check_scene_file(str(scene_file))
+
+
+def test_check_output_directory_creates_the_directory(tmp_path):
+    output_dir = tmp_path / "renders" / "shot"
+
+    check_output_directory(str(output_dir))
+
+    assert output_dir.is_dir()
+    # The file written to check the directory is removed
+    assert os.listdir(output_dir) == []
+
+
+def test_check_output_directory_fails_when_it_cannot_be_written_to(tmp_path):
+    (tmp_path / "renders").write_bytes(b"not a directory")
+
+    with pytest.raises(PermissionError, match="cannot be written to"):
+        check_output_directory(str(tmp_path / "renders" / "shot"))
+
+
+def test_check_free_space(tmp_path, monkeypatch):
+    disk_usage = mock.Mock(return_value=DiskUsage(100 << 20, 90 << 20, 10 << 20))
+    monkeypatch.setattr(shutil, "disk_usage", disk_usage)
+
+    check_free_space(str(tmp_path / "missing" / "renders"), 10 << 20)
+    with pytest.raises(OSError, match="has 10 MB free, but 11 MB are needed") as error:
+        check_free_space(str(tmp_path), 11 << 20)
+
+    assert error.value.errno == errno.ENOSPC
+    # The closest parent that exists is checked
+    assert disk_usage.call_args_list[0] == mock.call(str(tmp_path))
+
+
+def test_free_space_margin_bytes(monkeypatch):
+    monkeypatch.delenv(FREE_SPACE_MARGIN_MB_ENV_VAR, raising=False)
+    assert free_space_margin_bytes() == 512 * 1024 * 1024
+
+    monkeypatch.setenv(FREE_SPACE_MARGIN_MB_ENV_VAR, "0.5")
+    assert free_space_margin_bytes() == 512 * 1024
@@ -0,0 +1,113 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+from unittest.mock import Mock
+
+import pytest
+
+from deadline.keyshot_adaptor.KeyShotAdaptor.progress import ProgressReporter, _format_duration
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+@pytest.fixture
+def report() -> Mock:
+    return Mock()
+
+
+@pytest.fixture
+def reporter(report: Mock, clock: FakeClock) -> ProgressReporter:
+    return ProgressReporter(report, min_interval_seconds=1.0, clock=clock)
+
+
+def reported_progress(report: Mock) -> list:
+    return [call.kwargs["progress"] for call in report.call_args_list]
+
+
+def test_maps_render_progress_across_outputs(reporter, report, clock):
+    reporter.start(expected_outputs=4)
+
+    clock.now = 1
+    reporter.update(50)
+    reporter.complete_output()
+    clock.now = 3
+    reporter.update(50)
+
+    assert reported_progress(report) == [12.5, 25.0, 37.5]
+
+
+def test_coalesces_updates_within_the_interval(reporter, report, clock):
+    reporter.start(expected_outputs=1)
+
+    reporter.update(10)
+    clock.now = 0.5
+    reporter.update(20)
+    reporter.update(30)
+    clock.now = 1.0
+    reporter.update(40)
+
+    assert reported_progress(report) == [10.0, 40.0]
+
+
+def test_only_reports_changes(reporter, report, clock):
+    reporter.start(expected_outputs=1)
+
+    reporter.update(10)
+    clock.now = 5
+    reporter.update(10)
+
+    assert reported_progress(report) == [10.0]
+
+
+def test_progress_never_goes_backwards(reporter, report, clock):
+    reporter.start(expected_outputs=1)
+
+    reporter.update(60)
+    clock.now = 5
+    reporter.update(20)
+
+    assert reporter.progress == 60
+    assert reported_progress(report) == [60.0]
+
+
+def test_completed_outputs_are_always_reported(reporter, report, clock):
+    reporter.start(expected_outputs=2)
+
+    reporter.update(90)
+    assert not reporter.complete_output()
+    assert reporter.complete_output()
+
+    assert reported_progress(report) == [45.0, 50.0, 100.0]
+    assert report.call_args.kwargs["status_message"] == "Rendered 2 of 2 outputs"
+
+
+def test_estimates_remaining_time_from_throughput(reporter, report, clock):
+    reporter.start(expected_outputs=2)
+
+    clock.now = 30
+    reporter.complete_output()
+
+    assert reporter.estimate_remaining_seconds() == 30
+    assert report.call_args.kwargs["status_message"] == (
+        "Rendering output 2 of 2 (50.0%), about 30s remaining"
+    )
+
+
+def test_no_estimate_before_progress(reporter):
+    reporter.start(expected_outputs=2)
+
+    assert reporter.estimate_remaining_seconds() is None
+
+
+@pytest.mark.parametrize("seconds, expected", [(45, "45s"), (185, "3m 05s"), (3720, "1h 02m")])
+def test_format_duration(seconds, expected):
+    assert _format_duration(seconds) == expected
@@ -0,0 +1,77 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+import os
+
+from deadline.keyshot_adaptor.KeyShotAdaptor.render_cache import (
+    RENDER_CACHE_DIR_ENV_VAR,
+    RENDER_CACHE_MAX_MB_ENV_VAR,
+    RenderCache,
+    render_cache_key,
+)
+
+
+def test_render_cache_key_depends_on_every_part():
+    key = render_cache_key(scene="abc", frame=1, render_options={"seed": 1, "samples": 8})
+
+    assert key == render_cache_key(render_options={"samples": 8, "seed": 1}, frame=1, scene="abc")
+    assert key != render_cache_key(scene="abc", frame=2, render_options={"seed": 1, "samples": 8})
+    assert key != render_cache_key(scene="abd", frame=1, render_options={"seed": 1, "samples": 8})
+
+
+def test_fetch_copies_a_stored_output(tmp_path):
+    cache = RenderCache(str(tmp_path / "cache"), max_bytes=1024)
+    rendered = tmp_path / "frame.1.png"
+    rendered.write_bytes(b"image")
+    destination = tmp_path / "out" / "frame.1.png"
+
+    assert not cache.fetch("key", str(destination))
+    cache.store("key", str(rendered))
+    assert cache.fetch("key", str(destination))
+
+    assert destination.read_bytes() == b"image"
+    assert (cache.hits, cache.misses, cache.stored) == (1, 1, 1)
+    # No temporary files are left next to the output
+    assert os.listdir(destination.parent) == ["frame.1.png"]
+    assert cache.summary() == "Render cache: 1 hit(s), 1 miss(es), 1 stored, 0 evicted"
+
+
+def test_evict_removes_the_least_recently_used_outputs(tmp_path):
+    cache = RenderCache(str(tmp_path / "cache"), max_bytes=25)
+    rendered = tmp_path / "frame.png"
+    rendered.write_bytes(b"0123456789")
+    for key in ("first", "second"):
+        cache.store(key, str(rendered))
+        entry = os.path.join(cache.directory, key[:2], key)
+        os.utime(entry, ns=(0, 1000 if key == "first" else 2000))
+    # Using the first entry makes the second one the least recently used
+    assert cache.fetch("first", str(tmp_path / "fetched.png"))
+
+    cache.store("third", str(rendered))
+    # The cache is only trimmed to its limit once the outputs of the task are stored
+    assert cache.evicted == 0
+    cache.evict()
+
+    assert cache.evicted == 1
+    assert cache.fetch("first", str(tmp_path / "fetched.png"))
+    assert not cache.fetch("second", str(tmp_path / "fetched.png"))
+    assert cache.fetch("third", str(tmp_path / "fetched.png"))
+
+
+def test_store_skips_an_output_that_cannot_be_read(tmp_path):
+    cache = RenderCache(str(tmp_path / "cache"), max_bytes=1024)
+
+    cache.store("key", str(tmp_path / "missing.png"))
+
+    assert cache.stored == 0
+    assert not cache.fetch("key", str(tmp_path / "out.png"))
+
+
+def test_from_environment(tmp_path, monkeypatch):
+    monkeypatch.delenv(RENDER_CACHE_DIR_ENV_VAR, raising=False)
+    assert RenderCache.from_environment() is None
+
+    monkeypatch.setenv(RENDER_CACHE_DIR_ENV_VAR, str(tmp_path))
+    monkeypatch.setenv(RENDER_CACHE_MAX_MB_ENV_VAR, "2")
+    cache = RenderCache.from_environment()
+
+    assert cache is not None
+    assert (cache.directory, cache.max_bytes) == (str(tmp_path), 2 * 1024 * 1024)
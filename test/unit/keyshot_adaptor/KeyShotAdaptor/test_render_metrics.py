@@ -0,0 +1,105 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+import os
+import sys
+
+import pytest
+
+from deadline.keyshot_adaptor.KeyShotAdaptor.render_metrics import (
+    FrameMetricsSampler,
+    ProcessSample,
+    read_process_sample,
+    summarize_frames,
+)
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="Requires /proc")
+def test_read_process_sample_of_running_process():
+    sample = read_process_sample(os.getpid())
+
+    assert sample is not None
+    assert sample.rss_bytes > 0
+    assert sample.threads >= 1
+    assert sample.cpu_user_seconds + sample.cpu_system_seconds > 0
+
+
+def test_read_process_sample_of_missing_process():
+    assert read_process_sample(-1) is None
+
+
+def test_sampler_measures_each_frame():
+    clock = FakeClock()
+    samples = iter(
+        [
+            ProcessSample(10.0, 1.0, 100, 4),
+            ProcessSample(12.0, 1.5, 300, 8),  # Sampled while rendering
+            ProcessSample(14.0, 2.0, 200, 6),
+        ]
+    )
+    sampler = FrameMetricsSampler(
+        lambda: 1234, interval_seconds=60, clock=clock, read_sample=lambda pid: next(samples)
+    )
+
+    sampler.start(7)
+    with sampler._lock:
+        sampler._sample()
+    clock.now = 5.0
+    metrics = sampler.finish()
+    sampler.stop()
+
+    assert metrics == {
+        "frame": 7,
+        "start": 0.0,
+        "wall_seconds": 5.0,
+        "cpu_user_seconds": 4.0,
+        "cpu_system_seconds": 1.0,
+        "peak_rss_bytes": 300,
+        "max_threads": 8,
+    }
+    assert sampler.finish() is None
+
+
+def test_sampler_only_measures_wall_time_without_proc():
+    clock = FakeClock()
+    sampler = FrameMetricsSampler(lambda: 1234, clock=clock, read_sample=lambda pid: None)
+
+    sampler.start(1)
+    clock.now = 2.0
+    metrics = sampler.finish()
+    sampler.stop()
+
+    assert metrics is not None
+    assert metrics["wall_seconds"] == 2.0
+    assert metrics["cpu_user_seconds"] is None
+    assert metrics["peak_rss_bytes"] is None
+
+
+def test_summarize_frames():
+    records = [
+        {
+            "wall_seconds": 4.0,
+            "cpu_user_seconds": 30.0,
+            "cpu_system_seconds": 2.0,
+            "peak_rss_bytes": 3 * 1024**3,
+            "max_threads": 48,
+        },
+        {
+            "wall_seconds": 6.0,
+            "cpu_user_seconds": 40.0,
+            "cpu_system_seconds": 0.0,
+            "peak_rss_bytes": 2 * 1024**3,
+            "max_threads": 64,
+        },
+    ]
+
+    assert summarize_frames(records) == (
+        "Rendered 2 frame(s) in 10.0s (avg 5.0s/frame), CPU 72.0s (avg 36.0s/frame), "
+        "peak RSS 3.00 GiB, max threads 64"
+    )
@@ -0,0 +1,206 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+import struct
+import zlib
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from deadline.keyshot_adaptor.KeyShotAdaptor import sample_merger
+from deadline.keyshot_adaptor.KeyShotAdaptor.sample_merger import (
+    ExrChannel,
+    ExrImage,
+    SampleAccumulator,
+    main,
+    merge_samples,
+)
+from deadline.keyshot_adaptor.KeyShotAdaptor.samples import sample_output_path
+
+_CHANNELS = [ExrChannel("A", 1), ExrChannel("B", 2), ExrChannel("G", 2), ExrChannel("R", 2)]
+_DTYPES = {0: "<u4", 1: "<f2", 2: "<f4"}
+
+
+def _attribute(name: str, attribute_type: str, value: bytes) -> bytes:
+    return f"{name}\x00{attribute_type}\x00".encode() + struct.pack("<i", len(value)) + value
+
+
+def write_exr(
+    path: Path,
+    pixels: np.ndarray,
+    channels: list[ExrChannel] = _CHANNELS,
+    compression: int = 3,
+    y_min: int = 0,
+) -> None:
+    """
+    Writes a scanline OpenEXR image the way OpenEXR does, with the blocks in decreasing order of
+    rows to check that the reader places each block by its row.
+    """
+    height, width = pixels.shape[:2]
+    lines_per_block = 16 if compression == 3 else 1
+    window = struct.pack("<iiii", 0, y_min, width - 1, y_min + height - 1)
+    header = (
+        b"\x76\x2f\x31\x01\x02\x00\x00\x00"
+        + _attribute(
+            "channels",
+            "chlist",
+            b"".join(
+                channel.name.encode()
+                + b"\x00"
+                + struct.pack("<iB3xii", channel.pixel_type, 0, 1, 1)
+                for channel in channels
+            )
+            + b"\x00",
+        )
+        + _attribute("compression", "compression", bytes([compression]))
+        + _attribute("dataWindow", "box2i", window)
+        + _attribute("displayWindow", "box2i", window)
+        + _attribute("lineOrder", "lineOrder", b"\x01")
+        + _attribute("pixelAspectRatio", "float", struct.pack("<f", 1))
+        + b"\x00"
+    )
+    blocks = []
+    for row in range(0, height, lines_per_block):
+        raw = b"".join(
+            pixels[y, :, index].astype(_DTYPES[channel.pixel_type]).tobytes()
+            for y in range(row, min(row + lines_per_block, height))
+            for index, channel in enumerate(channels)
+        )
+        if compression:
+            interleaved = raw[0::2] + raw[1::2]
+            predicted = bytes(
+                [interleaved[0]]
+                + [(b - a + 128) & 0xFF for a, b in zip(interleaved, interleaved[1:])]
+            )
+            raw = zlib.compress(predicted)
+        blocks.append(struct.pack("<ii", y_min + row, len(raw)) + raw)
+    offsets: list[int] = []
+    offset = len(header) + 8 * len(blocks)
+    for block in reversed(blocks):
+        offsets.insert(0, offset)
+        offset += len(block)
+    path.write_bytes(
+        header + struct.pack(f"<{len(offsets)}Q", *offsets) + b"".join(reversed(blocks))
+    )
+
+
+def make_image(width: int, height: int, seed: int) -> np.ndarray:
+    # Values that half floats represent exactly
+    return np.random.default_rng(seed).integers(0, 64, (height, width, 4)) / 64
+
+
+def read_exr(path: Path) -> np.ndarray:
+    image = ExrImage(str(path))
+    pixels = np.empty((image.height, image.width, len(image.channels)))
+    for row, block in image.read_blocks():
+        pixels[row : row + block.shape[0]] = block
+    return pixels
+
+
+@pytest.mark.parametrize("compression", [0, 2, 3])
+def test_exr_image_reads_every_block(tmp_path, compression):
+    image = make_image(21, 37, seed=1)
+    write_exr(tmp_path / "image.exr", image, compression=compression, y_min=-5)
+
+    exr = ExrImage(str(tmp_path / "image.exr"))
+
+    assert exr.channels == _CHANNELS
+    assert (exr.width, exr.height) == (21, 37)
+    np.testing.assert_array_equal(read_exr(tmp_path / "image.exr"), image)
+
+
+@pytest.mark.parametrize("compression", [0, 3])
+def test_merge_samples_averages_the_images(tmp_path, compression):
+    images = [make_image(19, 40, seed) for seed in range(1, 5)]
+    sample_paths = []
+    for seed, image in enumerate(images, start=1):
+        sample_paths.append(str(tmp_path / f"frame.seed-{seed}.exr"))
+        write_exr(Path(sample_paths[-1]), image, compression=compression)
+
+    merge_samples(str(tmp_path / "frame.exr"), sample_paths)
+
+    merged = ExrImage(str(tmp_path / "frame.exr"))
+    assert merged.channels == _CHANNELS
+    assert (
+        merged.attributes["displayWindow"] == ExrImage(sample_paths[0]).attributes["displayWindow"]
+    )
+    # The average is written with the precision of each channel
+    np.testing.assert_allclose(read_exr(tmp_path / "frame.exr"), np.mean(images, axis=0), atol=1e-3)
+    # The memory-mapped sums are removed
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "frame.exr",
+        *(Path(path).name for path in sample_paths),
+    ]
+
+
+def test_merge_samples_rounds_uint_channels(tmp_path):
+    channels = [ExrChannel("id", 0)]
+    for seed, value in ((1, 1), (2, 2)):
+        write_exr(tmp_path / f"seed-{seed}.exr", np.full((3, 2, 1), value), channels)
+
+    merge_samples(str(tmp_path / "merged.exr"), [str(tmp_path / f"seed-{s}.exr") for s in (1, 2)])
+
+    np.testing.assert_array_equal(read_exr(tmp_path / "merged.exr"), np.full((3, 2, 1), 2))
+
+
+def test_sample_accumulator_rejects_images_of_another_size(tmp_path):
+    write_exr(tmp_path / "a.exr", make_image(4, 4, seed=1))
+    write_exr(tmp_path / "b.exr", make_image(4, 5, seed=1))
+
+    with SampleAccumulator(ExrImage(str(tmp_path / "a.exr")), str(tmp_path)) as sums:
+        with pytest.raises(ValueError, match="does not have the channels and data window"):
+            sums.add(ExrImage(str(tmp_path / "b.exr")))
+
+
+def test_merge_samples_rejects_unsupported_images(tmp_path):
+    write_exr(tmp_path / "piz.exr", make_image(4, 4, seed=1), compression=0)
+    data = bytearray((tmp_path / "piz.exr").read_bytes())
+    compression = data.index(b"compression\x00compression\x00") + 28
+    data[compression] = 4
+    (tmp_path / "piz.exr").write_bytes(bytes(data))
+    (tmp_path / "image.png").write_bytes(b"\x89PNG\r\n\x1a\n")
+
+    with pytest.raises(ValueError, match="not compression 4"):
+        merge_samples(str(tmp_path / "merged.exr"), [str(tmp_path / "piz.exr")])
+    with pytest.raises(ValueError, match="is not an OpenEXR image"):
+        merge_samples(str(tmp_path / "merged.exr"), [str(tmp_path / "image.png")])
+    with pytest.raises(ValueError, match="do not exist"):
+        merge_samples(str(tmp_path / "merged.exr"), [str(tmp_path / "missing.exr")])
+
+
+def test_merge_samples_removes_an_unfinished_output(tmp_path, monkeypatch):
+    write_exr(tmp_path / "seed-1.exr", make_image(4, 40, seed=1))
+    monkeypatch.setattr(sample_merger, "_zip", lambda raw: 1 / 0)
+
+    with pytest.raises(ZeroDivisionError):
+        merge_samples(str(tmp_path / "merged.exr"), [str(tmp_path / "seed-1.exr")])
+
+    assert [path.name for path in tmp_path.iterdir()] == ["seed-1.exr"]
+
+
+def test_main_merges_every_frame_and_removes_the_samples(tmp_path, capsys):
+    for frame in (1, 2):
+        for seed in (1, 2, 3):
+            write_exr(
+                Path(sample_output_path(str(tmp_path / f"frame.{frame}.exr"), seed)),
+                make_image(6, 3, seed=frame),
+            )
+
+    main(
+        [
+            "--output-file-path",
+            str(tmp_path / "frame.%d.exr"),
+            "--frames",
+            "1-2",
+            "--sample-tasks",
+            "3",
+            "--scratch-dir",
+            str(tmp_path),
+        ]
+    )
+
+    for frame in (1, 2):
+        np.testing.assert_array_equal(
+            read_exr(tmp_path / f"frame.{frame}.exr"), make_image(6, 3, seed=frame)
+        )
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["frame.1.exr", "frame.2.exr"]
+    assert "Merged 3 samples into" in capsys.readouterr().out
@@ -0,0 +1,158 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+import hashlib
+import os
+from unittest import mock
+
+import pytest
+
+from deadline.keyshot_adaptor.KeyShotAdaptor.scene_cache import (
+    SCENE_CACHE_DIR_ENV_VAR,
+    SCENE_CACHE_MAX_MB_ENV_VAR,
+    SceneCache,
+)
+from deadline.keyshot_adaptor._fileutil import ProcessLock
+
+
+@pytest.fixture
+def scene_file(tmp_path):
+    path = tmp_path / "share" / "scene.bip"
+    path.parent.mkdir()
+    path.write_bytes(b"scene")
+    return path
+
+
+def test_stage_copies_the_scene_once(tmp_path, scene_file):
+    cache = SceneCache(str(tmp_path / "cache"), max_bytes=1024)
+
+    first = cache.stage(str(scene_file))
+    with mock.patch.object(cache, "_copy") as copy_mock:
+        second = cache.stage(str(scene_file))
+
+    copy_mock.assert_not_called()
+    assert not first.hit and second.hit
+    assert first.path == second.path
+    assert first.digest == hashlib.blake2b(b"scene", digest_size=32).hexdigest()
+    assert first.path.endswith(f"{first.digest}.bip")
+    with open(first.path, "rb") as f:
+        assert f.read() == b"scene"
+
+
+def test_stage_does_not_change_the_modification_time_of_the_copy(tmp_path, scene_file):
+    cache = SceneCache(str(tmp_path / "cache"), max_bytes=1024)
+    first = cache.stage(str(scene_file))
+    os.utime(first.path, ns=(0, 0))
+
+    second = cache.stage(str(scene_file))
+
+    assert second.hit
+    # KeyShot tells whether the open scene changed by its modification time
+    assert os.stat(second.path).st_mtime_ns == 0
+
+
+def test_stage_copies_a_changed_scene_again(tmp_path, scene_file):
+    cache = SceneCache(str(tmp_path / "cache"), max_bytes=1024)
+    first = cache.stage(str(scene_file))
+
+    scene_file.write_bytes(b"changed scene")
+    second = cache.stage(str(scene_file))
+
+    assert not second.hit
+    assert second.path != first.path
+
+
+def test_stage_shares_the_copy_of_the_same_contents(tmp_path, scene_file):
+    cache = SceneCache(str(tmp_path / "cache"), max_bytes=1024)
+    other = tmp_path / "other.bip"
+    other.write_bytes(b"scene")
+
+    assert cache.stage(str(scene_file)).path == cache.stage(str(other)).path
+    assert os.listdir(tmp_path / "cache" / "scenes") == [
+        f"{hashlib.blake2b(b'scene', digest_size=32).hexdigest()}.bip"
+    ]
+
+
+def test_stage_evicts_the_least_recently_used_scenes(tmp_path):
+    cache = SceneCache(str(tmp_path / "cache"), max_bytes=12)
+    staged = []
+    for name in ("a", "b", "c"):
+        path = tmp_path / f"{name}.bip"
+        path.write_bytes(name.encode() * 5)
+        staged.append(cache.stage(str(path)))
+        os.utime(cache._used_marker(staged[-1].path), ns=(0, len(staged)))
+
+    assert not os.path.exists(staged[0].path)
+    assert os.path.exists(staged[1].path)
+    assert os.path.exists(staged[2].path)
+
+
+def _stage_three_scenes(tmp_path, cache):
+    staged = []
+    for name in ("a", "b", "c"):
+        path = tmp_path / f"{name}.bip"
+        path.write_bytes(name.encode() * 5)
+        staged.append(cache.stage(str(path)))
+        os.utime(cache._used_marker(staged[-1].path), ns=(0, len(staged)))
+    return staged
+
+
+def test_evict_keeps_a_scene_that_is_used_while_the_cache_is_scanned(tmp_path):
+    cache = SceneCache(str(tmp_path / "cache"), max_bytes=1024)
+    a, b, c = _stage_three_scenes(tmp_path, cache)
+    cache.max_bytes = 10
+    scan = cache._scan
+
+    def scan_then_stage():
+        scenes = scan()
+        # Another session uses the least recently used scene after it was scanned
+        assert cache.stage(str(tmp_path / "a.bip")).hit
+        return scenes
+
+    with mock.patch.object(cache, "_scan", side_effect=scan_then_stage):
+        cache._evict(keep=c.path)
+
+    assert os.path.exists(a.path)
+    assert not os.path.exists(b.path)
+    assert os.path.exists(c.path)
+
+
+def test_evict_skips_a_scene_that_another_session_is_marking_as_used(tmp_path):
+    cache = SceneCache(str(tmp_path / "cache"), max_bytes=1024)
+    a, b, c = _stage_three_scenes(tmp_path, cache)
+    cache.max_bytes = 10
+
+    lock = cache._scene_lock(a.path)
+    assert lock.try_acquire()
+    try:
+        cache._evict(keep=c.path)
+    finally:
+        lock.release()
+
+    assert os.path.exists(a.path)
+    assert not os.path.exists(b.path)
+    assert os.path.exists(c.path)
+
+
+def test_stage_waits_for_another_session_copying_the_scene(tmp_path, scene_file):
+    cache = SceneCache(str(tmp_path / "cache"), max_bytes=1024, lock_timeout_seconds=0.2)
+    with mock.patch.object(ProcessLock, "try_acquire", return_value=False):
+        with pytest.raises(TimeoutError, match="did not finish caching the scene file"):
+            cache.stage(str(scene_file))
+
+
+def test_stage_fails_for_a_missing_scene(tmp_path):
+    cache = SceneCache(str(tmp_path / "cache"), max_bytes=1024)
+
+    with pytest.raises(FileNotFoundError):
+        cache.stage(str(tmp_path / "missing.bip"))
+
+
+def test_from_environment(tmp_path, monkeypatch):
+    monkeypatch.delenv(SCENE_CACHE_DIR_ENV_VAR, raising=False)
+    assert SceneCache.from_environment() is None
+
+    monkeypatch.setenv(SCENE_CACHE_DIR_ENV_VAR, str(tmp_path))
+    monkeypatch.setenv(SCENE_CACHE_MAX_MB_ENV_VAR, "1.5")
+    cache = SceneCache.from_environment()
+
+    assert cache is not None
+    assert cache.max_bytes == int(1.5 * 1024 * 1024)
@@ -0,0 +1,60 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+import json
+
+import pytest
+
+from deadline.keyshot_adaptor.KeyShotAdaptor.session_events import (
+    EVENT_LOG_DIR_ENV_VAR,
+    SessionEventLog,
+)
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_records_phases_relative_to_session_start(tmp_path):
+    clock = FakeClock()
+    events = SessionEventLog(str(tmp_path), clock=clock)
+
+    clock.now = 101.0
+    with events.phase("start_server"):
+        clock.now = 101.5
+    events.record("action", "scene_file", 102.0, 105.0)
+    events.record("action", "scene_file", 106.0, 107.0)
+    events.close()
+
+    assert events.path is not None
+    with open(events.path) as event_file:
+        written = [json.loads(line) for line in event_file]
+    assert written == [
+        {"kind": "phase", "name": "start_server", "start": 1.0, "duration": 0.5},
+        {"kind": "action", "name": "scene_file", "start": 2.0, "duration": 3.0},
+        {"kind": "action", "name": "scene_file", "start": 6.0, "duration": 1.0},
+    ]
+    assert events.durations() == {"phase.start_server": 0.5, "action.scene_file": 4.0}
+
+
+def test_records_phase_that_raises():
+    events = SessionEventLog()
+
+    with pytest.raises(TimeoutError):
+        with events.phase("wait_for_keyshot"):
+            raise TimeoutError()
+
+    assert [event["name"] for event in events.events] == ["wait_for_keyshot"]
+    assert events.path is None
+
+
+def test_from_environment(tmp_path, monkeypatch):
+    monkeypatch.setenv(EVENT_LOG_DIR_ENV_VAR, str(tmp_path / "events"))
+
+    events = SessionEventLog.from_environment()
+    events.close()
+
+    assert events.path is not None
+    assert events.path.startswith(str(tmp_path / "events"))
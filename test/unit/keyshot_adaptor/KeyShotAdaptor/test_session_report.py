@@ -0,0 +1,33 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+import json
+
+from deadline.keyshot_adaptor.KeyShotAdaptor.session_report import main, read_events, summarize
+
+
+def write_session(path, durations):
+    with open(path, "w") as event_file:
+        for duration in durations:
+            event = {"kind": "phase", "name": "on_start", "start": 0, "duration": duration}
+            event_file.write(json.dumps(event) + "\n")
+        event_file.write("not an event\n")
+
+
+def test_summarize_reports_percentiles_per_phase(tmp_path):
+    write_session(tmp_path / "a.jsonl", [float(d) for d in range(1, 51)])
+    write_session(tmp_path / "b.jsonl", [float(d) for d in range(51, 101)])
+
+    summary = summarize(read_events([str(tmp_path)]))
+
+    assert summary == {
+        "phase.on_start": {"count": 100, "p50": 50, "p90": 90, "p99": 99, "max": 100},
+    }
+
+
+def test_main_prints_a_table(tmp_path, capsys):
+    write_session(tmp_path / "a.jsonl", [2.0, 4.0])
+
+    main([str(tmp_path / "a.jsonl")])
+
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0].split() == ["phase", "count", "p50", "p90", "p99", "max"]
+    assert lines[1].split() == ["phase.on_start", "2", "2.000", "4.000", "4.000", "4.000"]
@@ -0,0 +1,70 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+import pytest
+
+from deadline.keyshot_adaptor.KeyShotAdaptor.shots import expand_shots, shot_output_path
+
+
+@pytest.mark.parametrize(
+    "camera, studio, expected",
+    [
+        (None, None, []),
+        ("Front", None, [{"camera": "Front"}]),
+        (None, ["A", "B"], [{"studio": "A"}, {"studio": "B"}]),
+        (
+            ["Front", "Top"],
+            ["A", "B"],
+            [
+                {"studio": "A", "camera": "Front"},
+                {"studio": "A", "camera": "Top"},
+                {"studio": "B", "camera": "Front"},
+                {"studio": "B", "camera": "Top"},
+            ],
+        ),
+    ],
+)
+def test_expand_shots_renders_every_camera_in_every_studio(camera, studio, expected):
+    assert expand_shots(camera, studio) == expected
+
+
+def test_expand_shots_renders_every_camera_of_every_model_set():
+    assert expand_shots(["Front", "Top"], "Packshot", ["Red", "Blue"]) == [
+        {"studio": "Packshot", "model_set": "Red", "camera": "Front"},
+        {"studio": "Packshot", "model_set": "Red", "camera": "Top"},
+        {"studio": "Packshot", "model_set": "Blue", "camera": "Front"},
+        {"studio": "Packshot", "model_set": "Blue", "camera": "Top"},
+    ]
+
+
+@pytest.mark.parametrize(
+    "camera, studio, expected",
+    [
+        ("Front", None, "/renders/frame.%d.Front.png"),
+        (None, "Packshot", "/renders/frame.%d.Packshot.png"),
+        ("Front", "Packshot", "/renders/frame.%d.Packshot.Front.png"),
+        ("Close up/Left 50%", None, "/renders/frame.%d.Close_up_Left_50_-ab1dd2e6.png"),
+    ],
+)
+def test_shot_output_path(camera, studio, expected):
+    assert shot_output_path("/renders/frame.%d.png", camera, studio) == expected
+
+
+def test_shot_output_path_does_not_collide_for_names_that_differ_in_unsafe_characters():
+    paths = {
+        shot_output_path("/renders/frame.%d.png", camera)
+        for camera in ("Front/Left", "Front Left", "Front_Left")
+    }
+
+    assert len(paths) == 3
+
+
+def test_shot_output_path_does_not_collide_for_names_that_contain_the_separator():
+    assert shot_output_path("/renders/frame.%d.png", "B.C", "A") != shot_output_path(
+        "/renders/frame.%d.png", "C", "A.B"
+    )
+
+
+def test_shot_output_path_names_the_model_set_between_the_studio_and_camera():
+    assert (
+        shot_output_path("/renders/frame.%d.png", "Front", "Packshot", "Red")
+        == "/renders/frame.%d.Packshot.Red.Front.png"
+    )
@@ -0,0 +1,73 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+import threading
+
+import pytest
+
+from deadline.keyshot_adaptor.KeyShotAdaptor.session_events import SessionEventLog
+from deadline.keyshot_adaptor.KeyShotAdaptor.startup import StartupPipeline
+
+
+def test_run_overlaps_independent_steps():
+    events = SessionEventLog()
+    pipeline = StartupPipeline(events)
+    launched = threading.Event()
+    order = []
+
+    def launch():
+        order.append("launch")
+        launched.set()
+
+    def stage():
+        # Only sees the launch if the launch runs while the scene is staged
+        assert launched.wait(timeout=10)
+        order.append("stage")
+
+    pipeline.add_step("server", lambda: order.append("server"))
+    pipeline.add_step("launch", launch, after=["server"])
+    pipeline.add_step("stage", stage)
+    pipeline.add_step("queue", lambda: order.append("queue"), after=["launch", "stage"])
+
+    elapsed = pipeline.run()
+
+    assert order == ["server", "launch", "stage", "queue"]
+    assert elapsed >= pipeline.timings["queue"][1]
+    assert set(events.durations()) == {"phase.server", "phase.launch", "phase.stage", "phase.queue"}
+
+
+def test_run_raises_the_error_and_skips_the_steps_that_depend_on_it():
+    pipeline = StartupPipeline(SessionEventLog())
+    ran = []
+
+    def fail():
+        raise FileNotFoundError("scene.bip")
+
+    pipeline.add_step("stage", fail)
+    pipeline.add_step("telemetry", lambda: ran.append("telemetry"))
+    pipeline.add_step("queue", lambda: ran.append("queue"), after=["stage"])
+
+    with pytest.raises(FileNotFoundError, match="scene.bip"):
+        pipeline.run()
+
+    assert ran == ["telemetry"]
+    assert "queue" not in pipeline.timings
+
+
+def test_add_step_rejects_unknown_and_duplicate_steps():
+    pipeline = StartupPipeline(SessionEventLog())
+    pipeline.add_step("server", lambda: None)
+
+    with pytest.raises(ValueError, match="added twice"):
+        pipeline.add_step("server", lambda: None)
+    with pytest.raises(ValueError, match="unknown step stage"):
+        pipeline.add_step("queue", lambda: None, after=["stage"])
+
+
+def test_summary_reports_the_time_saved_by_overlapping_steps():
+    pipeline = StartupPipeline(SessionEventLog())
+    pipeline.add_step("launch", lambda: None)
+    pipeline.add_step("stage", lambda: None)
+    pipeline.timings = {"stage": (0.0, 3.0), "launch": (0.0, 2.0)}
+
+    assert pipeline.summary(3.0) == (
+        "Startup took 3.00s (launch 2.00s, stage 3.00s), 2.00s saved by overlapping steps"
+    )
@@ -0,0 +1,127 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+import threading
+import time
+from unittest.mock import Mock
+
+from deadline.keyshot_adaptor.KeyShotAdaptor.telemetry import TelemetryRecorder
+
+
+def test_records_events_with_common_details_in_the_background():
+    client = Mock(spec=["record_event"])
+    recorder = TelemetryRecorder({"adaptor-version": "1.0"}, client_factory=lambda: client)
+
+    recorder.update_common_details({"keyshot-version": "2024.3"})
+    recorder.record_event("start", {"phase.on_start": 1.5})
+    recorder.close()
+
+    client.record_event.assert_called_once_with(
+        event_type="start",
+        event_details={
+            "adaptor-version": "1.0",
+            "keyshot-version": "2024.3",
+            "phase.on_start": 1.5,
+        },
+    )
+
+
+def test_does_not_create_the_client_until_an_event_is_recorded():
+    client_factory = Mock()
+    recorder = TelemetryRecorder({}, client_factory=client_factory)
+
+    recorder.close()
+
+    client_factory.assert_not_called()
+
+
+def test_start_creates_the_client_before_the_first_event():
+    created = threading.Event()
+    client = Mock(spec=["record_event"])
+
+    def client_factory():
+        created.set()
+        return client
+
+    recorder = TelemetryRecorder({}, client_factory=client_factory)
+
+    recorder.start()
+    assert created.wait(timeout=10)
+    recorder.record_event("start", {})
+    recorder.close()
+
+    client.record_event.assert_called_once_with(event_type="start", event_details={})
+
+
+def test_record_event_does_not_wait_for_the_client():
+    created = threading.Event()
+
+    def slow_client_factory():
+        created.wait(timeout=10)
+        return Mock(spec=["record_event"])
+
+    recorder = TelemetryRecorder({}, queue_size=1, client_factory=slow_client_factory)
+
+    start = time.monotonic()
+    for _ in range(3):
+        recorder.record_event("start", {})
+    assert time.monotonic() - start < 1
+    created.set()
+    recorder.close()
+
+
+def test_close_gives_up_after_the_shutdown_timeout():
+    created = threading.Event()
+
+    def hanging_client_factory():
+        created.wait(timeout=10)
+        return Mock(spec=["record_event"])
+
+    recorder = TelemetryRecorder(
+        {}, shutdown_timeout_seconds=0.1, client_factory=hanging_client_factory
+    )
+    recorder.record_event("start", {})
+
+    start = time.monotonic()
+    recorder.close()
+    assert time.monotonic() - start < 1
+    created.set()
+
+
+def test_stops_the_sender_of_the_client_on_close():
+    client = Mock(spec=["record_event", "event_queue", "processing_thread", "_exit_cleanly"])
+    client.processing_thread.is_alive.return_value = False
+    recorder = TelemetryRecorder({}, client_factory=lambda: client)
+
+    recorder.record_event("start", {})
+    recorder.close()
+
+    client.event_queue.put_nowait.assert_called_once_with(None)
+    client.processing_thread.join.assert_called_once()
+
+
+def test_close_leaves_clients_without_a_sender_alone():
+    client = Mock(spec=["record_event", "processing_thread"])
+    recorder = TelemetryRecorder({}, client_factory=lambda: client)
+
+    recorder.record_event("start", {})
+    recorder.close()
+
+    client.processing_thread.join.assert_not_called()
+
+
+def test_close_ignores_errors_stopping_the_sender():
+    client = Mock(spec=["record_event", "event_queue", "processing_thread", "_exit_cleanly"])
+    client.event_queue.put_nowait.side_effect = RuntimeError("queue was replaced")
+    recorder = TelemetryRecorder({}, client_factory=lambda: client)
+
+    recorder.record_event("start", {})
+    recorder.close()
+
+    client.processing_thread.join.assert_not_called()
+
+
+def test_ignores_errors_creating_the_client():
+    recorder = TelemetryRecorder({}, client_factory=Mock(side_effect=RuntimeError("no config")))
+
+    recorder.record_event("start", {})
+    recorder.close()
+    recorder.record_event("ignored after close", {})
@@ -0,0 +1,228 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+import struct
+import zlib
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from deadline.keyshot_adaptor.KeyShotAdaptor.tile_stitcher import (
+    PngWriter,
+    main,
+    read_png,
+    stitch_tiles,
+)
+from deadline.keyshot_adaptor.KeyShotAdaptor.tiles import tile_output_path, tile_region
+
+_COLOR_TYPES = {1: 0, 2: 4, 3: 2, 4: 6}
+
+
+def _paeth(left: int, up: int, up_left: int) -> int:
+    estimate = left + up - up_left
+    distances = [abs(estimate - left), abs(estimate - up), abs(estimate - up_left)]
+    return [left, up, up_left][distances.index(min(distances))]
+
+
+def write_png(path: Path, pixels: np.ndarray) -> None:
+    """
+    Writes a PNG image the way an image editor might, cycling through the five filter types so
+    that the reader reverses each of them.
+    """
+    height, width, channels = pixels.shape
+    bytes_per_pixel = channels * pixels.dtype.itemsize
+    rows = pixels.astype(pixels.dtype.newbyteorder(">")).reshape(height, -1).view(np.uint8)
+    data = bytearray()
+    previous = [0] * rows.shape[1]
+    for y in range(height):
+        filter_type = y % 5
+        line = [int(value) for value in rows[y]]
+        data.append(filter_type)
+        for i, value in enumerate(line):
+            left = line[i - bytes_per_pixel] if i >= bytes_per_pixel else 0
+            up = previous[i]
+            up_left = previous[i - bytes_per_pixel] if i >= bytes_per_pixel else 0
+            predictor = [0, left, up, (left + up) // 2, _paeth(left, up, up_left)][filter_type]
+            data.append((value - predictor) & 0xFF)
+        previous = line
+
+    def chunk(chunk_type: bytes, chunk_data: bytes) -> bytes:
+        return (
+            struct.pack(">I", len(chunk_data))
+            + chunk_type
+            + chunk_data
+            + struct.pack(">I", zlib.crc32(chunk_type + chunk_data))
+        )
+
+    header = struct.pack(
+        ">IIBBBBB", width, height, pixels.dtype.itemsize * 8, _COLOR_TYPES[channels], 0, 0, 0
+    )
+    path.write_bytes(
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", header)
+        + chunk(b"IDAT", zlib.compress(bytes(data)))
+        + chunk(b"IEND", b"")
+    )
+
+
+def make_image(width: int, height: int, channels: int = 3, dtype=np.uint8) -> np.ndarray:
+    rng = np.random.default_rng(seed=width * height)
+    return rng.integers(0, np.iinfo(dtype).max, (height, width, channels), dtype=dtype)
+
+
+def write_tiles(output_path: Path, image: np.ndarray, rows: int, columns: int) -> None:
+    height, width = image.shape[:2]
+    for row in range(1, rows + 1):
+        for column in range(1, columns + 1):
+            x, y, tile_width, tile_height = tile_region(width, height, rows, columns, row, column)
+            write_png(
+                Path(tile_output_path(str(output_path), row, column)),
+                image[y : y + tile_height, x : x + tile_width],
+            )
+
+
+@pytest.mark.parametrize("channels", [1, 2, 3, 4])
+@pytest.mark.parametrize("dtype", [np.uint8, np.uint16])
+def test_read_png_reverses_every_filter(tmp_path, channels, dtype):
+    image = make_image(13, 11, channels, dtype)
+    write_png(tmp_path / "image.png", image)
+
+    pixels = read_png(str(tmp_path / "image.png"))
+
+    assert pixels.dtype == dtype
+    np.testing.assert_array_equal(pixels, image)
+
+
+def test_read_png_rejects_corrupt_images(tmp_path):
+    write_png(tmp_path / "image.png", make_image(4, 4))
+    data = bytearray((tmp_path / "image.png").read_bytes())
+    data[40] ^= 0xFF
+    (tmp_path / "image.png").write_bytes(bytes(data))
+
+    with pytest.raises(ValueError, match="chunk is corrupt"):
+        read_png(str(tmp_path / "image.png"))
+
+
+def test_png_writer_round_trips_rows_written_in_bands(tmp_path):
+    image = make_image(17, 9, 4, np.uint16)
+
+    with PngWriter(str(tmp_path / "image.png"), 17, 9, 4, np.dtype(np.uint16)) as writer:
+        for start in range(0, 9, 4):
+            writer.write_rows(image[start : start + 4])
+
+    np.testing.assert_array_equal(read_png(str(tmp_path / "image.png")), image)
+    assert [path.name for path in tmp_path.iterdir()] == ["image.png"]
+
+
+def test_png_writer_removes_an_unfinished_image(tmp_path):
+    with pytest.raises(ValueError, match="Wrote 2 of the 3 rows"):
+        with PngWriter(str(tmp_path / "image.png"), 4, 3, 3, np.dtype(np.uint8)) as writer:
+            writer.write_rows(make_image(4, 2))
+
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.parametrize("rows, columns", [(1, 1), (2, 2), (3, 5)])
+def test_stitch_tiles(tmp_path, rows, columns):
+    image = make_image(53, 31)
+    output_path = tmp_path / "frame.1.png"
+    write_tiles(output_path, image, rows, columns)
+
+    tile_paths = stitch_tiles(str(output_path), rows, columns, 53, 31)
+
+    assert len(tile_paths) == rows * columns
+    np.testing.assert_array_equal(read_png(str(output_path)), image)
+
+
+def test_stitch_tiles_crops_tiles_rendered_at_the_size_of_the_image(tmp_path):
+    image = make_image(20, 10)
+    output_path = tmp_path / "frame.1.png"
+    for row in (1, 2):
+        # Only the region of the tile is rendered, the rest of the image is black
+        tile = np.zeros_like(image)
+        tile[(row - 1) * 5 : row * 5] = image[(row - 1) * 5 : row * 5]
+        write_png(Path(tile_output_path(str(output_path), row, 1)), tile)
+
+    stitch_tiles(str(output_path), 2, 1, 20, 10)
+
+    np.testing.assert_array_equal(read_png(str(output_path)), image)
+
+
+def test_stitch_tiles_rejects_a_missing_tile(tmp_path):
+    output_path = tmp_path / "frame.1.png"
+    write_tiles(output_path, make_image(8, 8), 2, 2)
+    Path(tile_output_path(str(output_path), 2, 1)).unlink()
+
+    with pytest.raises(ValueError, match=r"tile-2-1.png does not exist"):
+        stitch_tiles(str(output_path), 2, 2, 8, 8)
+
+    assert not output_path.exists()
+
+
+def test_stitch_tiles_rejects_tiles_of_the_wrong_size(tmp_path):
+    output_path = tmp_path / "frame.1.png"
+    write_tiles(output_path, make_image(8, 8), 2, 2)
+
+    with pytest.raises(ValueError, match="expected 5x4 pixels"):
+        stitch_tiles(str(output_path), 2, 2, 10, 8)
+
+
+def test_stitch_tiles_only_stitches_png_images(tmp_path):
+    with pytest.raises(ValueError, match="Only PNG images"):
+        stitch_tiles(str(tmp_path / "frame.1.exr"), 2, 2, 8, 8)
+
+
+def test_main_stitches_every_frame_and_removes_the_tiles(tmp_path, capsys):
+    images = {frame: make_image(12 + frame, 7) for frame in (1, 2)}
+    for frame, image in images.items():
+        write_tiles(tmp_path / f"frame.{frame}.png", image, 2, 3)
+
+    for frame, image in images.items():
+        main(
+            [
+                "--output-file-path",
+                str(tmp_path / "frame.%d.png"),
+                "--frames",
+                str(frame),
+                "--rows",
+                "2",
+                "--columns",
+                "3",
+                "--width",
+                str(image.shape[1]),
+                "--height",
+                "7",
+            ]
+        )
+
+    for frame, image in images.items():
+        np.testing.assert_array_equal(read_png(str(tmp_path / f"frame.{frame}.png")), image)
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["frame.1.png", "frame.2.png"]
+    assert "Stitched 6 tiles into" in capsys.readouterr().out
+
+
+def test_main_stitches_the_tiles_of_a_camera(tmp_path):
+    image = make_image(8, 6)
+    write_tiles(tmp_path / "frame.1.Red.Front.png", image, 2, 2)
+
+    main(
+        [
+            "--output-file-path",
+            str(tmp_path / "frame.%d.png"),
+            "--frames",
+            "1",
+            "--rows",
+            "2",
+            "--columns",
+            "2",
+            "--width",
+            "8",
+            "--height",
+            "6",
+            "--camera",
+            "Front",
+            "--model-set",
+            "Red",
+        ]
+    )
+
+    np.testing.assert_array_equal(read_png(str(tmp_path / "frame.1.Red.Front.png")), image)
@@ -0,0 +1,42 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+import pytest
+
+from deadline.keyshot_adaptor.KeyShotAdaptor.tiles import Region, tile_output_path, tile_region
+
+
+@pytest.mark.parametrize(
+    "width, height, rows, columns",
+    [(1920, 1080, 2, 2), (1001, 997, 3, 7), (5, 5, 5, 5), (4096, 1, 1, 16)],
+)
+def test_tiles_cover_the_image_exactly_once(width, height, rows, columns):
+    covered = [[0] * width for _ in range(height)]
+    for row in range(1, rows + 1):
+        for column in range(1, columns + 1):
+            x, y, tile_width, tile_height = tile_region(width, height, rows, columns, row, column)
+            assert tile_width >= 1 and tile_height >= 1
+            for pixel_row in covered[y : y + tile_height]:
+                for i in range(x, x + tile_width):
+                    pixel_row[i] += 1
+
+    assert all(count == 1 for pixel_row in covered for count in pixel_row)
+
+
+def test_tile_region():
+    assert tile_region(1920, 1080, 2, 3, 2, 3) == Region(x=1280, y=540, width=640, height=540)
+    # The last tile of an uneven split takes the remaining pixels
+    assert tile_region(10, 10, 1, 3, 1, 3) == Region(x=6, y=0, width=4, height=10)
+
+
+@pytest.mark.parametrize("row, column", [(0, 1), (1, 0), (3, 1), (1, 3)])
+def test_tile_region_rejects_tiles_outside_the_grid(row, column):
+    with pytest.raises(ValueError, match="is not in a grid of 2x2 tiles"):
+        tile_region(100, 100, 2, 2, row, column)
+
+
+def test_tile_region_rejects_more_tiles_than_pixels():
+    with pytest.raises(ValueError, match="cannot be split into 1x3 tiles"):
+        tile_region(2, 2, 1, 3, 1, 1)
+
+
+def test_tile_output_path():
+    assert tile_output_path("/renders/frame.%d.png", 1, 2) == "/renders/frame.%d.tile-1-2.png"
@@ -1,10 +1,18 @@
 # Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
 from ... import lux_import_override  # noqa: F401
 
+import os
 from unittest import mock
 import pytest
 
-from deadline.keyshot_adaptor.KeyShotClient.keyshot_client import KeyShotClient, lux
+from deadline.keyshot_adaptor.KeyShotClient.keyshot_client import KeyShotClient, lux, serve_pool
+from deadline.keyshot_adaptor._fileutil import read_json, write_json_atomic
+from deadline.keyshot_adaptor.pool_protocol import (
+    LEASE_FILE,
+    LEASE_LOCK_FILE,
+    POOL_IDLE_TIMEOUT_ENV_VAR,
+    STATE_FILE,
+)
 
 
 @pytest.fixture(autouse=True)
@@ -16,3 +24,50 @@ def mock_get_keyshot_display_version():
 
 def test_keyshot_client_creation():
     KeyShotClient("127.0.01")
+
+
+@pytest.fixture
+def slot_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv(POOL_IDLE_TIMEOUT_ENV_VAR, "0.1")
+    write_json_atomic(str(tmp_path / LEASE_FILE), {"lease_id": "1", "server_path": "server"})
+    return str(tmp_path)
+
+
+def test_serve_pool_serves_lease_then_exits_when_idle(slot_dir):
+    with mock.patch.object(KeyShotClient, "poll") as poll_mock:
+        serve_pool(slot_dir)
+
+    poll_mock.assert_called_once()
+    state = read_json(os.path.join(slot_dir, STATE_FILE))
+    assert state is not None
+    assert state["uses"] == 1
+    assert state["status"] == "exited"
+    assert not os.path.exists(os.path.join(slot_dir, LEASE_FILE))
+
+
+def test_serve_pool_exits_when_retired(slot_dir, monkeypatch):
+    # Without retiring, the process would wait in the pool for the whole idle timeout
+    monkeypatch.setenv(POOL_IDLE_TIMEOUT_ENV_VAR, "600")
+
+    def close(self):
+        self.close({"retire": True})
+
+    with mock.patch.object(KeyShotClient, "poll", autospec=True, side_effect=close) as poll_mock:
+        serve_pool(slot_dir)
+
+    poll_mock.assert_called_once()
+    state = read_json(os.path.join(slot_dir, STATE_FILE))
+    assert state is not None
+    assert state["uses"] == 1
+
+
+def test_pooled_client_closes_when_lease_is_released(tmp_path):
+    lease_lock_path = str(tmp_path / LEASE_LOCK_FILE)
+    client = KeyShotClient("127.0.01", lease_lock_path=lease_lock_path)
+
+    status, _, action = client._request_next_action()
+
+    assert status == 200
+    assert action is not None and action.name == "close"
+    client.close(action.args)
+    assert not client.retire
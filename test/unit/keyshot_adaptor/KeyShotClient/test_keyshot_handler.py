@@ -1,8 +1,299 @@
 # Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
 from ... import lux_import_override  # noqa: F401
 
-from deadline.keyshot_adaptor.KeyShotClient.keyshot_handler import KeyShotHandler
+import os
+from unittest import mock
+
+import pytest
+
+from deadline.keyshot_adaptor.KeyShotAdaptor.scene_cache import SceneCache
+from deadline.keyshot_adaptor.KeyShotClient.keyshot_handler import KeyShotHandler, lux
 
 
 def test_keyshot_handler_creation():
     KeyShotHandler()
+
+
+def test_start_render_renders_every_frame_of_the_chunk():
+    handler = KeyShotHandler()
+    handler.set_output_file_path({"output_file_path": "/renders/frame.%d.png"})
+    handler.set_frames({"frames": [1, 2, 3]})
+
+    with (
+        mock.patch.object(lux, "renderImage") as render_image_mock,
+        mock.patch.object(lux, "setAnimationFrame") as set_animation_frame_mock,
+    ):
+        handler.start_render({})
+
+    assert set_animation_frame_mock.call_args_list == [mock.call(1), mock.call(2), mock.call(3)]
+    assert [call.kwargs["path"] for call in render_image_mock.call_args_list] == [
+        "/renders/frame.1.png",
+        "/renders/frame.2.png",
+        "/renders/frame.3.png",
+    ]
+
+
+def test_render_sets_output_and_frames_then_renders():
+    handler = KeyShotHandler()
+    handler.set_output_file_path({"output_file_path": "/renders/frame.%d.png"})
+
+    with mock.patch.object(lux, "renderImage") as render_image_mock:
+        handler.render(
+            {
+                "frames": [4, 5],
+                "output_file_path": "/override/frame.%d.exr",
+                "output_format": "RENDER_OUTPUT_EXR",
+            }
+        )
+
+    assert [call.kwargs["path"] for call in render_image_mock.call_args_list] == [
+        "/override/frame.4.exr",
+        "/override/frame.5.exr",
+    ]
+    assert render_image_mock.call_args.kwargs["format"] == lux.RENDER_OUTPUT_EXR
+    # The override only applies to that render
+    assert handler.output_path == "/renders/frame.%d.png"
+    assert handler.output_format_code == lux.RENDER_OUTPUT_PNG
+
+
+def test_render_renders_only_the_region_of_a_tile():
+    handler = KeyShotHandler()
+    handler.set_output_file_path({"output_file_path": "/renders/frame.%d.png"})
+
+    with (
+        mock.patch.object(lux, "renderImage") as render_image_mock,
+        mock.patch.object(lux, "getRenderOptions") as get_render_options_mock,
+    ):
+        handler.render(
+            {
+                "frames": [1],
+                "output_file_path": "/renders/frame.%d.tile-2-1.png",
+                "region": [0, 540, 960, 540],
+                "width": 1920,
+                "height": 1080,
+            }
+        )
+        # The next render is not a tile
+        handler.render({"frames": [2]})
+
+    get_render_options_mock.return_value.setRegion.assert_called_once_with((0, 540, 960, 540))
+    first, second = render_image_mock.call_args_list
+    assert first.kwargs["path"] == "/renders/frame.1.tile-2-1.png"
+    assert (first.kwargs["width"], first.kwargs["height"]) == (1920, 1080)
+    assert "width" not in second.kwargs and "height" not in second.kwargs
+
+
+def test_render_renders_the_samples_of_a_seed():
+    handler = KeyShotHandler()
+    handler.set_output_file_path({"output_file_path": "/renders/frame.%d.exr"})
+
+    with (
+        mock.patch.object(lux, "renderImage"),
+        mock.patch.object(lux, "getRenderOptions") as get_render_options_mock,
+    ):
+        handler.render({"frames": [1], "samples": 32, "seed": 4})
+
+    opts = get_render_options_mock.return_value
+    opts.setMaxSamplesRendering.assert_called_once_with(32)
+    opts.setSeed.assert_called_once_with(4)
+
+
+def test_render_fails_when_keyshot_cannot_set_the_seed():
+    handler = KeyShotHandler()
+    # The render options of a KeyShot version without seeds
+    opts = mock.Mock(spec=["setAddToQueue", "setMaxSamplesRendering"])
+
+    with (
+        mock.patch.object(lux, "renderImage") as render_image_mock,
+        mock.patch.object(lux, "getRenderOptions", return_value=opts),
+    ):
+        with pytest.raises(RuntimeError, match="cannot set the seed"):
+            handler.render({"frames": [1], "samples": 32, "seed": 4})
+
+    render_image_mock.assert_not_called()
+
+
+def test_render_fails_before_switching_views_when_keyshot_cannot_set_the_seed():
+    handler = KeyShotHandler()
+    opts = mock.Mock(spec=["setAddToQueue", "setMaxSamplesRendering"])
+
+    with (
+        mock.patch.object(lux, "renderImage") as render_image_mock,
+        mock.patch.object(lux, "getRenderOptions", return_value=opts),
+        mock.patch.object(handler, "set_camera") as set_camera_mock,
+    ):
+        with pytest.raises(RuntimeError, match="cannot set the seed"):
+            handler.render(
+                {"shots": [{"camera": "Front"}], "frames": [1], "samples": 32, "seed": 4}
+            )
+
+    set_camera_mock.assert_not_called()
+    opts.setMaxSamplesRendering.assert_not_called()
+    render_image_mock.assert_not_called()
+
+
+def test_render_renders_every_shot_in_turn():
+    handler = KeyShotHandler()
+    handler.set_output_file_path({"output_file_path": "/renders/frame.%d.png"})
+    calls = mock.Mock()
+
+    with (
+        mock.patch.object(lux, "getCameras", return_value=["Front", "Top"]),
+        mock.patch.object(lux, "getModelSets", return_value=["Red", "Blue"]),
+        mock.patch.object(lux, "getStudios", return_value=["Packshot"]),
+        mock.patch.object(lux, "setCamera", calls.setCamera),
+        mock.patch.object(lux, "setModelSet", calls.setModelSet),
+        mock.patch.object(lux, "setStudio", calls.setStudio),
+        mock.patch.object(lux, "renderImage", calls.renderImage),
+    ):
+        handler.render(
+            {
+                "shots": [
+                    {
+                        "studio": "Packshot",
+                        "model_set": "Red",
+                        "camera": camera,
+                        "frames": frames,
+                        "output_file_path": f"/renders/frame.%d.Packshot.Red.{camera}.png",
+                    }
+                    for camera, frames in (("Front", [2]), ("Top", [1, 2]))
+                ]
+            }
+        )
+
+    # Each shot switches the view, then renders its frames
+    assert [(name, args or kwargs["path"]) for name, args, kwargs in calls.mock_calls] == [
+        ("setStudio", ("Packshot",)),
+        ("setModelSet", ("Red",)),
+        ("setCamera", ("Front",)),
+        ("renderImage", "/renders/frame.2.Packshot.Red.Front.png"),
+        ("setStudio", ("Packshot",)),
+        ("setModelSet", ("Red",)),
+        ("setCamera", ("Top",)),
+        ("renderImage", "/renders/frame.1.Packshot.Red.Top.png"),
+        ("renderImage", "/renders/frame.2.Packshot.Red.Top.png"),
+    ]
+
+
+@pytest.mark.parametrize(
+    "action, kind", [("camera", "camera"), ("model_set", "model set"), ("studio", "studio")]
+)
+def test_switching_to_a_missing_view_fails(action, kind):
+    handler = KeyShotHandler()
+
+    with (
+        mock.patch.object(lux, "getCameras", return_value=["Front"]),
+        mock.patch.object(lux, "getModelSets", return_value=["Red"]),
+        mock.patch.object(lux, "getStudios", return_value=["Packshot"]),
+        mock.patch.object(lux, "setCamera") as set_camera_mock,
+        mock.patch.object(lux, "setModelSet") as set_model_set_mock,
+        mock.patch.object(lux, "setStudio") as set_studio_mock,
+    ):
+        with pytest.raises(RuntimeError, match=f"does not have the {kind} 'Back'"):
+            handler.action_dict[action]({action: "Back"})
+
+    set_camera_mock.assert_not_called()
+    set_model_set_mock.assert_not_called()
+    set_studio_mock.assert_not_called()
+
+
+def test_set_frame_renders_a_single_frame():
+    handler = KeyShotHandler()
+    handler.set_frame({"frame": 7})
+
+    assert handler.render_kwargs["frames"] == [7]
+
+
+@pytest.fixture
+def scene_file(tmp_path):
+    path = tmp_path / "scene.bip"
+    path.write_bytes(b"scene")
+    yield str(path)
+    KeyShotHandler.loaded_scene_fingerprint = None
+    KeyShotHandler.scene_loads_performed = 0
+    KeyShotHandler.scene_loads_skipped = 0
+
+
+def test_set_scene_file_skips_reloading_the_open_scene(scene_file):
+    with mock.patch.object(lux, "openFile") as open_file_mock:
+        # Each session of a reused KeyShot process creates its own handler
+        KeyShotHandler().set_scene_file({"scene_file": scene_file})
+        KeyShotHandler().set_scene_file({"scene_file": scene_file})
+
+    open_file_mock.assert_called_once_with(scene_file)
+    assert KeyShotHandler.scene_loads_performed == 1
+    assert KeyShotHandler.scene_loads_skipped == 1
+
+
+def test_set_scene_file_skips_reloading_a_scene_staged_again(tmp_path, scene_file):
+    cache = SceneCache(str(tmp_path / "cache"), max_bytes=1024)
+    with mock.patch.object(lux, "openFile") as open_file_mock:
+        # Each session stages the scene into the scene cache before KeyShot opens it
+        for _ in range(2):
+            staged = cache.stage(scene_file)
+            KeyShotHandler().set_scene_file({"scene_file": staged.path})
+
+    open_file_mock.assert_called_once_with(staged.path)
+    assert KeyShotHandler.scene_loads_skipped == 1
+
+
+def test_set_scene_file_reloads_a_changed_scene(scene_file):
+    handler = KeyShotHandler()
+    with mock.patch.object(lux, "openFile") as open_file_mock:
+        handler.set_scene_file({"scene_file": scene_file})
+        os.utime(scene_file, ns=(0, 0))
+        handler.set_scene_file({"scene_file": scene_file})
+
+    assert open_file_mock.call_count == 2
+    assert KeyShotHandler.scene_loads_skipped == 0
+
+
+def test_set_scene_file_reloads_when_forced(scene_file):
+    handler = KeyShotHandler()
+    with mock.patch.object(lux, "openFile") as open_file_mock:
+        handler.set_scene_file({"scene_file": scene_file})
+        handler.set_scene_file({"scene_file": scene_file, "force_reload": True})
+
+    assert open_file_mock.call_count == 2
+
+
+def test_set_scene_file_content_hash_detects_changes_that_keep_size_and_mtime(scene_file):
+    handler = KeyShotHandler()
+    stat = os.stat(scene_file)
+    with mock.patch.object(lux, "openFile") as open_file_mock:
+        handler.set_scene_file({"scene_file": scene_file, "content_hash": True})
+        with open(scene_file, "wb") as f:
+            f.write(b"SCENE")
+        os.utime(scene_file, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        handler.set_scene_file({"scene_file": scene_file, "content_hash": True})
+
+    assert open_file_mock.call_count == 2
+
+
+@pytest.mark.parametrize("action", ["camera", "model_set", "studio"])
+def test_switching_the_view_reloads_the_scene_in_the_next_session(scene_file, action):
+    with (
+        mock.patch.object(lux, "openFile") as open_file_mock,
+        mock.patch.object(lux, "getCameras", return_value=["Front"]),
+        mock.patch.object(lux, "getModelSets", return_value=["Front"]),
+        mock.patch.object(lux, "getStudios", return_value=["Front"]),
+        mock.patch.object(lux, "setCamera"),
+        mock.patch.object(lux, "setModelSet"),
+        mock.patch.object(lux, "setStudio"),
+    ):
+        handler = KeyShotHandler()
+        handler.set_scene_file({"scene_file": scene_file})
+        handler.action_dict[action]({action: "Front"})
+        KeyShotHandler().set_scene_file({"scene_file": scene_file})
+
+    assert open_file_mock.call_count == 2
+
+
+def test_set_scene_file_does_not_remember_a_failed_load(scene_file):
+    handler = KeyShotHandler()
+    with mock.patch.object(lux, "openFile", side_effect=[RuntimeError("crash"), None]) as open_file:
+        with pytest.raises(RuntimeError):
+            handler.set_scene_file({"scene_file": scene_file})
+        handler.set_scene_file({"scene_file": scene_file})
+
+    assert open_file.call_count == 2
@@ -65,6 +65,125 @@ def test_construct_job_template():
     assert job_template["name"] == filename
 
 
+def test_construct_job_template_chunks_frames():
+    job_template = submitter.construct_job_template("test_filename")
+
+    assert "TASK_CHUNKING" in job_template["extensions"]
+    assert "ChunkSize" in [param["name"] for param in job_template["parameterDefinitions"]]
+    frame_param = job_template["steps"][0]["parameterSpace"]["taskParameterDefinitions"][0]
+    assert frame_param["type"] == "CHUNK[INT]"
+    assert frame_param["chunks"]["defaultTaskCount"] == "{{Param.ChunkSize}}"
+
+
+def test_construct_job_template_splits_frames_into_tiles():
+    job_template = submitter.construct_job_template(
+        "test_filename", frame_split=submitter.FRAME_SPLIT_TILES
+    )
+
+    parameters = {param["name"]: param for param in job_template["parameterDefinitions"]}
+    assert {"TileRows", "TileColumns", "ImageWidth", "ImageHeight"} <= parameters.keys()
+    assert parameters["OutputFormat"]["allowedValues"] == ["PNG"]
+    render_step, assemble_step = job_template["steps"]
+    assert [
+        param["name"] for param in render_step["parameterSpace"]["taskParameterDefinitions"]
+    ] == ["Frame", "TileRow", "TileColumn"]
+    assert "tiles:" in render_step["stepEnvironments"][0]["script"]["embeddedFiles"][0]["data"]
+    assert "tile:" in render_step["script"]["embeddedFiles"][0]["data"]
+    assert assemble_step["dependencies"] == [{"dependsOn": "Render"}]
+    assert "deadline.keyshot_adaptor.KeyShotAdaptor.tile_stitcher" in (
+        assemble_step["script"]["actions"]["onRun"]["args"]
+    )
+    # Rendering without tiles is unchanged
+    assert len(submitter.construct_job_template("test_filename")["steps"]) == 1
+
+
+def test_construct_job_template_defaults_tiles_to_the_image_size():
+    job_template = submitter.construct_job_template(
+        "test_filename", frame_split=submitter.FRAME_SPLIT_TILES, image_size=(1920, 1080)
+    )
+
+    parameters = {param["name"]: param for param in job_template["parameterDefinitions"]}
+    assert parameters["ImageWidth"]["default"] == 1920
+    assert parameters["ImageHeight"]["default"] == 1080
+
+
+@pytest.mark.parametrize(
+    "scene_info, expected",
+    [
+        ({"width": 1920, "height": 1080}, (1920, 1080)),
+        ({"width": "1280", "height": "720"}, (1280, 720)),
+        ({}, submitter.DEFAULT_IMAGE_SIZE),
+        ({"width": 0, "height": 1080}, submitter.DEFAULT_IMAGE_SIZE),
+        ({"width": None, "height": None}, submitter.DEFAULT_IMAGE_SIZE),
+    ],
+)
+def test_get_render_resolution(scene_info, expected):
+    assert submitter.get_render_resolution(scene_info) == expected
+
+
+def test_construct_job_template_splits_samples_across_tasks():
+    job_template = submitter.construct_job_template(
+        "test_filename", frame_split=submitter.FRAME_SPLIT_SAMPLES
+    )
+
+    parameters = {param["name"]: param for param in job_template["parameterDefinitions"]}
+    assert {"SampleTasks", "SamplesPerTask"} <= parameters.keys()
+    assert parameters["OutputFormat"]["allowedValues"] == ["EXR"]
+    render_step, merge_step = job_template["steps"]
+    assert [
+        param["name"] for param in render_step["parameterSpace"]["taskParameterDefinitions"]
+    ] == ["Frame", "Seed"]
+    assert render_step["script"]["embeddedFiles"][0]["data"] == (
+        "frame: '{{Task.Param.Frame}}'\n"
+        "samples: {{Param.SamplesPerTask}}\n"
+        "seed: {{Task.Param.Seed}}\n"
+    )
+    assert merge_step["dependencies"] == [{"dependsOn": "Render"}]
+    assert merge_step["script"]["actions"]["onRun"]["args"][-2:] == [
+        "--sample-tasks",
+        "{{Param.SampleTasks}}",
+    ]
+
+
+def test_construct_job_template_renders_every_view_of_the_scene():
+    job_template = submitter.construct_job_template(
+        "test_filename",
+        frame_split=submitter.FRAME_SPLIT_TILES,
+        variants={"Camera": ["Front", "Top"], "ModelSet": ["Red"], "Studio": []},
+    )
+
+    render_step, assemble_step = job_template["steps"]
+    render_space = render_step["parameterSpace"]
+    assert render_space["combination"] == "Frame * ModelSet * Camera * TileRow * TileColumn"
+    assert render_space["taskParameterDefinitions"][1:3] == [
+        {"name": "ModelSet", "type": "STRING", "range": ["Red"]},
+        {"name": "Camera", "type": "STRING", "range": ["Front", "Top"]},
+    ]
+    assert render_step["script"]["embeddedFiles"][0]["data"].startswith(
+        "frame: '{{Task.Param.Frame}}'\n"
+        "model_set: |-\n  {{Task.Param.ModelSet}}\n"
+        "camera: |-\n  {{Task.Param.Camera}}\n"
+    )
+    # Each view is stitched from its own tiles
+    assert assemble_step["parameterSpace"]["combination"] == "Frame * ModelSet * Camera"
+    args = assemble_step["script"]["actions"]["onRun"]["args"]
+    assert args[args.index("--model-set") + 1] == "{{Task.Param.ModelSet}}"
+    assert args[args.index("--camera") + 1] == "{{Task.Param.Camera}}"
+
+
+def test_get_scene_variants_enumerates_the_selected_views():
+    with (
+        mock.patch.object(submitter.lux, "getCameras", return_value=["Front", "Top"]),
+        mock.patch.object(submitter.lux, "getModelSets", return_value=["Red"]) as get_model_sets,
+    ):
+        variants = submitter.get_scene_variants(
+            {"render_every_camera": True, "render_every_model_set": False}
+        )
+
+    assert variants == {"Camera": ["Front", "Top"]}
+    get_model_sets.assert_not_called()
+
+
 def test_construct_asset_references():
     settings = submitter.Settings(
         parameter_values=[
@@ -328,6 +447,87 @@ def test_auto_pause_resume(
     mock_lux_unpause.assert_called()
 
 
+@pytest.mark.parametrize(
+    "frame_split_option, expected_packages",
+    [
+        (0, "keyshot=2024.* keyshot-openjd=0.3.*"),
+        (1, "keyshot=2024.* keyshot-openjd=0.3.* numpy"),
+        (2, "keyshot=2024.* keyshot-openjd=0.3.* numpy"),
+    ],
+)
+def test_main_inner_installs_numpy_to_assemble_split_frames(
+    mock_lux_is_scene_changed, frame_split_option, expected_packages
+):
+    mock_lux_is_scene_changed.return_value = False
+    dumped = {}
+
+    def dump_json_to_dir(contents, directory, filename):
+        dumped[filename] = contents
+
+    with mock.patch.multiple(
+        submitter,
+        options_dialog=mock.Mock(
+            return_value={
+                submitter.SUBMISSION_MODE_KEY: [1],
+                submitter.FRAME_SPLIT_KEY: [frame_split_option],
+            }
+        ),
+        load_sticky_settings=mock.Mock(return_value=None),
+        dump_json_to_dir=dump_json_to_dir,
+        gui_submit=mock.Mock(return_value=None),
+    ):
+        with mock.patch.multiple(
+            submitter.lux,
+            getSceneInfo=mock.Mock(
+                return_value={
+                    "file": "/scenes/test.bip",
+                    "name": "test.bip",
+                    "width": 1920,
+                    "height": 1080,
+                }
+            ),
+            getAnimationFrame=mock.Mock(return_value=1),
+            getAnimationInfo=mock.Mock(return_value={"frames": 1}),
+            getKeyShotDisplayVersion=mock.Mock(return_value=(2024, 1)),
+        ):
+            submitter.main_inner()
+
+    parameter_values = {
+        parameter["name"]: parameter["value"]
+        for parameter in dumped["parameter_values.json"]["parameterValues"]
+    }
+    assert parameter_values["CondaPackages"] == expected_packages
+    assert parameter_values["CondaChannels"] == "deadline-cloud"
+    template_parameters = {
+        parameter["name"]: parameter
+        for parameter in dumped["template.json"]["parameterDefinitions"]
+    }
+    if frame_split_option == 1:
+        # Tiles default to the render resolution of the scene
+        assert template_parameters["ImageWidth"]["default"] == 1920
+        assert template_parameters["ImageHeight"]["default"] == 1080
+
+
+def test_main_inner_fails_to_split_samples_when_keyshot_cannot_set_the_seed(
+    mock_lux_is_scene_changed,
+):
+    mock_lux_is_scene_changed.return_value = False
+    # The render options of a KeyShot version without seeds
+    opts = mock.Mock(spec=["setAddToQueue", "setMaxSamplesRendering"])
+
+    with mock.patch.object(
+        submitter,
+        "options_dialog",
+        return_value={submitter.SUBMISSION_MODE_KEY: [1], submitter.FRAME_SPLIT_KEY: [2]},
+    ):
+        with mock.patch.object(submitter.lux, "getRenderOptions", return_value=opts):
+            with mock.patch.object(submitter, "gui_submit") as gui_submit_mock:
+                with pytest.raises(Exception, match="cannot set the seed"):
+                    submitter.main_inner()
+
+    gui_submit_mock.assert_not_called()
+
+
 def test_save_ksp_bundle(mock_lux_save_package):
     dir = os.path.normpath("/testdir/test")
     bundle_name = "test_bundle.ksp"